@@ -0,0 +1,176 @@
+"""
+Admission control for CPU-heavy routes.
+
+Routes are grouped into classes by path pattern ('import', 'transform', ...).
+Each class runs at most `limit` requests at once. Further requests wait in a
+bounded FIFO queue for at most `max_wait` seconds, and when the queue is full
+(or the wait runs out) they are turned away straight away with 503 and a
+Retry-After estimate, instead of piling onto the threadpool and making every
+request slow. Routes outside every class (settings, /, health checks, ...)
+bypass admission entirely.
+
+A request holds its slot until its response has been sent, so streamed
+responses count for as long as they are being generated. Waiting happens
+before the body is read, so queued uploads are not buffered.
+
+All of this runs on the event loop thread, so the counters need no lock.
+"""
+import asyncio
+import math
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.responses import JSONResponse
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+def _granted(waiter: asyncio.Future) -> bool:
+    return waiter.done() and not waiter.cancelled()
+
+class AdmissionClass:
+    """Concurrency limit plus bounded wait queue for one class of routes"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.running = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Counters, for /admission/stats
+        self.admitted = 0
+        self.queued = 0  # Admitted after waiting
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.abandoned = 0  # Client went away while queued
+        self.peak_queue = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.service_time = 0.0  # Moving average of seconds per request
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has probably drained"""
+        backlog = self.waiting + self.running
+        return max(1, math.ceil(self.service_time * backlog / self.limit))
+
+    async def acquire(self) -> None:
+        if self.running < self.limit and not self.waiting:
+            self.running += 1
+            self.admitted += 1
+            return
+        if self.waiting >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(f"Server busy: the {self.name} queue is full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.peak_queue = max(self.peak_queue, self.waiting)
+        started = time.perf_counter()
+        try:
+            # release() hands its slot straight to the waiter, so running stays counted
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            if not _granted(waiter):  # Else the slot arrived just as the wait ran out: keep it
+                self.rejected_timeout += 1
+                raise AdmissionRejected(f"Server busy: waited {self.max_wait:g}s for a {self.name} slot",
+                                        self.retry_after())
+        except asyncio.CancelledError:
+            if _granted(waiter):
+                self.release()  # Got the slot just as the client went away
+            self.abandoned += 1
+            raise
+        finally:
+            if waiter in self._waiters and waiter.done():
+                self._waiters.remove(waiter)
+        waited = time.perf_counter() - started
+        self.admitted += 1
+        self.queued += 1
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+
+    def release(self, seconds: Optional[float] = None) -> None:
+        if seconds is not None:
+            self.service_time = seconds if not self.service_time else 0.8 * self.service_time + 0.2 * seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # Slot passes to the next waiter
+                return
+        self.running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "maxQueue": self.max_queue,
+            "maxWaitSeconds": self.max_wait,
+            "running": self.running,
+            "queueDepth": self.waiting,
+            "peakQueueDepth": self.peak_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejectedQueueFull": self.rejected_queue_full,
+            "rejectedTimeout": self.rejected_timeout,
+            "abandoned": self.abandoned,
+            "avgWaitMs": round(self.total_wait / self.queued * 1000, 1) if self.queued else 0.0,
+            "maxWaitMs": round(self.max_wait_seen * 1000, 1),
+            "avgServiceMs": round(self.service_time * 1000, 1)
+        }
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission classes.
+
+    routes is a list of (path regex, class name), matched from the start of
+    the path in order; classes maps class names to AdmissionClass.
+    """
+
+    def __init__(self, app, classes: Dict[str, AdmissionClass], routes: Sequence[Tuple[str, str]],
+                 enabled: bool = True):
+        self.app = app
+        self.classes = classes
+        self.routes = [(re.compile(pattern), name) for pattern, name in routes]
+        self.enabled = enabled
+
+    def route_class(self, path: str) -> Optional[AdmissionClass]:
+        for pattern, name in self.routes:
+            if pattern.match(path):
+                return self.classes[name]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        admission = None
+        if self.enabled and scope['type'] == 'http' and scope.get('method') != 'OPTIONS':
+            admission = self.route_class(scope.get('path', ''))
+        if admission is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await admission.acquire()
+        except AdmissionRejected as e:
+            response = JSONResponse({"error": e.reason}, status_code=503,
+                                    headers={"Retry-After": str(e.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(time.perf_counter() - started)
+
+def admission_stats(classes: Dict[str, AdmissionClass], routes: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+    by_class: Dict[str, List[str]] = {name: [] for name in classes}
+    for pattern, name in routes:
+        by_class[name].append(pattern)
+    return {name: {**admission.stats(), "routes": by_class[name]} for name, admission in classes.items()}
@@ -0,0 +1,106 @@
+"""
+A burst of heavy requests, with and without admission control.
+
+Starts uvicorn twice (ADMISSION_CONTROL=0 and 1), fires `burst` concurrent
+4 x 100k-note /gesture/multi-layer requests, and while they run keeps probing a
+light /transform/transpose request and GET /settings. Reports latency of the
+heavy requests that succeeded, how many were turned away with 503 (and how
+fast), probe latency during the burst, and /admission/stats afterwards.
+
+Run from the backend directory:
+    python benchmarks/bench_admission.py [burst] [gesture_concurrency] [queue_size]
+"""
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from loadtest import free_port, percentile, start_server
+
+GESTURE = json.dumps({"layers": [{"layerId": i, "midiNote": 60 + i, "durationPercent": 50, "totalDuration": 600,
+                                  "numNotes": 100_000, "pattern": "random-walk", "seed": i} for i in range(4)],
+                      "scale_type": "major", "root_note": "C"})
+TRANSPOSE = json.dumps({"notes": [{"midi": 60 + i % 12, "time": i * 0.25, "duration": 0.25} for i in range(32)],
+                        "scale_type": "major", "root_note": "C", "semitones": 2})
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+    started = time.perf_counter()
+    conn.request(method, path, body=body, headers={'Content-Type': 'application/json'} if body else {})
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response.status, time.perf_counter() - started, response.getheader('Retry-After'), data
+
+
+def run(admission: bool, burst: int, concurrency: int, queue_size: int):
+    os.environ.update(ADMISSION_CONTROL='1' if admission else '0', ADMISSION_GESTURE_CONCURRENCY=str(concurrency),
+                      ADMISSION_QUEUE_SIZE=str(queue_size), WARMUP_ON_STARTUP='0')
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_server(Path(workdir), port)
+        try:
+            heavy, probes = [], {'/transform/transpose': [], '/settings': []}
+            done = threading.Event()
+
+            def fire():
+                heavy.append(request(port, 'POST', '/gesture/multi-layer', GESTURE))
+
+            def probe():
+                while not done.is_set():
+                    probes['/transform/transpose'].append(request(port, 'POST', '/transform/transpose', TRANSPOSE)[1])
+                    probes['/settings'].append(request(port, 'GET', '/settings')[1])
+                    time.sleep(0.02)
+
+            prober = threading.Thread(target=probe)
+            prober.start()
+            started = time.perf_counter()
+            threads = [threading.Thread(target=fire) for _ in range(burst)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            done.set()
+            prober.join()
+            stats = json.loads(request(port, 'GET', '/admission/stats')[3])
+        finally:
+            server.terminate()
+            server.wait()
+
+    ok = sorted(seconds for status, seconds, _, _ in heavy if status == 200)
+    rejected = sorted(seconds for status, seconds, _, _ in heavy if status == 503)
+    retry_after = sorted({retry for status, _, retry, _ in heavy if status == 503})
+    print(f"admission {'on' if admission else 'off'}: burst of {burst} finished in {elapsed:.1f} s")
+    print(f"  200: {len(ok):>3}  p50 {percentile(ok, 50) * 1000:>8.0f} ms  p99 {percentile(ok, 99) * 1000:>8.0f} ms")
+    if rejected:
+        print(f"  503: {len(rejected):>3}  p50 {percentile(rejected, 50) * 1000:>8.0f} ms  "
+              f"p99 {percentile(rejected, 99) * 1000:>8.0f} ms  Retry-After {retry_after}")
+    for path, samples in probes.items():
+        samples.sort()
+        print(f"  probe {path:<22} p50 {percentile(samples, 50) * 1000:>8.1f} ms  "
+              f"p99 {percentile(samples, 99) * 1000:>8.1f} ms")
+    if admission:
+        gesture = stats['classes']['gesture']
+        print(f"  stats: " + ", ".join(f"{key} {gesture[key]}" for key in
+                                       ('admitted', 'queued', 'rejectedQueueFull', 'rejectedTimeout',
+                                        'peakQueueDepth', 'avgWaitMs', 'avgServiceMs')))
+
+
+def main():
+    burst = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    queue_size = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    for admission in (False, True):
+        run(admission, burst, concurrency, queue_size)
+
+
+if __name__ == "__main__":
+    main()
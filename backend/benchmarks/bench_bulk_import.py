@@ -0,0 +1,87 @@
+"""
+Bulk MIDI import throughput across worker counts.
+
+Builds a zip of synthetic multi-track MIDI files and runs the bulk import
+pipeline (archive reading, process pool parse and re-encode, completion-order
+results) with the note store cache disabled, reporting files per second and
+time to first result for each pool size.
+
+Run from the backend directory:
+    python benchmarks/bench_bulk_import.py [files] [notes_per_track] [max_workers]
+"""
+import asyncio
+import io
+import os
+import random
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mido
+
+from bulk_import import bulk_import_results, iter_archive_members
+
+
+def synthetic_midi(tracks, notes_per_track, rng):
+    mid = mido.MidiFile(type=1)
+    for t in range(tracks):
+        track = mido.MidiTrack()
+        track.name = f"Track {t}"
+        for _ in range(notes_per_track):
+            note = rng.randint(40, 90)
+            track.append(mido.Message('note_on', note=note, velocity=rng.randint(30, 120), time=rng.randint(0, 60)))
+            track.append(mido.Message('note_off', note=note, velocity=0, time=rng.randint(30, 240)))
+        mid.tracks.append(track)
+    buf = io.BytesIO()
+    mid.save(file=buf)
+    return buf.getvalue()
+
+
+def build_archive(files, notes_per_track, rng):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for i in range(files):
+            archive.writestr(f"source/file_{i:04d}.mid", synthetic_midi(3, notes_per_track, rng))
+    return buf.getvalue()
+
+
+async def run(archive, workers):
+    members = iter_archive_members(io.BytesIO(archive), 'bench.zip', 10000, 1 << 31)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Start the workers before timing
+        list(pool.map(abs, range(workers)))
+        start = time.perf_counter()
+        summary = None
+        async for result in bulk_import_results(members, pool):
+            if result.get('done'):
+                summary = result
+        elapsed = time.perf_counter() - start
+    return elapsed, summary
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    notes_per_track = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 4)
+    rng = random.Random(3)
+
+    archive = build_archive(files, notes_per_track, rng)
+    print(f"Archive: {files} files x 3 tracks x {notes_per_track} notes, {len(archive) / 1e6:.2f} MB")
+    print(f"{'workers':>8} {'total s':>9} {'files/s':>9} {'first ms':>9} {'speedup':>8}")
+
+    baseline = None
+    workers = 1
+    while workers <= max_workers:
+        elapsed, summary = asyncio.run(run(archive, workers))
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {summary['filesImported'] / elapsed:>9.1f} "
+              f"{summary['firstResultMs']:>9.1f} {baseline / elapsed:>7.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
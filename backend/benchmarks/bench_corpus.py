@@ -0,0 +1,84 @@
+"""
+Melody corpus ingestion and query latency.
+
+Builds corpora of synthetic melodies (random walks seeded with shared motifs)
+at several sizes. It reports ingestion throughput, both in memory and from a
+directory of melody JSON files, and query latency percentiles for queries
+that are transposed excerpts of corpus melodies.
+
+Run from the backend directory:
+    python benchmarks/bench_corpus.py [max_melodies]
+"""
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corpus import MelodyCorpus
+
+
+def synthetic_melodies(count, rng):
+    motifs = [[rng.choice([-5, -3, -2, -1, 1, 2, 3, 4]) for _ in range(6)] for _ in range(200)]
+    melodies = []
+    for _ in range(count):
+        pitch = rng.randint(48, 72)
+        pitches = [pitch]
+        while len(pitches) < rng.randint(16, 64):
+            steps = rng.choice(motifs) if rng.random() < 0.3 else [rng.randint(-7, 7) for _ in range(4)]
+            for step in steps:
+                pitch = max(30, min(100, pitch + step))
+                pitches.append(pitch)
+        melodies.append(pitches)
+    return melodies
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    max_melodies = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = random.Random(0)
+    melodies = synthetic_melodies(max_melodies, rng)
+
+    print(f"{'melodies':>9}{'ingest/s':>12}{'p50 ms':>9}{'p99 ms':>9}")
+    for size in (1_000, 10_000, max_melodies):
+        corpus = MelodyCorpus()
+        start = time.perf_counter()
+        for i, pitches in enumerate(melodies[:size]):
+            corpus.add(pitches, 'synthetic', f'm{i}')
+        rate = size / (time.perf_counter() - start)
+
+        latencies = []
+        for _ in range(500):
+            source = rng.choice(melodies[:size])
+            offset = rng.randint(0, len(source) - 12)
+            transpose = rng.randint(-6, 6)
+            query = [p + transpose for p in source[offset:offset + 12]]
+            start = time.perf_counter()
+            corpus.query(query, top_k=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"{size:>9}{rate:>12.0f}{statistics.median(latencies):>9.3f}{percentile(latencies, 99):>9.3f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_count = 10_000 // 100
+        for f in range(file_count):
+            chunk = melodies[f * 100:(f + 1) * 100]
+            with open(Path(tmp) / f'melodies_{f}.json', 'w') as out:
+                json.dump({'melodies': [{'key': f'm{i}', 'pattern': p} for i, p in enumerate(chunk)]}, out)
+        corpus = MelodyCorpus()
+        start = time.perf_counter()
+        result = corpus.ingest_directory(Path(tmp))
+        elapsed = time.perf_counter() - start
+        print(f"\ndirectory ingest: {result['melodies']} melodies from {result['files']} JSON files "
+              f"in {elapsed:.2f} s ({result['melodies'] / elapsed:.0f} melodies/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Counterpoint throughput per scale.
+
+Shows the per-note cost of generate_counterpoint_notes for every registered
+scale, next to the legacy path (music21 scale per request plus a pitch-class
+list rebuilt for every snapped note).
+
+Run from the backend directory:
+    python benchmarks/bench_counterpoint.py [num_notes]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from counterpoint import generate_counterpoint_batch, generate_counterpoint_notes
+from scale_utils import SCALE_REGISTRY
+
+
+def legacy_snap(midi_note, scale_pitches):
+    note_class = midi_note % 12
+    octave = midi_note // 12
+    scale_degrees = sorted(set(p % 12 for p in scale_pitches))
+    result = octave * 12 + min(scale_degrees, key=lambda x: abs(x - note_class))
+    if abs(result - midi_note) > 6:
+        result += 12 if result < midi_note else -12
+    return result
+
+
+def legacy_counterpoint(notes, key):
+    from music21 import scale
+    scale_pitches = [p.midi for p in scale.MajorScale(key).pitches]
+    out = []
+    for i, n in enumerate(notes):
+        direction = -1 if i == 0 or n['midi'] - notes[i - 1]['midi'] > 0 else 1
+        for interval in (4, 9, 7, 12):
+            candidate = n['midi'] + interval * direction
+            if 48 <= candidate <= 84:
+                out.append(legacy_snap(candidate, scale_pitches))
+                break
+    return out
+
+
+def time_per_note(fn, num_notes, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best / num_notes * 1e9
+
+
+def main():
+    num_notes = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(0)
+    notes = [{'midi': random.randint(36, 96), 'time': i * 0.25, 'duration': 0.25, 'velocity': 0.8}
+             for i in range(num_notes)]
+
+    print(f"{num_notes} notes, best of 5")
+    print(f"{'scale':<20}{'size':>6}{'ns/note':>12}")
+    for name in SCALE_REGISTRY.names():
+        table = SCALE_REGISTRY.get(name, 'D')
+        ns = time_per_note(lambda: generate_counterpoint_notes(notes, table), num_notes)
+        print(f"{name:<20}{len(table.intervals):>6}{ns:>12.1f}")
+
+    melodies = [notes[i:i + 64] for i in range(0, num_notes, 64)]
+    table = SCALE_REGISTRY.get('major', 'D')
+    ns = time_per_note(lambda: generate_counterpoint_batch(melodies, table), num_notes)
+    print(f"{'batch (64-note)':<20}{7:>6}{ns:>12.1f}")
+
+    legacy_notes = notes[:10_000]
+    ns = time_per_note(lambda: legacy_counterpoint(legacy_notes, 'D'), len(legacy_notes), repeats=2)
+    print(f"{'legacy major':<20}{7:>6}{ns:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Beam-search counterpoint: quality score vs. time across beam widths.
+
+Cost per note is the solver's own objective (lower is better); the greedy
+one-note lookahead is scored with the same function for comparison. A final
+row shows a long melody under a tight time budget.
+
+Run from the backend directory:
+    python benchmarks/bench_counterpoint_beam.py [num_notes]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from counterpoint import BeamCounterpointSolver, greedy_counterpoint_pitches, score_counterpoint
+from scale_utils import SCALE_REGISTRY
+
+
+def random_melody(table, length, rng):
+    pitch = 66
+    melody = []
+    for _ in range(length):
+        pitch = max(55, min(84, pitch + rng.choice([-4, -2, -1, 1, 2, 3, 5])))
+        melody.append(table.snap(pitch))
+    return melody
+
+
+def main():
+    num_notes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rng = random.Random(0)
+    table = SCALE_REGISTRY.get('major', 'C')
+    melodies = [random_melody(table, num_notes, rng) for _ in range(5)]
+
+    print(f"5 melodies x {num_notes} notes")
+    print(f"{'solver':<14}{'cost/note':>10}{'violations':>12}{'ms/melody':>12}")
+
+    start = time.perf_counter()
+    scores = [score_counterpoint(m, greedy_counterpoint_pitches(m, table)) for m in melodies]
+    elapsed = (time.perf_counter() - start) * 1000 / len(melodies)
+    print(f"{'greedy':<14}{sum(s['costPerNote'] for s in scores) / len(scores):>10.3f}"
+          f"{sum(s['violations'] for s in scores):>12}{elapsed:>12.2f}")
+
+    for width in (1, 2, 3, 4, 6, 8, 16, 32):
+        solver = BeamCounterpointSolver(table, beam_width=width, time_budget=60)
+        start = time.perf_counter()
+        scores = [solver.solve(m)[1] for m in melodies]
+        elapsed = (time.perf_counter() - start) * 1000 / len(melodies)
+        print(f"{'beam ' + str(width):<14}{sum(s['costPerNote'] for s in scores) / len(scores):>10.3f}"
+              f"{sum(s['violations'] for s in scores):>12}{elapsed:>12.2f}")
+
+    long_melody = random_melody(table, 100_000, rng)
+    _, stats = BeamCounterpointSolver(table, beam_width=32, time_budget=0.2).solve(long_melody)
+    print(f"\n100k notes, beam 32, 200 ms budget: {stats['elapsedMs']:.0f} ms, "
+          f"cost/note {stats['costPerNote']:.3f}, budget exhausted at note {stats['budgetExhaustedAt']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Fragment development: materialized fragments versus lazy sampling.
+
+Compares the old develop("fragment") path (building every 2-4 note slice,
+then four random picks) against sampling (start, length)
+pairs and recombining views, in time and peak traced memory, at several
+melody sizes and recombination counts.
+
+Run from the backend directory:
+    python benchmarks/bench_fragments.py [notes]
+"""
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transformations import MusicTransformer
+
+
+def extract_fragments(notes, min_length, max_length):
+    """Every contiguous slice of min_length..max_length notes (the old develop path)"""
+    fragments = []
+    for length in range(min_length, min(max_length + 1, len(notes) + 1)):
+        for i in range(len(notes) - length + 1):
+            fragments.append(notes[i:i + length])
+    return fragments
+
+
+def materialized(transformer, notes, count, min_length, max_length):
+    fragments = extract_fragments(notes, min_length, max_length)
+    return transformer.recombine_fragments(random.choice(fragments) for _ in range(count))
+
+
+def lazy(transformer, notes, count, min_length, max_length):
+    return transformer.develop(notes, "fragment", count, min_length, max_length)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    max_notes = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    transformer = MusicTransformer("major", "C")
+    print(f"{'notes':>8} {'count':>6} {'lengths':>8} {'path':>13} {'ms':>9} {'peak MB':>9}")
+
+    for n in (1000, 10000, max_notes):
+        notes = [{'midi': 60 + (i * 7) % 24, 'time': i * 0.25, 'duration': 0.2, 'velocity': 0.7}
+                 for i in range(n)]
+        for count, min_length, max_length in ((4, 2, 4), (64, 2, 16)):
+            for name, fn in (("materialized", materialized), ("lazy", lazy)):
+                random.seed(1)
+                elapsed, peak = measure(fn, transformer, notes, count, min_length, max_length)
+                print(f"{n:>8} {count:>6} {f'{min_length}-{max_length}':>8} {name:>13} {elapsed:>9.2f} {peak:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+A 1000-combination gesture sweep.
+
+numNotes x durationPercent x totalDuration, 10 values each, rendered as:
+one /gesture/multi-layer request per combination, one /gesture/sweep request
+(NDJSON and zip), and render_sweep() directly with and without reusing slot
+layouts. The old per-combination mido path is timed for comparison (without
+its tempfile round trip, so it is a lower bound).
+
+Run from the backend directory:
+    python benchmarks/bench_gesture_sweep.py [max_notes]
+"""
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+
+import main
+from bench_gestures import legacy_layer_midi
+from gesture_sweep import expand_sweep, iter_combinations, render_sweep
+from gestures import generate_gesture
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main_bench():
+    max_notes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    base = {'layerId': 0, 'midiNote': 60, 'durationPercent': 50, 'totalDuration': 4, 'numNotes': 8}
+    sweep = {
+        'numNotes': {'start': max_notes // 10, 'stop': max_notes, 'num': 10},
+        'durationPercent': {'start': 10, 'stop': 100, 'step': 10},
+        'totalDuration': {'start': 1, 'stop': 10, 'step': 1},
+    }
+    fields, values = expand_sweep(sweep)
+    configs = [{**main.MultiLayerGestureLayerConfig(**base).dict(), **params}
+               for params in iter_combinations(fields, values)]
+    client = TestClient(main.app)
+    print(f"{len(configs)} combinations, {sum(c['numNotes'] for c in configs)} notes in total")
+
+    def legacy():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for c in configs:
+                legacy_layer_midi(c['midiNote'], c['numNotes'], c['durationPercent'], c['totalDuration'])
+
+    def per_request():
+        for c in configs:
+            response = client.post('/gesture/multi-layer', json={
+                'layers': [{k: c[k] for k in base}], 'scale_type': 'major', 'root_note': 'C'})
+            assert response.json()['success']
+
+    def sweep_request(fmt):
+        response = client.post('/gesture/sweep', json={'base': base, 'sweep': sweep, 'format': fmt})
+        assert response.status_code == 200 and not response.content.startswith(b'{"error"')
+        return len(response.content)
+
+    def no_reuse():
+        for c in configs:
+            generate_gesture(c['numNotes'], c['totalDuration'], c['durationPercent']).to_midi(c['midiNote'])
+
+    def with_reuse():
+        for _ in render_sweep(iter(configs)):
+            pass
+
+    rows = [
+        ('old mido path, per combination', legacy),
+        ('/gesture/multi-layer x 1000', per_request),
+        ('/gesture/sweep (ndjson)', lambda: sweep_request('ndjson')),
+        ('/gesture/sweep (zip)', lambda: sweep_request('zip')),
+        ('generate_gesture per combination', no_reuse),
+        ('render_sweep (layouts reused)', with_reuse),
+    ]
+    for label, func in rows:
+        seconds, size = timed(func)
+        extra = f" {size / 1e6:8.2f} MB" if isinstance(size, int) else ''
+        print(f"{label:<36} {seconds * 1000:>9.0f} ms{extra}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,77 @@
+"""
+Gesture generation at 100k notes.
+
+Times generate_gesture + MIDI encoding for every pattern, next to the old
+/gesture/multi-layer path (a Python loop building mido messages, with a print
+per note) at the old 100-note cap and at 10k notes.
+
+Run from the backend directory:
+    python benchmarks/bench_gestures.py [num_notes]
+"""
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mido
+
+from gestures import PATTERNS, generate_gesture
+
+
+def legacy_layer_midi(midi_note, num_notes, duration_percent, total_duration):
+    """The old symmetric-positions path, per-note loop and prints included"""
+    segment = total_duration / num_notes
+    centers = [(i + 0.5) * segment for i in range(num_notes)]
+    note_duration = segment * 0.99 * (duration_percent / 100.0)
+    mid = mido.MidiFile(ticks_per_beat=1000)
+    track = mido.MidiTrack()
+    mid.tracks.append(track)
+    events = []
+    for center in centers:
+        start = center - note_duration / 2
+        events.append(('note_on', int(start * 1000), midi_note))
+        events.append(('note_off', int((start + note_duration) * 1000), midi_note))
+    events.sort(key=lambda x: x[1])
+    current = 0
+    for kind, tick, note in events:
+        velocity = 80 if kind == 'note_on' else 0
+        track.append(mido.Message(kind, channel=0, note=note, velocity=velocity, time=tick - current))
+        print(f"  Note {kind}: {note} at {tick} ticks (delta: {tick - current})")
+        current = tick
+    out = io.BytesIO()
+    mid.save(file=out)
+    return out.getvalue()
+
+
+def timed(func, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    total = n * 0.05  # 20 notes per second
+
+    for count in (100, 10_000):
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds, data = timed(lambda: legacy_layer_midi(60, count, 50, count * 0.05))
+        print(f"{'legacy even, ' + str(count) + ' notes':<32} {seconds * 1000:>9.1f} ms {len(data) / 1e3:>9.1f} KB")
+
+    for pattern in PATTERNS:
+        def run():
+            gesture = generate_gesture(n, total, 50, pattern=pattern, seed=1,
+                                       velocity_envelope_kind='swell', velocity_start=40, velocity_end=120)
+            return gesture.to_midi(60)
+        seconds, data = timed(run)
+        print(f"{pattern + ', ' + str(n) + ' notes':<32} {seconds * 1000:>9.1f} ms {len(data) / 1e3:>9.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
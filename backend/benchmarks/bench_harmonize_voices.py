@@ -0,0 +1,70 @@
+"""
+Four-part harmony: one request per voice vs one multi-voice request.
+
+The per-voice path is what a client had to do before: one /transform/harmonize
+request per interval, each with per-note find_diatonic_interval calls and a
+music21 MIDI encode. The multi-voice path is a single /transform/harmonize-voices
+request returning every voice as a track of one MIDI file (and as JSON notes).
+
+Run from the backend directory:
+    python benchmarks/bench_harmonize_voices.py [num_notes]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+
+import main
+
+INTERVALS = [-2, -4, -7]  # Alto, tenor and bass under the melody ("satb")
+
+
+def best_of(func, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main_bench():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(0)
+    notes = [{'midi': rng.randrange(48, 84), 'time': i * 0.25, 'duration': 0.25,
+              'velocity': round(rng.random(), 3)} for i in range(n)]
+    request = {'notes': notes, 'scale_type': 'major', 'root_note': 'C'}
+    client = TestClient(main.app)
+
+    def per_voice():
+        for interval in INTERVALS:
+            response = client.post('/transform/harmonize', json={**request, 'interval': interval})
+            assert response.headers['content-type'] == 'audio/midi'
+
+    def multi_voice(fmt):
+        response = client.post('/transform/harmonize-voices', json={**request, 'intervals': INTERVALS, 'format': fmt})
+        assert response.status_code == 200 and b'"error"' not in response.content[:20]
+
+    print(f"{n} notes, {len(INTERVALS)} harmony voices")
+    baseline = best_of(per_voice)
+    print(f"{'one request per voice (music21)':<36} {baseline * 1000:>9.1f} ms")
+    for fmt in ('midi', 'json'):
+        seconds = best_of(lambda: multi_voice(fmt))
+        print(f"{'harmonize-voices (' + fmt + ')':<36} {seconds * 1000:>9.1f} ms  {baseline / seconds:>6.1f}x")
+
+    # Just the pitch computation, without HTTP or encoding
+    transformer = main.MusicTransformer('major', 'C')
+    pitches = [note['midi'] for note in notes]
+    loop = best_of(lambda: [[p + transformer.find_diatonic_interval(p, interval) for p in pitches]
+                            for interval in INTERVALS])
+    vectorized = best_of(lambda: transformer.harmony_pitches(pitches, INTERVALS))
+    print(f"{'pitches: per-note interval lookups':<36} {loop * 1000:>9.2f} ms")
+    print(f"{'pitches: harmony_pitches':<36} {vectorized * 1000:>9.2f} ms  {loop / vectorized:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main_bench()
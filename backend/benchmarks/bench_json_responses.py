@@ -0,0 +1,80 @@
+"""
+Response serialization for 100k-note payloads.
+
+Compares FastAPI's default path (jsonable_encoder, then JSONResponse's
+json.dumps) with FastJSONResponse (orjson when installed, and the stdlib
+fallback), compact and pretty, and the SuperCollider export's old indent=2
+output with the new compact one. Reports time per response and bytes.
+
+Run from the backend directory:
+    python benchmarks/bench_json_responses.py [notes]
+"""
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+import fast_json
+from fast_json import FastJSONResponse
+
+
+def payloads(n: int):
+    rng = random.Random(0)
+    notes = [{'midi': rng.randrange(40, 90), 'time': i * 0.125, 'duration': 0.125,
+              'velocity': round(rng.random(), 4)} for i in range(n)]
+    import_midi = {'success': True, 'tracks': [
+        {'notes': notes[i::3], 'name': f"Track {i + 1}", 'trackIndex': i} for i in range(3)],
+        'totalTracksFound': 3}
+    sc_export = {'metadata': {'exportDate': '2025-01-01', 'exportTime': '00:00:00', 'source': 'MIDI Editor',
+                              'format': 'decoupled-timing'},
+                 'layers': {f"layer{i}": {
+                     'metadata': {'durationType': 'fractional', 'totalDuration': n * 0.125 / 3, 'key': 'C',
+                                  'scale': 'major'},
+                     'notes': [{'midi': x['midi'], 'vel': x['velocity'], 'dur': 1.0} for x in notes[i::3]],
+                     'timing': [1 / (len(notes[i::3]) + 1)] * (len(notes[i::3]) + 1)} for i in range(3)}}
+    return {'counterpoint': {'counterpoint': notes}, 'import-midi': import_midi, 'sc-export': sc_export}
+
+
+def best_of(func, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        body = func()
+        best = min(best, time.perf_counter() - started)
+    return best, len(body)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    orjson = fast_json.orjson
+    print(f"{n} notes; orjson {'available' if orjson else 'not installed'}")
+    print(f"{'payload':<14} {'method':<36} {'ms':>8} {'MB':>7}")
+    for name, content in payloads(n).items():
+        methods = {
+            'default (jsonable_encoder + json)': lambda: JSONResponse(jsonable_encoder(content)).body,
+            'FastJSONResponse': lambda: FastJSONResponse(content).body,
+            'FastJSONResponse pretty': lambda: FastJSONResponse(content, pretty=True).body,
+        }
+        if orjson is not None:
+            def stdlib_fallback():
+                fast_json.orjson = None
+                try:
+                    return FastJSONResponse(content).body
+                finally:
+                    fast_json.orjson = orjson
+            methods['FastJSONResponse (stdlib fallback)'] = stdlib_fallback
+        if name == 'sc-export':
+            methods['old export: json.dumps(indent=2)'] = lambda: json.dumps(content, indent=2).encode()
+        for method, func in methods.items():
+            seconds, size = best_of(func)
+            print(f"{name:<14} {method:<36} {seconds * 1000:>8.1f} {size / 1e6:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
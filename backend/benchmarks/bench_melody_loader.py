@@ -0,0 +1,100 @@
+"""
+Multi-layer melody JSON loading and MIDI encoding.
+
+Times the melody loader (parse, loopCount expansion, per-layer MIDI
+encoding) on a synthetic file of many layers with long patterns and many
+loops, and compares per-note cost against the previous per-layer music21
+stream + tempfile encoding on a small sample.
+
+Run from the backend directory:
+    python benchmarks/bench_melody_loader.py [layers] [steps] [loops]
+"""
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mido
+from music21 import duration, meter, note, stream, tempo
+
+from melody_loader import encode_layer_loops, load_layer_loops
+
+
+def music21_layer_midi(pattern, velocity_first, velocity_last):
+    """The previous per-layer encoding, kept here for comparison"""
+    s = stream.Stream()
+    s.append(tempo.TempoIndication(number=120))
+    s.append(meter.TimeSignature('4/4'))
+    for i, midi_note in enumerate(pattern):
+        if len(pattern) > 1:
+            velocity = velocity_first + (velocity_last - velocity_first) * i / (len(pattern) - 1)
+        else:
+            velocity = velocity_first
+        velocity = max(0.1, min(1.0, velocity))
+        n = note.Note(midi=midi_note)
+        n.duration = duration.Duration(quarterLength=1.0)
+        n.offset = i * 1.0
+        n.volume.velocity = int(velocity * 127)
+        s.insert(n.offset, n)
+    with tempfile.NamedTemporaryFile(suffix='.mid', delete=False) as tmp_file:
+        s.write('midi', fp=tmp_file.name)
+        with open(tmp_file.name, 'rb') as f:
+            midi_bytes = f.read()
+        os.unlink(tmp_file.name)
+    return midi_bytes
+
+
+def main():
+    layers = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    loops = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    rng = random.Random(5)
+
+    melody_data = {"melodies": [
+        {
+            "active": True,
+            "key": f"layer{i + 1}",
+            "loopCount": loops,
+            "pattern": [rng.randint(40, 90) for _ in range(steps)],
+            "velocityFirst": 1.5,
+            "velocityLast": 0.5
+        }
+        for i in range(layers)
+    ]}
+    contents = json.dumps(melody_data)
+    total_notes = layers * steps * loops
+    print(f"{layers} layers x {steps} steps x {loops} loops = {total_notes:,} notes "
+          f"({len(contents) / 1e6:.1f} MB JSON)")
+
+    start = time.perf_counter()
+    loops_by_layer = load_layer_loops(json.loads(contents))
+    parsed = time.perf_counter()
+    midis = encode_layer_loops(loops_by_layer)
+    encoded = time.perf_counter()
+    midi_size = sum(len(b) for b in midis.values())
+
+    print(f"  loader: parse {1000 * (parsed - start):.1f} ms, encode {1000 * (encoded - parsed):.1f} ms, "
+          f"{midi_size / 1e6:.1f} MB MIDI, {1e9 * (encoded - start) / total_notes:.1f} ns/note")
+
+    # Sanity check one layer against its expected note count
+    check = mido.MidiFile(file=io.BytesIO(midis[0]))
+    note_ons = sum(1 for msg in check.tracks[1] if msg.type == 'note_on')
+    assert note_ons == steps * loops, note_ons
+
+    # The old path ignored loopCount, so compare per encoded note on one pattern
+    sample = melody_data["melodies"][0]
+    start = time.perf_counter()
+    music21_layer_midi(sample["pattern"], sample["velocityFirst"], sample["velocityLast"])
+    old = time.perf_counter() - start
+    print(f"  music21 per-layer path: {1000 * old:.1f} ms for {steps} notes, {1e9 * old / steps:.0f} ns/note "
+          f"(~{old * total_notes / steps:.0f} s extrapolated to the full file)")
+
+
+if __name__ == "__main__":
+    main()
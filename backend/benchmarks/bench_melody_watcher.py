@@ -0,0 +1,108 @@
+"""
+Melody file watcher: edit-to-send latency.
+
+Rewrites one layer of a copy of data/layer-melodies.json every 100 ms
+(alternating in-place writes and editor-style replace-by-rename), and measures
+the time from starting the write to the OSC message arriving at a loopback
+UDP receiver. Also checks that only the edited layer is sent each time.
+
+Run from the backend directory:
+    python benchmarks/bench_melody_watcher.py [edits]
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pythonosc import udp_client
+
+from melody_watcher import MelodyFileWatcher
+from osc_scheduler import percentile
+
+DATA_FILE = Path(__file__).resolve().parent.parent.parent / "data" / "layer-melodies.json"
+
+
+class Receiver(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.arrivals = []  # (wall time ns, datagram)
+        self.stopping = False
+
+    def run(self):
+        while not self.stopping:
+            try:
+                data = self.sock.recv(65536)
+                self.arrivals.append((time.time_ns(), data))
+            except socket.timeout:
+                pass
+
+
+def write_file(path: Path, data: dict, rename: bool):
+    content = json.dumps(data, indent=4)
+    if rename:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(tmp, path)
+    else:
+        path.write_text(content)
+
+
+async def run(path: Path, edits: int, receiver: Receiver):
+    client = udp_client.SimpleUDPClient('127.0.0.1', receiver.port)
+
+    def send_layers(_, changed):
+        for index, loop in changed.items():
+            client.send_message(f"/liveMelody/update/layer{index + 1}",
+                                json.dumps({'notes': [{'midi': n['midi'], 'vel': n['velocity'], 'dur': n['duration']}
+                                                      for n in loop.iter_notes()]}))
+
+    watcher = MelodyFileWatcher([path], send_layers)
+    watcher.start(push_initial=False)
+    data = json.loads(path.read_text())
+    writes = []
+    for i in range(edits):
+        await asyncio.sleep(0.1)
+        data['melodies'][1]['pattern'] = [60 + (i + k) % 24 for k in range(8)]
+        writes.append(time.time_ns())
+        write_file(path, data, rename=bool(i % 2))
+    await asyncio.sleep(0.2)
+    await watcher.stop()
+    return writes, watcher.status()
+
+
+def main():
+    edits = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    receiver = Receiver()
+    receiver.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "layer-melodies.json"
+        path.write_bytes(DATA_FILE.read_bytes())
+        writes, status = asyncio.run(run(path, edits, receiver))
+    receiver.stopping = True
+    receiver.join()
+
+    arrivals = receiver.arrivals
+    only_edited = all(b'/liveMelody/update/layer2' in data for _, data in arrivals)
+    latencies = sorted((arrival - written) / 1e6 for written, (arrival, _) in zip(writes, arrivals))
+    print(f"{edits} edits, {len(arrivals)} OSC messages received, only the edited layer sent: {only_edited}")
+    print(f"write-to-receive ms: p50 {percentile(latencies, 50):.2f}  p95 {percentile(latencies, 95):.2f}  "
+          f"p99 {percentile(latencies, 99):.2f}  max {latencies[-1]:.2f}")
+    latency = status['latency']
+    print(f"watcher mtime-to-send ms: p50 {latency['p50Ms']:.2f}  p95 {latency['p95Ms']:.2f}  "
+          f"p99 {latency['p99Ms']:.2f}  over 50 ms: {latency['lateEvents']}")
+
+
+if __name__ == "__main__":
+    main()
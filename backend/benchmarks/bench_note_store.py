@@ -0,0 +1,101 @@
+"""
+Note store reload cost versus re-parsing.
+
+Writes a synthetic multi-track MIDI file, then times parsing it with mido
+against opening its cached note store, and times rebuilding a corpus by
+re-ingesting melodies against loading a saved corpus store.
+
+Run from the backend directory:
+    python benchmarks/bench_note_store.py [tracks] [notes_per_track] [corpus_melodies]
+"""
+import io
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mido
+
+from corpus import MelodyCorpus
+from midi_utils import parse_midi_cached, parse_midi_tracks, read_midi_bytes
+from note_store import NoteStoreCache
+
+
+def synthetic_midi(tracks, notes_per_track, rng):
+    mid = mido.MidiFile(type=1)
+    for t in range(tracks):
+        track = mido.MidiTrack()
+        track.name = f"Track {t}"
+        for _ in range(notes_per_track):
+            note = rng.randint(40, 90)
+            track.append(mido.Message('note_on', note=note, velocity=rng.randint(30, 120), time=rng.randint(0, 60)))
+            track.append(mido.Message('note_off', note=note, velocity=0, time=rng.randint(30, 240)))
+        mid.tracks.append(track)
+    buf = io.BytesIO()
+    mid.save(file=buf)
+    return buf.getvalue()
+
+
+def timed(fn, repeats=5):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    notes_per_track = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    corpus_melodies = int(sys.argv[3]) if len(sys.argv) > 3 else 50000
+    rng = random.Random(7)
+
+    content = synthetic_midi(tracks, notes_per_track, rng)
+    print(f"MIDI file: {tracks} tracks x {notes_per_track} notes, {len(content) / 1e6:.1f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = NoteStoreCache(Path(tmp) / "cache")
+
+        parse_ms = timed(lambda: parse_midi_tracks(read_midi_bytes(content)), repeats=3)
+        start = time.perf_counter()
+        parse_midi_cached(content, cache).close()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        def reopen():
+            store = parse_midi_cached(content, cache)
+            for _, records in store:
+                records['pitch'].max()
+            store.close()
+        cached_ms = timed(reopen)
+
+        print(f"  mido parse:           {parse_ms:9.1f} ms")
+        print(f"  first cached import:  {build_ms:9.1f} ms (parse + write)")
+        print(f"  cached reopen + scan: {cached_ms:9.1f} ms ({parse_ms / cached_ms:.0f}x faster)")
+
+        melodies = [[rng.randint(48, 84) for _ in range(rng.randint(16, 64))] for _ in range(corpus_melodies)]
+
+        def rebuild():
+            corpus = MelodyCorpus()
+            for i, pitches in enumerate(melodies):
+                corpus.add(pitches, 'bench', f'm{i}')
+            return corpus
+
+        corpus = rebuild()
+        store_path = Path(tmp) / "corpus.gns"
+        rebuild_ms = timed(rebuild, repeats=1)
+        save_ms = timed(lambda: corpus.save(store_path), repeats=1)
+        load_ms = timed(lambda: MelodyCorpus.load(store_path), repeats=3)
+
+        print(f"Corpus: {corpus_melodies} melodies, store {store_path.stat().st_size / 1e6:.1f} MB")
+        print(f"  rebuild from pitches: {rebuild_ms:9.1f} ms")
+        print(f"  save:                 {save_ms:9.1f} ms")
+        print(f"  load from store:      {load_ms:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
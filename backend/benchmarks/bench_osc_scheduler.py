@@ -0,0 +1,95 @@
+"""
+OSC scheduler timing over UDP loopback.
+
+Schedules one event per millisecond (a note every 2 ms, 1 ms long) to a local
+UDP receiver and reports, for message and bundle mode, the scheduler's own
+send-time error statistics and the receive-time error measured by the
+receiver (arrival - intended send time) as percentiles.
+
+Run from the backend directory:
+    python benchmarks/bench_osc_scheduler.py [seconds] [events_per_second]
+"""
+import asyncio
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from osc_scheduler import OscNoteScheduler, build_timeline, percentile
+
+
+class Receiver(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.arrivals = []
+        self.stopping = False
+
+    def run(self):
+        while not self.stopping:
+            try:
+                self.sock.recv(65536)
+                self.arrivals.append(time.monotonic())
+            except socket.timeout:
+                pass
+
+
+async def play(notes, bundles, lookahead, port):
+    scheduler = OscNoteScheduler('127.0.0.1', port, lookahead=lookahead, bundles=bundles, loop=False)
+    scheduler.start({'layer1': notes})
+    while scheduler.running:
+        await asyncio.sleep(0.05)
+    return scheduler
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rate = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    # Alternating note-on/note-off, one event every 1/rate seconds
+    spacing = 2.0 / rate
+    count = int(seconds * rate / 2)
+    notes = [{'midi': 60 + i % 24, 'time': i * spacing, 'duration': spacing / 2, 'velocity': 0.8}
+             for i in range(count)]
+    events, _ = build_timeline({'layer1': notes})
+    print(f"{len(events)} events at {rate}/s over {seconds:.0f}s")
+    print(f"{'mode':>9} {'':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'late':>6}")
+
+    for bundles in (False, True):
+        receiver = Receiver()
+        receiver.start()
+        lookahead = 0.05
+        scheduler = asyncio.run(play(notes, bundles, lookahead, receiver.port))
+        time.sleep(0.3)
+        receiver.stopping = True
+        receiver.join()
+
+        timing = scheduler.status()['timing']
+        mode = 'bundles' if bundles else 'messages'
+        print(f"{mode:>9} {'send':>8} {timing['p50Ms']:>8.3f} {timing['p95Ms']:>8.3f} {timing['p99Ms']:>8.3f} "
+              f"{timing['maxMs']:>8.3f} {timing['lateEvents']:>6}")
+
+        # Arrivals are datagrams in send order; in message mode there is one per
+        # event, bundles hold all events due at the same instant
+        send_times = []
+        previous = None
+        for t, _, _, _ in events:
+            if bundles and t == previous:
+                continue
+            previous = t
+            send_times.append(scheduler.started_at + t - (lookahead if bundles else 0))
+        errors = sorted(arrival - intended for arrival, intended in zip(receiver.arrivals, send_times))
+        late = sum(1 for e in errors if e > 0.005)
+        print(f"{'':>9} {'receive':>8} {1000 * percentile(errors, 50):>8.3f} {1000 * percentile(errors, 95):>8.3f} "
+              f"{1000 * percentile(errors, 99):>8.3f} {1000 * errors[-1]:>8.3f} {late:>6}"
+              f"   ({len(receiver.arrivals)}/{len(send_times)} datagrams)")
+
+
+if __name__ == "__main__":
+    main()
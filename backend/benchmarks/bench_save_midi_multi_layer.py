@@ -0,0 +1,87 @@
+"""
+Saving a multi-layer composition as MIDI.
+
+Compares one /save-midi request per layer (a music21 encode each, one file per
+layer) with a single /save-midi/multi-layer request (one Type 1 file, one track
+per layer, encoded with NumPy), at 3 and 32 layers of 10k notes. The per-layer
+path is only run for the first 3 layers; beyond that its time is estimated
+from the measured per-layer time.
+
+Run from the backend directory:
+    python benchmarks/bench_save_midi_multi_layer.py [notes_per_layer]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+
+import main
+from midi_utils import conductor_track, midi_file_bytes, notes_track
+
+LAYER_COUNTS = (3, 32)
+MEASURED_LEGACY_LAYERS = 3
+
+
+def make_layer(rng, n):
+    notes = []
+    t = 0.0
+    for _ in range(n):
+        notes.append({'midi': rng.randrange(36, 96), 'time': round(t, 4), 'duration': 0.2,
+                      'velocity': round(rng.uniform(0.3, 1.0), 3)})
+        t += rng.choice((0.125, 0.25, 0.5))
+    return notes
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main_bench():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rng = random.Random(0)
+    client = TestClient(main.app)
+    layers = [make_layer(rng, n) for _ in range(max(LAYER_COUNTS))]
+
+    # Legacy: one request and one music21 encode per layer
+    legacy = []
+    for notes in layers[:MEASURED_LEGACY_LAYERS]:
+        seconds, response = timed(lambda: client.post('/save-midi', json={'notes': notes}))
+        assert response.headers['content-type'] == 'audio/midi'
+        legacy.append(seconds)
+    per_layer = sum(legacy) / len(legacy)
+
+    print(f"{n} notes per layer")
+    print(f"{'layers':>6} {'per-layer /save-midi':>22} {'multi-layer request':>20} {'encode only':>12} {'MB':>6} {'speedup':>8}")
+    for count in LAYER_COUNTS:
+        if count <= MEASURED_LEGACY_LAYERS:
+            legacy_seconds, legacy_label = sum(legacy[:count]), f"{sum(legacy[:count]):.2f} s"
+        else:
+            legacy_seconds = per_layer * count
+            legacy_label = f"~{legacy_seconds:.1f} s (est.)"
+
+        body = {'layers': [{'notes': notes, 'name': f"Layer {i + 1}", 'program': i % 128}
+                           for i, notes in enumerate(layers[:count])]}
+        seconds, response = timed(lambda: client.post('/save-midi/multi-layer', json=body))
+        assert response.headers['content-type'] == 'audio/midi'
+
+        def encode():
+            tracks = [conductor_track(120)]
+            for i, notes in enumerate(layers[:count]):
+                tracks.append(notes_track([x['time'] for x in notes], [x['duration'] for x in notes],
+                                          [x['midi'] for x in notes], [x['velocity'] for x in notes],
+                                          name=f"Layer {i + 1}", channel=i % 16, program=i % 128))
+            return midi_file_bytes(tracks)
+        encode_seconds, _ = timed(encode)
+
+        print(f"{count:>6} {legacy_label:>22} {seconds * 1000:>17.0f} ms {encode_seconds * 1000:>9.0f} ms "
+              f"{len(response.content) / 1e6:>6.2f} {legacy_seconds / seconds:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,85 @@
+"""
+Memory and speed of layer edit history.
+
+Loads a large layer into a LayerBuffer, applies thousands of small edits (one
+version each) and measures the memory the retained history adds, next to what
+full copies of the note buffer per version would take. Also times diffing
+adjacent and distant versions and restoring an old one.
+
+Run from the backend directory:
+    python benchmarks/bench_session_history.py [notes] [edits]
+"""
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from persistent_vector import count_nodes
+from session_store import LayerBuffer
+
+
+def timed(func, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rng = random.Random(0)
+    notes = [{'midi': rng.randrange(36, 96), 'time': i * 0.125, 'duration': 0.125, 'velocity': 0.7}
+             for i in range(n)]
+
+    tracemalloc.start()
+    buffer = LayerBuffer(notes, max_notes=n * 2, max_history=edits + 10)
+    loaded, _ = tracemalloc.get_traced_memory()
+
+    started = time.perf_counter()
+    for _ in range(edits):
+        op = rng.random()
+        ids = rng.sample(range(buffer.next_id), 3)
+        if op < 0.6:
+            buffer.move(ids, dt=0.01, dmidi=rng.choice((-1, 1)))
+        elif op < 0.8:
+            buffer.delete(ids[:1])
+        else:
+            buffer.insert([{'midi': 60, 'time': rng.random() * n * 0.125, 'duration': 0.25}])
+    edit_seconds = time.perf_counter() - started
+    edited, _ = tracemalloc.get_traced_memory()
+
+    # What one full copy of the buffer costs (list of note dict copies)
+    baseline, _ = tracemalloc.get_traced_memory()
+    copy = [dict(x) for x in buffer.notes.values()]
+    one_copy = tracemalloc.get_traced_memory()[0] - baseline
+    del copy
+    tracemalloc.stop()
+
+    versions = len(buffer.history)
+    print(f"{n} notes, {edits} edits, {versions} versions retained")
+    print(f"edits:                   {edit_seconds / edits * 1e6:8.1f} us per edit (including history)")
+    print(f"layer after load:        {loaded / 1e6:8.1f} MB")
+    print(f"history added:           {(edited - loaded) / 1e6:8.1f} MB "
+          f"({(edited - loaded) / edits / 1e3:.1f} KB per edit)")
+    print(f"full copy per version:   {one_copy * versions / 1e9:8.2f} GB ({one_copy / 1e6:.1f} MB x {versions})")
+    print(f"trie nodes, all versions: {count_nodes(entry.notes for entry in buffer.history.values())}")
+
+    newest = buffer.version
+    oldest = next(iter(buffer.history))
+    for label, base, version in (('adjacent versions', newest - 1, newest),
+                                 ('oldest vs newest', oldest + 1, newest)):
+        seconds, changes = timed(lambda: buffer.diff(base, version))
+        count = sum(len(v) for v in changes.values())
+        print(f"diff {label + ':':<20} {seconds * 1000:8.2f} ms ({count} notes differ)")
+    seconds, _ = timed(lambda: buffer.restore(oldest + 1), repeats=1)
+    print(f"restore oldest:          {seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Melody JSON upload parsing: whole-file json.loads vs the incremental reader.
+
+Builds melody files with a growing `melodies` array (most entries inactive or
+non-layer, as in exported libraries) and reports the time and peak traced
+memory of loading the active layers both ways.
+
+Run from the backend directory:
+    python benchmarks/bench_uploads.py
+"""
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from melody_loader import iter_melody_file, load_layer_loops, load_layer_loops_from
+from uploads import iter_upload_chunks
+
+
+def melody_file(n_melodies: int) -> bytes:
+    rng = random.Random(0)
+    melodies = []
+    for i in range(n_melodies):
+        melodies.append({
+            'active': i % 50 == 0,
+            'key': f"layer{1 + i % 3}" if i % 50 == 0 else f"melody{i}",
+            'loopCount': 1,
+            'pattern': [rng.randrange(48, 84) for _ in range(32)],
+            'velocityFirst': 1.0,
+            'velocityLast': 0.5
+        })
+    return json.dumps({'melodies': melodies, 'settings': {}}, indent=4).encode()
+
+
+def measure(func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    print(f"{'file MB':>8} {'melodies':>9} {'loads s':>8} {'loads MB':>9} {'stream s':>9} {'stream MB':>10}  same")
+    for n in (10_000, 50_000, 150_000):
+        content = melody_file(n)
+        upload = io.BytesIO(content)
+
+        full, full_s, full_peak = measure(lambda: load_layer_loops(json.loads(content)))
+        streamed, stream_s, stream_peak = measure(
+            lambda: load_layer_loops_from(iter_melody_file(iter_upload_chunks(upload, len(content), "json"))))
+
+        same = (full.keys() == streamed.keys()
+                and all(full[k].to_midi() == streamed[k].to_midi() for k in full))
+        print(f"{len(content) / 1e6:>8.1f} {n:>9} {full_s:>8.2f} {full_peak / 1e6:>9.1f} "
+              f"{stream_s:>9.2f} {stream_peak / 1e6:>10.1f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
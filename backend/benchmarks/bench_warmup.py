@@ -0,0 +1,91 @@
+"""
+First-request latency after a restart, with and without the startup warmup.
+
+Each mode runs in a fresh interpreter (so nothing is warm from a previous
+run): import the app, start it, wait for /readyz, then time the first and a
+second request to a handful of endpoints.
+
+Run from the backend directory:
+    python benchmarks/bench_warmup.py
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+NOTES = [{"midi": 60 + i, "time": i * 0.5, "duration": 0.5, "velocity": 0.7} for i in range(16)]
+TRANSFORM = {"notes": NOTES, "scale_type": "dorian", "root_note": "D"}
+REQUESTS = [
+    ("/generate", {"scale_type": "minor", "root_note": "A"}),
+    ("/save-midi", {"notes": NOTES}),
+    ("/transform/harmonize", TRANSFORM),
+    ("/transform/ornament", TRANSFORM),
+    ("/transform/develop", TRANSFORM),
+    ("/transform/harmonize-voices", TRANSFORM),
+    ("/generate_counterpoint", {"notes": NOTES, "key": "D", "scale_type": "dorian"}),
+    ("/gesture/multi-layer", {"layers": [{"layerId": 0, "midiNote": 60, "durationPercent": 50, "totalDuration": 4,
+                                          "numNotes": 32, "pattern": "ritardando"}],
+                              "scale_type": "major", "root_note": "C"}),
+]
+
+
+def run_child():
+    """One fresh process: start the app, wait until ready, time each request twice"""
+    import contextlib
+    import io
+
+    from fastapi.testclient import TestClient
+
+    started = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - started
+    timings = {}
+    with contextlib.redirect_stdout(io.StringIO()), TestClient(main.app) as client:
+        client.get("/healthz")  # Start the client's event loop before timing
+        started = time.perf_counter()
+        while client.get("/readyz").status_code != 200:
+            time.sleep(0.005)
+        ready_seconds = time.perf_counter() - started
+        for path, body in REQUESTS:
+            runs = []
+            for _ in range(2):
+                started = time.perf_counter()
+                response = client.post(path, json=body)
+                runs.append(time.perf_counter() - started)
+                assert response.status_code == 200, (path, response.status_code)
+            timings[path] = runs
+    print(json.dumps({"import": import_seconds, "ready": ready_seconds, "warmup": main.warmup.status(),
+                      "timings": timings}))
+
+
+def main():
+    results = {}
+    for label, flag in (("cold", "0"), ("warmed", "1")):
+        output = subprocess.run([sys.executable, __file__, "--child"], cwd=BACKEND, capture_output=True, text=True,
+                                env={**os.environ, "WARMUP_ON_STARTUP": flag}, check=True).stdout
+        results[label] = json.loads(output.strip().splitlines()[-1])
+
+    warm = results["warmed"]
+    print(f"app import: {results['cold']['import'] * 1000:.0f} ms, "
+          f"warmup: {warm['warmup']['durationMs']:.0f} ms {warm['warmup']['steps']}")
+    print(f"{'endpoint':<30} {'cold 1st':>10} {'warmed 1st':>11} {'2nd':>8}  (ms)")
+    totals = [0.0, 0.0]
+    for path, _ in REQUESTS:
+        cold, warmed = results["cold"]["timings"][path][0], warm["timings"][path][0]
+        totals[0] += cold
+        totals[1] += warmed
+        print(f"{path:<30} {cold * 1000:>10.1f} {warmed * 1000:>11.1f} "
+              f"{results['cold']['timings'][path][1] * 1000:>8.1f}")
+    print(f"{'first requests, total':<30} {totals[0] * 1000:>10.1f} {totals[1] * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        run_child()
+    else:
+        main()
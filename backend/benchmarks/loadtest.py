@@ -0,0 +1,383 @@
+"""
+Load generator for the backend.
+
+Replays a scenario's weighted request mix (transform chains, gestures,
+SuperCollider exports, MIDI imports, settings save bursts, ...) from N
+concurrent closed-loop workers, and reports throughput, latency percentiles
+and error rates per route. Results are written as JSON so runs of different
+releases can be compared with --compare.
+
+Responses count as errors if the status is >= 400, the request fails, or the
+body is a JSON object with an "error" key (how most endpoints report errors).
+
+With --start-server, uvicorn is started on a free port with a scratch working
+directory, so settings saves don't touch ./settings.db. Client and server
+then share the machine: compare runs made on the same machine only.
+
+Run from the backend directory:
+    python benchmarks/loadtest.py benchmarks/scenarios/production-mix.json --start-server --out run.json
+    python benchmarks/loadtest.py SCENARIO --url http://127.0.0.1:8000 --concurrency 16 --duration 60
+    python benchmarks/loadtest.py --compare baseline.json run.json
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+REPO_ROOT = BACKEND_DIR.parent
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+# Payloads
+
+def sc_export_layers(path: Path) -> Dict:
+    """
+    Rebuild an /export-supercollider request's layers from a SuperCollider
+    export file: fractional timing is spread over each layer's total duration.
+    """
+    export = json.loads(path.read_text())
+    layers = {}
+    for name, layer in export['layers'].items():
+        total = layer.get('metadata', {}).get('totalDuration') or 1.0
+        timing = layer.get('timing') or [1.0 / (len(layer['notes']) + 1)] * (len(layer['notes']) + 1)
+        onset = 0.0
+        notes = []
+        for sc_note, step in zip(layer['notes'], timing):
+            onset += step * total
+            notes.append({
+                'midi': sc_note['midi'],
+                'time': round(onset, 6),
+                'duration': sc_note['dur'] * (total if layer['metadata'].get('durationType') == 'fractional' else 1),
+                'velocity': sc_note['vel']
+            })
+        # "layer0" -> "0", as the frontend sends them
+        layers[name.replace('layer', '')] = {'parsedMidi': {'tracks': [{'notes': notes}]}}
+    return layers
+
+def multipart_body(field: str, path: Path) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f"Content-Disposition: form-data; name=\"{field}\"; filename=\"{path.name}\"\r\n"
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + path.read_bytes() + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+def resolve_json(value, layers_cache: Dict[str, Dict]):
+    """Replace {"$sc_export": path} placeholders anywhere in a JSON body"""
+    if isinstance(value, dict):
+        if set(value) == {'$sc_export'}:
+            path = value['$sc_export']
+            if path not in layers_cache:
+                layers_cache[path] = sc_export_layers(REPO_ROOT / path)
+            return layers_cache[path]
+        return {k: resolve_json(v, layers_cache) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_json(v, layers_cache) for v in value]
+    return value
+
+class Step:
+    """One prepared HTTP request of a scenario entry"""
+
+    def __init__(self, spec: Dict, layers_cache: Dict[str, Dict]):
+        self.method = spec.get('method', 'POST').upper()
+        self.path = spec['path']
+        self.route = spec.get('route') or f"{self.method} {self.path}"
+        self.capture = spec.get('capture', {})  # variable -> key of the JSON response
+        self.body = None
+        self.content_type = None
+        if 'json' in spec:
+            self.body = json.dumps(resolve_json(spec['json'], layers_cache)).encode()
+            self.content_type = 'application/json'
+        elif 'json_file' in spec:
+            self.body = (REPO_ROOT / spec['json_file']).read_bytes()
+            self.content_type = 'application/json'
+        elif 'file' in spec:
+            self.body, self.content_type = multipart_body(spec.get('field', 'file'), REPO_ROOT / spec['file'])
+
+class Entry:
+    """A weighted scenario entry: a chain of steps, sent `burst` times back to back"""
+
+    def __init__(self, spec: Dict, layers_cache: Dict[str, Dict]):
+        self.name = spec.get('name') or spec.get('path')
+        self.weight = float(spec.get('weight', 1))
+        self.burst = int(spec.get('burst', 1))
+        self.steps = [Step(s, layers_cache) for s in spec.get('steps', [spec])]
+
+def load_scenario(path: Path) -> Tuple[Dict, List[Entry]]:
+    scenario = json.loads(path.read_text())
+    layers_cache = {}
+    entries = [Entry(spec, layers_cache) for spec in scenario['requests']]
+    return scenario, entries
+
+# Running
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[Tuple[float, bool]]] = {}
+        self.error_messages: Dict[str, Dict[str, int]] = {}
+
+    def record(self, route: str, seconds: float, ok: bool, message: Optional[str] = None):
+        with self.lock:
+            self.samples.setdefault(route, []).append((seconds, ok))
+            if message:
+                errors = self.error_messages.setdefault(route, {})
+                errors[message] = errors.get(message, 0) + 1
+
+def response_error(status: int, content_type: str, body: bytes) -> Optional[str]:
+    if status >= 400:
+        return f"HTTP {status}"
+    if content_type.startswith('application/json') and body[:1] == b'{':
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return "Invalid JSON response"
+        if isinstance(data, dict) and 'error' in data:
+            return str(data['error'])[:120]
+    return None
+
+class Worker(threading.Thread):
+    def __init__(self, host: str, port: int, entries: List[Entry], recorder: Recorder,
+                 measure_from: float, deadline: float, seed: int):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.entries = entries
+        self.weights = [e.weight for e in entries]
+        self.recorder = recorder
+        self.measure_from = measure_from
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def request(self, step: Step, variables: Dict[str, str]) -> Tuple[bool, Optional[Dict]]:
+        path = step.path.format(**variables)
+        headers = {'Content-Type': step.content_type} if step.content_type else {}
+        started = time.perf_counter()
+        data = None
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.conn.request(step.method, path, body=step.body, headers=headers)
+            response = self.conn.getresponse()
+            body = response.read()
+            error = response_error(response.status, response.getheader('Content-Type', ''), body)
+            if error is None and step.capture:
+                data = json.loads(body)
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            error = f"{type(e).__name__}: {str(e)}"[:120]
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+        elapsed = time.perf_counter() - started
+
+        if started >= self.measure_from:
+            self.recorder.record(step.route, elapsed, error is None, error)
+        return error is None, data
+
+    def run(self):
+        while time.perf_counter() < self.deadline:
+            entry = self.rng.choices(self.entries, self.weights)[0]
+            for _ in range(entry.burst):
+                variables = {}
+                for step in entry.steps:
+                    ok, data = self.request(step, variables)
+                    if not ok:
+                        break  # Later steps of a chain depend on this one
+                    for name, key in step.capture.items():
+                        variables[name] = data[key]
+        if self.conn is not None:
+            self.conn.close()
+
+def run_scenario(url: str, entries: List[Entry], concurrency: int, duration: float,
+                 warmup: float, seed: int) -> Dict:
+    parsed = urlparse(url)
+    recorder = Recorder()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    workers = [Worker(parsed.hostname, parsed.port or 80, entries, recorder, measure_from, deadline, seed + i)
+               for i in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # Requests still running at the deadline make the window slightly longer
+    elapsed = max(duration, time.perf_counter() - measure_from)
+
+    routes = {}
+    all_samples = []
+    for route, samples in sorted(recorder.samples.items()):
+        routes[route] = summarize(samples, elapsed)
+        routes[route]['topErrors'] = dict(sorted(recorder.error_messages.get(route, {}).items(),
+                                                 key=lambda item: -item[1])[:3])
+        all_samples.extend(samples)
+    return {'elapsedS': round(elapsed, 3), 'total': summarize(all_samples, elapsed), 'routes': routes}
+
+def summarize(samples: List[Tuple[float, bool]], elapsed: float) -> Dict:
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'errorRate': round(errors / len(samples), 4) if samples else 0.0,
+        'rps': round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50Ms': round(percentile(latencies, 50), 2),
+        'p90Ms': round(percentile(latencies, 90), 2),
+        'p99Ms': round(percentile(latencies, 99), 2),
+        'maxMs': round(latencies[-1], 2) if latencies else 0.0
+    }
+
+# Local server
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(workdir: Path, port: int) -> subprocess.Popen:
+    env = dict(os.environ, CORPUS_DIR=str(REPO_ROOT / "data"), NOTE_STORE_DIR=str(workdir / ".note_cache"))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', str(BACKEND_DIR),
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        # Endpoint debug prints would drown the report; errors still show on stderr
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start within 60s")
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Reporting
+
+def print_results(results: Dict):
+    print(f"{'route':<48} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    rows = list(results['routes'].items()) + [('TOTAL', results['total'])]
+    for route, r in rows:
+        print(f"{route[:48]:<48} {r['requests']:>7} {r['rps']:>8.1f} {100 * r['errorRate']:>6.2f} "
+              f"{r['p50Ms']:>8.1f} {r['p90Ms']:>8.1f} {r['p99Ms']:>8.1f} {r['maxMs']:>8.1f}")
+    for route, r in results['routes'].items():
+        for message, count in r.get('topErrors', {}).items():
+            print(f"  {route}: {count} x {message}")
+
+def compare(baseline: Dict, current: Dict):
+    """Per-route rps and latency changes from baseline to current (negative latency change = faster)"""
+    print(f"baseline: {baseline.get('revision')} {baseline.get('startedAt')}   "
+          f"current: {current.get('revision')} {current.get('startedAt')}")
+    if baseline.get('config') != current.get('config'):
+        print(f"warning: configs differ: {baseline.get('config')} vs {current.get('config')}")
+
+    def change(old, new):
+        return f"{100 * (new - old) / old:+7.1f}%" if old else "     n/a"
+
+    print(f"{'route':<48} {'rps':>17} {'p50 ms':>17} {'p99 ms':>17} {'err% (old/new)':>15}")
+    baseline_routes = dict(baseline['routes'], TOTAL=baseline['total'])
+    current_routes = dict(current['routes'], TOTAL=current['total'])
+    for route in list(baseline['routes']) + [r for r in current['routes'] if r not in baseline['routes']] + ['TOTAL']:
+        old, new = baseline_routes.get(route), current_routes.get(route)
+        if old is None or new is None:
+            print(f"{route[:48]:<48} only in {'current' if old is None else 'baseline'}")
+            continue
+        print(f"{route[:48]:<48} {new['rps']:>8.1f} {change(old['rps'], new['rps'])} "
+              f"{new['p50Ms']:>8.1f} {change(old['p50Ms'], new['p50Ms'])} "
+              f"{new['p99Ms']:>8.1f} {change(old['p99Ms'], new['p99Ms'])} "
+              f"{100 * old['errorRate']:>6.2f}/{100 * new['errorRate']:<6.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a scenario's request mix against the backend")
+    parser.add_argument('scenario', nargs='?', help="Scenario JSON file")
+    parser.add_argument('--url', default="http://127.0.0.1:8000", help="Backend URL (ignored with --start-server)")
+    parser.add_argument('--start-server', action='store_true', help="Start uvicorn locally for the run")
+    parser.add_argument('--concurrency', type=int, help="Concurrent workers (default: scenario's)")
+    parser.add_argument('--duration', type=float, help="Measured seconds (default: scenario's)")
+    parser.add_argument('--warmup', type=float, help="Unmeasured seconds first (default: scenario's)")
+    parser.add_argument('--seed', type=int, help="Request mix seed (default: scenario's)")
+    parser.add_argument('--out', help="Write results JSON here")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="Compare two results files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(json.loads(Path(args.compare[0]).read_text()), json.loads(Path(args.compare[1]).read_text()))
+        return
+    if not args.scenario:
+        parser.error("a scenario file is required")
+
+    scenario, entries = load_scenario(Path(args.scenario))
+    config = {
+        'concurrency': args.concurrency or scenario.get('concurrency', 8),
+        'durationS': args.duration if args.duration is not None else scenario.get('duration_s', 30),
+        'warmupS': args.warmup if args.warmup is not None else scenario.get('warmup_s', 3),
+        'seed': args.seed if args.seed is not None else scenario.get('seed', 1)
+    }
+
+    server = None
+    workdir = None
+    url = args.url
+    try:
+        if args.start_server:
+            workdir = tempfile.TemporaryDirectory()
+            port = free_port()
+            server = start_server(Path(workdir.name), port)
+            url = f"http://127.0.0.1:{port}"
+
+        print(f"{scenario.get('name', args.scenario)}: {config['concurrency']} workers, "
+              f"{config['durationS']}s (+{config['warmupS']}s warmup) against {url}")
+        results = run_scenario(url, entries, config['concurrency'], config['durationS'],
+                               config['warmupS'], config['seed'])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        if workdir is not None:
+            workdir.cleanup()
+
+    results = {
+        'scenario': scenario.get('name', args.scenario),
+        'revision': git_revision(),
+        'startedAt': datetime.now().isoformat(timespec='seconds'),
+        'config': config,
+        **results
+    }
+    print_results(results)
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Hammer settings writes from many worker processes and check consistency.
+
+store    N processes each save M settings documents through SharedStateStore
+         while reading them back, and run K read-modify-write increments of
+         a shared counter. Checks: every document read is one that was
+         written whole, versions never go backwards for a reader, the final
+         version is N x M, and no increment was lost (counter == N x K).
+legacy   The same against the old scheme (settings.json rewritten in place,
+         read-modify-write without a lock), counting torn reads and lost
+         updates.
+http     uvicorn --workers W, with N client threads POSTing and GETting
+         /settings. Checks the returned versions and documents the same way.
+
+Exits non-zero if the store or http run finds an inconsistency.
+
+Run from the backend directory:
+    python benchmarks/stress_settings.py [store|legacy|http|all] [--procs 8] [--writes 500] [--workers 4]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from loadtest import BACKEND_DIR, free_port
+from shared_state import SharedStateStore
+
+
+def settings_doc(worker: int, seq: int) -> dict:
+    """A settings document whose fields all encode (worker, seq), so a mixed or torn one is detectable"""
+    return {"selectedScale": "major" if seq % 2 else "dorian", "rootNote": f"w{worker}", "octave": seq,
+            "zoomLevel": worker * 1_000_000 + seq, "editMode": bool(seq % 3),
+            "lastMidiData": f"{worker}:{seq}:" + "x" * (seq % 64)}
+
+
+def doc_consistent(doc: dict) -> bool:
+    try:
+        worker, seq = int(doc["rootNote"][1:]), doc["octave"]
+        return doc == settings_doc(worker, seq)
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def store_worker(db: str, worker: int, writes: int, increments: int, results):
+    store = SharedStateStore(db)
+    bad = backwards = 0
+    last_version = 0
+    for seq in range(writes):
+        store.put("settings", settings_doc(worker, seq))
+        doc, version = store.get_versioned("settings")
+        bad += not doc_consistent(doc)
+        backwards += version < last_version
+        last_version = version
+        if seq < increments:
+            store.update("counter", lambda value: value + 1, default=0)
+    results.put((bad, backwards, 0))
+
+
+def legacy_worker(path: str, worker: int, writes: int, increments: int, results):
+    settings_file, counter_file = Path(path), Path(path + ".counter")
+    bad = torn = 0
+    for seq in range(writes):
+        with open(settings_file, 'w') as f:
+            json.dump(settings_doc(worker, seq), f, indent=2)
+        try:
+            with open(settings_file, 'r') as f:
+                bad += not doc_consistent(json.load(f))
+        except (json.JSONDecodeError, FileNotFoundError):
+            torn += 1
+        if seq < increments:
+            try:
+                value = json.loads(counter_file.read_text())
+            except (json.JSONDecodeError, FileNotFoundError):
+                torn += 1
+                continue
+            counter_file.write_text(json.dumps(value + 1))
+    results.put((bad, 0, torn))
+
+
+def run_processes(target, location: str, procs: int, writes: int, increments: int):
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=target, args=(location, i, writes, increments, results))
+               for i in range(procs)]
+    started = time.perf_counter()
+    for process in workers:
+        process.start()
+    totals = [sum(column) for column in zip(*(results.get() for _ in workers))]
+    for process in workers:
+        process.join()
+    return time.perf_counter() - started, totals
+
+
+def run_store(procs: int, writes: int, increments: int) -> bool:
+    with tempfile.TemporaryDirectory() as workdir:
+        db = str(Path(workdir) / "settings.db")
+        SharedStateStore(db)  # Create the schema once up front
+        elapsed, (bad, backwards, _) = run_processes(store_worker, db, procs, writes, increments)
+        store = SharedStateStore(db)
+        version, counter = store.version("settings"), store.get("counter")
+    ok = not bad and not backwards and version == procs * writes and counter == procs * increments
+    print(f"store:  {procs} procs x {writes} saves in {elapsed:.2f} s "
+          f"({procs * writes / elapsed:,.0f} saves/s with a read each)")
+    print(f"        inconsistent reads {bad}, versions going backwards {backwards}, "
+          f"final version {version}/{procs * writes}, counter {counter}/{procs * increments}"
+          f" -> {'OK' if ok else 'FAILED'}")
+    return ok
+
+
+def run_legacy(procs: int, writes: int, increments: int):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = str(Path(workdir) / "settings.json")
+        Path(path + ".counter").write_text("0")
+        elapsed, (bad, _, torn) = run_processes(legacy_worker, path, procs, writes, increments)
+        try:
+            counter = json.loads(Path(path + ".counter").read_text())
+        except json.JSONDecodeError:
+            counter = None
+    print(f"legacy: {procs} procs x {writes} saves in {elapsed:.2f} s "
+          f"({procs * writes / elapsed:,.0f} saves/s with a read each)")
+    print(f"        torn reads {torn}, inconsistent reads {bad}, counter {counter}/{procs * increments} "
+          f"(lost updates {procs * increments - (counter or 0)})")
+
+
+def http_request(port: int, method: str, path: str, body=None, timeout: float = 60):
+    """One request on a fresh connection (keep-alive connections to a multi-worker
+    uvicorn add ~40 ms per request here, which would swamp the numbers)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request(method, path, body=None if body is None else json.dumps(body),
+                     headers={'Content-Type': 'application/json'} if body is not None else {})
+        response = conn.getresponse()
+        return json.loads(response.read()), int(response.getheader('X-Settings-Version') or 0)
+    finally:
+        conn.close()
+
+
+def run_http(procs: int, writes: int, workers: int) -> bool:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', str(BACKEND_DIR), '--host', '127.0.0.1',
+             '--port', str(port), '--workers', str(workers), '--log-level', 'warning'],
+            cwd=workdir, stdout=subprocess.DEVNULL, env={**os.environ, 'WARMUP_ON_STARTUP': '0'}
+        )
+        try:
+            deadline = time.time() + 60
+            while True:
+                try:
+                    http_request(port, 'GET', '/settings', timeout=1)
+                    break
+                except OSError:
+                    if time.time() > deadline or server.poll() is not None:
+                        raise RuntimeError("Server did not start")
+                    time.sleep(0.2)
+
+            counts = {"bad": 0, "backwards": 0, "errors": 0}
+            lock = threading.Lock()
+
+            def client(worker):
+                bad = backwards = errors = 0
+                last_version = 0
+                for seq in range(writes):
+                    saved, _ = http_request(port, 'POST', '/settings', settings_doc(worker, seq))
+                    errors += "error" in saved
+                    doc, version = http_request(port, 'GET', '/settings')
+                    bad += not doc_consistent(doc)
+                    backwards += version < last_version
+                    last_version = max(version, saved.get("version", 0))
+                with lock:
+                    counts["bad"] += bad
+                    counts["backwards"] += backwards
+                    counts["errors"] += errors
+
+            threads = [threading.Thread(target=client, args=(i,)) for i in range(procs)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            version = http_request(port, 'GET', '/settings')[1]
+        finally:
+            server.terminate()
+            server.wait()
+    ok = not any(counts.values()) and version == procs * writes
+    print(f"http:   {workers} uvicorn workers, {procs} clients x {writes} saves in {elapsed:.2f} s "
+          f"({procs * writes / elapsed:,.0f} save+load pairs/s)")
+    print(f"        errors {counts['errors']}, inconsistent reads {counts['bad']}, versions going backwards "
+          f"{counts['backwards']}, final version {version}/{procs * writes} -> {'OK' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', nargs='?', default='all', choices=('store', 'legacy', 'http', 'all'))
+    parser.add_argument('--procs', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=500)
+    parser.add_argument('--increments', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    ok = True
+    if args.mode in ('store', 'all'):
+        ok &= run_store(args.procs, args.writes, args.increments)
+    if args.mode in ('legacy', 'all'):
+        run_legacy(args.procs, args.writes, args.increments)
+    if args.mode in ('http', 'all'):
+        ok &= run_http(args.procs, args.writes // 5, args.workers)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Bulk MIDI import from zip and tar archives.
+
+Archive members are read sequentially (checked against the file count and
+uncompressed size limits as they go) and handed to a process pool, where each
+one is parsed and re-encoded with the same code as /import-midi. Results are
+yielded in completion order, so the first finished file is reported without
+waiting for the rest of the archive.
+"""
+import asyncio
+import tarfile
+import time
+import zipfile
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, Optional, Tuple
+
+from midi_utils import import_midi_content
+
+MIDI_SUFFIXES = ('.mid', '.midi')
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+class ArchiveLimitExceeded(ValueError):
+    pass
+
+def is_bulk_archive(filename: str) -> bool:
+    return filename.lower().endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+
+def _is_midi_member(name: str) -> bool:
+    # Skip macOS resource forks and other hidden files
+    base = name.rsplit('/', 1)[-1]
+    return name.lower().endswith(MIDI_SUFFIXES) and not base.startswith('.') and '__MACOSX/' not in name
+
+class _Budget:
+    """Running file count and uncompressed byte totals for one archive"""
+
+    def __init__(self, max_files: int, max_total_bytes: int):
+        self.max_files = max_files
+        self.max_total_bytes = max_total_bytes
+        self.files = 0
+        self.total_bytes = 0
+
+    def reserve(self, name: str, size: int) -> None:
+        self.files += 1
+        if self.files > self.max_files:
+            raise ArchiveLimitExceeded(f"Archive has more than {self.max_files} MIDI files")
+        self.total_bytes += size
+        if self.total_bytes > self.max_total_bytes:
+            raise ArchiveLimitExceeded(
+                f"Archive exceeds {self.max_total_bytes} uncompressed bytes (at {name})")
+
+    def read(self, name: str, f: BinaryIO) -> bytes:
+        # Sizes in archive headers are not trusted: read at most what is left
+        remaining = self.max_total_bytes - self.total_bytes
+        data = f.read(remaining + 1)
+        self.reserve(name, len(data))
+        return data
+
+def iter_archive_members(fileobj: BinaryIO, filename: str, max_files: int,
+                         max_total_bytes: int) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (name, content) for each MIDI file in a zip or tar archive.
+
+    Raises ArchiveLimitExceeded as soon as the archive goes over max_files MIDI
+    members or max_total_bytes of uncompressed MIDI data.
+    """
+    budget = _Budget(max_files, max_total_bytes)
+
+    if filename.lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(fileobj) as archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and _is_midi_member(info.filename)]
+
+            # Central directory sizes allow an early reject before decompressing anything
+            if len(members) > max_files:
+                raise ArchiveLimitExceeded(f"Archive has more than {max_files} MIDI files")
+            if sum(info.file_size for info in members) > max_total_bytes:
+                raise ArchiveLimitExceeded(f"Archive exceeds {max_total_bytes} uncompressed bytes")
+
+            for info in members:
+                with archive.open(info) as f:
+                    yield info.filename, budget.read(info.filename, f)
+    else:
+        # Stream mode: members are read in order without seeking
+        with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+            for member in archive:
+                if not member.isfile() or not _is_midi_member(member.name):
+                    continue
+                f = archive.extractfile(member)
+                if f is not None:
+                    yield member.name, budget.read(member.name, f)
+
+def import_archive_member(name: str, content: bytes, cache_dir: Optional[str] = None) -> Dict:
+    """Pool worker: import one archive member, never raising"""
+    started = time.perf_counter()
+    try:
+        cache = None
+        if cache_dir is not None:
+            from note_store import NoteStoreCache
+            cache = NoteStoreCache(Path(cache_dir))
+        result = import_midi_content(content, cache)
+    except Exception as e:
+        result = {'success': False, 'error': f"Failed to import MIDI file: {str(e) or type(e).__name__}"}
+    result['file'] = name
+    result['parseMs'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+async def bulk_import_results(members: Iterator[Tuple[str, bytes]], executor: Executor,
+                              cache_dir: Optional[str] = None) -> AsyncIterator[Dict]:
+    """
+    Import archive members on an executor, yielding each file's result as it
+    finishes, then a final summary record ('done': True).
+
+    Archive reading is also done off the event loop. If reading stops with an
+    error (e.g. a limit is hit), files already submitted are still reported
+    and the summary carries the error.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    pending = set()
+    index_of = {}
+    read_error = None
+    imported = failed = 0
+    first_result_ms = None
+
+    def next_member():
+        return next(members, None)
+
+    def finished(future) -> Dict:
+        nonlocal imported, failed, first_result_ms
+        result = future.result()
+        result['index'] = index_of[future]
+        if result.get('success'):
+            imported += 1
+        else:
+            failed += 1
+        if first_result_ms is None:
+            first_result_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    try:
+        while True:
+            try:
+                member = await loop.run_in_executor(None, next_member)
+            except Exception as e:
+                read_error = str(e)
+                member = None
+            if member is None:
+                break
+
+            name, content = member
+            future = asyncio.wrap_future(executor.submit(import_archive_member, name, content, cache_dir))
+            index_of[future] = len(index_of)
+            pending.add(future)
+
+            # Report anything that finished while the archive was being read
+            done = {f for f in pending if f.done()}
+            for future in done:
+                pending.discard(future)
+                yield finished(future)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield finished(future)
+    finally:
+        # Client went away: don't keep parsing files nobody will see
+        for future in pending:
+            future.cancel()
+
+    summary = {
+        'done': True,
+        'success': read_error is None,
+        'filesImported': imported,
+        'filesFailed': failed,
+        'elapsedMs': round((time.perf_counter() - started) * 1000, 2),
+        'firstResultMs': round(first_result_ms, 2) if first_result_ms is not None else None
+    }
+    if read_error is not None:
+        summary['error'] = read_error
+    yield summary
@@ -0,0 +1,211 @@
+import heapq
+import json
+import math
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from midi_utils import parse_midi_cached, parse_midi_tracks, read_midi_bytes
+from note_store import NoteStore, notes_to_records, pitches_to_records, write_note_store
+
+MIDI_SUFFIXES = ('.mid', '.midi')
+JSON_SUFFIXES = ('.json',)
+
+# Intervals are clamped so that octave-plus leaps share n-grams
+MAX_INTERVAL = 24
+
+def interval_ngrams(pitches: Sequence[int], n: int) -> List[Tuple[int, ...]]:
+    """Transposition-invariant n-grams over the melody's interval sequence"""
+    intervals = [
+        max(-MAX_INTERVAL, min(MAX_INTERVAL, pitches[i] - pitches[i - 1]))
+        for i in range(1, len(pitches))
+    ]
+    return [tuple(intervals[i:i + n]) for i in range(len(intervals) - n + 1)]
+
+class MelodyCorpus:
+    """
+    Local melody library with an interval n-gram inverted index.
+
+    Each melody is indexed by the set of its interval n-grams, so the same
+    melody in any key shares every n-gram. A query only visits the posting
+    lists of its own n-grams, and n-grams found in more than `max_df_ratio` of
+    the corpus are skipped as uninformative, so query time depends on how
+    selective the query is rather than on the corpus size. The cutoff only
+    applies from `min_df_corpus` melodies on (in a small corpus every shared
+    n-gram is "common"), and when it would leave no candidates the common
+    n-grams are scored after all.
+    """
+
+    def __init__(self, n: int = 4, max_df_ratio: float = 0.2, min_df_corpus: int = 100):
+        self.n = n
+        self.max_df_ratio = max_df_ratio
+        self.min_df_corpus = min_df_corpus
+        self.melodies: List[Dict] = []
+        self.postings: Dict[Tuple[int, ...], List[int]] = defaultdict(list)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.melodies)
+
+    def add(self, pitches: Sequence[int], source: str, name: str) -> Optional[int]:
+        """Index a bare pitch pattern"""
+        return self.add_records(pitches_to_records(pitches), source, name)
+
+    def add_records(self, records: np.ndarray, source: str, name: str) -> Optional[int]:
+        """
+        Index one melody given as note store records (kept as-is, so views
+        into a memory-mapped store are not copied). Melodies too short for a
+        single n-gram are skipped.
+        """
+        grams = set(interval_ngrams(records['pitch'].astype(np.int16).tolist(), self.n))
+        if not grams:
+            return None
+
+        with self._lock:
+            melody_id = len(self.melodies)
+            self.melodies.append({
+                'id': melody_id,
+                'source': source,
+                'name': name,
+                'noteCount': len(records),
+                'ngramCount': len(grams),
+                'records': records
+            })
+            for gram in grams:
+                self.postings[gram].append(melody_id)
+        return melody_id
+
+    def ingest_file(self, path: Path, cache=None) -> int:
+        """Ingest every melody in a MIDI or melody JSON file; returns the count added"""
+        added = 0
+        for name, records in read_melody_file(path, cache):
+            if self.add_records(records, str(path), name) is not None:
+                added += 1
+        return added
+
+    def ingest_directory(self, directory: Path, recursive: bool = True, cache=None) -> Dict:
+        """
+        Ingest all MIDI and melody JSON files under a directory.
+
+        With a NoteStoreCache, MIDI files are only parsed the first time their
+        content is seen.
+        """
+        directory = Path(directory)
+        pattern = '**/*' if recursive else '*'
+        files = errors = melodies = 0
+
+        for path in sorted(directory.glob(pattern)):
+            if not path.is_file() or path.suffix.lower() not in MIDI_SUFFIXES + JSON_SUFFIXES:
+                continue
+            try:
+                melodies += self.ingest_file(path, cache)
+                files += 1
+            except Exception as e:
+                print(f"Skipping corpus file {path}: {str(e)}")
+                errors += 1
+
+        return {'files': files, 'melodies': melodies, 'errors': errors, 'total': len(self)}
+
+    def save(self, path: Path) -> None:
+        """Write every melody to one note store file"""
+        with self._lock:
+            write_note_store(path, (
+                ({'source': m['source'], 'name': m['name']}, m['records']) for m in self.melodies
+            ), {'n': self.n})
+
+    @classmethod
+    def load(cls, path: Path, **kwargs) -> "MelodyCorpus":
+        """Rebuild a corpus from a saved note store; records stay memory-mapped"""
+        store = NoteStore(path)
+        corpus = cls(n=store.metadata.get('n', 4), **kwargs)
+        for meta, records in store:
+            corpus.add_records(records, meta['source'], meta['name'])
+        return corpus
+
+    def query(self, pitches: Sequence[int], top_k: int = 10) -> List[Dict]:
+        """
+        Rank melodies by idf-weighted n-gram overlap with the query.
+
+        Scores are cosine similarities between idf-weighted n-gram sets, in 0-1.
+        """
+        grams = set(interval_ngrams(pitches, self.n))
+        if not grams:
+            return []
+
+        with self._lock:
+            total = len(self.melodies)
+            if total == 0:
+                return []
+            max_df = max(1, int(total * self.max_df_ratio)) if total >= self.min_df_corpus else total
+
+            scores = Counter()
+            common = []  # (weight, posting) of the skipped n-grams
+            query_norm = 0.0
+            for gram in grams:
+                posting = self.postings.get(gram)
+                if not posting:
+                    continue
+                idf = math.log(1 + total / len(posting))
+                query_norm += idf * idf
+                weight = idf * idf
+                if len(posting) > max_df:
+                    common.append((weight, posting))
+                    continue
+                for melody_id in posting:
+                    scores[melody_id] += weight
+
+            if not scores:
+                # Only common n-grams matched: better those than nothing
+                for weight, posting in common:
+                    for melody_id in posting:
+                        scores[melody_id] += weight
+            if not scores:
+                return []
+
+            # Approximate each candidate's norm by its n-gram count at the query's average idf
+            avg_weight = query_norm / len(grams)
+            ranked = heapq.nlargest(top_k, (
+                (score / math.sqrt(query_norm * avg_weight * self.melodies[melody_id]['ngramCount']), melody_id)
+                for melody_id, score in scores.items()
+            ))
+
+            results = []
+            for score, melody_id in ranked:
+                melody = self.melodies[melody_id]
+                results.append({
+                    'id': melody_id,
+                    'source': melody['source'],
+                    'name': melody['name'],
+                    'noteCount': melody['noteCount'],
+                    'score': min(1.0, score)
+                })
+            return results
+
+    def stats(self) -> Dict:
+        return {
+            'melodies': len(self.melodies),
+            'ngrams': len(self.postings),
+            'n': self.n
+        }
+
+def read_melody_file(path: Path, cache=None) -> Iterable[Tuple[str, np.ndarray]]:
+    """Yield (name, records) for each melody in a MIDI or melody JSON file"""
+    path = Path(path)
+    if path.suffix.lower() in MIDI_SUFFIXES:
+        if cache is not None:
+            for meta, records in parse_midi_cached(path.read_bytes(), cache):
+                yield meta['trackName'] or path.stem, records
+            return
+        _, tracks = parse_midi_tracks(read_midi_bytes(path.read_bytes()))
+        for track in tracks:
+            yield track['trackName'] or path.stem, notes_to_records(track['notes'])
+    elif path.suffix.lower() in JSON_SUFFIXES:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        for i, melody in enumerate(data.get('melodies', []) if isinstance(data, dict) else []):
+            pattern = melody.get('pattern')
+            if pattern:
+                yield melody.get('name') or melody.get('key') or f"{path.stem}[{i}]", pitches_to_records(pattern)
@@ -0,0 +1,287 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+from scale_utils import ScaleTable
+import heapq
+import time
+
+# Counterpoint intervals in order of preference [3rd, 6th, 5th, octave]
+PREFERRED_INTERVALS = (4, 9, 7, 12)  # Semitones
+
+# Counterpoint range (C3 to C6)
+COUNTERPOINT_LOW = 48
+COUNTERPOINT_HIGH = 84
+
+def snap_to_scale(midi_note: int, table: ScaleTable) -> int:
+    """Snap a MIDI note to the nearest note in the scale."""
+    return midi_note + table.snap_offsets[midi_note % 12]
+
+def greedy_counterpoint_pitches(melody: Sequence[int], table: ScaleTable) -> List[int]:
+    """
+    One-note lookahead counterpoint: contrary motion, trying a 3rd, 6th, 5th
+    then octave and snapping to the scale.
+    """
+    snap_offsets = table.snap_offsets
+    pitches = []
+    prev_midi = None
+
+    for midi in melody:
+        # Determine motion direction for pitch
+        prefer_direction = -1  # Default: start below
+        if prev_midi is not None:
+            prefer_direction = -1 if midi - prev_midi > 0 else 1  # Contrary motion
+        prev_midi = midi
+
+        # Try intervals in order of preference, falling back to a 3rd above
+        candidate = midi + 4
+        for interval in PREFERRED_INTERVALS:
+            in_range = midi + interval * prefer_direction
+            if COUNTERPOINT_LOW <= in_range <= COUNTERPOINT_HIGH:
+                candidate = in_range
+                break
+
+        pitches.append(candidate + snap_offsets[candidate % 12])
+
+    return pitches
+
+def alternate_with_counterpoint(notes: Sequence[Dict], cp_pitches: Sequence[int]) -> List[Dict]:
+    """
+    Lay out original and counterpoint notes on an alternating timeline.
+
+    Each original note is re-timed to double spacing and followed by its
+    counterpoint note.
+    """
+    alternating_notes = []
+
+    for i, (original_note, cp_pitch) in enumerate(zip(notes, cp_pitches)):
+        note_duration = original_note['duration']
+        velocity = original_note['velocity']
+
+        # Recalculate original note timing (double-spaced)
+        new_original_time = i * (note_duration * 2)
+
+        # Add re-timed original note
+        alternating_notes.append({
+            "midi": original_note['midi'],
+            "time": new_original_time,
+            "duration": note_duration,
+            "velocity": velocity,
+            "id": f"orig-{i}"
+        })
+
+        alternating_notes.append({
+            "midi": cp_pitch,
+            "time": new_original_time + note_duration,
+            "duration": note_duration,
+            "velocity": velocity * 0.7,
+            "id": f"cp-{i}"
+        })
+
+    return alternating_notes
+
+def generate_counterpoint_notes(notes: Sequence[Dict], table: ScaleTable) -> List[Dict]:
+    """
+    Generate interspaced counterpoint using alternating timeline approach.
+
+    Scale snapping is a table lookup, so the cost per note does not depend on
+    the scale.
+
+    Args:
+        notes: dicts with 'midi', 'time', 'duration' and 'velocity'
+        table: scale tables from SCALE_REGISTRY
+
+    Returns:
+        Re-timed original notes and counterpoint notes, in timeline order
+    """
+    pitches = greedy_counterpoint_pitches([n['midi'] for n in notes], table)
+    return alternate_with_counterpoint(notes, pitches)
+
+
+# Beam-search solver
+#
+# Costs are additive per note: a vertical cost for the interval against the
+# melody, plus a transition cost from the previous note pair. Both depend only
+# on a few small integers, so they are memoized.
+
+VIOLATION_COST = 100.0  # Parallel fifths/octaves; effectively forbidden
+PERFECT_CLASSES = (0, 7)
+CONSONANT_CLASSES = (0, 3, 4, 7, 8, 9)
+MAX_VERTICAL_SPAN = 19  # Octave plus a fifth
+
+@lru_cache(maxsize=65536)
+def vertical_cost(melody_pitch: int, cp_pitch: int, below: bool, max_crossing: int) -> float:
+    """Cost of the harmonic interval between melody and counterpoint"""
+    distance = cp_pitch - melody_pitch
+    crossing = distance > 0 if below else distance < 0
+    if crossing and abs(distance) > max_crossing:
+        return VIOLATION_COST
+
+    interval_class = abs(distance) % 12
+    if interval_class in (3, 4, 8, 9):
+        cost = 0.0  # Imperfect consonances preferred
+    elif interval_class == 7:
+        cost = 1.0
+    else:
+        cost = 2.0  # Octaves and unisons
+    if crossing:
+        cost += 3.0
+    return cost
+
+@lru_cache(maxsize=262144)
+def transition_cost(prev_melody: int, prev_cp: int, melody_pitch: int, cp_pitch: int,
+                    max_leap: int) -> float:
+    """Cost of moving both voices from one note pair to the next"""
+    melody_motion = melody_pitch - prev_melody
+    cp_motion = cp_pitch - prev_cp
+    leap = abs(cp_motion)
+
+    # Leap size
+    if leap > max_leap:
+        cost = VIOLATION_COST
+    elif leap <= 2:
+        cost = 0.0
+    elif leap <= 4:
+        cost = 1.0
+    elif leap <= 7:
+        cost = 2.0
+    else:
+        cost = 4.0 + (leap - 7)
+
+    if cp_motion == 0:
+        cost += 1.0  # Repeated note
+
+    same_direction = melody_motion * cp_motion > 0
+    prev_class = abs(prev_cp - prev_melody) % 12
+    cur_class = abs(cp_pitch - melody_pitch) % 12
+
+    if same_direction and cur_class in PERFECT_CLASSES:
+        if prev_class == cur_class:
+            cost += VIOLATION_COST  # Parallel fifths/octaves
+        else:
+            cost += 3.0  # Hidden fifths/octaves
+    elif same_direction:
+        cost += 1.0  # Similar motion
+    elif melody_motion == 0 or cp_motion == 0:
+        cost += 0.5  # Oblique motion
+    # Contrary motion is free
+
+    return cost
+
+@lru_cache(maxsize=4096)
+def counterpoint_candidates(table: ScaleTable, melody_pitch: int, below: bool,
+                            max_crossing: int) -> Tuple[int, ...]:
+    """Consonant scale tones in range that may sound against melody_pitch"""
+    low = max(COUNTERPOINT_LOW, melody_pitch - MAX_VERTICAL_SPAN)
+    high = min(COUNTERPOINT_HIGH, melody_pitch + MAX_VERTICAL_SPAN)
+    candidates = []
+    for cp_pitch in range(low, high + 1):
+        distance = cp_pitch - melody_pitch
+        if distance == 0 or abs(distance) % 12 not in CONSONANT_CLASSES:
+            continue
+        if not table.contains(cp_pitch):
+            continue
+        if vertical_cost(melody_pitch, cp_pitch, below, max_crossing) >= VIOLATION_COST:
+            continue
+        candidates.append(cp_pitch)
+
+    if not candidates:
+        # Melody outside the usable range: fall back to the greedy choice
+        candidates = greedy_counterpoint_pitches([melody_pitch], table)
+    return tuple(candidates)
+
+def score_counterpoint(melody: Sequence[int], cp_pitches: Sequence[int], below: bool = True,
+                       max_leap: int = 12, max_crossing: int = 4) -> Dict:
+    """Total and per-note cost of a counterpoint line (lower is better)"""
+    total = 0.0
+    violations = 0
+    for i, (melody_pitch, cp_pitch) in enumerate(zip(melody, cp_pitches)):
+        step = vertical_cost(melody_pitch, cp_pitch, below, max_crossing)
+        if i > 0:
+            step += transition_cost(melody[i - 1], cp_pitches[i - 1], melody_pitch, cp_pitch, max_leap)
+        violations += int(step // VIOLATION_COST)
+        total += step
+    return {
+        'cost': total,
+        'costPerNote': total / len(melody) if melody else 0.0,
+        'violations': violations
+    }
+
+class BeamCounterpointSolver:
+    """
+    Beam-search counterpoint over the consonant scale tones for each note.
+
+    Keeps the best `beam_width` partial lines (at most one per last pitch) at
+    each step. Once `time_budget` seconds have elapsed the best line so far is
+    finished with the greedy one-note lookahead, so latency stays bounded on
+    long melodies while quality grows with the budget.
+    """
+
+    def __init__(self, table: ScaleTable, beam_width: int = 8, time_budget: float = 0.2,
+                 below: bool = True, max_leap: int = 12, max_crossing: int = 4):
+        self.table = table
+        self.beam_width = max(1, beam_width)
+        self.time_budget = time_budget
+        self.below = below
+        self.max_leap = max_leap
+        self.max_crossing = max_crossing
+
+    def solve(self, melody: Sequence[int]) -> Tuple[List[int], Dict]:
+        """Return counterpoint pitches for the melody, plus solver stats"""
+        started = time.perf_counter()
+        deadline = started + self.time_budget
+        budget_exhausted_at: Optional[int] = None
+
+        # Beam entries are (cost, node); nodes are (pitch, parent) linked lists
+        beam = [(0.0, None)]
+        prev_melody = None
+
+        for i, melody_pitch in enumerate(melody):
+            # Check the clock before every note: a step costs beam_width x candidates
+            # cost evaluations, far more than reading the clock
+            if i > 0 and time.perf_counter() > deadline:
+                budget_exhausted_at = i
+                break
+
+            candidates = counterpoint_candidates(self.table, melody_pitch, self.below, self.max_crossing)
+            best = {}
+            for cost, node in beam:
+                for cp_pitch in candidates:
+                    step = vertical_cost(melody_pitch, cp_pitch, self.below, self.max_crossing)
+                    if node is not None:
+                        step += transition_cost(prev_melody, node[0], melody_pitch, cp_pitch, self.max_leap)
+                    total = cost + step
+                    if cp_pitch not in best or total < best[cp_pitch][0]:
+                        best[cp_pitch] = (total, (cp_pitch, node))
+
+            beam = heapq.nsmallest(self.beam_width, best.values(), key=lambda entry: entry[0])
+            prev_melody = melody_pitch
+
+        pitches = []
+        node = beam[0][1]
+        while node is not None:
+            pitches.append(node[0])
+            node = node[1]
+        pitches.reverse()
+
+        if budget_exhausted_at is not None:
+            # Include the previous melody note so the greedy pass sees its motion
+            rest = greedy_counterpoint_pitches(melody[budget_exhausted_at - 1:], self.table)
+            pitches.extend(rest[1:])
+
+        stats = score_counterpoint(melody, pitches, self.below, self.max_leap, self.max_crossing)
+        stats.update({
+            'beamWidth': self.beam_width,
+            'timeBudgetMs': self.time_budget * 1000,
+            'elapsedMs': (time.perf_counter() - started) * 1000,
+            'budgetExhaustedAt': budget_exhausted_at
+        })
+        return pitches, stats
+
+def generate_counterpoint_batch(melodies: Sequence[Sequence[Dict]], table: ScaleTable,
+                                solver: Optional[BeamCounterpointSolver] = None) -> List[List[Dict]]:
+    """Generate counterpoint for many melodies sharing one key and scale."""
+    if solver is None:
+        return [generate_counterpoint_notes(melody, table) for melody in melodies]
+    return [
+        alternate_with_counterpoint(melody, solver.solve([n['midi'] for n in melody])[0])
+        for melody in melodies
+    ]
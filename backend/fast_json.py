@@ -0,0 +1,87 @@
+"""
+Fast JSON responses for large payloads.
+
+FastJSONResponse serializes a route's result as-is, skipping FastAPI's
+jsonable_encoder pass (which walks and copies every note dict before the
+stdlib encoder walks them again). orjson is used when installed, otherwise the
+stdlib encoder. Output is compact by default; pretty=True indents by 2 spaces.
+Both write NaN and infinities as null (what orjson does), so a route returns the
+same JSON whichever encoder is installed.
+
+Routes must return the response themselves (return FastJSONResponse(data))
+for jsonable_encoder to be skipped.
+"""
+import dataclasses
+import json
+import math
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Mapping, Optional
+
+import numpy as np
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used instead
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    """Encode the non-JSON types results can contain"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (Fraction, Decimal)):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _finite(obj: Any) -> Any:
+    """Copy of obj with NaN and infinite floats replaced by None"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    if isinstance(obj, np.ndarray) and obj.dtype.kind in 'fc':
+        return _finite(obj.tolist())
+    return obj
+
+def _stdlib_dumps(content: Any, pretty: bool, default) -> bytes:
+    if pretty:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=2, default=default).encode('utf-8')
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':'),
+                      default=default).encode('utf-8')
+
+def dumps(content: Any, pretty: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, compact unless pretty"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(content, default=_default, option=option)
+    try:
+        return _stdlib_dumps(content, pretty, _default)
+    except ValueError:
+        # A NaN or infinity somewhere: encode again with them as null, like orjson.
+        # Only payloads that contain one pay for the extra walk.
+        return _stdlib_dumps(_finite(content), pretty, lambda obj: _finite(_default(obj)))
+
+class FastJSONResponse(JSONResponse):
+    def __init__(self, content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None,
+                 media_type: Optional[str] = None, background: Optional[BackgroundTask] = None,
+                 pretty: bool = False):
+        self.pretty = pretty
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content, self.pretty)
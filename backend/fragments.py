@@ -0,0 +1,70 @@
+import random
+from collections import abc
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+
+class FragmentView(abc.Sequence):
+    """Read-only window onto notes[start:start + length], without copying"""
+
+    __slots__ = ('notes', 'start', 'length')
+
+    def __init__(self, notes: Sequence[Dict], start: int, length: int):
+        self.notes = notes
+        self.start = start
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.notes[self.start + i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("fragment index out of range")
+        return self.notes[self.start + index]
+
+    def __iter__(self):
+        notes = self.notes
+        for i in range(self.start, self.start + self.length):
+            yield notes[i]
+
+    def __repr__(self):
+        return f"FragmentView(start={self.start}, length={self.length})"
+
+
+def fragment_count(n: int, min_length: int, max_length: int) -> int:
+    """Number of contiguous fragments of length min_length..max_length in n notes"""
+    return sum(n - length + 1 for length in range(min_length, min(max_length, n) + 1))
+
+
+def sample_fragment_bounds(n: int, count: int, min_length: int = 2, max_length: int = 4,
+                           rng: Optional[random.Random] = None) -> Iterator[Tuple[int, int]]:
+    """
+    Draw `count` (start, length) pairs uniformly from all contiguous fragments.
+
+    Each draw picks an index into the (implicit) list of every fragment,
+    ordered by length and then by start, and maps it back to (start, length),
+    so the draws match random.choice over that list without building it.
+    Memory is independent of n.
+    """
+    rng = rng or random
+    total = fragment_count(n, min_length, max_length)
+    if total <= 0:
+        return
+
+    for _ in range(count):
+        k = rng.randrange(total)
+        length = min_length
+        while k >= n - length + 1:
+            k -= n - length + 1
+            length += 1
+        yield k, length
+
+
+def sample_fragments(notes: Sequence[Dict], count: int, min_length: int = 2, max_length: int = 4,
+                     rng: Optional[random.Random] = None) -> Iterator[FragmentView]:
+    """Yield `count` uniformly drawn fragments of notes as views"""
+    for start, length in sample_fragment_bounds(len(notes), count, min_length, max_length, rng):
+        yield FragmentView(notes, start, length)
@@ -0,0 +1,88 @@
+"""
+Parameter sweeps over /gesture/multi-layer layer settings.
+
+A sweep maps layer-config fields (numNotes, durationPercent, pattern, ...) to
+a list of values or a range, and renders every combination. Combinations are
+ordered with the slot-layout fields varying slowest, so consecutive
+combinations share their slot layout (and velocities) and only redo what
+actually changed, usually just the note lengths and the MIDI encoding.
+"""
+import itertools
+import math
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from gestures import Gesture, gesture_slots, gesture_velocities, notes_in_slots
+
+# Fields that determine the slot layout, then those that determine velocities
+LAYOUT_FIELDS = ('numNotes', 'totalDuration', 'pattern', 'curve', 'pulses', 'steps', 'rotation',
+                 'volatility', 'seed')
+VELOCITY_FIELDS = ('velocityEnvelope', 'velocityStart', 'velocityEnd')
+
+def sweep_values(spec: Any) -> List[Any]:
+    """
+    Values of one swept field: a list as-is, or a range
+    {"start", "stop", "step"} (stop included) / {"start", "stop", "num"}.
+    """
+    if isinstance(spec, list):
+        if not spec:
+            raise ValueError("Sweep value lists must not be empty")
+        return spec
+    if not isinstance(spec, dict) or 'start' not in spec or 'stop' not in spec:
+        raise ValueError("A sweep is a list of values or {start, stop, step|num}")
+    start, stop = spec['start'], spec['stop']
+    if spec.get('num') is not None:
+        num = int(spec['num'])
+        if num < 1:
+            raise ValueError("num must be at least 1")
+        if num == 1:
+            return [start]
+        values = [start + (stop - start) * i / (num - 1) for i in range(num)]
+    else:
+        step = spec.get('step') or 1
+        if (stop - start) / step < 0:
+            raise ValueError("step goes away from stop")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        values = [start + step * i for i in range(count)]
+    # Drop float noise like 0.30000000000000004; integer ranges stay integers
+    values = [round(v, 10) for v in values]
+    if isinstance(start, int) and isinstance(stop, int) and all(float(v).is_integer() for v in values):
+        return [int(v) for v in values]
+    return values
+
+def expand_sweep(sweep: Dict[str, Any]) -> Tuple[List[str], List[List[Any]]]:
+    """Swept fields in render order (layout fields first) and their values"""
+    fields = [f for f in LAYOUT_FIELDS if f in sweep] + sorted(f for f in sweep if f not in LAYOUT_FIELDS)
+    return fields, [sweep_values(sweep[f]) for f in fields]
+
+def combination_count(values: Sequence[Sequence[Any]]) -> int:
+    return math.prod(len(v) for v in values)
+
+def iter_combinations(fields: Sequence[str], values: Sequence[Sequence[Any]]) -> Iterator[Dict[str, Any]]:
+    for combination in itertools.product(*values):
+        yield dict(zip(fields, combination))
+
+def render_sweep(configs: Iterator[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Gesture, bytes]]:
+    """
+    Render layer configs (dicts with the /gesture/multi-layer layer fields) to
+    (config, gesture, MIDI bytes), reusing the slot layout and velocities of
+    the previous config when they are unchanged.
+    """
+    layout_key = velocity_key = None
+    centers = slots = velocities = None
+    for config in configs:
+        key = tuple(config.get(f) for f in LAYOUT_FIELDS)
+        if key != layout_key:
+            centers, slots = gesture_slots(
+                config['numNotes'], config['totalDuration'], config['pattern'], config.get('curve'),
+                config.get('pulses'), config.get('steps'), config.get('rotation', 0),
+                config.get('volatility'), config.get('seed')
+            )
+            layout_key, velocity_key = key, None
+        key = tuple(config.get(f) for f in VELOCITY_FIELDS)
+        if key != velocity_key:
+            velocities = gesture_velocities(centers, config['totalDuration'], config['velocityEnvelope'],
+                                            config['velocityStart'], config.get('velocityEnd'),
+                                            config.get('volatility'), config.get('seed'))
+            velocity_key = key
+        gesture = notes_in_slots(centers, slots, config['durationPercent'], velocities)
+        yield config, gesture, gesture.to_midi(config['midiNote'])
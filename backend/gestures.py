@@ -0,0 +1,166 @@
+"""
+Parametric gesture generators.
+
+A gesture is num_notes notes spread over a total duration. Each note gets a
+slot (its center and length) from one of the slot layouts below, and sounds
+for a percentage of 99% of its slot, centered in it (the /gesture/multi-layer
+layout). Velocities come from an envelope over the gesture.
+
+Everything is computed in closed form with NumPy (no per-note Python loop and
+no accumulated floating-point error), so 100k-note gestures take milliseconds.
+
+Slot layouts:
+    even           equal slots (the original symmetric layout)
+    accelerando    slot lengths shrinking geometrically, first/last = curve
+    ritardando     slot lengths growing geometrically, last/first = curve
+    euclidean      `pulses` hits spread over `steps` grid steps per cycle
+                   (Bjorklund/Bresenham), cycles repeated until num_notes
+    random-walk    slot lengths following a log-normal random walk (seeded)
+
+Velocity envelopes (MIDI velocities 1-127):
+    flat           velocity_start throughout
+    linear         velocity_start to velocity_end (crescendo/decrescendo)
+    swell          velocity_start to velocity_end at the middle and back
+    random-walk    a random walk around velocity_start
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from midi_utils import midi_file_bytes, note_events, track_chunk
+
+SLOT_FILL = 0.99  # A note at 100% fills 99% of its slot, so neighbours never touch
+TICKS_PER_SECOND = 1000  # /gesture/multi-layer files: 1000 ticks per second, no tempo track
+
+PATTERNS = ('even', 'accelerando', 'ritardando', 'euclidean', 'random-walk')
+ENVELOPES = ('flat', 'linear', 'swell', 'random-walk')
+
+@dataclass(frozen=True)
+class Gesture:
+    onsets: np.ndarray  # Seconds
+    durations: np.ndarray  # Seconds
+    velocities: np.ndarray  # MIDI velocities
+
+    def __len__(self):
+        return len(self.onsets)
+
+    def to_midi(self, midi_note: int, ticks_per_second: int = TICKS_PER_SECOND) -> bytes:
+        """Single-track MIDI file, one tick per 1/ticks_per_second seconds"""
+        on_ticks = np.trunc(self.onsets * ticks_per_second).astype(np.int64)
+        off_ticks = np.trunc((self.onsets + self.durations) * ticks_per_second).astype(np.int64)
+        # At least one tick long, so note_off never lands before its note_on
+        durations = np.maximum(off_ticks - on_ticks, 1)
+        pitches = np.full(len(self), midi_note, dtype=np.int64)
+        track = track_chunk(note_events(on_ticks, durations, pitches, self.velocities))
+        return midi_file_bytes([track], ticks_per_beat=ticks_per_second)
+
+def even_slots(num_notes: int, total: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Equal slots: slot i is centered at (i + 0.5) * total / num_notes"""
+    segment = total / num_notes
+    return (np.arange(num_notes) + 0.5) * segment, np.full(num_notes, segment)
+
+def curve_slots(num_notes: int, total: float, ratio: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Geometric slots: the last slot is `ratio` times the first, summing to total"""
+    if ratio <= 0:
+        raise ValueError("curve must be positive")
+    if num_notes == 1 or abs(ratio - 1) < 1e-12:
+        return even_slots(num_notes, total)
+    r = ratio ** (1 / (num_notes - 1))
+    k = np.arange(num_notes)
+    first = total * (1 - r) / (1 - r ** num_notes)
+    starts = first * (1 - r ** k) / (1 - r)
+    lengths = first * r ** k
+    return starts + lengths / 2, lengths
+
+def euclidean_hits(pulses: int, steps: int, rotation: int = 0) -> np.ndarray:
+    """Grid steps (0..steps-1) of a Euclidean rhythm, e.g. (3, 8) -> x..x..x."""
+    if not 0 < pulses <= steps:
+        raise ValueError("Euclidean rhythms need 0 < pulses <= steps")
+    step = np.arange(steps)
+    hits = np.flatnonzero((step * pulses) % steps < pulses)
+    return np.sort((hits + rotation) % steps)
+
+def euclidean_slots(num_notes: int, total: float, pulses: int, steps: int,
+                    rotation: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """The rhythm's cycle repeated until num_notes hits, over total seconds"""
+    hits = euclidean_hits(pulses, steps, rotation)
+    cycles = -(-num_notes // pulses)
+    step_length = total / (cycles * steps)
+    grid = (np.arange(cycles)[:, None] * steps + hits[None, :]).ravel()[:num_notes]
+    return (grid + 0.5) * step_length, np.full(num_notes, step_length)
+
+def random_walk_slots(num_notes: int, total: float, volatility: float,
+                      rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Slot lengths exp(random walk), scaled to sum to total"""
+    walk = np.cumsum(rng.normal(0.0, volatility, num_notes))
+    lengths = np.exp(walk - walk.max())  # Shifted so long walks can't overflow
+    lengths *= total / lengths.sum()
+    starts = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    return starts + lengths / 2, lengths
+
+def velocity_envelope(kind: str, positions: np.ndarray, start: int, end: Optional[int],
+                      volatility: float, rng: np.random.Generator) -> np.ndarray:
+    """MIDI velocities at positions 0-1 through the gesture"""
+    if end is None:
+        end = start
+    if kind == 'flat':
+        velocities = np.full(len(positions), float(start))
+    elif kind == 'linear':
+        velocities = start + (end - start) * positions
+    elif kind == 'swell':
+        velocities = start + (end - start) * np.sin(np.pi * positions)
+    elif kind == 'random-walk':
+        # Steps of about volatility * 32 velocity units
+        velocities = start + np.cumsum(rng.normal(0.0, volatility * 32, len(positions)))
+    else:
+        raise ValueError(f"Unknown velocity envelope: {kind} (expected one of {', '.join(ENVELOPES)})")
+    return np.clip(np.rint(velocities), 1, 127).astype(np.int64)
+
+def gesture_slots(num_notes: int, total: float, pattern: str = 'even', curve: Optional[float] = None,
+                  pulses: Optional[int] = None, steps: Optional[int] = None, rotation: int = 0,
+                  volatility: Optional[float] = None, seed: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Slot centers and lengths of num_notes notes over `total` seconds, laid out by `pattern`"""
+    if pattern == 'even':
+        return even_slots(num_notes, total)
+    if pattern == 'accelerando':
+        return curve_slots(num_notes, total, 1 / (curve or 4.0))
+    if pattern == 'ritardando':
+        return curve_slots(num_notes, total, curve or 4.0)
+    if pattern == 'euclidean':
+        return euclidean_slots(num_notes, total, pulses or 3, steps or 8, rotation)
+    if pattern == 'random-walk':
+        return random_walk_slots(num_notes, total, volatility if volatility is not None else 0.3,
+                                 np.random.default_rng(seed))
+    raise ValueError(f"Unknown gesture pattern: {pattern} (expected one of {', '.join(PATTERNS)})")
+
+def place_notes(centers: np.ndarray, slots: np.ndarray, total: float, duration_percent: float,
+                velocity_envelope_kind: str = 'flat', velocity_start: int = 80, velocity_end: Optional[int] = None,
+                volatility: Optional[float] = None, seed: Optional[int] = None) -> Gesture:
+    """Notes centered in their slots, sounding for duration_percent of 99% of the slot"""
+    velocities = gesture_velocities(centers, total, velocity_envelope_kind, velocity_start, velocity_end,
+                                    volatility, seed)
+    return notes_in_slots(centers, slots, duration_percent, velocities)
+
+def notes_in_slots(centers: np.ndarray, slots: np.ndarray, duration_percent: float,
+                   velocities: np.ndarray) -> Gesture:
+    durations = slots * SLOT_FILL * (duration_percent / 100.0)
+    return Gesture(centers - durations / 2, durations, velocities)
+
+def gesture_velocities(centers: np.ndarray, total: float, kind: str = 'flat', start: int = 80,
+                       end: Optional[int] = None, volatility: Optional[float] = None,
+                       seed: Optional[int] = None) -> np.ndarray:
+    """Envelope velocities at the slot centers"""
+    # A stream of its own, so velocities don't depend on the slot layout's draws
+    rng = np.random.default_rng(None if seed is None else [seed, 1])
+    return velocity_envelope(kind, centers / total, start, end, volatility if volatility is not None else 0.3, rng)
+
+def generate_gesture(num_notes: int, total: float, duration_percent: float, pattern: str = 'even',
+                     curve: Optional[float] = None, pulses: Optional[int] = None, steps: Optional[int] = None,
+                     rotation: int = 0, volatility: Optional[float] = None, seed: Optional[int] = None,
+                     velocity_envelope_kind: str = 'flat', velocity_start: int = 80,
+                     velocity_end: Optional[int] = None) -> Gesture:
+    """num_notes notes over `total` seconds, laid out by `pattern`"""
+    centers, slots = gesture_slots(num_notes, total, pattern, curve, pulses, steps, rotation, volatility, seed)
+    return place_notes(centers, slots, total, duration_percent, velocity_envelope_kind, velocity_start,
+                       velocity_end, volatility, seed)
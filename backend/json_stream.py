@@ -0,0 +1,140 @@
+"""
+Incremental JSON reading for large uploads.
+
+iter_json_object() walks a top-level JSON object chunk by chunk and yields its
+members one at a time; the elements of one chosen array member are yielded
+individually, so a huge array is never held in memory at once. Values are
+decoded with the stdlib decoder (json.JSONDecoder.raw_decode), so the result
+matches json.loads.
+"""
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator, Tuple
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_CHARS = '0123456789.eE+-'
+
+class _Reader:
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk to the buffer; False at end of input"""
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            text = self.decoder.decode(b'', final=True)
+        else:
+            text = self.decoder.decode(chunk)
+        # Drop what has been consumed before growing the buffer
+        if self.pos > len(self.buf) // 2:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += text
+        return True
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.buf, self.pos)
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at end of input"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self.error(f"Expecting '{char}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        if not self.peek():
+            raise self.error("Expecting value")
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._grow()
+                continue
+            # A number cut off by the end of the buffer ("12", "1.", "1.5e+")
+            # may continue in the next chunk
+            tail = self.buf[end:]
+            if (not self.eof and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and len(tail) <= 2 and all(c in _NUMBER_CHARS for c in tail)):
+                self._grow()
+                continue
+            self.pos = end
+            return value
+
+    def _grow(self) -> None:
+        # Read until the pending text has doubled, so re-decoding a value that
+        # spans many chunks stays linear overall
+        pending = len(self.buf) - self.pos
+        while len(self.buf) - self.pos < 2 * pending + 1 and self.fill():
+            pass
+
+def iter_json_object(chunks: Iterable[bytes], array_key: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (key, value) for each member of a top-level JSON object read from
+    byte chunks. The array under `array_key` is yielded element by element, as
+    (array_key, element); any other value under that key is an error.
+
+    Raises json.JSONDecodeError for malformed input. Stopping early leaves the
+    rest of the input unread.
+    """
+    reader = _Reader(chunks)
+    if reader.peek() != '{':
+        raise reader.error("Expecting a JSON object")
+    reader.pos += 1
+    if reader.peek() == '}':
+        reader.pos += 1
+        return
+
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise reader.error("Expecting property name")
+        reader.expect(':')
+
+        if key == array_key:
+            if reader.peek() != '[':
+                raise reader.error(f'"{array_key}" must be an array')
+            reader.pos += 1
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value()
+                    separator = reader.peek()
+                    reader.pos += 1
+                    if separator == ']':
+                        break
+                    if separator != ',':
+                        reader.pos -= 1
+                        raise reader.error("Expecting ',' or ']'")
+        else:
+            yield key, reader.value()
+
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == '}':
+            break
+        if separator != ',':
+            reader.pos -= 1
+            raise reader.error("Expecting ',' or '}'")
+
+    if reader.peek():
+        raise reader.error("Extra data")
@@ -0,0 +1,214 @@
+"""
+Loop-aware note representation.
+
+A LoopedPattern is "pattern x repeats + a pitch transform per repeat": the
+pattern's notes are stored once, and repeat r plays them r * period seconds
+later with the pitches of variant r % len(pitch_cycle). Transposition,
+diatonic transposition and augmentation/diminution act on the pattern and
+its pitch variants only, so their cost depends on the pattern length, not
+the unrolled length. Notes are only unrolled by iter_notes()/to_arrays() or
+when encoding to MIDI.
+"""
+import math
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from midi_utils import TICKS_PER_BEAT, conductor_track, meta_event, midi_file_bytes, note_events, track_chunk
+from scale_utils import ScaleTable
+
+DEFAULT_VELOCITY = 0.7
+
+def midi_pitches(pitches: np.ndarray) -> np.ndarray:
+    """Pitches clipped to the MIDI range (develop("sequence") can push them past 127)"""
+    return np.clip(np.asarray(pitches, dtype=np.int64), 0, 127)
+
+def midi_velocities(velocities: np.ndarray) -> np.ndarray:
+    """0-1 velocities as MIDI velocities 1-127 (values above 1.0 are clipped)"""
+    return np.clip(np.rint(np.asarray(velocities, dtype=np.float64) * 127), 1, 127).astype(np.int64)
+
+@dataclass(frozen=True, eq=False)
+class LoopedPattern:
+    notes: Tuple[Dict, ...]  # Pattern note dicts; extra keys are carried into unrolled notes
+    onsets: np.ndarray  # Seconds, for the first repeat
+    durations: np.ndarray
+    velocities: np.ndarray  # 0-1
+    pitch_cycle: Tuple[np.ndarray, ...]  # Pitches of repeat r are pitch_cycle[r % len(pitch_cycle)]
+    repeats: int
+    period: float  # Seconds between repeat starts
+    end: Optional[float] = None  # Notes from here on are dropped, notes crossing it are trimmed
+
+    @classmethod
+    def from_notes(cls, notes: Sequence[Dict], repeats: int = 1, period: Optional[float] = None,
+                   pitch_cycle: Optional[Sequence[Sequence[int]]] = None,
+                   end: Optional[float] = None) -> "LoopedPattern":
+        """
+        Build a looped pattern from note dicts ('midi', 'time', 'duration',
+        'velocity'). The period defaults to the end of the last note.
+        """
+        notes = tuple(notes)
+        onsets = np.array([n['time'] for n in notes], dtype=np.float64)
+        durations = np.array([n['duration'] for n in notes], dtype=np.float64)
+        if period is None:
+            period = float((onsets + durations).max()) if notes else 0.0
+        if pitch_cycle is None:
+            pitch_cycle = [[n['midi'] for n in notes]]
+        return cls(
+            notes=notes,
+            onsets=onsets,
+            durations=durations,
+            velocities=np.array([n.get('velocity', DEFAULT_VELOCITY) for n in notes], dtype=np.float64),
+            pitch_cycle=tuple(np.asarray(p, dtype=np.int64) for p in pitch_cycle),
+            repeats=max(0, int(repeats)),
+            period=float(period),
+            end=end
+        )
+
+    @classmethod
+    def sequence(cls, notes: Sequence[Dict], table: ScaleTable, scale_steps: Sequence[int],
+                 period: float) -> "LoopedPattern":
+        """One repeat per entry of scale_steps, each transposed by that many scale steps"""
+        pitches = np.array([n['midi'] for n in notes], dtype=np.int64)
+        return cls.from_notes(
+            notes, repeats=len(scale_steps), period=period,
+            pitch_cycle=[table.transpose_steps(pitches, steps) for steps in scale_steps]
+        )
+
+    def __len__(self):
+        """Number of notes once unrolled"""
+        return int(self._repeat_counts().sum())
+
+    def _repeat_counts(self) -> np.ndarray:
+        """How many repeats of each pattern note start before `end`"""
+        counts = np.full(len(self.notes), self.repeats, dtype=np.int64)
+        if self.end is None or not len(self.notes):
+            return counts
+        if self.period <= 0:
+            return np.where(self.onsets < self.end, counts, 0)
+
+        # Estimate, then correct the estimate's float rounding with the exact test
+        counts = np.clip(np.ceil((self.end - self.onsets) / self.period), 0, self.repeats).astype(np.int64)
+        counts -= (counts > 0) & (self.onsets + (counts - 1) * self.period >= self.end)
+        counts += (counts < self.repeats) & (self.onsets + counts * self.period < self.end)
+        return counts
+
+    # Native transforms: all O(pattern length)
+
+    def transpose(self, semitones: int) -> "LoopedPattern":
+        return replace(self, pitch_cycle=tuple(p + semitones for p in self.pitch_cycle))
+
+    def transpose_diatonic(self, table: ScaleTable, scale_steps: int) -> "LoopedPattern":
+        return replace(self, pitch_cycle=tuple(table.transpose_steps(p, scale_steps) for p in self.pitch_cycle))
+
+    def scale_time(self, factor: float) -> "LoopedPattern":
+        """Augment (factor > 1) or diminish (factor < 1) around the first onset"""
+        if not len(self.notes):
+            return self
+        origin = float(self.onsets.min())
+        return replace(
+            self,
+            onsets=origin + (self.onsets - origin) * factor,
+            durations=self.durations * factor,
+            period=self.period * factor,
+            end=None if self.end is None else origin + (self.end - origin) * factor
+        )
+
+    # Unrolling
+
+    def iter_notes(self) -> Iterator[Dict]:
+        """Yield unrolled note dicts, repeat by repeat"""
+        onsets = self.onsets.tolist()
+        durations = self.durations.tolist()
+        velocities = self.velocities.tolist()
+        cycle = [p.tolist() for p in self.pitch_cycle]
+
+        for r in range(self.repeats):
+            offset = r * self.period
+            pitches = cycle[r % len(cycle)]
+            for note_data, onset, dur, velocity, midi in zip(self.notes, onsets, durations, velocities, pitches):
+                time = onset + offset
+                if self.end is not None:
+                    if time >= self.end:
+                        continue
+                    dur = min(dur, self.end - time)
+                yield {**note_data, 'midi': midi, 'time': time, 'duration': dur, 'velocity': velocity}
+
+    def unroll(self) -> List[Dict]:
+        return list(self.iter_notes())
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Unrolled (onsets, durations, pitches, velocities), repeat by repeat"""
+        n = len(self.notes)
+        repeat = np.repeat(np.arange(self.repeats), n)
+        onsets = np.tile(self.onsets, self.repeats) + repeat * self.period
+        durations = np.tile(self.durations, self.repeats)
+        velocities = np.tile(self.velocities, self.repeats)
+        cycle = np.stack(self.pitch_cycle) if n else np.zeros((1, 0), dtype=np.int64)
+        pitches = cycle[repeat % len(cycle), np.tile(np.arange(n), self.repeats)]
+
+        if self.end is not None:
+            keep = onsets < self.end
+            onsets, durations, pitches, velocities = onsets[keep], durations[keep], pitches[keep], velocities[keep]
+            durations = np.minimum(durations, self.end - onsets)
+        return onsets, durations, pitches, velocities
+
+    # MIDI encoding
+
+    def to_midi(self, bpm: float = 120, ticks_per_beat: int = TICKS_PER_BEAT) -> bytes:
+        """Encode as a Type 1 MIDI file (conductor track + one note track)"""
+        ticks_per_second = bpm / 60 * ticks_per_beat
+        period_ticks = self.period * ticks_per_second
+        name = meta_event(0, 0x03, b'')
+
+        if self._repeats_encode_identically(period_ticks):
+            # Encode one repeat, then the same bytes again for every later
+            # repeat (only the first event's delta differs from the first repeat)
+            period_ticks = int(round(period_ticks))
+            onsets = np.rint(self.onsets * ticks_per_second).astype(np.int64)
+            durations = np.rint((self.onsets + self.durations) * ticks_per_second).astype(np.int64) - onsets
+            args = (onsets, durations, midi_pitches(self.pitch_cycle[0]), midi_velocities(self.velocities))
+            first = note_events(*args)
+            last_tick = int((onsets + durations).max())
+            rest = note_events(*args, start_tick=last_tick - period_ticks) * (self.repeats - 1)
+            return midi_file_bytes([conductor_track(bpm), track_chunk(name, first, rest)], ticks_per_beat)
+
+        onsets, durations, pitches, velocities = self.to_arrays()
+        onset_ticks = np.rint(onsets * ticks_per_second).astype(np.int64)
+        return midi_file_bytes([conductor_track(bpm), track_chunk(name, note_events(
+            onset_ticks,
+            np.rint((onsets + durations) * ticks_per_second).astype(np.int64) - onset_ticks,
+            midi_pitches(pitches),
+            midi_velocities(velocities)
+        ))], ticks_per_beat)
+
+    def _repeats_encode_identically(self, period_ticks: float) -> bool:
+        # Same pitches every repeat, nothing clipped, a whole number of ticks
+        # per period, and each repeat's notes inside its own period
+        return (
+            self.repeats > 1 and len(self.notes) > 0 and len(self.pitch_cycle) == 1
+            and self.end is None
+            and abs(period_ticks - round(period_ticks)) < 1e-6
+            and self.onsets.min() >= 0
+            and (self.onsets + self.durations).max() <= self.period
+        )
+
+def rhythm_pattern(midi_note: int, note_duration: float, rest: float, total: float,
+                   velocity: float = DEFAULT_VELOCITY) -> LoopedPattern:
+    """
+    One note every note_duration + rest seconds until `total`, the last note
+    trimmed to end at `total` (the /gesture/simple-rhythm layout).
+    """
+    cycle = note_duration + rest
+    if cycle <= 0:
+        raise ValueError("Note duration plus rest must be positive")
+
+    # Repeats start at r * cycle < total
+    repeats = max(0, int(math.ceil(total / cycle)))
+    while repeats > 0 and (repeats - 1) * cycle >= total:
+        repeats -= 1
+    while repeats * cycle < total:
+        repeats += 1
+
+    note_data = {'midi': midi_note, 'time': 0.0, 'duration': note_duration, 'velocity': velocity}
+    return LoopedPattern.from_notes([note_data], repeats=repeats, period=cycle, end=total)
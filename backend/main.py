@@ -1,18 +1,45 @@
 from fastapi import FastAPI, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, FileResponse
+from fastapi.responses import Response, FileResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from music21 import stream, note, tempo, meter, duration, scale, converter
 import json
 import os
 from pathlib import Path
-from scale_utils import get_scale_intervals
+from scale_utils import SCALE_REGISTRY, create_custom_scale, note_name_to_midi
 import base64
 from datetime import datetime
 from transformations import MusicTransformer
+from corpus import MelodyCorpus
+from counterpoint import (BeamCounterpointSolver, alternate_with_counterpoint,
+                          generate_counterpoint_batch, generate_counterpoint_notes)
+from midi_utils import (MELODIC_CHANNELS, conductor_track, import_midi_content, midi_file_bytes, midi_header,
+                        notes_track)
+from melody_loader import encode_layer_loops, iter_melody_file, load_layer_loops_from, pick_melody
+from looped_pattern import LoopedPattern, rhythm_pattern
+from gestures import generate_gesture
+from gesture_sweep import combination_count, expand_sweep, iter_combinations, render_sweep
+from osc_scheduler import OscNoteScheduler
+from melody_watcher import MelodyFileWatcher
+from profiling import ProfileStore, profiled_route_class
+from fast_json import FastJSONResponse, dumps as dumps_json
+from uploads import (UploadLimitMiddleware, UploadRejected, iter_upload_chunks, read_upload,
+                     upload_error_response)
+from starlette.concurrency import run_in_threadpool
+from note_store import NoteStoreCache
+from bulk_import import bulk_import_results, is_bulk_archive, iter_archive_members
+from concurrent.futures import ProcessPoolExecutor
+import io
+import zipfile
+from session_store import LayerSessionStore, SessionNotFound
+from shared_state import SharedStateStore, VersionConflict
 from pythonosc import udp_client
 import logging
+import numpy as np
+from warmup import Warmup
+from admission import AdmissionClass, AdmissionMiddleware, admission_stats
+from worker_lock import SingleWorkerMiddleware, WorkerLock
 
 class MidiEvent(BaseModel):
     type: str  # 'noteOn' or 'noteOff'
@@ -34,6 +61,16 @@ class SaveNote(BaseModel):
 class SaveMidiData(BaseModel):
     notes: List[SaveNote]
 
+class SaveMidiLayer(BaseModel):
+    notes: List[SaveNote]
+    name: Optional[str] = None
+    channel: Optional[int] = None  # 0-15; defaults to one channel per layer, skipping drums
+    program: Optional[int] = None  # General MIDI program 0-127; no program change when unset
+
+class SaveMultiLayerMidiData(BaseModel):
+    layers: List[SaveMidiLayer]
+    bpm: float = 120
+
 class GenerateParams(BaseModel):
     scale_type: str = "major"
     root_note: str = "C"
@@ -58,6 +95,17 @@ class CounterpointRequest(BaseModel):
     notes: List[CounterpointNote]
     key: str
     scale_type: str
+    # "greedy" (one-note lookahead) or "beam" (constraint-based beam search)
+    solver: str = "greedy"
+    beam_width: int = 8  # Capped at COUNTERPOINT_MAX_BEAM_WIDTH
+    time_budget_ms: float = 200  # Per melody, capped at COUNTERPOINT_MAX_TIME_BUDGET_MS
+    voice: str = "below"  # Side of the melody the counterpoint stays on
+    max_leap: int = 12
+    max_crossing: int = 4  # Semitones the counterpoint may cross the melody
+
+class CounterpointBatchRequest(CounterpointRequest):
+    notes: List[CounterpointNote] = []
+    melodies: List[List[CounterpointNote]]
 
 class JsonMelodyData(BaseModel):
     melody_index: int = 0
@@ -66,6 +114,7 @@ class SuperColliderExportRequest(BaseModel):
     layers: Dict[str, Any]
     duration_type: str = "absolute"  # "absolute" or "fractional"
     format_type: str = "standard"
+    pretty: bool = False  # Indented JSON instead of compact
 
 class TransformNote(BaseModel):
     midi: int
@@ -84,6 +133,21 @@ class TransformRequest(BaseModel):
     axis: Optional[str] = None
     factor: Optional[float] = None
     method: Optional[str] = None
+    # develop(method="fragment"): number of fragments and their length range (in notes)
+    fragment_count: Optional[int] = None
+    fragment_min_length: Optional[int] = None
+    fragment_max_length: Optional[int] = None
+
+class HarmonizeVoicesRequest(BaseModel):
+    notes: List[TransformNote]
+    scale_type: str
+    root_note: str
+    # One voice per interval, in scale steps like /transform/harmonize's interval;
+    # when empty, the intervals of a chord shape (see CHORD_SHAPES)
+    intervals: Optional[List[int]] = None
+    chord: Optional[str] = None
+    include_melody: bool = True  # Add the melody as the first MIDI track
+    format: str = "midi"  # "midi" (one track per voice) or "json" (notes per voice)
 
 class GestureRequest(BaseModel):
     scale_type: str
@@ -99,18 +163,265 @@ class MultiLayerGestureLayerConfig(BaseModel):
     layerId: int
     midiNote: int
     durationPercent: float  # 1-100%
-    totalDuration: float  # 1-10 seconds
-    numNotes: int  # 1-100 notes
+    totalDuration: float  # Seconds, up to GESTURE_MAX_DURATION
+    numNotes: int  # Up to GESTURE_MAX_NOTES
+    # Optional gesture shape (see gestures.py); the defaults give the original even layout
+    pattern: str = "even"  # 'even', 'accelerando', 'ritardando', 'euclidean' or 'random-walk'
+    curve: Optional[float] = None  # accelerando/ritardando: ratio of the longest to the shortest slot (4)
+    pulses: Optional[int] = None  # euclidean: hits per cycle (3)
+    steps: Optional[int] = None  # euclidean: grid steps per cycle (8)
+    rotation: int = 0  # euclidean
+    volatility: Optional[float] = None  # random-walk spacing/velocity step size (0.3)
+    seed: Optional[int] = None  # random-walk
+    velocityEnvelope: str = "flat"  # 'flat', 'linear', 'swell' or 'random-walk'
+    velocityStart: int = 80
+    velocityEnd: Optional[int] = None
 
 class MultiLayerGestureRequest(BaseModel):
     layers: List[MultiLayerGestureLayerConfig]
     scale_type: str
     root_note: str
 
+class GestureSweepRequest(BaseModel):
+    base: MultiLayerGestureLayerConfig  # Values of the fields that are not swept (layerId is ignored)
+    # Field -> list of values, or a range {"start", "stop", "step"} (stop included) / {"start", "stop", "num"}
+    sweep: Dict[str, Any]
+    format: str = "ndjson"  # "ndjson" (a line per combination, MIDI as base64) or "zip" (.mid files + index.json)
+
+class SessionCreateRequest(BaseModel):
+    # Same shape as SuperColliderExportRequest.layers; sent once per session
+    layers: Dict[str, Any] = {}
+
+class LayerEdit(BaseModel):
+    op: str  # 'insert', 'delete', 'move' or 'transform-range'
+    ids: Optional[List[int]] = None
+    notes: Optional[List[TransformNote]] = None
+    # move
+    dt: float = 0.0
+    dmidi: int = 0
+    # transform-range
+    start: Optional[float] = None
+    end: Optional[float] = None
+    transform: Optional[str] = None
+    scale_type: str = "major"
+    root_note: str = "C"
+    params: Dict[str, Any] = {}
+
+class LayerEditRequest(BaseModel):
+    edits: List[LayerEdit]
+
+class SessionExportRequest(BaseModel):
+    duration_type: str = "absolute"  # "absolute" or "fractional"
+    format_type: str = "standard"
+    layer_ids: Optional[List[str]] = None  # Default: all layers
+    pretty: bool = False  # Indented JSON instead of compact
+
+class SchedulerStartRequest(BaseModel):
+    # Same shape as SuperColliderExportRequest.layers, or a stored session
+    layers: Dict[str, Any] = {}
+    session_id: Optional[str] = None
+    layer_ids: Optional[List[str]] = None  # Session layers to play; default all
+    host: str = "127.0.0.1"
+    port: int = 57120
+    bundles: bool = False  # Timetagged bundles sent lookahead_ms early
+    lookahead_ms: float = 50
+    loop: bool = True
+
+class WatcherStartRequest(BaseModel):
+    paths: List[str]  # Melody JSON files in MELODY_WATCH_DIR, like layer-melodies.json
+    host: str = "127.0.0.1"
+    port: int = 57120
+    duration_type: str = "absolute"
+    poll_ms: float = 5
+    debounce_ms: float = 10
+    push_initial: bool = True  # Send the files' current layers on start
+
+class SessionTransformRequest(BaseModel):
+    scale_type: str
+    root_note: str
+    start: Optional[float] = None
+    end: Optional[float] = None
+    # Transform-specific parameters
+    style: Optional[str] = None
+    interval: Optional[int] = None
+    semitones: Optional[int] = None
+    axis: Optional[str] = None
+    factor: Optional[float] = None
+    method: Optional[str] = None
+    # develop(method="fragment"): number of fragments and their length range (in notes)
+    fragment_count: Optional[int] = None
+    fragment_min_length: Optional[int] = None
+    fragment_max_length: Optional[int] = None
+
+class CorpusIngestRequest(BaseModel):
+    directory: Optional[str] = None  # CORPUS_DIR or a directory inside it (relative to it). Default: CORPUS_DIR
+    recursive: bool = True
+
+class CorpusStoreRequest(BaseModel):
+    path: Optional[str] = None  # Relative to NOTE_STORE_DIR. Default: CORPUS_STORE_FILE
+
+class CorpusQueryRequest(BaseModel):
+    notes: Optional[List[TransformNote]] = None
+    pattern: Optional[List[int]] = None  # MIDI pitches, as in melody JSON files
+    top_k: int = 10
+
 app = FastAPI()
 
-# Settings file path
+# Per-request profiling (X-Profile header or ?profile=1), only when enabled;
+# routes must be created after the route class is set
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", "./.profiles"))
+profile_store = ProfileStore(PROFILE_DIR)
+if PROFILING_ENABLED:
+    app.router.route_class = profiled_route_class(profile_store)
+
+# Settings live in a SQLite database (WAL mode) shared by all workers, so
+# `uvicorn --workers N` is safe. A settings.json from before is imported once.
+SETTINGS_DB = Path(os.environ.get("SETTINGS_DB", "./settings.db"))
 SETTINGS_FILE = Path("./settings.json")
+shared_state = SharedStateStore(SETTINGS_DB)
+shared_state.import_file("settings", SETTINGS_FILE)
+
+# Layer sessions, the melody corpus, the OSC scheduler and the melody watcher are
+# kept in process memory, so only one worker may own them: the one holding this lock. Other
+# workers answer their routes with 503 (run a single worker to use them).
+STATEFUL_WORKER_LOCK = Path(os.environ.get("STATEFUL_WORKER_LOCK", str(SETTINGS_DB) + ".worker.lock"))
+stateful_worker_lock = WorkerLock(STATEFUL_WORKER_LOCK)
+STATEFUL_ROUTES = [r"/sessions(/|$)", r"/corpus(/|$)", r"/scheduler/", r"/watcher/"]
+
+# Local melody library for similarity search
+CORPUS_DIR = Path(os.environ.get("CORPUS_DIR", "../data"))
+melody_corpus = MelodyCorpus()
+
+# Parsed MIDI imports, cached as memory-mapped note stores by content hash;
+# least recently used stores are deleted past either cap
+NOTE_STORE_DIR = Path(os.environ.get("NOTE_STORE_DIR", "./.note_cache"))
+NOTE_STORE_CACHE_MAX_BYTES = int(os.environ.get("NOTE_STORE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+NOTE_STORE_CACHE_MAX_FILES = int(os.environ.get("NOTE_STORE_CACHE_MAX_FILES", 2000))
+note_store_cache = NoteStoreCache(NOTE_STORE_DIR, max_bytes=NOTE_STORE_CACHE_MAX_BYTES,
+                                  max_files=NOTE_STORE_CACHE_MAX_FILES)
+CORPUS_STORE_FILE = NOTE_STORE_DIR / "corpus.gns"
+
+def confined_path(root: Path, name: str, allow_root: bool = False) -> Path:
+    """A path from a request, relative to root (or absolute), which it may not leave"""
+    resolved_root = root.resolve()
+    path = (resolved_root / name.strip()).resolve()
+    if resolved_root not in path.parents and not (allow_root and path == resolved_root):
+        raise ValueError(f"Path must be inside {root}: {name}")
+    return path
+
+def corpus_store_path(name: Optional[str]) -> Path:
+    """Corpus store file for a request: a path relative to NOTE_STORE_DIR, which it may not leave"""
+    if not name:
+        return CORPUS_STORE_FILE
+    return confined_path(NOTE_STORE_DIR, name)
+
+# Bulk MIDI import: archive limits and the worker pool (created on first use)
+BULK_IMPORT_WORKERS = int(os.environ.get("BULK_IMPORT_WORKERS", os.cpu_count() or 2))
+BULK_IMPORT_MAX_FILES = int(os.environ.get("BULK_IMPORT_MAX_FILES", 500))
+BULK_IMPORT_MAX_BYTES = int(os.environ.get("BULK_IMPORT_MAX_BYTES", 200 * 1024 * 1024))
+bulk_import_pool: Optional[ProcessPoolExecutor] = None
+
+def get_bulk_import_pool() -> ProcessPoolExecutor:
+    global bulk_import_pool
+    if bulk_import_pool is None:
+        bulk_import_pool = ProcessPoolExecutor(max_workers=BULK_IMPORT_WORKERS)
+    return bulk_import_pool
+
+@app.on_event("shutdown")
+def shutdown_bulk_import_pool():
+    if bulk_import_pool is not None:
+        bulk_import_pool.shutdown(wait=False, cancel_futures=True)
+
+# Backend OSC sequencer (created by /scheduler/start)
+osc_scheduler: Optional[OscNoteScheduler] = None
+
+@app.on_event("shutdown")
+async def shutdown_osc_scheduler():
+    if osc_scheduler is not None:
+        await osc_scheduler.stop()
+
+# Melody file hot reload (started by /watcher/start, or at startup from
+# MELODY_WATCH_FILES, a comma-separated list of melody JSON files). Files
+# requested through /watcher/start must be inside MELODY_WATCH_DIR.
+MELODY_WATCH_DIR = Path(os.environ.get("MELODY_WATCH_DIR", "../data"))
+MELODY_WATCH_FILES = [p for p in os.environ.get("MELODY_WATCH_FILES", "").split(",") if p.strip()]
+melody_watcher: Optional[MelodyFileWatcher] = None
+
+@app.on_event("startup")
+def start_melody_watcher_from_env():
+    global melody_watcher
+    if MELODY_WATCH_FILES:
+        if not stateful_worker_lock.acquire():
+            print(f"Melody watcher not started: worker {stateful_worker_lock.owner()} runs it")
+            return
+        melody_watcher = create_melody_watcher(WatcherStartRequest(paths=MELODY_WATCH_FILES))
+        melody_watcher.start()
+
+@app.on_event("shutdown")
+async def shutdown_melody_watcher():
+    if melody_watcher is not None:
+        await melody_watcher.stop()
+
+# Beam search limits (/generate_counterpoint): larger requested values are clamped
+COUNTERPOINT_MAX_BEAM_WIDTH = int(os.environ.get("COUNTERPOINT_MAX_BEAM_WIDTH", 64))
+COUNTERPOINT_MAX_TIME_BUDGET_MS = float(os.environ.get("COUNTERPOINT_MAX_TIME_BUDGET_MS", 2000))
+
+# Gesture size limits (/gesture/multi-layer)
+GESTURE_MAX_NOTES = int(os.environ.get("GESTURE_MAX_NOTES", 100_000))
+GESTURE_MAX_DURATION = float(os.environ.get("GESTURE_MAX_DURATION", 3600))
+GESTURE_SWEEP_MAX_COMBINATIONS = int(os.environ.get("GESTURE_SWEEP_MAX_COMBINATIONS", 5000))
+GESTURE_SWEEP_MAX_NOTES = int(os.environ.get("GESTURE_SWEEP_MAX_NOTES", 5_000_000))  # Across all combinations
+
+# Server-side layer buffers, so clients can send edits instead of full note lists
+# Each layer keeps its last SESSION_HISTORY_VERSIONS versions for diff/restore
+SESSION_HISTORY_VERSIONS = int(os.environ.get("SESSION_HISTORY_VERSIONS", 1000))
+session_store = LayerSessionStore(max_sessions=64, ttl_seconds=3600,
+                                  max_history_per_layer=SESSION_HISTORY_VERSIONS)
+
+# Upload size caps (bytes of the uploaded file). Bodies over the cap are
+# rejected with 413 as soon as that is known, files that don't start like
+# the expected kind with 415.
+SETTINGS_UPLOAD_MAX_BYTES = int(os.environ.get("SETTINGS_UPLOAD_MAX_BYTES", 1024 * 1024))
+MELODY_UPLOAD_MAX_BYTES = int(os.environ.get("MELODY_UPLOAD_MAX_BYTES", 64 * 1024 * 1024))
+MIDI_UPLOAD_MAX_BYTES = int(os.environ.get("MIDI_UPLOAD_MAX_BYTES", 16 * 1024 * 1024))
+BULK_IMPORT_MAX_UPLOAD_BYTES = int(os.environ.get("BULK_IMPORT_MAX_UPLOAD_BYTES", BULK_IMPORT_MAX_BYTES))
+UPLOAD_LIMITS = {
+    "/settings/upload": (SETTINGS_UPLOAD_MAX_BYTES, "json"),
+    "/load-json-melody": (MELODY_UPLOAD_MAX_BYTES, "json"),
+    "/load-multi-layer-melody": (MELODY_UPLOAD_MAX_BYTES, "json"),
+    "/import-midi": (MIDI_UPLOAD_MAX_BYTES, "midi"),
+    "/import-midi/bulk": (BULK_IMPORT_MAX_UPLOAD_BYTES, None)
+}
+# Admission control: CPU-heavy routes run at most N at a time per class, with
+# up to ADMISSION_QUEUE_SIZE more waiting (at most ADMISSION_MAX_WAIT seconds)
+# per class; beyond that they get 503 with Retry-After. Other routes bypass it.
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "1").lower() in ("1", "true", "yes")
+ADMISSION_QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", 64))
+ADMISSION_MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", 30))
+ADMISSION_LIMITS = {
+    "import": int(os.environ.get("ADMISSION_IMPORT_CONCURRENCY", 2)),
+    "transform": int(os.environ.get("ADMISSION_TRANSFORM_CONCURRENCY", os.cpu_count() or 2)),
+    "gesture": int(os.environ.get("ADMISSION_GESTURE_CONCURRENCY", os.cpu_count() or 2))
+}
+ADMISSION_ROUTES = [
+    (r"/import-midi", "import"),
+    (r"/load-(json|multi-layer)-melody$", "import"),
+    (r"/corpus/ingest$", "import"),
+    (r"/transform/", "transform"),
+    (r"/sessions/[^/]+/layers/[^/]+/transform/", "transform"),
+    (r"/generate_counterpoint", "transform"),
+    (r"/gesture/", "gesture")
+]
+admission_classes = {name: AdmissionClass(name, limit, ADMISSION_QUEUE_SIZE, ADMISSION_MAX_WAIT)
+                     for name, limit in ADMISSION_LIMITS.items()}
+# Added before the upload limits, so oversized uploads are refused without queueing
+app.add_middleware(AdmissionMiddleware, classes=admission_classes, routes=ADMISSION_ROUTES,
+                   enabled=ADMISSION_CONTROL)
+app.add_middleware(UploadLimitMiddleware, limits=UPLOAD_LIMITS)
+app.add_exception_handler(UploadRejected, upload_error_response)
+# Outermost, so requests for another worker's state are refused before queueing
+app.add_middleware(SingleWorkerMiddleware, lock=stateful_worker_lock, routes=STATEFUL_ROUTES)
 
 app.add_middleware(
     CORSMiddleware,
@@ -132,19 +443,15 @@ def generate_midi(params: GenerateParams):
         s.append(tempo.TempoIndication(number=120))
         s.append(meter.TimeSignature('4/4'))
         
-        # Get scale intervals from our utility module
-        intervals = get_scale_intervals(params.scale_type)
+        # Get precomputed scale tables from our utility module
+        table = SCALE_REGISTRY.get(params.scale_type, params.root_note)
         
         # Convert root note to MIDI number
-        root_note_obj = note.Note(f"{params.root_note}{params.octave}")
-        root_midi = root_note_obj.pitch.midi
+        root_midi = note_name_to_midi(params.root_note, params.octave)
         
         # Generate ascending notes
         for i in range(params.num_notes):
-            scale_degree = i % len(intervals)
-            octave_offset = i // len(intervals)
-            
-            midi_note = root_midi + intervals[scale_degree] + (octave_offset * 12)
+            midi_note = table.note_at(root_midi, i)
             n = note.Note(midi=midi_note)
             n.duration = duration.Duration(0.5)  # Half note
             s.append(n)
@@ -283,25 +590,66 @@ def save_midi(save_data: SaveMidiData):
         print(f"Error saving MIDI: {str(e)}")
         return {"error": str(e)}
 
+@app.post("/save-midi/multi-layer")
+def save_midi_multi_layer(save_data: SaveMultiLayerMidiData):
+    """Export every layer as its own track of one Type 1 MIDI file"""
+    try:
+        if not save_data.layers:
+            return {"error": "No layers to save"}
+        if save_data.bpm <= 0:
+            return {"error": "bpm must be positive"}
+        
+        # Encode every track up front (errors still return JSON), then stream the chunks
+        tracks = [conductor_track(save_data.bpm)]
+        for i, layer in enumerate(save_data.layers):
+            channel = layer.channel if layer.channel is not None else MELODIC_CHANNELS[i % len(MELODIC_CHANNELS)]
+            if not 0 <= channel <= 15:
+                return {"error": f"Layer {i}: channel must be 0-15"}
+            if layer.program is not None and not 0 <= layer.program <= 127:
+                return {"error": f"Layer {i}: program must be 0-127"}
+            tracks.append(notes_track(
+                [n.time for n in layer.notes],
+                [n.duration for n in layer.notes],
+                [n.midi for n in layer.notes],
+                [n.velocity for n in layer.notes],
+                name=layer.name or f"Layer {i + 1}",
+                channel=channel,
+                program=layer.program,
+                bpm=save_data.bpm
+            ))
+        
+        header = midi_header(len(tracks))
+        return StreamingResponse(
+            iter([header, *tracks]),
+            media_type="audio/midi",
+            headers={
+                "Content-Disposition": "attachment; filename=multi-layer.mid",
+                "Content-Length": str(len(header) + sum(len(track) for track in tracks))
+            }
+        )
+    except Exception as e:
+        print(f"Error saving multi-layer MIDI: {str(e)}")
+        return {"error": str(e)}
+
 @app.get("/settings")
-def get_settings():
+def get_settings(response: Response):
     try:
-        if SETTINGS_FILE.exists():
-            with open(SETTINGS_FILE, 'r') as f:
-                return json.load(f)
-        else:
-            # Return default settings
-            return Settings().dict()
+        settings, version = shared_state.get_versioned("settings")
+        # Send back as expected_version to save only if nobody else saved in between
+        response.headers["X-Settings-Version"] = str(version)
+        # Default settings until the first save
+        return settings if settings is not None else Settings().dict()
     except Exception as e:
         print(f"Error loading settings: {str(e)}")
         return Settings().dict()
 
 @app.post("/settings")
-def save_settings(settings: Settings):
+def save_settings(settings: Settings, expected_version: Optional[int] = None):
     try:
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings.dict(), f, indent=2)
-        return {"message": "Settings saved successfully"}
+        version = shared_state.put("settings", settings.dict(), expected_version=expected_version)
+        return {"message": "Settings saved successfully", "version": version}
+    except VersionConflict as e:
+        return {"error": str(e), "version": e.actual}
     except Exception as e:
         print(f"Error saving settings: {str(e)}")
         return {"error": str(e)}
@@ -309,17 +657,18 @@ def save_settings(settings: Settings):
 @app.post("/settings/upload")
 async def upload_settings(file: UploadFile = File(...)):
     try:
-        contents = await file.read()
+        contents = await read_upload(file, SETTINGS_UPLOAD_MAX_BYTES, "json")
         settings_data = json.loads(contents)
         
         # Validate the settings
         settings = Settings(**settings_data)
         
-        # Save to file
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings.dict(), f, indent=2)
+        # Save to the shared store
+        version = await run_in_threadpool(shared_state.put, "settings", settings.dict())
         
-        return {"message": "Settings uploaded successfully", "settings": settings.dict()}
+        return {"message": "Settings uploaded successfully", "settings": settings.dict(), "version": version}
+    except UploadRejected:
+        raise
     except Exception as e:
         print(f"Error uploading settings: {str(e)}")
         return {"error": str(e)}
@@ -327,197 +676,83 @@ async def upload_settings(file: UploadFile = File(...)):
 @app.get("/settings/download")
 def download_settings():
     try:
-        if not SETTINGS_FILE.exists():
-            # Create default settings file
-            default_settings = Settings()
-            with open(SETTINGS_FILE, 'w') as f:
-                json.dump(default_settings.dict(), f, indent=2)
-        
-        return FileResponse(
-            path=SETTINGS_FILE,
+        settings = shared_state.get("settings")
+        if settings is None:
+            settings = Settings().dict()
+        
+        return Response(
+            content=json.dumps(settings, indent=2),
             media_type="application/json",
-            filename="gesture-edit-settings.json"
+            headers={"Content-Disposition": "attachment; filename=gesture-edit-settings.json"}
         )
     except Exception as e:
         print(f"Error downloading settings: {str(e)}")
         return {"error": str(e)}
 
+def counterpoint_solver(request: CounterpointRequest, table) -> BeamCounterpointSolver:
+    """Build a beam-search solver from request parameters, clamped to the server's limits"""
+    if request.beam_width <= 0:
+        raise ValueError(f"Invalid beam width {request.beam_width}. Must be at least 1.")
+    if not request.time_budget_ms > 0:
+        raise ValueError(f"Invalid time budget {request.time_budget_ms} ms. Must be positive.")
+    return BeamCounterpointSolver(
+        table,
+        beam_width=min(request.beam_width, COUNTERPOINT_MAX_BEAM_WIDTH),
+        time_budget=min(request.time_budget_ms, COUNTERPOINT_MAX_TIME_BUDGET_MS) / 1000.0,
+        below=request.voice != "above",
+        max_leap=request.max_leap,
+        max_crossing=request.max_crossing
+    )
+
 @app.post("/generate_counterpoint")
-def generate_counterpoint(request: CounterpointRequest):
+def generate_counterpoint(request: CounterpointRequest, pretty: bool = False):
     try:
-        # Get scale notes for the given key
-        if request.scale_type == "major":
-            s = scale.MajorScale(request.key)
-        elif request.scale_type == "minor":
-            s = scale.MinorScale(request.key)
-        else:
-            # Default to major if unknown scale type
-            s = scale.MajorScale(request.key)
-        
-        scale_pitches = [p.midi for p in s.pitches]
+        # Precomputed tables for the given key and scale (any registered scale)
+        table = SCALE_REGISTRY.get(request.scale_type, request.key)
+        notes = [n.dict() for n in request.notes]
         
-        # Generate interspaced counterpoint using alternating timeline approach
-        # This creates a new timeline where original and counterpoint notes alternate
-        alternating_notes = []
-        
-        for i, original_note in enumerate(request.notes):
-            # Step 1: Recalculate original note timing (double-spaced)
-            new_original_time = i * (original_note.duration * 2)
-            
-            # Add re-timed original note
-            alternating_notes.append({
-                "midi": original_note.midi,
-                "time": new_original_time,
-                "duration": original_note.duration,
-                "velocity": original_note.velocity,
-                "id": f"orig-{i}"
-            })
-            
-            # Step 2: Calculate counterpoint note timing and pitch
-            cp_time = new_original_time + original_note.duration
-            cp_duration = original_note.duration
-            
-            # Determine motion direction for pitch
-            prefer_direction = -1  # Default: start below
-            if i > 0:
-                motion = original_note.midi - request.notes[i-1].midi
-                prefer_direction = -1 if motion > 0 else 1  # Contrary motion
-            
-            # Try intervals in order of preference [3rd, 6th, 5th, octave]
-            intervals = [4, 9, 7, 12]  # Semitones
-            
-            found_valid_note = False
-            for interval in intervals:
-                candidate = original_note.midi + (interval * prefer_direction)
-                
-                # Check if in reasonable range (C3 to C6)
-                if 48 <= candidate <= 84:
-                    # Snap to scale
-                    candidate = snap_to_scale(candidate, scale_pitches)
-                    
-                    alternating_notes.append({
-                        "midi": candidate,
-                        "time": cp_time,
-                        "duration": cp_duration,
-                        "velocity": original_note.velocity * 0.7,
-                        "id": f"cp-{i}"
-                    })
-                    found_valid_note = True
-                    break
-            
-            # Fallback: use a 3rd above if nothing else worked
-            if not found_valid_note:
-                candidate = original_note.midi + 4
-                candidate = snap_to_scale(candidate, scale_pitches)
-                alternating_notes.append({
-                    "midi": candidate,
-                    "time": cp_time,
-                    "duration": cp_duration,
-                    "velocity": original_note.velocity * 0.7,
-                    "id": f"cp-{i}"
-                })
+        if request.solver == "beam":
+            pitches, stats = counterpoint_solver(request, table).solve([n['midi'] for n in notes])
+            return FastJSONResponse({"counterpoint": alternate_with_counterpoint(notes, pitches), "stats": stats},
+                                    pretty=pretty)
         
         # Return ALL notes (both re-timed originals and counterpoint)
-        return {"counterpoint": alternating_notes}
+        return FastJSONResponse({"counterpoint": generate_counterpoint_notes(notes, table)}, pretty=pretty)
         
     except Exception as e:
         print(f"Error generating counterpoint: {str(e)}")
         return {"error": str(e)}
 
-def snap_to_scale(midi_note, scale_pitches):
-    """Snap a MIDI note to the nearest note in the scale."""
-    # Get the note within an octave (0-11)
-    note_class = midi_note % 12
-    octave = midi_note // 12
-    
-    # Find scale degrees within the octave
-    scale_degrees = [p % 12 for p in scale_pitches]
-    scale_degrees = sorted(list(set(scale_degrees)))  # Remove duplicates and sort
-    
-    # Find the closest scale degree
-    closest_degree = min(scale_degrees, key=lambda x: abs(x - note_class))
-    
-    # Reconstruct the MIDI note
-    result = octave * 12 + closest_degree
-    
-    # Handle edge cases where snapping might have moved us too far
-    if abs(result - midi_note) > 6:  # More than a tritone away
-        # Try the next octave
-        if result < midi_note:
-            result += 12
-        else:
-            result -= 12
-    
-    return result
+@app.post("/generate_counterpoint/batch")
+def generate_counterpoint_batch_endpoint(request: CounterpointBatchRequest, pretty: bool = False):
+    """Generate counterpoint for many melodies in one call"""
+    try:
+        table = SCALE_REGISTRY.get(request.scale_type, request.key)
+        melodies = [[n.dict() for n in melody] for melody in request.melodies]
+        solver = counterpoint_solver(request, table) if request.solver == "beam" else None
+        return FastJSONResponse({"counterpoints": generate_counterpoint_batch(melodies, table, solver)},
+                                pretty=pretty)
+    except Exception as e:
+        print(f"Error generating counterpoint batch: {str(e)}")
+        return {"error": str(e)}
 
 @app.post("/load-json-melody")
 async def load_json_melody(file: UploadFile = File(...)):
     try:
-        contents = await file.read()
-        melody_data = json.loads(contents)
-        
-        # Validate JSON structure
-        if "melodies" not in melody_data or not melody_data["melodies"]:
-            return {"error": "Invalid JSON format: missing melodies array"}
+        # Melodies are parsed as the upload is read, stopping at the first active one
+        chunks = iter_upload_chunks(file.file, MELODY_UPLOAD_MAX_BYTES, "json")
         
         # Use the first active melody or first melody if none are active
-        selected_melody = None
-        for melody in melody_data["melodies"]:
-            if melody.get("active", False):
-                selected_melody = melody
-                break
-        
-        if not selected_melody:
-            selected_melody = melody_data["melodies"][0]
-        
-        # Validate melody structure
-        if "pattern" not in selected_melody:
-            return {"error": "Invalid melody format: missing pattern"}
-        
-        pattern = selected_melody["pattern"]
-        velocity_first = selected_melody.get("velocityFirst", 1.0)
-        velocity_last = selected_melody.get("velocityLast", 1.0)
-        
-        # Create a new stream
-        s = stream.Stream()
-        s.append(tempo.TempoIndication(number=120))
-        s.append(meter.TimeSignature('4/4'))
-        
-        # Convert pattern to MIDI notes
-        default_duration = 0.5  # Half second per note
-        
-        for i, midi_note in enumerate(pattern):
-            # Calculate velocity interpolation
-            if len(pattern) > 1:
-                velocity_ratio = i / (len(pattern) - 1)
-                velocity = velocity_first + (velocity_last - velocity_first) * velocity_ratio
-            else:
-                velocity = velocity_first
-            
-            # Normalize velocity to 0-1 range, then to MIDI range
-            velocity = max(0.1, min(1.0, velocity))  # Clamp between 0.1 and 1.0
-            
-            # Create note
-            n = note.Note(midi=midi_note)
-            n.duration = duration.Duration(quarterLength=default_duration * 2)  # Assuming 120 BPM
-            n.offset = i * default_duration * 2  # Sequential timing
-            n.volume.velocity = int(velocity * 127)
-            s.insert(n.offset, n)
-        
-        # Convert to MIDI bytes
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix='.mid', delete=False) as tmp_file:
-            s.write('midi', fp=tmp_file.name)
-            tmp_file.flush()
-            with open(tmp_file.name, 'rb') as f:
-                midi_bytes = f.read()
-            os.unlink(tmp_file.name)
+        loop = await run_in_threadpool(pick_melody, iter_melody_file(chunks))
+        midi_bytes = await run_in_threadpool(loop.to_midi)
         
         return Response(
             content=midi_bytes,
             media_type="audio/midi",
             headers={"Content-Disposition": "attachment; filename=json-melody.mid"}
         )
+    except UploadRejected:
+        raise
     except json.JSONDecodeError:
         return {"error": "Invalid JSON file"}
     except Exception as e:
@@ -525,80 +760,26 @@ async def load_json_melody(file: UploadFile = File(...)):
         return {"error": str(e)}
 
 @app.post("/load-multi-layer-melody")
-async def load_multi_layer_melody(file: UploadFile = File(...)):
+async def load_multi_layer_melody(file: UploadFile = File(...), pretty: bool = False):
+    """
+    Load every active layerN melody (any N) from a melody JSON file, with
+    loopCount repeats, as base64 MIDI keyed layer0, layer1, ...
+    """
     try:
-        contents = await file.read()
-        melody_data = json.loads(contents)
-        
-        # Validate JSON structure
-        if "melodies" not in melody_data or not melody_data["melodies"]:
-            return {"error": "Invalid JSON format: missing melodies array"}
+        # Melodies are parsed one at a time as the upload is read
+        chunks = iter_upload_chunks(file.file, MELODY_UPLOAD_MAX_BYTES, "json")
+        layer_loops = await run_in_threadpool(load_layer_loops_from, iter_melody_file(chunks))
         
-        # Process each layer
-        layer_midis = {}
-        
-        for melody in melody_data["melodies"]:
-            if not melody.get("active", False):
-                continue
-                
-            layer_key = melody.get("key", "")
-            if layer_key not in ["layer1", "layer2", "layer3"]:
-                continue
-                
-            pattern = melody.get("pattern", [])
-            if not pattern:
-                continue
-                
-            velocity_first = melody.get("velocityFirst", 1.0)
-            velocity_last = melody.get("velocityLast", 1.0)
-            
-            # Create a new stream for this layer
-            s = stream.Stream()
-            s.append(tempo.TempoIndication(number=120))
-            s.append(meter.TimeSignature('4/4'))
-            
-            # Convert pattern to MIDI notes
-            default_duration = 0.5  # Half second per note
-            
-            for i, midi_note in enumerate(pattern):
-                # Calculate velocity interpolation
-                if len(pattern) > 1:
-                    velocity_ratio = i / (len(pattern) - 1)
-                    velocity = velocity_first + (velocity_last - velocity_first) * velocity_ratio
-                else:
-                    velocity = velocity_first
-                
-                # Normalize velocity to 0-1 range, then to MIDI range
-                velocity = max(0.1, min(1.0, velocity))  # Clamp between 0.1 and 1.0
-                
-                # Create note
-                n = note.Note(midi=midi_note)
-                n.duration = duration.Duration(quarterLength=default_duration * 2)  # Assuming 120 BPM
-                n.offset = i * default_duration * 2  # Sequential timing
-                n.volume.velocity = int(velocity * 127)
-                s.insert(n.offset, n)
-            
-            # Convert to MIDI bytes
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix='.mid', delete=False) as tmp_file:
-                s.write('midi', fp=tmp_file.name)
-                tmp_file.flush()
-                with open(tmp_file.name, 'rb') as f:
-                    midi_bytes = f.read()
-                os.unlink(tmp_file.name)
-            
-            # Map layer key to layer index
-            layer_index = int(layer_key[-1]) - 1  # layer1 -> 0, layer2 -> 1, layer3 -> 2
-            layer_midis[layer_index] = midi_bytes
+        layer_midis = await run_in_threadpool(encode_layer_loops, layer_loops)
         
-        # Return the MIDI files as a multipart response
-        import base64
         response_data = {}
         for layer_index, midi_bytes in layer_midis.items():
             response_data[f"layer{layer_index}"] = base64.b64encode(midi_bytes).decode('utf-8')
         
-        return {"layers": response_data}
+        return FastJSONResponse({"layers": response_data}, pretty=pretty)
         
+    except UploadRejected:
+        raise
     except json.JSONDecodeError:
         return {"error": "Invalid JSON file"}
     except Exception as e:
@@ -681,8 +862,8 @@ def convert_to_decoupled_format(notes: List[Dict], duration_type: str = "absolut
         'timing': timing
     }
 
-def generate_supercollider_json(layers_data: Dict, format_type: str = "standard") -> str:
-    """Generate JSON data for SuperCollider from layer data."""
+def generate_supercollider_json(layers_data: Dict, format_type: str = "standard", pretty: bool = False) -> bytes:
+    """Generate JSON data for SuperCollider from layer data (compact unless pretty)."""
     export_data = {
         "metadata": {
             "exportDate": datetime.now().strftime('%Y-%m-%d'),
@@ -704,7 +885,113 @@ def generate_supercollider_json(layers_data: Dict, format_type: str = "standard"
             "timing": layer_data['timing']
         }
     
-    return json.dumps(export_data, indent=2)
+    return dumps_json(export_data, pretty)
+
+def extract_parsed_midi_notes(parsed_midi: Dict) -> List[Dict]:
+    """Extract a flat note list from a frontend parsedMidi object."""
+    notes = []
+    if 'tracks' in parsed_midi:
+        for track in parsed_midi['tracks']:
+            if 'notes' in track:
+                for note in track['notes']:
+                    notes.append({
+                        'midi': note['midi'],
+                        'time': note['time'],
+                        'duration': note['duration'],
+                        'velocity': note.get('velocity', 0.7)
+                    })
+    return notes
+
+def extract_request_layer_notes(layers: Dict[str, Any]) -> Dict[str, List[Dict]]:
+    """Extract notes for each layer of an export request, skipping empty layers."""
+    layer_notes = {}
+    for layer_id, layer_data in layers.items():
+        if not layer_data.get('parsedMidi'):
+            continue
+        notes = extract_parsed_midi_notes(layer_data['parsedMidi'])
+        if notes:
+            layer_notes[str(layer_id)] = notes
+    return layer_notes
+
+def read_current_settings() -> Dict:
+    """Read the saved settings, or an empty dict if none were saved yet."""
+    return shared_state.get("settings", {})
+
+# Layer name mapping (frontend to SuperCollider)
+OSC_LAYER_MAPPING = {
+    "0": "layer1",
+    "1": "layer2",
+    "2": "layer3"
+}
+
+def sc_layer_name(layer_id: str) -> str:
+    """Get the SuperCollider layer name for a frontend layer ID."""
+    return OSC_LAYER_MAPPING.get(str(layer_id), f"layer{int(layer_id)+1}")
+
+def build_osc_layer_message(notes: List[Dict], duration_type: str,
+                            root_note: str, scale_type: str) -> Dict:
+    """Build the liveMelody OSC payload for one layer's notes."""
+    # Sort notes by time
+    notes = sorted(notes, key=lambda n: n['time'])
+    
+    # Convert to SuperCollider format
+    sc_notes = []
+    for note in notes:
+        sc_notes.append({
+            'midi': note['midi'],
+            'vel': note['velocity'] / 127.0 if note['velocity'] > 1 else note['velocity'],  # Convert to 0-1 range
+            'dur': note['duration']
+        })
+    
+    # Calculate timing array
+    timing = []
+    if notes:
+        # Initial delay (time before first note)
+        timing.append(notes[0]['time'] if notes[0]['time'] > 0 else 0.0)
+        
+        # Inter-onset intervals
+        for i in range(1, len(notes)):
+            interval = notes[i]['time'] - notes[i-1]['time']
+            timing.append(interval if interval > 0 else 0.0)
+        
+        # Final wait (arbitrary, use 0.2 of total duration)
+        total_duration = max(n['time'] + n['duration'] for n in notes)
+        timing.append(total_duration * 0.2)
+        
+        # Normalize timing to sum to 1.0
+        timing_sum = sum(timing)
+        if timing_sum > 0:
+            timing = [t / timing_sum for t in timing]
+        else:
+            # Fallback: evenly distribute
+            timing = [1.0 / (len(notes) + 1)] * (len(notes) + 1)
+    
+    return {
+        "notes": sc_notes,
+        "timing": timing,
+        "metadata": {
+            "durationType": duration_type,
+            "totalDuration": max(n['time'] + n['duration'] for n in notes) if notes else 0,
+            "key": root_note,
+            "scale": scale_type
+        }
+    }
+
+def supercollider_export_response(layers_data: Dict, format_type: str, pretty: bool = False) -> Response:
+    """Wrap exported layer data as a downloadable SuperCollider JSON file."""
+    json_content = generate_supercollider_json(layers_data, format_type, pretty)
+    
+    # Return as downloadable JSON file
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"sc_export_{timestamp}.json"
+    
+    return Response(
+        content=json_content,
+        media_type="application/json",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
 
 @app.post("/export-supercollider")
 async def export_supercollider(request: SuperColliderExportRequest):
@@ -713,62 +1000,24 @@ async def export_supercollider(request: SuperColliderExportRequest):
         layers_data = {}
         
         # Get current settings for key and scale
-        settings = {}
-        if SETTINGS_FILE.exists():
-            with open(SETTINGS_FILE, 'r') as f:
-                settings = json.load(f)
-        
+        settings = read_current_settings()
         root_note = settings.get('rootNote', 'C')
         scale_type = settings.get('selectedScale', 'major')
         
         # Process each layer
-        for layer_id, layer_data in request.layers.items():
-            if not layer_data.get('parsedMidi'):
-                continue
-            
-            # Extract notes from parsed MIDI
-            notes = []
-            parsed_midi = layer_data['parsedMidi']
-            
-            if 'tracks' in parsed_midi:
-                for track in parsed_midi['tracks']:
-                    if 'notes' in track:
-                        for note in track['notes']:
-                            notes.append({
-                                'midi': note['midi'],
-                                'time': note['time'],
-                                'duration': note['duration'],
-                                'velocity': note.get('velocity', 0.7)
-                            })
-            
-            if notes:
-                # Convert to decoupled format
-                melody_data = convert_to_decoupled_format(
-                    notes,
-                    duration_type=request.duration_type,
-                    root_note=root_note,
-                    scale_type=scale_type
-                )
-                
-                layers_data[f"layer{layer_id}"] = melody_data
+        for layer_id, notes in extract_request_layer_notes(request.layers).items():
+            # Convert to decoupled format
+            layers_data[f"layer{layer_id}"] = convert_to_decoupled_format(
+                notes,
+                duration_type=request.duration_type,
+                root_note=root_note,
+                scale_type=scale_type
+            )
         
         if not layers_data:
             return {"error": "No valid layer data to export"}
         
-        # Generate JSON for SuperCollider
-        json_content = generate_supercollider_json(layers_data, request.format_type)
-        
-        # Return as downloadable JSON file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"sc_export_{timestamp}.json"
-        
-        return Response(
-            content=json_content,
-            media_type="application/json",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
+        return supercollider_export_response(layers_data, request.format_type, request.pretty)
         
     except Exception as e:
         print(f"Error exporting to SuperCollider: {str(e)}")
@@ -782,100 +1031,24 @@ async def send_to_osc(request: SuperColliderExportRequest):
         osc_client = udp_client.SimpleUDPClient("127.0.0.1", 57120)
         
         # Get current settings for key and scale
-        settings = {}
-        if SETTINGS_FILE.exists():
-            with open(SETTINGS_FILE, 'r') as f:
-                settings = json.load(f)
-        
+        settings = read_current_settings()
         root_note = settings.get('rootNote', 'C')
         scale_type = settings.get('selectedScale', 'major')
         
-        # Layer name mapping (frontend to SuperCollider)
-        layer_mapping = {
-            "0": "layer1",
-            "1": "layer2",
-            "2": "layer3"
-        }
-        
         sent_layers = []
         
         # Process each layer
-        for layer_id, layer_data in request.layers.items():
-            if not layer_data.get('parsedMidi'):
-                continue
-            
+        for layer_id, notes in extract_request_layer_notes(request.layers).items():
             # Get the SuperCollider layer name
-            sc_layer_name = layer_mapping.get(str(layer_id), f"layer{int(layer_id)+1}")
+            name = sc_layer_name(layer_id)
+            osc_data = build_osc_layer_message(notes, request.duration_type, root_note, scale_type)
             
-            # Extract notes from parsed MIDI
-            notes = []
-            parsed_midi = layer_data['parsedMidi']
+            # Send OSC message
+            osc_path = f"/liveMelody/update/{name}"
+            osc_client.send_message(osc_path, json.dumps(osc_data))
+            sent_layers.append(name)
             
-            if 'tracks' in parsed_midi:
-                for track in parsed_midi['tracks']:
-                    if 'notes' in track:
-                        for note in track['notes']:
-                            notes.append({
-                                'midi': note['midi'],
-                                'time': note['time'],
-                                'duration': note['duration'],
-                                'velocity': note.get('velocity', 0.7)
-                            })
-            
-            if notes:
-                # Sort notes by time
-                notes.sort(key=lambda n: n['time'])
-                
-                # Convert to SuperCollider format
-                sc_notes = []
-                for note in notes:
-                    sc_notes.append({
-                        'midi': note['midi'],
-                        'vel': note['velocity'] / 127.0 if note['velocity'] > 1 else note['velocity'],  # Convert to 0-1 range
-                        'dur': note['duration']
-                    })
-                
-                # Calculate timing array
-                timing = []
-                if notes:
-                    # Initial delay (time before first note)
-                    timing.append(notes[0]['time'] if notes[0]['time'] > 0 else 0.0)
-                    
-                    # Inter-onset intervals
-                    for i in range(1, len(notes)):
-                        interval = notes[i]['time'] - notes[i-1]['time']
-                        timing.append(interval if interval > 0 else 0.0)
-                    
-                    # Final wait (arbitrary, use 0.2 of total duration)
-                    total_duration = max(n['time'] + n['duration'] for n in notes)
-                    timing.append(total_duration * 0.2)
-                    
-                    # Normalize timing to sum to 1.0
-                    timing_sum = sum(timing)
-                    if timing_sum > 0:
-                        timing = [t / timing_sum for t in timing]
-                    else:
-                        # Fallback: evenly distribute
-                        timing = [1.0 / (len(notes) + 1)] * (len(notes) + 1)
-                
-                # Create OSC message
-                osc_data = {
-                    "notes": sc_notes,
-                    "timing": timing,
-                    "metadata": {
-                        "durationType": request.duration_type,
-                        "totalDuration": max(n['time'] + n['duration'] for n in notes) if notes else 0,
-                        "key": root_note,
-                        "scale": scale_type
-                    }
-                }
-                
-                # Send OSC message
-                osc_path = f"/liveMelody/update/{sc_layer_name}"
-                osc_client.send_message(osc_path, json.dumps(osc_data))
-                sent_layers.append(sc_layer_name)
-                
-                logging.info(f"Sent OSC message to {osc_path}")
+            logging.info(f"Sent OSC message to {osc_path}")
         
         if not sent_layers:
             return {"error": "No valid layer data to send"}
@@ -892,13 +1065,13 @@ async def send_to_osc(request: SuperColliderExportRequest):
 
 # Transformation endpoints
 @app.post("/transform/analyze")
-def analyze_melody(request: TransformRequest):
+def analyze_melody(request: TransformRequest, pretty: bool = False):
     """Analyze melody structure and patterns"""
     try:
         transformer = MusicTransformer(request.scale_type, request.root_note)
         notes_data = [note.dict() for note in request.notes]
         analysis = transformer.analyze_melody(notes_data)
-        return analysis
+        return FastJSONResponse(analysis, pretty=pretty)
     except Exception as e:
         print(f"Error analyzing melody: {str(e)}")
         return {"error": str(e)}
@@ -937,6 +1110,52 @@ def transform_harmonize(request: TransformRequest):
         print(f"Error harmonizing: {str(e)}")
         return {"error": str(e)}
 
+@app.post("/transform/harmonize-voices")
+def transform_harmonize_voices(request: HarmonizeVoicesRequest, pretty: bool = False):
+    """Create several harmony lines in one pass, as a multi-track MIDI file or notes per voice"""
+    try:
+        transformer = MusicTransformer(request.scale_type, request.root_note)
+        intervals = request.intervals or MusicTransformer.chord_intervals(request.chord or "triad")
+        
+        # Every voice gets its own (non-drum) channel
+        max_voices = len(MELODIC_CHANNELS) - (1 if request.include_melody else 0)
+        if len(intervals) > max_voices:
+            return {"error": f"Too many voices: at most {max_voices}"}
+        
+        if request.format == "json":
+            notes_data = [note.dict() for note in request.notes]
+            voices = transformer.harmonize_voices(notes_data, intervals)
+            return FastJSONResponse({
+                "intervals": intervals,
+                "voices": [{"interval": interval, "notes": voice} for interval, voice in zip(intervals, voices)]
+            }, pretty=pretty)
+        if request.format != "midi":
+            return {"error": f"Unknown format: {request.format}"}
+        
+        # All voices from the same note arrays, without building note dicts
+        times = [note.time for note in request.notes]
+        durations = [note.duration for note in request.notes]
+        pitches = [note.midi for note in request.notes]
+        velocities = [note.velocity for note in request.notes]
+        harmony_velocities = [velocity * 0.85 for velocity in velocities]
+        
+        tracks = [conductor_track(120)]
+        channels = iter(MELODIC_CHANNELS)
+        if request.include_melody:
+            tracks.append(notes_track(times, durations, pitches, velocities, "Melody", next(channels)))
+        for interval, voice in zip(intervals, transformer.harmony_pitches(pitches, intervals)):
+            tracks.append(notes_track(times, durations, voice, harmony_velocities,
+                                      f"Harmony {interval:+d}", next(channels)))
+        
+        return Response(
+            content=midi_file_bytes(tracks),
+            media_type="audio/midi",
+            headers={"Content-Disposition": "attachment; filename=harmony-voices.mid"}
+        )
+    except Exception as e:
+        print(f"Error harmonizing voices: {str(e)}")
+        return {"error": str(e)}
+
 @app.post("/transform/transpose")
 def transform_transpose(request: TransformRequest):
     """Transpose melody by semitones"""
@@ -1049,9 +1268,17 @@ def transform_develop(request: TransformRequest):
         transformer = MusicTransformer(request.scale_type, request.root_note)
         notes_data = [note.dict() for note in request.notes]
         
+        method = request.method or "sequence"
+        if method == "sequence":
+            # Encoded straight from the looped pattern
+            return create_midi_response(transformer.sequence_pattern(notes_data), "developed")
+        
         transformed = transformer.develop(
             notes_data,
-            method=request.method or "sequence"
+            method=method,
+            fragment_count=request.fragment_count or 4,
+            fragment_min_length=request.fragment_min_length or 2,
+            fragment_max_length=request.fragment_max_length or 4
         )
         
         return create_midi_response(transformed, "developed")
@@ -1059,8 +1286,15 @@ def transform_develop(request: TransformRequest):
         print(f"Error developing melody: {str(e)}")
         return {"error": str(e)}
 
-def create_midi_response(notes: List[Dict], transformation_name: str) -> Response:
+def create_midi_response(notes: Union[List[Dict], LoopedPattern], transformation_name: str) -> Response:
     """Helper to create MIDI file from transformed notes"""
+    if isinstance(notes, LoopedPattern):
+        return Response(
+            content=notes.to_midi(),
+            media_type="audio/midi",
+            headers={"Content-Disposition": f"attachment; filename={transformation_name}.mid"}
+        )
+    
     # Create a new stream
     s = stream.Stream()
     s.append(tempo.TempoIndication(number=120))
@@ -1105,160 +1339,64 @@ def generate_simple_rhythm(request: GestureRequest):
         # Calculate rest interval in seconds (percentage of note duration)
         rest_interval = note_duration * (interval_percent / 100.0)
         
-        # Calculate total time per note cycle (note + rest)
-        cycle_duration = note_duration + rest_interval
-        
-        # Create notes array
-        notes = []
-        current_time = 0
-        
-        while current_time < gesture_duration:
-            # Check if note would extend beyond gesture duration
-            if current_time + note_duration > gesture_duration:
-                # Trim the last note duration if needed
-                actual_duration = gesture_duration - current_time
-                if actual_duration > 0:
-                    notes.append({
-                        'midi': midi_note,
-                        'time': current_time,
-                        'duration': actual_duration,
-                        'velocity': 0.7
-                    })
-                break
-            
-            # Add the note
-            notes.append({
-                'midi': midi_note,
-                'time': current_time,
-                'duration': note_duration,
-                'velocity': 0.7
-            })
-            
-            # Move to next note start time (after note + rest)
-            current_time += cycle_duration
-            
-            # Break if the next note would start beyond gesture duration
-            if current_time >= gesture_duration:
-                break
+        # One note per cycle (note + rest), the last one trimmed to the gesture duration
+        notes = rhythm_pattern(midi_note, note_duration, rest_interval, gesture_duration)
         
         return create_midi_response(notes, "simple-rhythm")
     except Exception as e:
         print(f"Error generating simple rhythm: {str(e)}")
         return {"error": str(e)}
 
-def calculate_symmetric_positions(num_notes: int, total_duration: float) -> List[float]:
-    """Calculate symmetric note positions using equal time segments."""
-    if num_notes <= 0 or total_duration <= 0:
-        return []
+def gesture_layer_error(layer_config: MultiLayerGestureLayerConfig) -> Optional[str]:
+    """Why a gesture layer config is invalid, or None"""
+    if not (0 <= layer_config.midiNote <= 127):
+        return f"Invalid MIDI note {layer_config.midiNote} for layer {layer_config.layerId}. Must be 0-127."
     
-    # Divide time into equal segments, place each note at center of its segment
-    segment_duration = total_duration / num_notes
-    positions = []
-    for i in range(num_notes):
-        # Center of segment i: (i + 0.5) * segment_duration
-        center_position = (i + 0.5) * segment_duration
-        positions.append(center_position)
+    if not (1 <= layer_config.durationPercent <= 100):
+        return f"Invalid duration percent {layer_config.durationPercent} for layer {layer_config.layerId}. Must be 1-100."
     
-    return positions
-
-def generate_layer_midi(midi_note: int, center_positions: List[float], duration_percent: float, total_duration: float, num_notes: int) -> bytes:
-    """Generate MIDI bytes for a single layer using symmetric positions with pure mathematical timing."""
-    import mido
-    import tempfile
-    import os
-    
-    # Calculate maximum possible duration (99% of each note's time segment)
-    segment_duration = total_duration / num_notes
-    max_duration = segment_duration * 0.99
-    
-    # Calculate actual note duration from percentage of maximum possible
-    note_duration = max_duration * (duration_percent / 100.0)
-    
-    print(f"  Generating MIDI: center_positions={center_positions}, note_duration={note_duration}")
-    
-    # Create MIDI file with pure mathematical timing
-    mid = mido.MidiFile(ticks_per_beat=1000)  # High resolution for precise timing
-    track = mido.MidiTrack()
-    mid.tracks.append(track)
+    if not (0 < layer_config.totalDuration <= GESTURE_MAX_DURATION):
+        return f"Invalid total duration {layer_config.totalDuration} for layer {layer_config.layerId}. Must be up to {GESTURE_MAX_DURATION:g} seconds."
     
-    # Direct mathematical conversion: 1000 ticks = 1 second (ignoring musical timing)
-    ticks_per_second = 1000
-    
-    # Convert center positions to start times and create note events
-    note_events = []
-    for center_pos in center_positions:
-        # Calculate start time: center - (duration / 2)
-        start_time = center_pos - (note_duration / 2)
-        end_time = start_time + note_duration
-        
-        note_on_time = int(start_time * ticks_per_second)
-        note_off_time = int(end_time * ticks_per_second)
-        note_events.append(('note_on', note_on_time, midi_note))
-        note_events.append(('note_off', note_off_time, midi_note))
-    
-    # Sort all events by time
-    note_events.sort(key=lambda x: x[1])
-    
-    # Convert absolute times to delta times and create MIDI messages
-    current_time = 0
-    for event_type, abs_time, note in note_events:
-        delta_time = abs_time - current_time
-        current_time = abs_time
-        
-        if event_type == 'note_on':
-            msg = mido.Message('note_on', channel=0, note=note, velocity=80, time=delta_time)
-            print(f"  Note ON: {note} at {abs_time} ticks (delta: {delta_time})")
-        else:
-            msg = mido.Message('note_off', channel=0, note=note, velocity=0, time=delta_time)
-            print(f"  Note OFF: {note} at {abs_time} ticks (delta: {delta_time})")
-        
-        track.append(msg)
+    if not (1 <= layer_config.numNotes <= GESTURE_MAX_NOTES):
+        return f"Invalid number of notes {layer_config.numNotes} for layer {layer_config.layerId}. Must be 1-{GESTURE_MAX_NOTES}."
     
-    # Write to temporary file and read bytes
-    with tempfile.NamedTemporaryFile(suffix='.mid', delete=False) as tmp_file:
-        mid.save(tmp_file.name)
-        
-        with open(tmp_file.name, 'rb') as f:
-            midi_bytes = f.read()
-        os.unlink(tmp_file.name)
+    velocity_end = layer_config.velocityEnd  # None means same as velocityStart; 0 is invalid
+    if not (1 <= layer_config.velocityStart <= 127) or (velocity_end is not None and not (1 <= velocity_end <= 127)):
+        return f"Invalid velocity for layer {layer_config.layerId}. Must be 1-127."
     
-    return midi_bytes
+    return None
 
 @app.post("/gesture/multi-layer")
 def generate_multi_layer_gesture(request: MultiLayerGestureRequest):
-    """Generate symmetric gestures for multiple layers simultaneously."""
+    """Generate gestures for multiple layers simultaneously."""
     try:
         result_layers = {}
         
         for layer_config in request.layers:
             # Validate parameters
-            if not (0 <= layer_config.midiNote <= 127):
-                return {"error": f"Invalid MIDI note {layer_config.midiNote} for layer {layer_config.layerId}. Must be 0-127."}
-            
-            if not (1 <= layer_config.durationPercent <= 100):
-                return {"error": f"Invalid duration percent {layer_config.durationPercent} for layer {layer_config.layerId}. Must be 1-100."}
+            error = gesture_layer_error(layer_config)
+            if error:
+                return {"error": error}
             
-            if not (1 <= layer_config.totalDuration <= 10):
-                return {"error": f"Invalid total duration {layer_config.totalDuration} for layer {layer_config.layerId}. Must be 1-10 seconds."}
-            
-            if not (1 <= layer_config.numNotes <= 100):
-                return {"error": f"Invalid number of notes {layer_config.numNotes} for layer {layer_config.layerId}. Must be 1-100."}
-            
-            # Calculate symmetric positions
-            center_positions = calculate_symmetric_positions(layer_config.numNotes, layer_config.totalDuration)
-            print(f"Layer {layer_config.layerId}: center_positions = {center_positions}")
-            
-            # Generate MIDI for this layer
-            midi_bytes = generate_layer_midi(
-                layer_config.midiNote,
-                center_positions,
-                layer_config.durationPercent,
+            gesture = generate_gesture(
+                layer_config.numNotes,
                 layer_config.totalDuration,
-                layer_config.numNotes
+                layer_config.durationPercent,
+                pattern=layer_config.pattern,
+                curve=layer_config.curve,
+                pulses=layer_config.pulses,
+                steps=layer_config.steps,
+                rotation=layer_config.rotation,
+                volatility=layer_config.volatility,
+                seed=layer_config.seed,
+                velocity_envelope_kind=layer_config.velocityEnvelope,
+                velocity_start=layer_config.velocityStart,
+                velocity_end=layer_config.velocityEnd
             )
             
             # Convert to base64 for response
-            import base64
+            midi_bytes = gesture.to_midi(layer_config.midiNote)
             result_layers[str(layer_config.layerId)] = base64.b64encode(midi_bytes).decode('utf-8')
         
         return {
@@ -1270,135 +1408,657 @@ def generate_multi_layer_gesture(request: MultiLayerGestureRequest):
         print(f"Error generating multi-layer gesture: {str(e)}")
         return {"error": str(e)}
 
+@app.post("/gesture/sweep")
+def sweep_gestures(request: GestureSweepRequest):
+    """
+    Render every combination of swept gesture parameters in one call.
+
+    Streams NDJSON, one line per combination ('index', 'params', 'noteCount'
+    and 'midi' as base64) followed by a summary line with 'done': true, or
+    returns a zip of .mid files with an index.json.
+    """
+    try:
+        unknown = [f for f in request.sweep if f not in MultiLayerGestureLayerConfig.__fields__ or f == "layerId"]
+        if unknown:
+            return {"error": f"Unknown sweep fields: {', '.join(unknown)}"}
+        if request.format not in ("ndjson", "zip"):
+            return {"error": f"Unknown format: {request.format}"}
+        
+        fields, values = expand_sweep(request.sweep)
+        count = combination_count(values)
+        if count > GESTURE_SWEEP_MAX_COMBINATIONS:
+            return {"error": f"Too many combinations: {count} (the limit is {GESTURE_SWEEP_MAX_COMBINATIONS})"}
+        
+        # Validate every combination before rendering anything
+        base = request.base.dict()
+        configs = []
+        total_notes = 0
+        for params in iter_combinations(fields, values):
+            config = MultiLayerGestureLayerConfig(**{**base, **params})
+            error = gesture_layer_error(config)
+            if error:
+                return {"error": f"Combination {params}: {error}"}
+            configs.append(config.dict())
+            total_notes += config.numNotes
+        if total_notes > GESTURE_SWEEP_MAX_NOTES:
+            return {"error": f"Too many notes: {total_notes} across all combinations (the limit is {GESTURE_SWEEP_MAX_NOTES})"}
+        
+        if request.format == "zip":
+            buffer = io.BytesIO()
+            index = []
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+                for i, (config, gesture, midi_bytes) in enumerate(render_sweep(iter(configs))):
+                    name = f"gesture-{i:05d}.mid"
+                    archive.writestr(name, midi_bytes)
+                    index.append({"index": i, "file": name, "params": {f: config[f] for f in fields},
+                                  "noteCount": len(gesture)})
+                archive.writestr("index.json", json.dumps({"base": base, "combinations": index}))
+            return Response(
+                content=buffer.getvalue(),
+                media_type="application/zip",
+                headers={"Content-Disposition": "attachment; filename=gesture-sweep.zip"}
+            )
+        
+        def ndjson_lines():
+            for i, (config, gesture, midi_bytes) in enumerate(render_sweep(iter(configs))):
+                yield json.dumps({
+                    "index": i,
+                    "params": {f: config[f] for f in fields},
+                    "noteCount": len(gesture),
+                    "midi": base64.b64encode(midi_bytes).decode("utf-8")
+                }) + "\n"
+            yield json.dumps({"done": True, "count": count}) + "\n"
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    except Exception as e:
+        print(f"Error sweeping gestures: {str(e)}")
+        return {"error": str(e)}
+
 @app.post("/import-midi")
-async def import_midi_file(file: UploadFile = File(...)):
+async def import_midi_file(file: UploadFile = File(...), pretty: bool = False):
     """Import MIDI file and extract up to 3 tracks"""
     try:
         if not file.filename.endswith(('.mid', '.midi')):
             return {"error": "Invalid file type. Please upload a MIDI file."}
         
-        # Import mido
-        import mido
-        import tempfile
-        
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(suffix='.mid', delete=False) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            tmp_path = tmp_file.name
-        
-        try:
-            # Parse MIDI file with mido
-            mid = mido.MidiFile(tmp_path)
-            
-            # Get tempo from first track (if available)
-            tempo_value = 500000  # Default tempo (120 BPM in microseconds per beat)
-            for msg in mid.tracks[0]:
-                if msg.type == 'set_tempo':
-                    tempo_value = msg.tempo
-                    break
-            
-            # Convert tempo to BPM
-            bpm = 60000000 / tempo_value
-            
-            # Process up to 3 tracks that have notes
-            tracks_data = []
-            track_count = 0
-            
-            for track_idx, track in enumerate(mid.tracks):
-                if track_count >= 3:
-                    break
-                
-                # Check if track has any note events
-                has_notes = any(msg.type in ['note_on', 'note_off'] for msg in track)
-                if not has_notes:
-                    continue
-                
-                # Extract notes from track
-                notes = []
-                active_notes = {}  # pitch -> (start_time, velocity)
-                current_time = 0  # in ticks
-                
-                for msg in track:
-                    current_time += msg.time
-                    
-                    if msg.type == 'note_on' and msg.velocity > 0:
-                        # Start of a note
-                        active_notes[msg.note] = (current_time, msg.velocity)
-                    elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                        # End of a note
-                        if msg.note in active_notes:
-                            start_time, velocity = active_notes[msg.note]
-                            duration_ticks = current_time - start_time
-                            
-                            # Convert ticks to seconds
-                            time_seconds = mido.tick2second(start_time, mid.ticks_per_beat, tempo_value)
-                            duration_seconds = mido.tick2second(duration_ticks, mid.ticks_per_beat, tempo_value)
-                            
-                            notes.append({
-                                'midi': msg.note,
-                                'time': time_seconds,
-                                'duration': duration_seconds,
-                                'velocity': velocity / 127.0
-                            })
-                            del active_notes[msg.note]
-                
-                # Sort notes by time
-                notes.sort(key=lambda n: n['time'])
-                
-                # Create MIDI file for this track using music21
-                track_stream = stream.Stream()
-                track_stream.append(tempo.TempoIndication(number=120))
-                track_stream.append(meter.TimeSignature('4/4'))
-                
-                for note_data in notes:
-                    n = note.Note(note_data['midi'])
-                    # Convert seconds to quarter notes at 120 BPM
-                    n.duration = duration.Duration(quarterLength=note_data['duration'] * 2)
-                    n.offset = note_data['time'] * 2
-                    n.volume.velocity = int(note_data['velocity'] * 127)
-                    track_stream.insert(n.offset, n)
-                
-                # Convert to MIDI bytes
-                with tempfile.NamedTemporaryFile(suffix='.mid', delete=False) as tmp_file2:
-                    track_stream.write('midi', fp=tmp_file2.name)
-                    tmp_file2.flush()
-                    with open(tmp_file2.name, 'rb') as f:
-                        midi_bytes = f.read()
-                    os.unlink(tmp_file2.name)
-                
-                # Encode as base64 for transport
-                midi_base64 = base64.b64encode(midi_bytes).decode('utf-8')
-                tracks_data.append({
-                    'trackIndex': track_count,
-                    'midiData': midi_base64,
-                    'noteCount': len(notes),
-                    'originalTrackIndex': track_idx,
-                    'trackName': track.name if hasattr(track, 'name') else f'Track {track_idx}'
-                })
-                track_count += 1
-            
-            # Clean up temp file
-            os.unlink(tmp_path)
-            
-            return {
-                'success': True,
-                'tracks': tracks_data,
-                'totalTracksFound': len(mid.tracks),
-                'tracksImported': len(tracks_data),
-                'detectedTempo': round(bpm),
-                'midiType': mid.type
-            }
-            
-        except Exception as e:
-            # Clean up temp file on error
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-            raise e
+        # Parse MIDI file with mido, or reuse the cached note store for this content.
+        # Parsing and re-encoding run in the threadpool, off the event loop, so the
+        # import admission limit bounds them and other requests keep being served
+        content = await read_upload(file, MIDI_UPLOAD_MAX_BYTES, "midi")
+        result = await run_in_threadpool(import_midi_content, content, note_store_cache)
+        return FastJSONResponse(result, pretty=pretty)
         
+    except UploadRejected:
+        raise
     except Exception as e:
         print(f"Error importing MIDI file: {str(e)}")
         import traceback
         traceback.print_exc()
-        return {"error": f"Failed to import MIDI file: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Failed to import MIDI file: {str(e)}"}
+
+@app.post("/import-midi/bulk")
+async def import_midi_bulk(file: UploadFile = File(...)):
+    """
+    Import every MIDI file in a zip or tar archive.
+
+    Files are parsed concurrently and streamed back as NDJSON, one line per file
+    (the /import-midi response plus 'file', 'index' and 'parseMs') in the order
+    they finish, followed by a summary line with 'done': true.
+    """
+    try:
+        if not is_bulk_archive(file.filename):
+            return {"error": "Invalid file type. Please upload a .zip or .tar(.gz) archive of MIDI files."}
+
+        # The upload is closed once this handler returns, before the stream is sent
+        content = await read_upload(file, BULK_IMPORT_MAX_UPLOAD_BYTES)
+        members = iter_archive_members(io.BytesIO(content), file.filename,
+                                       BULK_IMPORT_MAX_FILES, BULK_IMPORT_MAX_BYTES)
+
+        async def ndjson_lines():
+            try:
+                async for result in bulk_import_results(members, get_bulk_import_pool(), str(NOTE_STORE_DIR)):
+                    yield json.dumps(result) + "\n"
+            finally:
+                # Pool workers write to the cache without evicting: apply the caps once done
+                await run_in_threadpool(note_store_cache.evict)
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    except UploadRejected:
+        raise
+    except Exception as e:
+        print(f"Error importing MIDI archive: {str(e)}")
+        return {"error": f"Failed to import MIDI archive: {str(e)}"}
+
+# Layer session endpoints
+def apply_layer_edit(buffer, edit: LayerEdit) -> Dict:
+    """Apply one edit operation to a session layer buffer"""
+    if edit.op == "insert":
+        return {"op": edit.op, "ids": buffer.insert(n.dict() for n in edit.notes or [])}
+    if edit.op == "delete":
+        return {"op": edit.op, "count": buffer.delete(edit.ids or [])}
+    if edit.op == "move":
+        return {"op": edit.op, "count": buffer.move(edit.ids or [], dt=edit.dt, dmidi=edit.dmidi)}
+    if edit.op == "transform-range":
+        if not edit.transform:
+            raise ValueError("transform-range requires a transform name")
+        transformer = MusicTransformer(edit.scale_type, edit.root_note)
+        ids = buffer.transform_range(
+            edit.start if edit.start is not None else float('-inf'),
+            edit.end if edit.end is not None else float('inf'),
+            lambda notes: transformer.apply(edit.transform, notes, edit.params)
+        )
+        return {"op": edit.op, "ids": ids}
+    raise ValueError(f"Unknown edit operation: {edit.op}")
+
+@app.post("/sessions")
+def create_session(request: SessionCreateRequest):
+    """Create a layer session, optionally seeded with the client's current layers"""
+    try:
+        session = session_store.create(extract_request_layer_notes(request.layers))
+        return session.summary()
+    except Exception as e:
+        print(f"Error creating session: {str(e)}")
+        return {"error": str(e)}
+
+@app.get("/sessions/{session_id}")
+def get_session(session_id: str):
+    try:
+        session = session_store.get(session_id)
+        with session.lock:
+            return session.summary()
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    if not session_store.delete(session_id):
+        return {"error": f"Unknown or expired session: {session_id}"}
+    return {"success": True}
+
+@app.get("/sessions/{session_id}/layers/{layer_id}")
+def get_session_layer(session_id: str, layer_id: str):
+    """Return a layer's current notes (with their IDs) and version"""
+    try:
+        session = session_store.get(session_id)
+        with session.lock:
+            buffer = session.layer(layer_id)
+            return {"version": buffer.version, "notes": buffer.sorted_notes()}
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+    except KeyError as e:
+        return {"error": str(e)}
+
+@app.post("/sessions/{session_id}/layers/{layer_id}/edits")
+def edit_session_layer(session_id: str, layer_id: str, request: LayerEditRequest):
+    """Apply a batch of edit operations to a session layer"""
+    try:
+        session = session_store.get(session_id)
+        with session.lock:
+            buffer = session.layer(layer_id, create=True)
+            # The whole batch is one version; if any edit fails none of them are applied
+            # and the error carries the (unchanged) version, so the client stays in sync
+            try:
+                with buffer.batch(request.edits[0].op if len(request.edits) == 1 else 'batch'):
+                    results = [apply_layer_edit(buffer, edit) for edit in request.edits]
+            except Exception as e:
+                print(f"Error editing session layer: {str(e)}")
+                return {"error": str(e), "version": buffer.version, "applied": False}
+            return {
+                "version": buffer.version,
+                "noteCount": len(buffer.notes),
+                "results": results
+            }
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+    except Exception as e:
+        print(f"Error editing session layer: {str(e)}")
+        return {"error": str(e)}
+
+@app.get("/sessions/{session_id}/layers/{layer_id}/versions")
+def list_session_layer_versions(session_id: str, layer_id: str):
+    """List a layer's retained versions, oldest first"""
+    try:
+        session = session_store.get(session_id)
+        with session.lock:
+            buffer = session.layer(layer_id)
+            return {
+                "version": buffer.version,
+                "versions": [entry.summary() for entry in buffer.history.values()]
+            }
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+    except KeyError as e:
+        return {"error": str(e)}
+
+@app.get("/sessions/{session_id}/layers/{layer_id}/versions/{version}")
+def get_session_layer_version(session_id: str, layer_id: str, version: int):
+    """Return a layer's notes (with their IDs) as they were at a version"""
+    try:
+        session = session_store.get(session_id)
+        with session.lock:
+            entry = session.layer(layer_id).get_version(version)
+        notes = sorted(
+            ({**n, 'id': note_id} for note_id, n in enumerate(entry.notes) if n is not None),
+            key=lambda n: n['time']
+        )
+        return {**entry.summary(), "notes": notes}
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+    except KeyError as e:
+        return {"error": str(e)}
+
+@app.get("/sessions/{session_id}/layers/{layer_id}/versions/{version}/diff")
+def diff_session_layer_version(session_id: str, layer_id: str, version: int, base: Optional[int] = None):
+    """Notes added, removed and changed between `base` (default: the previous version) and `version`"""
+    try:
+        session = session_store.get(session_id)
+        with session.lock:
+            buffer = session.layer(layer_id)
+            if base is None:
+                base = version - 1
+            changes = buffer.diff(base, version)
+        return {"base": base, "version": version, **changes}
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+    except KeyError as e:
+        return {"error": str(e)}
+
+@app.post("/sessions/{session_id}/layers/{layer_id}/versions/{version}/restore")
+def restore_session_layer_version(session_id: str, layer_id: str, version: int):
+    """Make an earlier version of a layer current again (recorded as a new version)"""
+    try:
+        session = session_store.get(session_id)
+        with session.lock:
+            buffer = session.layer(layer_id)
+            entry = buffer.restore(version)
+            return {"version": buffer.version, "restoredFrom": version, "noteCount": entry.note_count}
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+    except KeyError as e:
+        return {"error": str(e)}
+
+def session_layer_notes(session, layer_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Map layer ID -> buffer for the requested (non-empty) session layers"""
+    selected = layer_ids if layer_ids is not None else list(session.layers.keys())
+    return {
+        str(layer_id): session.layers[str(layer_id)]
+        for layer_id in selected
+        if str(layer_id) in session.layers and session.layers[str(layer_id)].notes
+    }
+
+@app.post("/sessions/{session_id}/export-supercollider")
+def export_session_supercollider(session_id: str, request: SessionExportRequest):
+    """Export the stored session layers to SuperCollider format"""
+    try:
+        session = session_store.get(session_id)
+        settings = read_current_settings()
+        root_note = settings.get('rootNote', 'C')
+        scale_type = settings.get('selectedScale', 'major')
+        
+        layers_data = {}
+        with session.lock:
+            for layer_id, buffer in session_layer_notes(session, request.layer_ids).items():
+                # Cached per layer version, so unchanged layers are not reconverted
+                layers_data[f"layer{layer_id}"] = buffer.cached(
+                    ('decoupled', request.duration_type, root_note, scale_type),
+                    lambda: convert_to_decoupled_format(
+                        buffer.sorted_notes(),
+                        duration_type=request.duration_type,
+                        root_note=root_note,
+                        scale_type=scale_type
+                    )
+                )
+        
+        if not layers_data:
+            return {"error": "No valid layer data to export"}
+        
+        return supercollider_export_response(layers_data, request.format_type, request.pretty)
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+    except Exception as e:
+        print(f"Error exporting session to SuperCollider: {str(e)}")
+        return {"error": str(e)}
+
+@app.post("/sessions/{session_id}/send-to-osc")
+def send_session_to_osc(session_id: str, request: SessionExportRequest):
+    """Send the stored session layers to SuperCollider via OSC"""
+    try:
+        session = session_store.get(session_id)
+        settings = read_current_settings()
+        root_note = settings.get('rootNote', 'C')
+        scale_type = settings.get('selectedScale', 'major')
+        
+        osc_client = udp_client.SimpleUDPClient("127.0.0.1", 57120)
+        sent_layers = []
+        with session.lock:
+            for layer_id, buffer in session_layer_notes(session, request.layer_ids).items():
+                payload = buffer.cached(
+                    ('osc', request.duration_type, root_note, scale_type),
+                    lambda: json.dumps(build_osc_layer_message(
+                        buffer.sorted_notes(), request.duration_type, root_note, scale_type
+                    ))
+                )
+                name = sc_layer_name(layer_id)
+                osc_path = f"/liveMelody/update/{name}"
+                osc_client.send_message(osc_path, payload)
+                sent_layers.append(name)
+                logging.info(f"Sent OSC message to {osc_path}")
+        
+        if not sent_layers:
+            return {"error": "No valid layer data to send"}
+        
+        return {
+            "success": True,
+            "message": f"Successfully sent {len(sent_layers)} layers to SuperCollider",
+            "layers": sent_layers
+        }
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+    except Exception as e:
+        logging.error(f"Error sending session to OSC: {str(e)}")
+        return {"error": str(e)}
+
+@app.post("/sessions/{session_id}/layers/{layer_id}/transform/{transform_name}")
+def transform_session_layer(session_id: str, layer_id: str, transform_name: str,
+                            request: SessionTransformRequest):
+    """Run a transformation on a stored layer (optionally a time range) and return MIDI"""
+    try:
+        session = session_store.get(session_id)
+        with session.lock:
+            notes = session.layer(layer_id).sorted_notes()
+        
+        if request.start is not None or request.end is not None:
+            start = request.start if request.start is not None else float('-inf')
+            end = request.end if request.end is not None else float('inf')
+            notes = [n for n in notes if start <= n['time'] < end]
+        
+        transformer = MusicTransformer(request.scale_type, request.root_note)
+        transformed = transformer.apply(transform_name, [dict(n) for n in notes], request.dict())
+        
+        return create_midi_response(transformed, transform_name)
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {session_id}"}
+    except Exception as e:
+        print(f"Error transforming session layer: {str(e)}")
+        return {"error": str(e)}
+
+# Melody corpus endpoints
+@app.get("/corpus")
+def get_corpus_stats():
+    return melody_corpus.stats()
+
+@app.post("/corpus/ingest")
+def ingest_corpus(request: CorpusIngestRequest):
+    """Ingest MIDI and melody JSON files from a local directory into the corpus"""
+    try:
+        directory = confined_path(CORPUS_DIR, request.directory, allow_root=True) if request.directory else CORPUS_DIR
+        if not directory.is_dir():
+            return {"error": f"Not a directory: {directory}"}
+        return melody_corpus.ingest_directory(directory, recursive=request.recursive, cache=note_store_cache)
+    except Exception as e:
+        print(f"Error ingesting corpus: {str(e)}")
+        return {"error": str(e)}
+
+@app.post("/corpus/save")
+def save_corpus(request: CorpusStoreRequest):
+    """Save the corpus to a single note store file for fast reloads"""
+    try:
+        path = corpus_store_path(request.path)
+        melody_corpus.save(path)
+        return {"success": True, "path": str(path), **melody_corpus.stats()}
+    except Exception as e:
+        print(f"Error saving corpus: {str(e)}")
+        return {"error": str(e)}
+
+@app.post("/corpus/load")
+def load_corpus(request: CorpusStoreRequest):
+    """Replace the corpus with one loaded from a note store file"""
+    global melody_corpus
+    try:
+        path = corpus_store_path(request.path)
+        if not path.exists():
+            return {"error": f"No corpus store at {path}"}
+        melody_corpus = MelodyCorpus.load(path)
+        return {"success": True, "path": str(path), **melody_corpus.stats()}
+    except Exception as e:
+        print(f"Error loading corpus: {str(e)}")
+        return {"error": str(e)}
+
+@app.post("/corpus/query")
+def query_corpus(request: CorpusQueryRequest):
+    """Find corpus melodies similar to the given notes or pitch pattern"""
+    try:
+        if request.notes:
+            pitches = [n.midi for n in sorted(request.notes, key=lambda n: n.time)]
+        else:
+            pitches = request.pattern or []
+        return {"results": melody_corpus.query(pitches, top_k=request.top_k)}
+    except Exception as e:
+        print(f"Error querying corpus: {str(e)}")
+        return {"error": str(e)}
+
+# OSC scheduler endpoints
+@app.post("/scheduler/start")
+async def start_scheduler(request: SchedulerStartRequest):
+    """
+    Play layers as OSC note-on/off events from the backend.
+
+    If the scheduler is already running with the same destination and mode,
+    the new layers take over at the next loop boundary.
+    """
+    global osc_scheduler
+    try:
+        if request.session_id:
+            session = session_store.get(request.session_id)
+            with session.lock:
+                layer_notes = {
+                    layer_id: buffer.sorted_notes()
+                    for layer_id, buffer in session_layer_notes(session, request.layer_ids).items()
+                }
+        else:
+            layer_notes = extract_request_layer_notes(request.layers)
+        
+        if not layer_notes:
+            return {"error": "No valid layer data to play"}
+        layers = {sc_layer_name(layer_id): notes for layer_id, notes in layer_notes.items()}
+        
+        lookahead = request.lookahead_ms / 1000.0
+        if (osc_scheduler is not None and osc_scheduler.running
+                and (osc_scheduler.host, osc_scheduler.port, osc_scheduler.bundles, osc_scheduler.lookahead, osc_scheduler.loop)
+                == (request.host, request.port, request.bundles, lookahead, request.loop)):
+            osc_scheduler.update(layers)
+            return {"success": True, "updated": True, **osc_scheduler.status()}
+        
+        if osc_scheduler is not None:
+            await osc_scheduler.stop()
+        osc_scheduler = OscNoteScheduler(request.host, request.port, lookahead=lookahead,
+                                         bundles=request.bundles, loop=request.loop)
+        osc_scheduler.start(layers)
+        return {"success": True, "updated": False, **osc_scheduler.status()}
+    except SessionNotFound:
+        return {"error": f"Unknown or expired session: {request.session_id}"}
+    except Exception as e:
+        print(f"Error starting OSC scheduler: {str(e)}")
+        return {"error": str(e)}
+
+@app.post("/scheduler/stop")
+async def stop_scheduler():
+    """Stop the scheduler, sending note-offs for any sounding notes"""
+    if osc_scheduler is None:
+        return {"success": True, "running": False}
+    await osc_scheduler.stop()
+    return {"success": True, **osc_scheduler.status()}
+
+@app.get("/scheduler/stats")
+def get_scheduler_stats():
+    """Scheduler state plus send-time error percentiles and late-event counts"""
+    if osc_scheduler is None:
+        return {"running": False}
+    return osc_scheduler.status()
+
+# Melody file watcher endpoints
+def create_melody_watcher(request: WatcherStartRequest) -> MelodyFileWatcher:
+    """Watcher that sends changed layers to /liveMelody/update/<layer>"""
+    osc_client = udp_client.SimpleUDPClient(request.host, request.port)
+
+    def send_layers(path: Path, changed: Dict[int, LoopedPattern]):
+        # Key and scale are only metadata here: read them per push so
+        # settings changes are picked up
+        settings = read_current_settings()
+        root_note = settings.get('rootNote', 'C')
+        scale_type = settings.get('selectedScale', 'major')
+        for layer_index, loop in changed.items():
+            osc_data = build_osc_layer_message(loop.unroll(), request.duration_type, root_note, scale_type)
+            osc_path = f"/liveMelody/update/layer{layer_index + 1}"
+            osc_client.send_message(osc_path, json.dumps(osc_data))
+            logging.info(f"Sent OSC message to {osc_path} ({path.name} changed)")
+
+    return MelodyFileWatcher(
+        [Path(p.strip()) for p in request.paths],
+        send_layers,
+        poll_interval=max(0.001, request.poll_ms / 1000.0),
+        debounce=max(0.0, request.debounce_ms / 1000.0)
+    )
+
+@app.post("/watcher/start")
+async def start_watcher(request: WatcherStartRequest):
+    """
+    Watch melody JSON files and push edited layers to SuperCollider via OSC.
+
+    Replaces any running watcher. Only layers whose entry changed are re-parsed
+    and sent; rapid saves are debounced into one push.
+    """
+    global melody_watcher
+    try:
+        if not request.paths:
+            return {"error": "No files to watch"}
+        paths = [confined_path(MELODY_WATCH_DIR, p) for p in request.paths]
+        missing = [p for p, path in zip(request.paths, paths) if not path.is_file()]
+        if missing:
+            return {"error": f"File not found: {', '.join(missing)}"}
+        request.paths = [str(path) for path in paths]
+
+        if melody_watcher is not None:
+            await melody_watcher.stop()
+        melody_watcher = create_melody_watcher(request)
+        melody_watcher.start(push_initial=request.push_initial)
+        return {"success": True, **melody_watcher.status()}
+    except Exception as e:
+        print(f"Error starting melody watcher: {str(e)}")
+        return {"error": str(e)}
+
+@app.post("/watcher/stop")
+async def stop_watcher():
+    if melody_watcher is None:
+        return {"success": True, "running": False}
+    await melody_watcher.stop()
+    return {"success": True, **melody_watcher.status()}
+
+@app.get("/watcher/status")
+def get_watcher_status():
+    """Watched files, the last push and edit-to-send latency percentiles"""
+    if melody_watcher is None:
+        return {"running": False}
+    return melody_watcher.status()
+
+@app.get("/admission/stats")
+def get_admission_stats():
+    """Per route class: limit, running, queue depth, admitted/queued/rejected counts and wait times"""
+    return {"enabled": ADMISSION_CONTROL, "classes": admission_stats(admission_classes, ADMISSION_ROUTES)}
+
+# Profiling endpoints
+@app.get("/debug/profiles")
+def list_profiles():
+    """Saved request profiles, newest first"""
+    try:
+        return {"enabled": PROFILING_ENABLED, "directory": str(PROFILE_DIR), "profiles": profile_store.list()}
+    except Exception as e:
+        print(f"Error listing profiles: {str(e)}")
+        return {"error": str(e)}
+
+@app.get("/debug/profiles/{name}")
+def download_profile(name: str):
+    """Download a saved profile (.prof for pstats/snakeviz, .folded for flamegraphs)"""
+    profile_file = profile_store.file(name)
+    if profile_file is None:
+        return {"error": f"Unknown profile: {name}"}
+    return FileResponse(profile_file, media_type="application/octet-stream", filename=profile_file.name)
+
+# Startup warmup and health checks. The warmup calls each encoder and
+# transformer once with a small melody (in a background thread, so /healthz
+# answers right away) and /readyz returns 503 until it has finished, so a proxy
+# can hold traffic until the worker is warm. WARMUP_ON_STARTUP=0 skips it.
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+WARMUP_NOTES = [{"midi": midi, "time": i * 0.5, "duration": 0.5, "velocity": 0.7}
+                for i, midi in enumerate([60, 62, 64, 65, 67, 65, 64, 62, 60])]
+
+def first_error(responses):
+    """The first endpoint-style {"error": ...} result, if any (failed steps show in /readyz)"""
+    return next((r for r in responses if isinstance(r, dict) and "error" in r), None)
+
+def warm_scales():
+    # Every registered scale's tables, the NumPy scale-step kernels and music21's scale classes
+    pitches = np.arange(128)
+    for name in SCALE_REGISTRY.names():
+        for root in range(12):
+            SCALE_REGISTRY.get(name, root).transpose_steps(pitches, np.array([[2], [-2]]))
+    create_custom_scale("C", 4, "phrygian dominant")
+
+def warm_midi_writers():
+    error = first_error([generate_midi(GenerateParams()),
+                         save_midi(SaveMidiData(notes=WARMUP_NOTES)),
+                         save_midi_multi_layer(SaveMultiLayerMidiData(layers=[SaveMidiLayer(notes=WARMUP_NOTES)]))])
+    # Reading MIDI back: mido parsing and the music21 per-track re-encode (not cached)
+    import_midi_content(midi_file_bytes([notes_track(
+        np.array([n["time"] for n in WARMUP_NOTES]), np.array([n["duration"] for n in WARMUP_NOTES]),
+        np.array([n["midi"] for n in WARMUP_NOTES]), np.array([n["velocity"] for n in WARMUP_NOTES])
+    )]))
+    return error
+
+def warm_transformer():
+    request = TransformRequest(notes=WARMUP_NOTES, scale_type="major", root_note="C")
+    return first_error([transform(request) for transform in (
+        analyze_melody, transform_counter_melody, transform_harmonize, transform_transpose_diatonic,
+        transform_invert, transform_ornament, transform_develop
+    )] + [transform_harmonize_voices(HarmonizeVoicesRequest(notes=WARMUP_NOTES, scale_type="major",
+                                                            root_note="C", chord="satb"))])
+
+def warm_counterpoint():
+    # Both solvers, which also primes counterpoint's lookup caches
+    return first_error([generate_counterpoint(CounterpointRequest(notes=WARMUP_NOTES, key="C", scale_type="major",
+                                                                  solver=solver, time_budget_ms=50))
+                        for solver in ("greedy", "beam")])
+
+def warm_gestures():
+    layers = [MultiLayerGestureLayerConfig(layerId=i, midiNote=60 + i, durationPercent=50, totalDuration=4,
+                                           numNotes=16, pattern=pattern, seed=1, velocityEnvelope="swell",
+                                           velocityEnd=110)
+              for i, pattern in enumerate(("even", "accelerando", "euclidean", "random-walk"))]
+    return generate_multi_layer_gesture(MultiLayerGestureRequest(layers=layers, scale_type="major", root_note="C"))
+
+warmup = Warmup([
+    ("scales", warm_scales),
+    ("midiWriters", warm_midi_writers),
+    ("transformer", warm_transformer),
+    ("counterpoint", warm_counterpoint),
+    ("gestures", warm_gestures)
+])
+
+@app.on_event("startup")
+def start_warmup():
+    if WARMUP_ON_STARTUP:
+        warmup.start()
+    else:
+        warmup.skip()
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving (warm or not)"""
+    return {"status": "ok", "ready": warmup.ready, "warmupMs": warmup.status()["durationMs"]}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once the startup warmup has finished, 503 before"""
+    status = warmup.status()
+    return FastJSONResponse(status, status_code=200 if warmup.ready else 503)
@@ -0,0 +1,217 @@
+import heapq
+from typing import Dict, Iterable, List, Sequence
+from scale_utils import ScaleTable
+
+# Marks an interval whose occurrences are preceded by different intervals
+_MIXED = object()
+
+
+def suffix_array(values: Sequence[int]) -> List[int]:
+    """
+    Suffix array of an integer sequence by prefix doubling.
+
+    Each round sorts by (rank, rank at +k) and stops as soon as all ranks are
+    distinct, which for melodies usually takes a handful of rounds.
+    """
+    n = len(values)
+    if n == 0:
+        return []
+
+    # Initial ranks: dense ranks of the values themselves
+    order = {v: r for r, v in enumerate(sorted(set(values)))}
+    rank = [order[v] for v in values]
+    sa = list(range(n))
+    k = 1
+
+    while True:
+        key = [rank[i] * (n + 1) + (rank[i + k] + 1 if i + k < n else 0) for i in range(n)]
+        sa.sort(key=key.__getitem__)
+
+        new_rank = [0] * n
+        r = 0
+        for j in range(1, n):
+            if key[sa[j]] != key[sa[j - 1]]:
+                r += 1
+            new_rank[sa[j]] = r
+        rank = new_rank
+
+        if r == n - 1 or k >= n:
+            return sa
+        k *= 2
+
+
+def lcp_array(values: Sequence[int], sa: Sequence[int]) -> List[int]:
+    """Kasai's algorithm: lcp[i] is the common prefix of suffixes sa[i-1] and sa[i]"""
+    n = len(values)
+    rank = [0] * n
+    for i, suffix in enumerate(sa):
+        rank[suffix] = i
+
+    lcp = [0] * n
+    h = 0
+    for i in range(n):
+        if rank[i] > 0:
+            j = sa[rank[i] - 1]
+            while i + h < n and j + h < n and values[i + h] == values[j + h]:
+                h += 1
+            lcp[rank[i]] = h
+            if h > 0:
+                h -= 1
+        else:
+            h = 0
+    return lcp
+
+
+def find_repeated_motifs(intervals: Sequence[int], min_length: int = 3,
+                         max_motifs: int = 20) -> List[Dict]:
+    """
+    Find maximal repeated interval patterns (transposition-invariant motifs).
+
+    Walks the LCP intervals of the suffix array, i.e. the internal nodes of the
+    suffix tree, keeping only left- and right-maximal repeats. The best
+    `max_motifs` by coverage (length x occurrences) are returned with their
+    non-overlapping occurrences as note indices.
+
+    Args:
+        intervals: semitone intervals between consecutive notes
+        min_length: minimum motif length in intervals
+        max_motifs: maximum number of motifs returned
+
+    Returns:
+        List of dicts with 'intervals', 'length' (in notes) and 'occurrences'
+    """
+    n = len(intervals)
+    if n < min_length * 2:
+        return []
+
+    sa = suffix_array(intervals)
+    lcp = lcp_array(intervals, sa)
+
+    def left_of(j):
+        return intervals[sa[j] - 1] if sa[j] > 0 else _MIXED
+
+    def merge(a, b):
+        if a is None:
+            return b
+        return a if a == b else _MIXED
+
+    # Candidates are (coverage, length, lb, rb); coverage here counts overlaps
+    candidates = []
+    limit = max_motifs * 4
+    stack = [[0, 0, None]]  # [lcp, left bound, left interval]
+
+    for i in range(1, n + 1):
+        h = lcp[i] if i < n else 0
+        lb = i - 1
+        left = left_of(i - 1)
+
+        while h < stack[-1][0]:
+            top = stack.pop()
+            top[2] = merge(top[2], left)
+            length, top_lb = top[0], top[1]
+            if length >= min_length and top[2] is _MIXED:
+                entry = (length * (i - top_lb), length, top_lb, i - 1)
+                if len(candidates) < limit:
+                    heapq.heappush(candidates, entry)
+                else:
+                    heapq.heappushpop(candidates, entry)
+            lb = top_lb
+            left = top[2]
+
+        if h > stack[-1][0]:
+            stack.append([h, lb, left])
+        else:
+            stack[-1][2] = merge(stack[-1][2], left)
+
+    motifs = []
+    for _, length, lb, rb in sorted(candidates, reverse=True):
+        occurrences = []
+        for start in sorted(sa[lb:rb + 1]):
+            if not occurrences or start >= occurrences[-1] + length:
+                occurrences.append(start)
+        if len(occurrences) < 2:
+            continue
+        motifs.append({
+            'intervals': list(intervals[occurrences[0]:occurrences[0] + length]),
+            'length': length + 1,
+            'occurrences': occurrences
+        })
+        if len(motifs) >= max_motifs:
+            break
+
+    return motifs
+
+
+class StreamingMelodyAnalyzer:
+    """
+    Single-pass melody analysis.
+
+    Notes are fed one at a time (in time order) and every per-note statistic,
+    i.e. intervals, contour, scale degrees, time-gap phrases and range, is
+    updated in the same step. Repeated motifs are found over the collected
+    interval sequence when the result is requested.
+    """
+
+    def __init__(self, scale_table: ScaleTable, phrase_gap: float = 0.5,
+                 min_motif_length: int = 3, max_motifs: int = 20):
+        self.scale_table = scale_table
+        self.phrase_gap = phrase_gap
+        self.min_motif_length = min_motif_length
+        self.max_motifs = max_motifs
+
+        self.count = 0
+        self.intervals: List[int] = []
+        self.contour: List[str] = []
+        self.scale_degrees: List[int] = []
+        self.phrases: List[List[int]] = []
+        self.lowest = None
+        self.highest = None
+        self._prev_midi = None
+        self._prev_end = None
+
+    def add(self, note_data: Dict) -> None:
+        midi = note_data['midi']
+        index = self.count
+        self.count += 1
+
+        if self._prev_midi is not None:
+            interval = midi - self._prev_midi
+            self.intervals.append(interval)
+            self.contour.append('up' if interval > 0 else 'down' if interval < 0 else 'same')
+
+        self.scale_degrees.append(self.scale_table.degree_of_pc[midi % 12] + 1)
+
+        # If gap is more than phrase_gap seconds, start new phrase
+        if self._prev_end is None or note_data['time'] - self._prev_end > self.phrase_gap:
+            self.phrases.append([index])
+        else:
+            self.phrases[-1].append(index)
+
+        if self.lowest is None or midi < self.lowest:
+            self.lowest = midi
+        if self.highest is None or midi > self.highest:
+            self.highest = midi
+
+        self._prev_midi = midi
+        self._prev_end = note_data['time'] + note_data['duration']
+
+    def add_many(self, notes: Iterable[Dict]) -> "StreamingMelodyAnalyzer":
+        for note_data in notes:
+            self.add(note_data)
+        return self
+
+    def result(self) -> Dict:
+        analysis = {
+            'intervals': self.intervals,
+            'contour': self.contour,
+            'scale_degrees': self.scale_degrees,
+            'phrases': self.phrases,
+            'motifs': find_repeated_motifs(self.intervals, self.min_motif_length, self.max_motifs)
+        }
+        if self.count:
+            analysis['range'] = {
+                'lowest': self.lowest,
+                'highest': self.highest,
+                'span': self.highest - self.lowest
+            }
+        return analysis
@@ -0,0 +1,129 @@
+"""
+JSON melody loader.
+
+Melody JSON files hold a `melodies` array of
+    {"key": "layer1", "active": true, "pattern": [...], "loopCount": 1,
+     "velocityFirst": 1.0, "velocityLast": 1.0}
+entries. Each entry is loaded as a LoopedPattern of loopCount repeats, so the
+pattern is kept once and only unrolled when serialized.
+
+Uploaded files are read with iter_melody_file(), which yields the melodies one
+at a time as the upload is read, so a huge melodies array is never held in
+memory as a whole.
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from json_stream import iter_json_object
+from looped_pattern import LoopedPattern
+
+LAYER_KEY = re.compile(r'^layer(\d+)$')
+
+DEFAULT_STEP = 0.5  # Half second per note
+MIN_VELOCITY = 0.1
+
+# Guard against loopCount blowing a small file up into an enormous MIDI file
+MAX_NOTES_PER_LAYER = 1_000_000
+
+def ramp_velocities(n: int, velocity_first: float, velocity_last: float) -> np.ndarray:
+    """Velocity (0.1-1.0) of each of n notes, ramping velocity_first -> velocity_last"""
+    if n > 1:
+        ratio = np.arange(n) / (n - 1)
+        velocities = velocity_first + (velocity_last - velocity_first) * ratio
+    else:
+        velocities = np.full(n, float(velocity_first))
+    return np.clip(velocities, MIN_VELOCITY, 1.0)
+
+def parse_melody(melody: Dict, max_notes: int = MAX_NOTES_PER_LAYER) -> LoopedPattern:
+    """Build a LoopedPattern from one entry of a melody JSON file"""
+    if "pattern" not in melody:
+        raise ValueError("Invalid melody format: missing pattern")
+
+    pattern = np.asarray(melody["pattern"], dtype=np.int64)
+    if pattern.ndim != 1 or (len(pattern) and (pattern.min() < 0 or pattern.max() > 127)):
+        raise ValueError("Invalid melody format: pattern must be a list of MIDI notes (0-127)")
+
+    loop_count = int(melody.get("loopCount", 1) or 1)
+    if loop_count < 1:
+        raise ValueError("Invalid melody format: loopCount must be at least 1")
+    if len(pattern) * loop_count > max_notes:
+        raise ValueError(f"Melody too long: {len(pattern)} notes x {loop_count} loops exceeds {max_notes} notes")
+
+    # One repeat of the pattern; loopCount repeats are not unrolled here
+    velocities = ramp_velocities(len(pattern), melody.get("velocityFirst", 1.0), melody.get("velocityLast", 1.0))
+    notes = [
+        {'midi': midi, 'time': i * DEFAULT_STEP, 'duration': DEFAULT_STEP, 'velocity': velocity}
+        for i, (midi, velocity) in enumerate(zip(pattern.tolist(), velocities.tolist()))
+    ]
+    return LoopedPattern.from_notes(notes, repeats=loop_count, period=len(pattern) * DEFAULT_STEP)
+
+def validate_melody_file(melody_data) -> List[Dict]:
+    """Return the melodies array, raising ValueError if there is none"""
+    if not isinstance(melody_data, dict) or not melody_data.get("melodies"):
+        raise ValueError("Invalid JSON format: missing melodies array")
+    return melody_data["melodies"]
+
+def iter_melody_file(chunks: Iterable[bytes]) -> Iterator[Dict]:
+    """Melodies of a melody JSON file read incrementally from byte chunks"""
+    found = False
+    for key, melody in iter_json_object(chunks, "melodies"):
+        if key == "melodies":
+            found = True
+            yield melody
+    if not found:
+        raise ValueError("Invalid JSON format: missing melodies array")
+
+def select_melody(melody_data: Dict) -> LoopedPattern:
+    """The first active melody, or the first melody if none are active"""
+    return pick_melody(validate_melody_file(melody_data))
+
+def pick_melody(melodies: Iterable[Dict]) -> LoopedPattern:
+    """select_melody() over a stream of melodies: stops at the first active one"""
+    first = None
+    for melody in melodies:
+        if melody.get("active", False):
+            return parse_melody(melody)
+        if first is None:
+            first = melody
+    if first is None:
+        raise ValueError("Invalid JSON format: missing melodies array")
+    return parse_melody(first)
+
+def iter_layer_melodies(melodies: Iterable[Dict]) -> Iterator[Tuple[int, Dict]]:
+    """
+    (layer index, melody) for active `layerN` melodies (layer1 -> 0), for any N.
+
+    Melodies with other keys or empty patterns are skipped.
+    """
+    for melody in melodies:
+        if not melody.get("active", False):
+            continue
+        match = LAYER_KEY.match(str(melody.get("key", "")))
+        if not match or int(match.group(1)) < 1 or not melody.get("pattern"):
+            continue
+        yield int(match.group(1)) - 1, melody
+
+def layer_melodies(melody_data: Dict) -> Dict[int, Dict]:
+    """
+    Active `layerN` melody entries keyed by layer index; if a layer key
+    appears twice, the later melody wins.
+    """
+    layers = dict(iter_layer_melodies(validate_melody_file(melody_data)))
+    return dict(sorted(layers.items()))
+
+def load_layer_loops(melody_data: Dict) -> Dict[int, LoopedPattern]:
+    """Active `layerN` melodies as LoopedPatterns, keyed by layer index"""
+    return load_layer_loops_from(validate_melody_file(melody_data))
+
+def load_layer_loops_from(melodies: Iterable[Dict]) -> Dict[int, LoopedPattern]:
+    """load_layer_loops() over a stream of melodies, parsing each as it arrives"""
+    layers = {}
+    for index, melody in iter_layer_melodies(melodies):
+        layers[index] = parse_melody(melody)
+    return dict(sorted(layers.items()))
+
+def encode_layer_loops(layers: Dict[int, LoopedPattern], bpm: float = 120) -> Dict[int, bytes]:
+    """MIDI file bytes for each layer"""
+    return {index: loop.to_midi(bpm) for index, loop in layers.items()}
@@ -0,0 +1,185 @@
+"""
+Hot reload for melody JSON files.
+
+Watched files are polled with os.stat (a handful of stats every few
+milliseconds is cheap, and needs nothing beyond the standard library). When a
+file changes, it is read once it has stopped changing for `debounce` seconds,
+so an editor's truncate-then-write or several quick saves are coalesced into
+a single reload. Each layer entry is hashed and only layers whose entry
+changed are re-parsed and handed to the change callback.
+
+Latency is measured from the file's modification time to the moment the
+callback (the OSC send) returns.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from looped_pattern import LoopedPattern
+from melody_loader import layer_melodies, parse_melody
+from osc_scheduler import TimingStats
+
+# Called with the file and its changed layers (layer index -> pattern)
+ChangeCallback = Callable[[Path, Dict[int, LoopedPattern]], None]
+
+LATENCY_TARGET = 0.05  # Edits slower than this to reach SuperCollider count as late
+
+def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def _entry_hash(melody: Dict) -> str:
+    return hashlib.sha1(json.dumps(melody, sort_keys=True).encode('utf-8')).hexdigest()
+
+class WatchedFile:
+    def __init__(self, path: Path):
+        self.path = path
+        self.signature = _signature(path)
+        self.changed_at: Optional[float] = None  # Monotonic time of the last unsettled change
+        self.content_hash: Optional[str] = None
+        self.layer_hashes: Dict[int, str] = {}
+        self.reloads = 0
+        self.error: Optional[str] = None
+
+    def status(self) -> Dict:
+        return {
+            'path': str(self.path),
+            'exists': self.signature is not None,
+            'layers': [f"layer{index + 1}" for index in sorted(self.layer_hashes)],
+            'reloads': self.reloads,
+            'error': self.error
+        }
+
+class MelodyFileWatcher:
+    """
+    Asyncio polling watcher for melody JSON files.
+
+    start() must be called from a running event loop. Layers that disappear
+    from a file (removed or deactivated) are reported in the status but not
+    sent, so SuperCollider keeps playing their last melody.
+    """
+
+    def __init__(self, paths: Sequence[Path], on_change: ChangeCallback, poll_interval: float = 0.005,
+                 debounce: float = 0.01, clock: Callable[[], float] = time.monotonic):
+        self.files = [WatchedFile(Path(p)) for p in paths]
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.clock = clock
+        self.latency = TimingStats(late_threshold=LATENCY_TARGET)
+        self.last_push: Optional[Dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, push_initial: bool = True) -> None:
+        if self.running:
+            raise RuntimeError("Watcher already running")
+        # Read the current contents first: either push them, or use them as
+        # the baseline so only later edits are sent
+        for watched in self.files:
+            if watched.signature is not None:
+                self._reload(watched, push=push_initial, edited=False)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict:
+        return {
+            'running': self.running,
+            'pollMs': round(self.poll_interval * 1000, 3),
+            'debounceMs': round(self.debounce * 1000, 3),
+            'files': [watched.status() for watched in self.files],
+            'lastPush': self.last_push,
+            # Edit (file mtime) to OSC sent
+            'latency': self.latency.snapshot()
+        }
+
+    async def _run(self) -> None:
+        while True:
+            now = self.clock()
+            for watched in self.files:
+                signature = _signature(watched.path)
+                if signature != watched.signature:
+                    # Still being written: wait until it settles
+                    watched.signature = signature
+                    watched.changed_at = now
+                elif watched.changed_at is not None and now - watched.changed_at >= self.debounce:
+                    watched.changed_at = None
+                    if signature is not None:
+                        self._reload(watched)
+            await asyncio.sleep(self.poll_interval)
+
+    def _reload(self, watched: WatchedFile, push: bool = True, edited: bool = True) -> None:
+        started = time.perf_counter()
+        try:
+            content = watched.path.read_bytes()
+            content_hash = hashlib.sha1(content).hexdigest()
+            if content_hash == watched.content_hash:
+                return  # Touched or rewritten with the same contents
+            melodies = layer_melodies(json.loads(content))
+        except Exception as e:
+            # Typically a half-written file; the next save triggers a retry
+            watched.error = str(e)
+            return
+
+        changed = {}
+        hashes = {}
+        errors = []
+        for index, melody in melodies.items():
+            entry_hash = _entry_hash(melody)
+            if watched.layer_hashes.get(index) == entry_hash:
+                hashes[index] = entry_hash
+                continue
+            try:
+                changed[index] = parse_melody(melody)
+                hashes[index] = entry_hash
+            except Exception as e:
+                errors.append(f"layer{index + 1}: {str(e)}")
+
+        removed = sorted(set(watched.layer_hashes) - set(melodies))
+        watched.content_hash = content_hash
+        watched.layer_hashes = hashes
+        watched.reloads += 1
+        watched.error = "; ".join(errors) or None
+        if not push or not changed:
+            return
+
+        try:
+            self.on_change(watched.path, changed)
+        except Exception as e:
+            # Forget the unsent layers so the next save sends them again
+            watched.content_hash = None
+            for index in changed:
+                watched.layer_hashes.pop(index, None)
+            watched.error = f"Send failed: {str(e)}"
+            print(f"Melody watcher send failed: {str(e)}")
+            return
+
+        # Only edits seen by the poll loop count: the initial push is not an edit
+        latency = (time.time_ns() - watched.signature[0]) / 1e9 if edited else None
+        if latency is not None:
+            self.latency.record(latency)
+        self.last_push = {
+            'file': str(watched.path),
+            'layers': [f"layer{index + 1}" for index in changed],
+            'removedLayers': [f"layer{index + 1}" for index in removed],
+            'reloadMs': round((time.perf_counter() - started) * 1000, 3),
+            'latencyMs': round(latency * 1000, 3) if latency is not None else None
+        }
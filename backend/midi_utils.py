@@ -0,0 +1,301 @@
+import io
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_TEMPO = 500000  # Default tempo (120 BPM in microseconds per beat)
+
+# Same resolution music21 writes, so re-encoded files line up with older exports
+TICKS_PER_BEAT = 10080
+
+# Channels for pitched parts: every channel but 10 (index 9), which General MIDI keeps for drums
+MELODIC_CHANNELS = [channel for channel in range(16) if channel != 9]
+
+def read_midi_bytes(content: bytes):
+    """Parse MIDI file bytes with mido, without touching the filesystem"""
+    import mido
+    return mido.MidiFile(file=io.BytesIO(content))
+
+def midi_tempo(mid) -> int:
+    """Get tempo from first track (if available)"""
+    for msg in mid.tracks[0] if mid.tracks else []:
+        if msg.type == 'set_tempo':
+            return msg.tempo
+    return DEFAULT_TEMPO
+
+def track_notes(track, ticks_per_beat: int, tempo_value: int) -> List[Dict]:
+    """Extract notes from a mido track, sorted by time (in seconds)"""
+    import mido
+
+    notes = []
+    active_notes = {}  # pitch -> (start_time, velocity)
+    current_time = 0  # in ticks
+
+    for msg in track:
+        current_time += msg.time
+
+        if msg.type == 'note_on' and msg.velocity > 0:
+            # Start of a note
+            active_notes[msg.note] = (current_time, msg.velocity)
+        elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
+            # End of a note
+            if msg.note in active_notes:
+                start_time, velocity = active_notes[msg.note]
+                duration_ticks = current_time - start_time
+
+                # Convert ticks to seconds
+                notes.append({
+                    'midi': msg.note,
+                    'time': mido.tick2second(start_time, ticks_per_beat, tempo_value),
+                    'duration': mido.tick2second(duration_ticks, ticks_per_beat, tempo_value),
+                    'velocity': velocity / 127.0
+                })
+                del active_notes[msg.note]
+
+    # Sort notes by time
+    notes.sort(key=lambda n: n['time'])
+    return notes
+
+def parse_midi_tracks(mid, max_tracks: Optional[int] = None) -> Tuple[int, List[Dict]]:
+    """
+    Extract the note-bearing tracks of a mido MidiFile.
+
+    Returns:
+        (tempo in microseconds per beat, list of dicts with 'originalTrackIndex',
+        'trackName' and 'notes')
+    """
+    tempo_value = midi_tempo(mid)
+    tracks = []
+
+    for track_idx, track in enumerate(mid.tracks):
+        if max_tracks is not None and len(tracks) >= max_tracks:
+            break
+
+        # Check if track has any note events
+        if not any(msg.type in ('note_on', 'note_off') for msg in track):
+            continue
+
+        tracks.append({
+            'originalTrackIndex': track_idx,
+            'trackName': track.name if hasattr(track, 'name') else f'Track {track_idx}',
+            'notes': track_notes(track, mid.ticks_per_beat, tempo_value)
+        })
+
+    return tempo_value, tracks
+
+def parse_midi_cached(content: bytes, cache) -> "NoteStore":
+    """
+    Parse MIDI bytes into a note store, cached by content hash.
+
+    The store holds one melody per note-bearing track (metadata
+    'originalTrackIndex' and 'trackName') and file metadata 'tempo',
+    'totalTracks' and 'midiType'.
+    """
+    from note_store import notes_to_records
+
+    def build():
+        mid = read_midi_bytes(content)
+        tempo_value, tracks = parse_midi_tracks(mid)
+        melodies = [
+            ({'originalTrackIndex': t['originalTrackIndex'], 'trackName': t['trackName']},
+             notes_to_records(t['notes']))
+            for t in tracks
+        ]
+        return melodies, {'tempo': tempo_value, 'totalTracks': len(mid.tracks), 'midiType': mid.type}
+
+    return cache.get_or_build(content, build)
+
+def encode_notes_music21(notes: List[Dict]) -> bytes:
+    """Encode notes as a single-track MIDI file at 120 BPM using music21"""
+    import os
+    import tempfile
+    from music21 import duration, meter, note, stream, tempo
+
+    # Create MIDI file for this track using music21
+    track_stream = stream.Stream()
+    track_stream.append(tempo.TempoIndication(number=120))
+    track_stream.append(meter.TimeSignature('4/4'))
+
+    for note_data in notes:
+        n = note.Note(note_data['midi'])
+        # Convert seconds to quarter notes at 120 BPM
+        n.duration = duration.Duration(quarterLength=note_data['duration'] * 2)
+        n.offset = note_data['time'] * 2
+        n.volume.velocity = int(note_data['velocity'] * 127)
+        track_stream.insert(n.offset, n)
+
+    # Convert to MIDI bytes
+    with tempfile.NamedTemporaryFile(suffix='.mid', delete=False) as tmp_file:
+        track_stream.write('midi', fp=tmp_file.name)
+        tmp_file.flush()
+        with open(tmp_file.name, 'rb') as f:
+            midi_bytes = f.read()
+        os.unlink(tmp_file.name)
+    return midi_bytes
+
+def import_midi_content(content: bytes, cache=None, max_tracks: int = 3) -> Dict:
+    """
+    Import MIDI file bytes: extract up to max_tracks note-bearing tracks and
+    re-encode each as its own base64 MIDI file.
+
+    With a NoteStoreCache the parse is cached by content hash. Returns the
+    /import-midi response body.
+    """
+    import base64
+
+    if cache is not None:
+        from note_store import records_to_notes
+        store = parse_midi_cached(content, cache)
+        tempo_value = store.metadata['tempo']
+        total_tracks = store.metadata['totalTracks']
+        midi_type = store.metadata['midiType']
+        tracks = [
+            (store.melody_metadata[i], records_to_notes(store.melody(i)))
+            for i in range(min(max_tracks, len(store)))
+        ]
+        store.close()
+    else:
+        mid = read_midi_bytes(content)
+        tempo_value, parsed_tracks = parse_midi_tracks(mid, max_tracks=max_tracks)
+        total_tracks = len(mid.tracks)
+        midi_type = mid.type
+        tracks = [(parsed, parsed['notes']) for parsed in parsed_tracks]
+
+    # Convert tempo to BPM
+    bpm = 60000000 / tempo_value
+
+    tracks_data = []
+    for track_count, (parsed, notes) in enumerate(tracks):
+        # Encode as base64 for transport
+        midi_base64 = base64.b64encode(encode_notes_music21(notes)).decode('utf-8')
+        tracks_data.append({
+            'trackIndex': track_count,
+            'midiData': midi_base64,
+            'noteCount': len(notes),
+            'originalTrackIndex': parsed['originalTrackIndex'],
+            'trackName': parsed['trackName']
+        })
+
+    return {
+        'success': True,
+        'tracks': tracks_data,
+        'totalTracksFound': total_tracks,
+        'tracksImported': len(tracks_data),
+        'detectedTempo': round(bpm),
+        'midiType': midi_type
+    }
+
+
+# Direct MIDI encoding
+#
+# Events are laid out with NumPy instead of building one message object per
+# note, so encoding cost is a handful of array operations per track.
+
+def _vlq_lengths(values: np.ndarray) -> np.ndarray:
+    """Byte length of each value as a MIDI variable-length quantity"""
+    return 1 + (values >= 1 << 7).astype(np.int64) + (values >= 1 << 14) + (values >= 1 << 21)
+
+def encode_track_events(ticks: np.ndarray, status: np.ndarray, data1: np.ndarray,
+                        data2: np.ndarray, start_tick: int = 0) -> bytes:
+    """
+    Encode sorted channel events (absolute ticks) as MTrk event bytes, without
+    the chunk header or end-of-track event. The first delta is measured from
+    start_tick.
+    """
+    ticks = np.asarray(ticks, dtype=np.int64)
+    if len(ticks) == 0:
+        return b''
+    delta = np.diff(ticks, prepend=start_tick)
+    if delta.min() < 0 or delta.max() >= 1 << 28:
+        raise ValueError("Event ticks must be sorted and less than 2^28 apart")
+
+    vlq = _vlq_lengths(delta)
+    starts = np.concatenate(([0], np.cumsum(vlq + 3)[:-1]))
+    out = np.zeros(int(starts[-1] + vlq[-1] + 3), dtype=np.uint8)
+
+    # Delta time bytes, most significant group first, continuation bit on all but the last
+    for j in range(4):
+        mask = vlq > j
+        shift = 7 * (vlq[mask] - 1 - j)
+        byte = (delta[mask] >> shift) & 0x7F
+        byte |= np.where(j < vlq[mask] - 1, 0x80, 0)
+        out[starts[mask] + j] = byte
+
+    event = starts + vlq
+    out[event] = status
+    out[event + 1] = data1
+    out[event + 2] = data2
+    return out.tobytes()
+
+def note_events(onsets: np.ndarray, durations: np.ndarray, pitches: np.ndarray,
+                velocities: np.ndarray, channel: int = 0, start_tick: int = 0) -> bytes:
+    """
+    Encode notes (ticks, MIDI pitch and velocity) as note_on/note_off events.
+
+    At equal ticks note_offs come first, so back-to-back notes of the same
+    pitch don't cut each other off.
+    """
+    onsets = np.asarray(onsets, dtype=np.int64)
+    n = len(onsets)
+    ticks = np.concatenate((onsets, onsets + np.asarray(durations, dtype=np.int64)))
+    is_on = np.concatenate((np.ones(n, dtype=np.int8), np.zeros(n, dtype=np.int8)))
+    order = np.lexsort((is_on, ticks))
+
+    status = np.where(is_on, 0x90, 0x80) | (channel & 0x0F)
+    data1 = np.tile(np.asarray(pitches, dtype=np.uint8), 2)
+    data2 = np.concatenate((np.asarray(velocities, dtype=np.uint8), np.zeros(n, dtype=np.uint8)))
+    return encode_track_events(ticks[order], status[order], data1[order], data2[order], start_tick)
+
+def meta_event(delta: int, meta_type: int, data: bytes) -> bytes:
+    """Encode a meta event (data shorter than 128 bytes)"""
+    return bytes((delta, 0xFF, meta_type, len(data))) + data
+
+def track_chunk(*events: bytes, end_delta: int = 0) -> bytes:
+    """Wrap encoded events in an MTrk chunk, adding end-of-track"""
+    end = _vlq_bytes(end_delta) + b'\xff\x2f\x00'
+    length = sum(len(e) for e in events) + len(end)
+    return b''.join((b'MTrk', struct.pack('>I', length)) + events + (end,))
+
+def _vlq_bytes(value: int) -> bytes:
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(out))
+
+def conductor_track(bpm: float = 120, numerator: int = 4, denominator: int = 4) -> bytes:
+    """Tempo and time signature track"""
+    tempo_bytes = struct.pack('>I', int(round(60000000 / bpm)))[1:]
+    time_sig = bytes((numerator, denominator.bit_length() - 1, 24, 8))
+    return track_chunk(meta_event(0, 0x51, tempo_bytes), meta_event(0, 0x58, time_sig))
+
+def midi_header(track_count: int, ticks_per_beat: int = TICKS_PER_BEAT) -> bytes:
+    """MThd chunk of a Type 1 MIDI file"""
+    return b'MThd' + struct.pack('>IHHH', 6, 1, track_count, ticks_per_beat)
+
+def midi_file_bytes(tracks: Iterable[bytes], ticks_per_beat: int = TICKS_PER_BEAT) -> bytes:
+    """Assemble a Type 1 MIDI file from MTrk chunks"""
+    tracks = list(tracks)
+    return b''.join([midi_header(len(tracks), ticks_per_beat)] + tracks)
+
+def notes_track(times: np.ndarray, durations: np.ndarray, pitches: np.ndarray, velocities: np.ndarray,
+                name: str = '', channel: int = 0, program: Optional[int] = None, bpm: float = 120,
+                ticks_per_beat: int = TICKS_PER_BEAT) -> bytes:
+    """
+    MTrk chunk for notes given in seconds, with velocities from 0 to 1 (like
+    the note dicts the API passes around). A program, if given, is set with a
+    program change at the start of the track.
+    """
+    ticks_per_second = bpm / 60 * ticks_per_beat
+    times = np.asarray(times, dtype=np.float64)
+    onsets = np.rint(times * ticks_per_second).astype(np.int64)
+    ends = np.rint((times + np.asarray(durations, dtype=np.float64)) * ticks_per_second).astype(np.int64)
+    pitches = np.clip(np.asarray(pitches, dtype=np.int64), 0, 127)
+    velocities = np.clip((np.asarray(velocities, dtype=np.float64) * 127).astype(np.int64), 0, 127)
+    events = [meta_event(0, 0x03, name.encode('utf-8')[:127])]
+    if program is not None:
+        events.append(bytes((0, 0xC0 | (channel & 0x0F), program & 0x7F)))
+    events.append(note_events(onsets, np.maximum(ends - onsets, 0), pitches, velocities, channel))
+    return track_chunk(*events)
@@ -0,0 +1,231 @@
+"""
+Compact binary note store.
+
+One file holds many melodies as fixed-width note records:
+
+    header        64 bytes: magic, version, melody count, note count,
+                  metadata offset and length
+    offset table  (melody count + 1) uint64 record indices; melody i spans
+                  records [offsets[i], offsets[i + 1])
+    records       NOTE_DTYPE array, 8-byte aligned
+    metadata      UTF-8 JSON: file-level metadata plus one dict per melody
+
+Files are opened with mmap and melodies are exposed as zero-copy NumPy views,
+so reopening a store costs a header read rather than a re-parse.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b'GNS1'
+VERSION = 1
+HEADER = struct.Struct('<4sIIQQQ')
+HEADER_SIZE = 64
+
+# 24-byte records; velocity is stored as a MIDI velocity (0-127)
+NOTE_DTYPE = np.dtype([
+    ('onset', '<f8'),     # seconds
+    ('duration', '<f8'),  # seconds
+    ('pitch', 'u1'),
+    ('velocity', 'u1'),
+    ('channel', 'u1'),
+    ('_pad', 'V5')
+])
+
+def notes_to_records(notes: Sequence[Dict], channel: int = 0) -> np.ndarray:
+    """Convert note dicts ('midi', 'time', 'duration', 'velocity' 0-1) to records"""
+    records = np.zeros(len(notes), dtype=NOTE_DTYPE)
+    if len(notes):
+        records['onset'] = [n['time'] for n in notes]
+        records['duration'] = [n['duration'] for n in notes]
+        velocities = np.array([n.get('velocity', 0.7) for n in notes], dtype=np.float64)
+        records['velocity'] = np.clip(np.rint(velocities * 127), 0, 127)
+        records['pitch'] = [n['midi'] for n in notes]
+        records['channel'] = channel
+    return records
+
+def pitches_to_records(pitches: Sequence[int], step: float = 0.5) -> np.ndarray:
+    """Records for a bare pitch pattern, one note every `step` seconds"""
+    records = np.zeros(len(pitches), dtype=NOTE_DTYPE)
+    records['onset'] = np.arange(len(pitches)) * step
+    records['duration'] = step
+    records['velocity'] = 89  # 0.7
+    records['pitch'] = pitches
+    return records
+
+def records_to_notes(records: np.ndarray) -> List[Dict]:
+    """Convert records back to note dicts (velocity 0-1)"""
+    return [
+        {'midi': p, 'time': t, 'duration': d, 'velocity': v / 127.0}
+        for p, t, d, v in zip(records['pitch'].tolist(), records['onset'].tolist(),
+                              records['duration'].tolist(), records['velocity'].tolist())
+    ]
+
+def _align8(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def write_note_store(path: Path, melodies: Iterable[Tuple[Dict, np.ndarray]],
+                     metadata: Optional[Dict] = None) -> None:
+    """
+    Write melodies (metadata dict, records) to a note store file.
+
+    The file is written to a temporary name and renamed into place, so readers
+    never see a partial store.
+    """
+    path = Path(path)
+    melody_meta = []
+    arrays = []
+    for meta, records in melodies:
+        melody_meta.append(meta)
+        arrays.append(np.asarray(records, dtype=NOTE_DTYPE))
+
+    offsets = np.zeros(len(arrays) + 1, dtype='<u8')
+    if arrays:
+        offsets[1:] = np.cumsum([len(a) for a in arrays])
+    note_count = int(offsets[-1])
+
+    records_start = _align8(HEADER_SIZE + offsets.nbytes)
+    meta_bytes = json.dumps({'metadata': metadata or {}, 'melodies': melody_meta}).encode('utf-8')
+    meta_offset = records_start + note_count * NOTE_DTYPE.itemsize
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(arrays), note_count, meta_offset, len(meta_bytes)))
+            f.write(b'\0' * (HEADER_SIZE - HEADER.size))
+            f.write(offsets.tobytes())
+            f.write(b'\0' * (records_start - HEADER_SIZE - offsets.nbytes))
+            for records in arrays:
+                f.write(records.tobytes())
+            f.write(meta_bytes)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+class NoteStore:
+    """Read-only, memory-mapped view of a note store file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, melody_count, note_count, meta_offset, meta_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"Not a note store file: {self.path}")
+
+        self.offsets = np.frombuffer(self._mmap, dtype='<u8', count=melody_count + 1, offset=HEADER_SIZE)
+        records_start = _align8(HEADER_SIZE + self.offsets.nbytes)
+        self.records = np.frombuffer(self._mmap, dtype=NOTE_DTYPE, count=note_count, offset=records_start)
+
+        meta = json.loads(bytes(self._mmap[meta_offset:meta_offset + meta_length]))
+        self.metadata: Dict = meta['metadata']
+        self.melody_metadata: List[Dict] = meta['melodies']
+
+    def __len__(self):
+        return len(self.melody_metadata)
+
+    def melody(self, index: int) -> np.ndarray:
+        """Zero-copy view of one melody's records"""
+        return self.records[int(self.offsets[index]):int(self.offsets[index + 1])]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.melody_metadata[i], self.melody(i)
+
+    def close(self):
+        # Views must be dropped before the mmap can close; if callers still
+        # hold melody views, the mapping is released once they are collected
+        self.offsets = self.records = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class NoteStoreCache:
+    """
+    Note stores keyed by the SHA-256 of the source file's bytes.
+
+    A file is converted once; later loads of the same content open the cached
+    store instead of re-parsing it. With max_bytes / max_files, the least
+    recently used stores are deleted once the cache grows past either cap
+    (use is tracked by file mtime, so it holds across processes and restarts).
+    Only cache entries are counted and evicted, not other files in cache_dir.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: Optional[int] = None, max_files: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+
+    def path_for(self, content: bytes) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(content).hexdigest()}.gns"
+
+    def get_or_build(self, content: bytes,
+                     build: Callable[[], Tuple[List[Tuple[Dict, np.ndarray]], Dict]]) -> NoteStore:
+        """Open the cached store for content, building it with build() on a miss"""
+        path = self.path_for(content)
+        if path.exists():
+            try:
+                os.utime(path)  # Most recently used
+            except OSError:
+                pass  # Evicted meanwhile: NoteStore() below reports it
+        else:
+            melodies, metadata = build()
+            write_note_store(path, melodies, metadata)
+            self.evict(keep=path)
+        return NoteStore(path)
+
+    def entries(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every cached store, least recently used first"""
+        entries = []
+        for path in self.cache_dir.glob('*.gns'):
+            if len(path.stem) != 64 or not all(c in '0123456789abcdef' for c in path.stem):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self, keep: Optional[Path] = None) -> int:
+        """Delete least recently used stores until both caps hold; returns how many were deleted"""
+        if self.max_bytes is None and self.max_files is None:
+            return 0
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        deleted = 0
+        for _, size, path in entries:
+            if ((self.max_bytes is None or total <= self.max_bytes)
+                    and (self.max_files is None or count <= self.max_files)):
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()  # Open (mmapped) stores stay readable until closed
+            except OSError:
+                continue
+            total -= size
+            count -= 1
+            deleted += 1
+        return deleted
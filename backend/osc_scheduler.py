@@ -0,0 +1,253 @@
+"""
+Backend OSC sequencer.
+
+Plays layers as individual note-on/note-off OSC messages (or timetagged
+bundles), for setups without the SuperCollider liveMelody patch.
+
+Every event has an absolute target time on the monotonic clock (loop start +
+note time), so sleep errors never accumulate. Sleeps are shortened by a
+running estimate of how late asyncio timers fire, and the last fraction of a
+millisecond is spent yielding to the event loop. In bundle mode, events are
+sent `lookahead` seconds early with the target time as the OSC timetag, so
+the receiver can play them sample-accurately.
+"""
+import asyncio
+import math
+import statistics
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pythonosc import osc_bundle_builder, osc_message_builder, udp_client
+
+NOTE_ON_ADDRESS = "/gesture/noteOn"    # layer, midi, velocity (0-1)
+NOTE_OFF_ADDRESS = "/gesture/noteOff"  # layer, midi
+
+# (time, order, address, args); note-offs sort before note-ons at the same time
+Event = Tuple[float, int, str, list]
+
+def build_timeline(layers: Dict[str, Sequence[Dict]]) -> Tuple[List[Event], float]:
+    """Note-on/off events for all layers, sorted by time, and the timeline length"""
+    events = []
+    length = 0.0
+    for layer_name, notes in layers.items():
+        for note_data in notes:
+            start = max(0.0, float(note_data['time']))
+            end = start + max(0.0, float(note_data['duration']))
+            velocity = note_data.get('velocity', 0.7)
+            velocity = velocity / 127.0 if velocity > 1 else velocity  # Convert to 0-1 range
+            events.append((start, 1, NOTE_ON_ADDRESS, [layer_name, int(note_data['midi']), float(velocity)]))
+            events.append((end, 0, NOTE_OFF_ADDRESS, [layer_name, int(note_data['midi'])]))
+            length = max(length, end)
+    events.sort(key=lambda e: (e[0], e[1]))
+    return events, length
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(math.ceil(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class TimingStats:
+    """Send-time error (actual - intended) over a sliding window of events"""
+
+    def __init__(self, late_threshold: float = 0.005, window: int = 10000):
+        self.late_threshold = late_threshold
+        self.errors = deque(maxlen=window)
+        self.count = 0
+        self.late = 0
+        self.max_error = 0.0
+
+    def record(self, error: float) -> None:
+        self.errors.append(error)
+        self.count += 1
+        if error > self.late_threshold:
+            self.late += 1
+        self.max_error = max(self.max_error, error)
+
+    def snapshot(self) -> Dict:
+        errors = sorted(self.errors)
+        ms = lambda seconds: round(seconds * 1000, 3)
+        return {
+            'events': self.count,
+            'lateEvents': self.late,
+            'lateThresholdMs': ms(self.late_threshold),
+            'window': len(errors),
+            'meanMs': ms(statistics.fmean(errors)) if errors else 0.0,
+            'jitterMs': ms(statistics.pstdev(errors)) if len(errors) > 1 else 0.0,
+            'p50Ms': ms(percentile(errors, 50)),
+            'p95Ms': ms(percentile(errors, 95)),
+            'p99Ms': ms(percentile(errors, 99)),
+            'maxMs': ms(self.max_error)
+        }
+
+class OscNoteScheduler:
+    """
+    Asyncio note scheduler sending OSC to one destination.
+
+    start() must be called from a running event loop. update() swaps in new
+    layers at the next loop boundary, like the liveMelody patch does.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 57120, lookahead: float = 0.05,
+                 bundles: bool = False, loop: bool = True, late_threshold: float = 0.005,
+                 spin: float = 0.0005, clock: Callable[[], float] = time.monotonic):
+        self.host = host
+        self.port = port
+        self.lookahead = lookahead
+        self.bundles = bundles
+        self.loop = loop
+        self.spin = spin
+        self.clock = clock
+        self.client = udp_client.UDPClient(host, port)
+        self.stats = TimingStats(late_threshold)
+
+        self._timeline: Tuple[List[Event], float] = ([], 0.0)
+        self._pending: Optional[Tuple[List[Event], float]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._oversleep = 0.0  # Running estimate of how late asyncio timers fire
+        self._active = set()  # (layer, midi) currently sounding
+        self.cycles = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None  # Clock time of the first cycle start
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, layers: Dict[str, Sequence[Dict]]) -> None:
+        if self.running:
+            raise RuntimeError("Scheduler already running")
+        self._timeline = build_timeline(layers)
+        self._pending = None
+        self.stats = TimingStats(self.stats.late_threshold)
+        self.cycles = 0
+        self.error = None
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def update(self, layers: Dict[str, Sequence[Dict]]) -> None:
+        """Play these layers from the next loop boundary"""
+        self._pending = build_timeline(layers)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Don't leave notes hanging
+        for layer_name, midi in list(self._active):
+            self._send_message(NOTE_OFF_ADDRESS, [layer_name, midi])
+        self._active.clear()
+
+    def status(self) -> Dict:
+        events, length = self._timeline
+        return {
+            'running': self.running,
+            'destination': f"{self.host}:{self.port}",
+            'mode': 'bundles' if self.bundles else 'messages',
+            'lookaheadMs': round(self.lookahead * 1000, 3),
+            'loop': self.loop,
+            'cycles': self.cycles,
+            'timelineEvents': len(events),
+            'timelineLength': length,
+            'updatePending': self._pending is not None,
+            'error': self.error,
+            'timing': self.stats.snapshot()
+        }
+
+    # Sending
+
+    def _message(self, address: str, args: list):
+        builder = osc_message_builder.OscMessageBuilder(address=address)
+        for arg in args:
+            builder.add_arg(arg)
+        return builder.build()
+
+    def _send_message(self, address: str, args: list) -> None:
+        self.client.send(self._message(address, args))
+
+    def _send_bundle(self, wall_time: float, events: Sequence[Event]) -> None:
+        builder = osc_bundle_builder.OscBundleBuilder(wall_time)
+        for _, _, address, args in events:
+            builder.add_content(self._message(address, args))
+        self.client.send(builder.build())
+
+    def _track(self, address: str, args: list) -> None:
+        if address == NOTE_ON_ADDRESS:
+            self._active.add((args[0], args[1]))
+        else:
+            self._active.discard((args[0], args[1]))
+
+    # Timing
+
+    async def _sleep_until(self, deadline: float) -> None:
+        while True:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return
+            if remaining > self._oversleep + self.spin:
+                requested = remaining - self._oversleep
+                before = self.clock()
+                await asyncio.sleep(requested)
+                late = (self.clock() - before) - requested
+                self._oversleep = 0.9 * self._oversleep + 0.1 * max(0.0, late)
+            else:
+                await asyncio.sleep(0)
+
+    async def _run(self) -> None:
+        try:
+            await self._play()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = str(e)
+            print(f"OSC scheduler stopped: {str(e)}")
+
+    async def _play(self) -> None:
+        clock = self.clock
+        # Monotonic -> wall clock, for bundle timetags
+        wall_offset = time.time() - clock()
+        cycle_start = clock() + self.lookahead
+        self.started_at = cycle_start
+
+        while True:
+            events, length = self._timeline
+            i = 0
+            while i < len(events):
+                target = cycle_start + events[i][0]
+
+                # Events due at the same instant go out together
+                j = i + 1
+                while j < len(events) and events[j][0] == events[i][0]:
+                    j += 1
+
+                send_at = target - self.lookahead if self.bundles else target
+                await self._sleep_until(send_at)
+                error = clock() - send_at
+
+                if self.bundles:
+                    self._send_bundle(target + wall_offset, events[i:j])
+                else:
+                    for _, _, address, args in events[i:j]:
+                        self._send_message(address, args)
+                for _, _, address, args in events[i:j]:
+                    self._track(address, args)
+                    self.stats.record(error)
+                i = j
+
+            self.cycles += 1
+            if not self.loop:
+                return
+
+            # The next cycle starts exactly one timeline length later
+            cycle_start += length
+            if self._pending is not None:
+                self._timeline, self._pending = self._pending, None
+            elif not events or length <= 0:
+                # Nothing to play: wait for an update
+                await asyncio.sleep(0.05)
+            if cycle_start < clock():
+                cycle_start = clock() + self.lookahead
@@ -0,0 +1,157 @@
+"""
+Persistent (immutable, structurally shared) vector.
+
+A 32-ary trie of tuples, as in Clojure's vectors: leaves hold up to 32 values
+and inner nodes up to 32 children. Updating returns a new vector that copies
+only the nodes on the paths to the changed indices (a handful per index) and
+shares every other node with the old one, so keeping many versions costs
+memory proportional to what changed between them.
+
+Because unchanged subtrees are the very same objects, diff() between two
+versions skips them by identity and only looks at the changed paths.
+"""
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+class PersistentVector:
+    """Immutable vector of values; missing slots read as None"""
+
+    __slots__ = ('root', 'length', 'shift')
+
+    def __init__(self, root: tuple = (), length: int = 0, shift: int = 0):
+        self.root = root
+        self.length = length
+        self.shift = shift  # BITS * (depth - 1); 0 when the root is a leaf
+
+    @classmethod
+    def from_iterable(cls, values: Iterable[Any]) -> "PersistentVector":
+        values = list(values)
+        return cls().update(dict(enumerate(values)))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def get(self, index: int) -> Any:
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        node = self.root
+        for level in range(self.shift, 0, -BITS):
+            child = (index >> level) & MASK
+            if child >= len(node) or node[child] is None:
+                return None
+            node = node[child]
+        slot = index & MASK
+        return node[slot] if slot < len(node) else None
+
+    __getitem__ = get
+
+    def update(self, changes: Mapping[int, Any]) -> "PersistentVector":
+        """
+        New vector with changes (index -> value) applied; indices at or past the
+        end grow the vector. Each touched node is copied once per call.
+        """
+        if not changes:
+            return self
+        if min(changes) < 0:
+            raise IndexError(min(changes))
+        length = max(self.length, max(changes) + 1)
+
+        # Add levels on top until the trie can hold `length` values
+        root, shift = self.root, self.shift
+        while length > WIDTH << shift:
+            root = (root,)
+            shift += BITS
+        root = _assoc(root, shift, sorted(changes.items()))
+        return PersistentVector(root, length, shift)
+
+    def set(self, index: int, value: Any) -> "PersistentVector":
+        return self.update({index: value})
+
+    def append(self, value: Any) -> "PersistentVector":
+        return self.update({self.length: value})
+
+    def __iter__(self) -> Iterator[Any]:
+        yield from _iter_node(self.root, self.shift, self.length)
+
+    def diff(self, other: "PersistentVector") -> Iterator[Tuple[int, Any, Any]]:
+        """
+        Yield (index, value here, value in other) for every slot that differs,
+        skipping subtrees the two vectors share.
+        """
+        a, b = self.root, other.root
+        shift = max(self.shift, other.shift)
+        # Lift the shallower trie so both roots are at the same level
+        for _ in range((shift - self.shift) // BITS):
+            a = (a,)
+        for _ in range((shift - other.shift) // BITS):
+            b = (b,)
+        yield from _diff_nodes(a, b, shift, 0)
+
+def _assoc(node: Optional[tuple], shift: int, items: List[Tuple[int, Any]]) -> tuple:
+    """Copy of node with the (sorted) items set, sharing untouched children"""
+    slots = list(node) if node else []
+    if shift == 0:
+        for index, value in items:
+            slot = index & MASK
+            if slot >= len(slots):
+                slots.extend([None] * (slot + 1 - len(slots)))
+            slots[slot] = value
+        return tuple(slots)
+
+    # Group items by the child they fall into (items are sorted by index)
+    start = 0
+    while start < len(items):
+        child = (items[start][0] >> shift) & MASK
+        end = start + 1
+        while end < len(items) and (items[end][0] >> shift) & MASK == child:
+            end += 1
+        if child >= len(slots):
+            slots.extend([None] * (child + 1 - len(slots)))
+        slots[child] = _assoc(slots[child], shift - BITS, items[start:end])
+        start = end
+    return tuple(slots)
+
+def _iter_node(node: Optional[tuple], shift: int, remaining: int) -> Iterator[Any]:
+    """Yield the first `remaining` values under node, None for missing slots"""
+    if shift == 0:
+        for slot in range(min(remaining, WIDTH)):
+            yield node[slot] if node is not None and slot < len(node) else None
+        return
+    span = 1 << shift
+    for child in range(WIDTH):
+        if remaining <= 0:
+            return
+        child_node = node[child] if node is not None and child < len(node) else None
+        yield from _iter_node(child_node, shift - BITS, min(remaining, span))
+        remaining -= span
+
+def _diff_nodes(a: Optional[tuple], b: Optional[tuple], shift: int, base: int) -> Iterator[Tuple[int, Any, Any]]:
+    if a is b:
+        return
+    width = max(len(a) if a else 0, len(b) if b else 0)
+    for slot in range(width):
+        x = a[slot] if a is not None and slot < len(a) else None
+        y = b[slot] if b is not None and slot < len(b) else None
+        if x is y:
+            continue
+        if shift == 0:
+            if x != y:
+                yield base + slot, x, y
+        else:
+            yield from _diff_nodes(x, y, shift - BITS, base + (slot << shift))
+
+def count_nodes(vectors: Iterable[PersistentVector]) -> int:
+    """Distinct trie nodes across vectors (shared nodes counted once)"""
+    seen = set()
+    stack = [(v.root, v.shift) for v in vectors]
+    while stack:
+        node, shift = stack.pop()
+        if node is None or id(node) in seen:
+            continue
+        seen.add(id(node))
+        if shift > 0:
+            stack.extend((child, shift - BITS) for child in node)
+    return len(seen)
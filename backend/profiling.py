@@ -0,0 +1,255 @@
+"""
+Opt-in per-request profiling.
+
+When PROFILING_ENABLED is set, routes are created with ProfiledRoute. A
+request with an `X-Profile` header or a `profile` query parameter is then run
+under a profiler, and the result is saved to the profile directory:
+
+    X-Profile: 1 / cprofile   deterministic (cProfile), saved as .prof (pstats)
+    X-Profile: sample         sampling every SAMPLE_INTERVAL, saved as .folded
+                              (collapsed stacks, for flamegraph.pl / speedscope)
+
+Both cover the async route handler (body parsing, validation, response
+serialization) on the event loop thread and the endpoint itself, which runs in
+the threadpool for sync endpoints. Time on the event loop thread includes
+waiting (e.g. in select while a sync endpoint runs) and can include other
+requests being served concurrently.
+
+Each profile has a .json sidecar (route, request ID, status, duration) that
+/debug/profiles lists. Requests without the flag only pay for one header and
+one query lookup; with profiling disabled the routes are plain APIRoutes.
+"""
+import asyncio
+import contextvars
+import cProfile
+import functools
+import json
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY = "profile"
+SAMPLE_INTERVAL = 0.001  # Seconds between stack samples
+PROFILE_SUFFIXES = {'cprofile': '.prof', 'sample': '.folded'}
+
+def profile_mode(value: Optional[str]) -> Optional[str]:
+    """Map a header/query value to a profiler, or None for no profiling"""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in ('', '0', 'false', 'off', 'no'):
+        return None
+    return 'sample' if value in ('sample', 'sampling', 'folded') else 'cprofile'
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of registered threads into collapsed-stack counts"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.interval = interval
+        self.thread_ids = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class ProfileSession:
+    """Profilers of one request, across the threads it runs on"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.profilers: List[cProfile.Profile] = []
+        self.sampler: Optional[StackSampler] = None
+        if mode == 'sample':
+            self.sampler = StackSampler()
+            self.sampler.start()
+
+    def run(self, func: Callable, *args, **kwargs):
+        """Run a sync call on the current thread under this session's profiler"""
+        if self.sampler is not None:
+            thread_id = threading.get_ident()
+            self.sampler.thread_ids.add(thread_id)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.sampler.thread_ids.discard(thread_id)
+        profiler = cProfile.Profile()
+        self.profilers.append(profiler)
+        return profiler.runcall(func, *args, **kwargs)
+
+    def save(self, path: Path) -> None:
+        if self.sampler is not None:
+            self.sampler.stop()
+            path.write_text(self.sampler.collapsed())
+        else:
+            stats = pstats.Stats(*self.profilers)
+            stats.dump_stats(str(path))
+
+# Set for the duration of a profiled request; read by the endpoint wrapper,
+# including in the threadpool (contexts are copied into worker threads)
+current_profile: contextvars.ContextVar[Optional[ProfileSession]] = contextvars.ContextVar(
+    'current_profile', default=None)
+
+def _profiled_endpoint(call: Callable) -> Callable:
+    """Wrap a sync endpoint so it runs under the request's profiler, if any"""
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        session = current_profile.get()
+        if session is None:
+            return call(*args, **kwargs)
+        return session.run(call, *args, **kwargs)
+    return wrapper
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '-', text).strip('-')[:60] or 'root'
+
+class ProfileStore:
+    """Profile files and their metadata sidecars in one directory"""
+
+    def __init__(self, directory: Path, max_profiles: int = 200):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def save(self, session: ProfileSession, method: str, route: str, path: str,
+             request_id: str, status: int, duration: float) -> Dict:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        created = datetime.now()
+        name = f"{created.strftime('%Y%m%d-%H%M%S')}_{method}_{_slug(route)}_{_slug(request_id)}"
+        profile_file = self.directory / (name + PROFILE_SUFFIXES[session.mode])
+        session.save(profile_file)
+
+        metadata = {
+            'name': name,
+            'file': profile_file.name,
+            'format': 'pstats' if session.mode == 'cprofile' else 'collapsed',
+            'method': method,
+            'route': route,
+            'path': path,
+            'requestId': request_id,
+            'status': status,
+            'durationMs': round(duration * 1000, 3),
+            'created': created.isoformat(timespec='milliseconds'),
+            'bytes': profile_file.stat().st_size
+        }
+        if session.sampler is not None:
+            metadata['samples'] = session.sampler.samples
+        (self.directory / (name + '.json')).write_text(json.dumps(metadata, indent=2))
+        self._prune()
+        return metadata
+
+    def list(self) -> List[Dict]:
+        """Saved profiles, newest first"""
+        profiles = []
+        for sidecar in self.directory.glob('*.json'):
+            try:
+                profiles.append(json.loads(sidecar.read_text()))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda p: p.get('created', ''), reverse=True)
+
+    def file(self, name: str) -> Optional[Path]:
+        """The profile file of a listed profile, or None"""
+        for suffix in PROFILE_SUFFIXES.values():
+            path = self.directory / (Path(name).name + suffix)
+            if path.is_file():
+                return path
+        return None
+
+    def _prune(self) -> None:
+        with self._lock:
+            sidecars = sorted(self.directory.glob('*.json'), key=lambda p: p.stat().st_mtime)
+            for sidecar in sidecars[:max(0, len(sidecars) - self.max_profiles)]:
+                for suffix in ('.json', *PROFILE_SUFFIXES.values()):
+                    sidecar.with_suffix(suffix).unlink(missing_ok=True)
+
+def profiled_route_class(store: ProfileStore) -> type:
+    """An APIRoute subclass that profiles flagged requests into `store`"""
+
+    class ProfiledRoute(APIRoute):
+        def get_route_handler(self) -> Callable:
+            if not getattr(self, '_endpoint_wrapped', False):
+                # Sync endpoints run in the threadpool: profile them there
+                if not asyncio.iscoroutinefunction(self.dependant.call):
+                    self.dependant.call = _profiled_endpoint(self.dependant.call)
+                self._endpoint_wrapped = True
+            handler = super().get_route_handler()
+            route = self.path
+
+            async def profiled_handler(request: Request) -> Response:
+                mode = profile_mode(request.headers.get(PROFILE_HEADER)
+                                    or request.query_params.get(PROFILE_QUERY))
+                if mode is None:
+                    return await handler(request)
+
+                request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:12]
+                session = ProfileSession(mode)
+                token = current_profile.set(session)
+                started = time.perf_counter()
+                status = 500
+                profiler = None
+                if session.sampler is not None:
+                    session.sampler.thread_ids.add(threading.get_ident())
+                else:
+                    # Handler work on the event loop thread: parsing, validation,
+                    # async endpoints and response serialization
+                    profiler = cProfile.Profile()
+                    try:
+                        profiler.enable()
+                        session.profilers.append(profiler)
+                    except ValueError:
+                        # Another profiled request holds this thread's profiler:
+                        # only the endpoint is profiled for this one
+                        profiler = None
+                try:
+                    response = await handler(request)
+                    status = response.status_code
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                    current_profile.reset(token)
+                    duration = time.perf_counter() - started
+                    try:
+                        metadata = store.save(session, request.method, route, request.url.path, request_id, status, duration)
+                    except Exception as e:
+                        metadata = None
+                        print(f"Error saving profile: {str(e)}")
+                if metadata is not None:
+                    response.headers['X-Profile-Id'] = metadata['name']
+                return response
+
+            return profiled_handler
+
+    return ProfiledRoute
@@ -1,5 +1,83 @@
-from music21 import scale, pitch, note
-from typing import List, Dict, Optional
+from music21 import scale, pitch
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Dict, Optional, Sequence, Tuple, Union
+import threading
+
+import numpy as np
+
+STANDARD_SCALES = {
+    "major": [0, 2, 4, 5, 7, 9, 11],
+    "minor": [0, 2, 3, 5, 7, 8, 10],
+    "harmonic minor": [0, 2, 3, 5, 7, 8, 11],
+    "melodic minor": [0, 2, 3, 5, 7, 9, 11],
+    "pentatonic": [0, 2, 4, 7, 9],
+    "minor pentatonic": [0, 3, 5, 7, 10],
+    "blues": [0, 3, 5, 6, 7, 10],
+    "chromatic": [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11],
+    "whole tone": [0, 2, 4, 6, 8, 10],
+    "dorian": [0, 2, 3, 5, 7, 9, 10],
+    "phrygian": [0, 1, 3, 5, 7, 8, 10],
+    "lydian": [0, 2, 4, 6, 7, 9, 11],
+    "mixolydian": [0, 2, 4, 5, 7, 9, 10],
+    "aeolian": [0, 2, 3, 5, 7, 8, 10],
+    "locrian": [0, 1, 3, 5, 6, 8, 10],
+    # Custom scales
+    "phrygian dominant": [0, 1, 4, 5, 7, 8, 10]  # Phrygian with raised 3rd
+}
+
+# Pitch class names as spelled by music21's nameWithOctave
+PITCH_CLASS_NAMES = ('C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'G#', 'A', 'B-', 'B')
+
+# MIDI number -> name with octave (e.g. 61 -> 'C#4')
+MIDI_NOTE_NAMES = tuple(f"{PITCH_CLASS_NAMES[m % 12]}{m // 12 - 1}" for m in range(128))
+
+_LETTER_PITCH_CLASSES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+_ACCIDENTALS = {'#': 1, 'b': -1, '-': -1}
+
+def midi_to_name(midi_note: int) -> str:
+    """Name with octave for a MIDI number, matching music21's nameWithOctave."""
+    if 0 <= midi_note < 128:
+        return MIDI_NOTE_NAMES[midi_note]
+    return f"{PITCH_CLASS_NAMES[midi_note % 12]}{midi_note // 12 - 1}"
+
+def parse_note_name(name: str) -> Tuple[int, Optional[int]]:
+    """
+    Parse a note name like 'C', 'F#', 'Bb', 'E-' or 'C#4'.
+    
+    Returns:
+        (semitones above C, octave or None); semitones may be -1 or 12 for Cb/B#
+    """
+    name = name.strip()
+    if not name or name[0].upper() not in _LETTER_PITCH_CLASSES:
+        raise ValueError(f"Invalid note name: {name!r}")
+    
+    semitones = _LETTER_PITCH_CLASSES[name[0].upper()]
+    i = 1
+    while i < len(name) and name[i] in _ACCIDENTALS:
+        semitones += _ACCIDENTALS[name[i]]
+        i += 1
+    
+    octave_text = name[i:]
+    if not octave_text:
+        return semitones, None
+    try:
+        return semitones, int(octave_text)
+    except ValueError:
+        raise ValueError(f"Invalid note name: {name!r}")
+
+def note_name_to_midi(name: str, octave: Optional[int] = None) -> int:
+    """MIDI number for a note name; `octave` is used when the name has none."""
+    semitones, name_octave = parse_note_name(name)
+    if name_octave is None:
+        name_octave = 4 if octave is None else octave
+    return (name_octave + 1) * 12 + semitones
+
+def pitch_class(name: Union[str, int]) -> int:
+    """Pitch class (0-11) of a note name or MIDI number."""
+    if isinstance(name, int):
+        return name % 12
+    return parse_note_name(name)[0] % 12
 
 def alter_scale_degrees(base_scale, alterations: Dict[int, int]):
     """
@@ -30,32 +108,122 @@ def alter_scale_degrees(base_scale, alterations: Dict[int, int]):
 def get_scale_intervals(scale_type: str) -> List[int]:
     """
     Get the semitone intervals for a given scale type.
-    Includes standard scales and custom scales like Phrygian Dominant.
+    Includes standard scales, custom scales like Phrygian Dominant and any
+    scale registered with SCALE_REGISTRY.
     
     Returns:
         List of semitone intervals from root
     """
-    standard_scales = {
-        "major": [0, 2, 4, 5, 7, 9, 11],
-        "minor": [0, 2, 3, 5, 7, 8, 10],
-        "harmonic minor": [0, 2, 3, 5, 7, 8, 11],
-        "melodic minor": [0, 2, 3, 5, 7, 9, 11],
-        "pentatonic": [0, 2, 4, 7, 9],
-        "minor pentatonic": [0, 3, 5, 7, 10],
-        "blues": [0, 3, 5, 6, 7, 10],
-        "chromatic": [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11],
-        "whole tone": [0, 2, 4, 6, 8, 10],
-        "dorian": [0, 2, 3, 5, 7, 9, 10],
-        "phrygian": [0, 1, 3, 5, 7, 8, 10],
-        "lydian": [0, 2, 4, 6, 7, 9, 11],
-        "mixolydian": [0, 2, 4, 5, 7, 9, 10],
-        "aeolian": [0, 2, 3, 5, 7, 8, 10],
-        "locrian": [0, 1, 3, 5, 6, 8, 10],
-        # Custom scales
-        "phrygian dominant": [0, 1, 4, 5, 7, 8, 10]  # Phrygian with raised 3rd
-    }
-    
-    return standard_scales.get(scale_type, standard_scales["major"])
+    return list(SCALE_REGISTRY.intervals(scale_type))
+
+@dataclass(frozen=True)
+class ScaleTable:
+    """Precomputed lookup tables for one scale on one root."""
+    name: str
+    root: int  # Root pitch class
+    intervals: Tuple[int, ...]
+    pitch_classes: Tuple[int, ...]  # Pitch class of each degree, in degree order
+    pitch_names: Tuple[str, ...]  # Name of each degree, e.g. ('D', 'E', 'F#', ...)
+    degree_of_pc: Tuple[int, ...]  # Pitch class -> closest 0-based degree
+    snap_offsets: Tuple[int, ...]  # Pitch class -> semitones to the nearest scale tone
+    
+    def snap(self, midi_note: int) -> int:
+        """Snap a MIDI note to the nearest scale tone"""
+        return midi_note + self.snap_offsets[midi_note % 12]
+    
+    def contains(self, midi_note: int) -> bool:
+        return self.pitch_classes[self.degree_of_pc[midi_note % 12]] == midi_note % 12
+    
+    def note_at(self, root_midi: int, index: int) -> int:
+        """MIDI number of the index-th note ascending from root_midi"""
+        octave_offset, degree = divmod(index, len(self.intervals))
+        return root_midi + self.intervals[degree] + octave_offset * 12
+    
+    def transpose_steps(self, pitches: np.ndarray, steps: Union[int, np.ndarray]) -> np.ndarray:
+        """
+        Move MIDI notes by scale steps, like MusicTransformer.transpose_by_scale_degree
+        (notes outside the scale move with their closest degree).
+
+        steps broadcasts against pitches: a column of steps (shape (voices, 1))
+        gives one row of pitches per step count.
+        """
+        pitches = np.asarray(pitches, dtype=np.int64)
+        intervals = np.asarray(self.intervals, dtype=np.int64)
+        degree = np.asarray(self.degree_of_pc, dtype=np.int64)[pitches % 12]
+        octave, target = np.divmod(degree + steps, len(intervals))
+        return pitches + intervals[target] - intervals[degree] + octave * 12
+
+def _build_scale_table(name: str, root: int, intervals: Tuple[int, ...]) -> ScaleTable:
+    degree_of_pc = []
+    for pc in range(12):
+        interval_from_root = (pc - root) % 12
+        # Exact match, else the closest interval (first wins on ties)
+        if interval_from_root in intervals:
+            degree_of_pc.append(intervals.index(interval_from_root))
+        else:
+            closest = min(intervals, key=lambda x: abs(x - interval_from_root))
+            degree_of_pc.append(intervals.index(closest))
+    
+    pitch_classes = tuple((root + iv) % 12 for iv in intervals)
+    
+    # Nearest scale pitch class within the octave (lowest wins on ties), moved
+    # an octave when that is more than a tritone away
+    snap_offsets = []
+    for pc in range(12):
+        offset = min(sorted(pitch_classes), key=lambda x: abs(x - pc)) - pc
+        if abs(offset) > 6:
+            offset += 12 if offset < 0 else -12
+        snap_offsets.append(offset)
+    
+    return ScaleTable(
+        name=name,
+        root=root,
+        intervals=intervals,
+        pitch_classes=pitch_classes,
+        pitch_names=tuple(PITCH_CLASS_NAMES[pc] for pc in pitch_classes),
+        degree_of_pc=tuple(degree_of_pc),
+        snap_offsets=tuple(snap_offsets)
+    )
+
+class ScaleRegistry:
+    """
+    Immutable scale tables for every registered scale on all 12 roots.
+    
+    Built once at import time. Registering a scale builds its tables and swaps
+    in a new read-only mapping, so lookups never lock or see a partial update.
+    """
+    
+    def __init__(self, scales: Dict[str, Sequence[int]], default: str = "major"):
+        self.default = default
+        self._lock = threading.Lock()
+        self._tables = MappingProxyType({})
+        self._intervals = MappingProxyType({})
+        for name, intervals in scales.items():
+            self.register(name, intervals)
+    
+    def register(self, name: str, intervals: Sequence[int]) -> None:
+        """Add (or replace) a scale from its semitone intervals"""
+        intervals = tuple(sorted({int(iv) % 12 for iv in intervals}))
+        if not intervals or intervals[0] != 0:
+            raise ValueError(f"Scale {name!r} must include the root (interval 0)")
+        
+        new_tables = {(name, root): _build_scale_table(name, root, intervals) for root in range(12)}
+        with self._lock:
+            self._tables = MappingProxyType({**self._tables, **new_tables})
+            self._intervals = MappingProxyType({**self._intervals, name: intervals})
+    
+    def names(self) -> List[str]:
+        return list(self._intervals.keys())
+    
+    def intervals(self, scale_type: str) -> Tuple[int, ...]:
+        """Intervals for scale_type, falling back to the default scale"""
+        return self._intervals.get(scale_type, self._intervals[self.default])
+    
+    def get(self, scale_type: str, root: Union[str, int] = 0) -> ScaleTable:
+        """Tables for scale_type on root (a note name or pitch class)"""
+        if scale_type not in self._intervals:
+            scale_type = self.default
+        return self._tables[(scale_type, pitch_class(root))]
 
 def create_custom_scale(root_note: str, octave: int, scale_type: str) -> Optional[scale.ConcreteScale]:
     """
@@ -85,23 +253,17 @@ def generate_scale_notes(root_note: str, octave: int, scale_type: str, num_notes
     Returns:
         List of dicts with 'midi' and 'pitch_name' for each note
     """
-    intervals = get_scale_intervals(scale_type)
-    
-    # Convert root note to MIDI number
-    root_note_obj = note.Note(f"{root_note}{octave}")
-    root_midi = root_note_obj.pitch.midi
+    table = SCALE_REGISTRY.get(scale_type, root_note)
+    root_midi = note_name_to_midi(root_note, octave)
     
     notes = []
     for i in range(num_notes):
-        scale_degree = i % len(intervals)
-        octave_offset = i // len(intervals)
-        
-        midi_note = root_midi + intervals[scale_degree] + (octave_offset * 12)
-        note_obj = note.Note(midi=midi_note)
-        
+        midi_note = table.note_at(root_midi, i)
         notes.append({
             'midi': midi_note,
-            'pitch_name': note_obj.nameWithOctave
+            'pitch_name': midi_to_name(midi_note)
         })
     
-    return notes
\ No newline at end of file
+    return notes
+
+SCALE_REGISTRY = ScaleRegistry(STANDARD_SCALES)
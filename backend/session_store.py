@@ -0,0 +1,314 @@
+import contextlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from persistent_vector import PersistentVector
+
+
+class SessionNotFound(KeyError):
+    """Raised when a session ID is unknown or has expired."""
+
+
+@dataclass(frozen=True)
+class LayerVersion:
+    """One entry of a layer's edit history"""
+    version: int
+    op: str
+    created: float  # Unix time
+    note_count: int
+    notes: PersistentVector  # Notes by ID at this version (None for deleted IDs)
+    restored_from: Optional[int] = None
+
+    def summary(self) -> Dict:
+        summary = {'version': self.version, 'op': self.op, 'created': self.created, 'noteCount': self.note_count}
+        if self.restored_from is not None:
+            summary['restoredFrom'] = self.restored_from
+        return summary
+
+
+class LayerBuffer:
+    """Current note buffer of a single layer, addressed by stable note IDs.
+
+    Every mutation that changes a note bumps `version` (edits that change
+    nothing leave it alone), which also keys the derived-data cache so exports
+    and OSC payloads are only rebuilt after the layer actually changed. Each
+    edit is all-or-nothing, and batch() makes several edits one version.
+
+    Each version is also kept in `history` as a persistent vector of notes by
+    ID. Versions share every part of the vector an edit didn't touch (note
+    dicts are never modified in place), so the history costs memory per edit,
+    not per snapshot. The oldest versions are dropped past `max_history`.
+    """
+
+    def __init__(self, notes: Iterable[Dict] = (), max_notes: int = 200_000, max_history: int = 1000):
+        self.max_notes = max_notes
+        self.max_history = max_history
+        self.notes: Dict[int, Dict] = {}
+        self.next_id = 0
+        self.version = 0
+        self.history: "OrderedDict[int, LayerVersion]" = OrderedDict()
+        self._vector = PersistentVector()
+        self._cache: Dict[Any, Any] = {}
+        self._pending: Optional[Dict[int, Optional[Dict]]] = None  # Changes of the open batch
+        # Version 1 is the initial notes, even if there are none
+        changes = {}
+        self._insert(notes, changes)
+        self._vector = self._vector.update(changes)
+        self._touch()
+        self._record('insert')
+
+    @contextlib.contextmanager
+    def batch(self, op: str = 'batch'):
+        """Apply the edits made inside as one version: all of them, or none if one raises"""
+        if self._pending is not None:
+            yield self._pending  # Part of an enclosing batch
+            return
+        changes: Dict[int, Optional[Dict]] = {}
+        next_id = self.next_id
+        self._pending = changes
+        try:
+            yield changes
+        except BaseException:
+            self._pending = None
+            self._rollback(changes, next_id)
+            raise
+        self._pending = None
+        self._commit(op, changes)
+
+    def insert(self, notes: Iterable[Dict]) -> List[int]:
+        """Insert notes and return their newly assigned IDs"""
+        with self.batch('insert') as changes:
+            return self._insert(notes, changes)
+
+    def _insert(self, notes: Iterable[Dict], changes: Dict[int, Optional[Dict]]) -> List[int]:
+        new_ids = []
+        for note_data in notes:
+            if len(self.notes) >= self.max_notes:
+                raise ValueError(f"Layer note limit of {self.max_notes} reached")
+            note_id = self.next_id
+            self.next_id += 1
+            self.notes[note_id] = changes[note_id] = {
+                'midi': int(note_data['midi']),
+                'time': float(note_data['time']),
+                'duration': float(note_data['duration']),
+                'velocity': float(note_data.get('velocity', 0.7))
+            }
+            new_ids.append(note_id)
+        return new_ids
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """Delete notes by ID, returning how many were removed"""
+        with self.batch('delete') as changes:
+            return self._delete(ids, changes)
+
+    def _delete(self, ids: Iterable[int], changes: Dict[int, Optional[Dict]]) -> int:
+        removed = 0
+        for note_id in ids:
+            if self.notes.pop(note_id, None) is not None:
+                changes[note_id] = None
+                removed += 1
+        return removed
+
+    def move(self, ids: Iterable[int], dt: float = 0.0, dmidi: int = 0) -> int:
+        """Shift notes in time and pitch, clamped to valid positions"""
+        moved = 0
+        with self.batch('move') as changes:
+            for note_id in ids:
+                note_data = self.notes.get(note_id)
+                if note_data is None:
+                    continue
+                # A new dict: older versions still hold the old one
+                self.notes[note_id] = changes[note_id] = {
+                    **note_data,
+                    'time': max(0.0, note_data['time'] + dt),
+                    'midi': max(0, min(127, note_data['midi'] + dmidi))
+                }
+                moved += 1
+        return moved
+
+    def transform_range(self, start: float, end: float,
+                        transform: Callable[[List[Dict]], List[Dict]]) -> List[int]:
+        """Replace the notes starting in [start, end) with transform(notes).
+
+        One-to-one transforms keep their note IDs; transforms that change the
+        number of notes (ornaments, development) get fresh IDs.
+        """
+        selected = sorted(
+            ((note_id, n) for note_id, n in self.notes.items() if start <= n['time'] < end),
+            key=lambda item: item[1]['time']
+        )
+        if not selected:
+            return []
+
+        result = transform([dict(n) for _, n in selected])
+
+        with self.batch('transform-range') as changes:
+            if len(result) == len(selected):
+                for (note_id, _), new_note in zip(selected, result):
+                    self.notes[note_id] = changes[note_id] = {
+                        'midi': int(new_note['midi']),
+                        'time': float(new_note['time']),
+                        'duration': float(new_note['duration']),
+                        'velocity': float(new_note.get('velocity', 0.7))
+                    }
+                return [note_id for note_id, _ in selected]
+
+            self._delete((note_id for note_id, _ in selected), changes)
+            return self._insert(result, changes)
+
+    def restore(self, version: int) -> LayerVersion:
+        """Make an earlier version current again, recorded as a new version"""
+        snapshot = self.get_version(version)
+        self._vector = snapshot.notes
+        self.notes = {note_id: n for note_id, n in enumerate(snapshot.notes) if n is not None}
+        self._touch()
+        return self._record('restore', restored_from=version)
+
+    def get_version(self, version: int) -> LayerVersion:
+        snapshot = self.history.get(version)
+        if snapshot is None:
+            raise KeyError(f"Unknown or expired version {version}")
+        return snapshot
+
+    def diff(self, base: int, version: int) -> Dict[str, List[Dict]]:
+        """Notes added, removed and changed from version `base` to `version`"""
+        added, removed, changed = [], [], []
+        for note_id, before, after in self.get_version(base).notes.diff(self.get_version(version).notes):
+            if before is None:
+                added.append({**after, 'id': note_id})
+            elif after is None:
+                removed.append({**before, 'id': note_id})
+            else:
+                changed.append({'id': note_id, 'before': before, 'after': after})
+        return {'added': added, 'removed': removed, 'changed': changed}
+
+    def sorted_notes(self) -> List[Dict]:
+        """Notes sorted by start time, cached until the next edit"""
+        return self.cached('sorted', lambda: sorted(
+            ({**n, 'id': note_id} for note_id, n in self.notes.items()),
+            key=lambda n: n['time']
+        ))
+
+    def cached(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """Return derived data for the current version, computing it on a miss"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _commit(self, op: str, changes: Dict[int, Optional[Dict]]) -> None:
+        if not changes:
+            return  # Nothing changed: keep the version, so clients' expected versions stay valid
+        self._vector = self._vector.update(changes)
+        self._touch()
+        self._record(op)
+
+    def _record(self, op: str, restored_from: Optional[int] = None) -> LayerVersion:
+        entry = LayerVersion(self.version, op, time.time(), len(self.notes), self._vector, restored_from)
+        self.history[self.version] = entry
+        while len(self.history) > self.max_history:
+            self.history.popitem(last=False)
+        return entry
+
+    def _rollback(self, changes: Dict[int, Optional[Dict]], next_id: int) -> None:
+        """Undo uncommitted changes: the last committed version is still in _vector"""
+        for note_id in changes:
+            before = self._vector.get(note_id) if note_id < len(self._vector) else None
+            if before is None:
+                self.notes.pop(note_id, None)
+            else:
+                self.notes[note_id] = before
+        self.next_id = next_id
+        self._cache.clear()
+
+    def _touch(self):
+        self.version += 1
+        self._cache.clear()
+
+
+class LayerSession:
+    """A client's set of layer buffers"""
+
+    def __init__(self, session_id: str, max_notes_per_layer: int, max_history_per_layer: int = 1000):
+        self.id = session_id
+        self.max_notes_per_layer = max_notes_per_layer
+        self.max_history_per_layer = max_history_per_layer
+        self.layers: Dict[str, LayerBuffer] = {}
+        self.lock = threading.RLock()
+        self.last_access = time.monotonic()
+
+    def layer(self, layer_id: str, create: bool = False, notes: Iterable[Dict] = ()) -> LayerBuffer:
+        """A layer's buffer; with create, a missing layer starts at version 1 holding `notes`"""
+        layer_id = str(layer_id)
+        if layer_id not in self.layers:
+            if not create:
+                raise KeyError(f"Unknown layer {layer_id}")
+            self.layers[layer_id] = LayerBuffer(notes, max_notes=self.max_notes_per_layer,
+                                                 max_history=self.max_history_per_layer)
+        return self.layers[layer_id]
+
+    def summary(self) -> Dict:
+        return {
+            'session_id': self.id,
+            'layers': {
+                layer_id: {'version': buf.version, 'noteCount': len(buf.notes)}
+                for layer_id, buf in self.layers.items()
+            }
+        }
+
+
+class LayerSessionStore:
+    """In-memory, bounded store of layer sessions.
+
+    Sessions are evicted least-recently-used once `max_sessions` is reached and
+    expire after `ttl_seconds` without access.
+    """
+
+    def __init__(self, max_sessions: int = 64, ttl_seconds: float = 3600,
+                 max_notes_per_layer: int = 200_000, max_history_per_layer: int = 1000):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_notes_per_layer = max_notes_per_layer
+        self.max_history_per_layer = max_history_per_layer
+        self._sessions: "OrderedDict[str, LayerSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, layers: Optional[Dict[str, List[Dict]]] = None) -> LayerSession:
+        session = LayerSession(uuid.uuid4().hex, self.max_notes_per_layer, self.max_history_per_layer)
+        for layer_id, notes in (layers or {}).items():
+            session.layer(layer_id, create=True, notes=notes)  # Seeded as version 1, not an edit
+
+        with self._lock:
+            self._expire()
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> LayerSession:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise SessionNotFound(session_id)
+            self._sessions.move_to_end(session_id)
+            session.last_access = time.monotonic()
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if oldest.last_access >= cutoff:
+                break
+            del self._sessions[oldest_id]
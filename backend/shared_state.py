@@ -0,0 +1,164 @@
+"""
+Shared state in a local SQLite database, safe across worker processes.
+
+settings.json was rewritten in place without locking, so with several
+workers (`uvicorn --workers N`, or several instances on one machine) a read
+could see a half-written file and concurrent saves could interleave. A
+SharedStateStore keeps named JSON documents ("settings", and whatever else
+has to be shared between workers later) in one SQLite database in WAL mode:
+
+- every write is one transaction that replaces the whole document and bumps
+  its version, so readers only ever see complete documents, and never block
+  on writers (WAL);
+- each document's version counter is how workers invalidate what they cached:
+  get() keeps the decoded document per process and only re-reads and decodes
+  it when the stored version has moved on;
+- compare-and-set writes (expected_version) let a caller detect that another
+  worker saved in between.
+
+Connections are per thread (sqlite3 connections must not be shared between
+threads) and per process (never reused across fork).
+"""
+import contextlib
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+BUSY_TIMEOUT_MS = 10_000  # How long a writer waits for another worker's write transaction
+
+class VersionConflict(Exception):
+    """A compare-and-set write found a different version than expected"""
+
+    def __init__(self, name: str, expected: int, actual: int):
+        super().__init__(f"{name} is at version {actual}, not {expected}: it was changed by another writer")
+        self.name = name
+        self.expected = expected
+        self.actual = actual
+
+class SharedStateStore:
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._cache: Dict[str, Tuple[int, Any]] = {}  # name -> (version, decoded value)
+        self._cache_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    name TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Autocommit mode: transactions are opened explicitly in _transaction()
+            conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: commits survive a worker crash (a power cut may lose the last few) and
+            # don't wait for an fsync
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT: takes the write lock up front, so a read
+        and a write inside the transaction can't race another worker's write"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, name: str, encoded: str, version: int) -> None:
+        conn.execute(
+            "INSERT INTO documents (name, value, version, updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value, version = excluded.version, "
+            "updated = excluded.updated",
+            (name, encoded, version, time.time())
+        )
+
+    def version(self, name: str) -> int:
+        """Current version of a document (0 if it was never written)"""
+        row = self._connection().execute("SELECT version FROM documents WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """The document's value (a copy), or default if it was never written"""
+        return self.get_versioned(name, default)[0]
+
+    def get_versioned(self, name: str, default: Any = None) -> Tuple[Any, int]:
+        version = self.version(name)
+        if version == 0:
+            return default, 0
+        with self._cache_lock:
+            cached = self._cache.get(name)
+        if cached is None or cached[0] != version:
+            row = self._connection().execute("SELECT value, version FROM documents WHERE name = ?",
+                                             (name,)).fetchone()
+            cached = (row[1], json.loads(row[0]))
+            with self._cache_lock:
+                # Another thread may have cached a newer version meanwhile
+                if name not in self._cache or self._cache[name][0] < cached[0]:
+                    self._cache[name] = cached
+        return copy.deepcopy(cached[1]), cached[0]
+
+    def put(self, name: str, value: Any, expected_version: Optional[int] = None) -> int:
+        """
+        Replace a document, returning its new version. With expected_version,
+        raises VersionConflict unless the stored version still matches.
+        """
+        encoded = json.dumps(value)
+        with self._transaction() as conn:
+            row = conn.execute("SELECT version FROM documents WHERE name = ?", (name,)).fetchone()
+            current = row[0] if row else 0
+            if expected_version is not None and expected_version != current:
+                raise VersionConflict(name, expected_version, current)
+            self._write(conn, name, encoded, current + 1)
+        with self._cache_lock:
+            self._cache[name] = (current + 1, json.loads(encoded))
+        return current + 1
+
+    def update(self, name: str, func: Callable[[Any], Any], default: Any = None) -> Tuple[Any, int]:
+        """Read-modify-write under the write lock: stores func(current value) and returns it with its version"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value, version FROM documents WHERE name = ?", (name,)).fetchone()
+            current, version = (json.loads(row[0]), row[1]) if row else (copy.deepcopy(default), 0)
+            value = func(current)
+            self._write(conn, name, json.dumps(value), version + 1)
+        return value, version + 1
+
+    def import_file(self, name: str, path: Union[str, Path]) -> bool:
+        """Seed a document from a JSON file (e.g. the old settings.json) unless it already exists"""
+        path = Path(path)
+        if not path.exists():
+            return False
+        with open(path, 'r') as f:
+            value = json.load(f)
+        try:
+            self.put(name, value, expected_version=0)
+        except VersionConflict:
+            return False  # Already there, or another worker imported it first
+        return True
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
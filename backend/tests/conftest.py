@@ -0,0 +1,50 @@
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+# Tests import the backend modules directly, like the benchmarks do
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="session")
+def main_module(tmp_path_factory):
+    """The app module, with its settings database, caches and lock under a temp directory
+
+    Importing main creates those files, so it runs from an empty working
+    directory with every path setting pointed there.
+    """
+    workdir = tmp_path_factory.mktemp("backend")
+    (workdir / "corpus").mkdir()
+    patch = pytest.MonkeyPatch()
+    patch.chdir(workdir)
+    for name, value in {"SETTINGS_DB": workdir / "settings.db", "NOTE_STORE_DIR": workdir / "note_cache",
+                        "PROFILE_DIR": workdir / "profiles", "CORPUS_DIR": workdir / "corpus",
+                        "MELODY_WATCH_DIR": workdir / "corpus", "WARMUP_ON_STARTUP": "0"}.items():
+        patch.setenv(name, str(value))
+    sys.modules.pop("main", None)
+    yield importlib.import_module("main")
+    sys.modules.pop("main", None)
+    patch.undo()
+
+
+@pytest.fixture
+def client(main_module):
+    from fastapi.testclient import TestClient
+    with TestClient(main_module.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_midi():
+    """MIDI file bytes with one track per list of pitches (half-second notes)"""
+    from midi_utils import conductor_track, midi_file_bytes, notes_track
+
+    def make(*tracks):
+        return midi_file_bytes([conductor_track()] + [
+            notes_track([i * 0.5 for i in range(len(pitches))], [0.5] * len(pitches), pitches, [0.8] * len(pitches),
+                        name=f'track {n}')
+            for n, pitches in enumerate(tracks)
+        ])
+    return make
@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.responses import JSONResponse
+
+from admission import AdmissionClass, AdmissionMiddleware, AdmissionRejected
+
+
+def test_waiters_are_admitted_in_order():
+    async def run():
+        admission = AdmissionClass('transform', limit=1, max_queue=5, max_wait=5)
+        order = []
+        await admission.acquire()
+
+        async def request(name):
+            await admission.acquire()
+            order.append(name)
+            await asyncio.sleep(0)
+            admission.release()
+
+        tasks = [asyncio.create_task(request(name)) for name in 'abc']
+        await asyncio.sleep(0.01)
+        assert admission.waiting == 3 and admission.running == 1
+        admission.release(0.5)
+        await asyncio.gather(*tasks)
+        return admission, order
+
+    admission, order = asyncio.run(run())
+    assert order == ['a', 'b', 'c']
+    assert admission.running == 0 and admission.waiting == 0
+    assert admission.stats()['queued'] == 3 and admission.stats()['peakQueueDepth'] == 3
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def run():
+        admission = AdmissionClass('import', limit=2, max_queue=1, max_wait=5)
+        await admission.acquire()
+        admission.release(3.0)  # Requests take about 3 s
+        await admission.acquire()
+        await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        waiter.cancel()
+        return admission, rejected.value
+
+    admission, rejected = asyncio.run(run())
+    assert 'queue is full' in rejected.reason
+    assert rejected.retry_after == 5  # 3 s each for 2 running plus 1 waiting, 2 at a time
+    assert admission.stats()['rejectedQueueFull'] == 1 and admission.stats()['abandoned'] == 1
+
+
+def test_wait_times_out():
+    async def run():
+        admission = AdmissionClass('gesture', limit=1, max_queue=5, max_wait=0.02)
+        await admission.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        admission.release()
+        return admission, rejected.value
+
+    admission, rejected = asyncio.run(run())
+    assert 'waited 0.02s' in rejected.reason
+    assert admission.running == 0 and admission.waiting == 0 and admission.stats()['rejectedTimeout'] == 1
+
+
+def test_middleware_returns_503_when_busy():
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        if scope['path'].startswith('/transform/slow'):
+            await release.wait()
+        await JSONResponse({'ok': True})(scope, receive, send)
+
+    async def run():
+        admission = AdmissionClass('transform', limit=1, max_queue=1, max_wait=5)
+        middleware = AdmissionMiddleware(app, {'transform': admission}, [(r'/transform/', 'transform')])
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url='http://test') as client:
+            slow = asyncio.create_task(client.post('/transform/slow'))
+            queued = asyncio.create_task(client.post('/transform/fast'))
+            await asyncio.sleep(0.05)
+            rejected = await client.post('/transform/fast')
+            bypass = await client.get('/settings')  # Outside every class
+            release.set()
+            return admission, rejected, bypass, await slow, await queued
+
+    admission, rejected, bypass, slow, queued = asyncio.run(run())
+    assert rejected.status_code == 503 and int(rejected.headers['Retry-After']) >= 1
+    assert 'queue is full' in rejected.json()['error']
+    assert bypass.status_code == slow.status_code == queued.status_code == 200
+    assert admission.running == 0 and admission.stats()['admitted'] == 2
+
+
+def test_admission_stats_endpoint(client):
+    classes = client.get('/admission/stats').json()['classes']
+    assert set(classes) == {'import', 'transform', 'gesture'}
+    assert '/transform/' in classes['transform']['routes']
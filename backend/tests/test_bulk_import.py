@@ -0,0 +1,77 @@
+import asyncio
+import io
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bulk_import import ArchiveLimitExceeded, bulk_import_results, iter_archive_members
+
+
+def zip_archive(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def tar_archive(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('build, filename', [(zip_archive, 'songs.zip'), (tar_archive, 'songs.tar.gz')])
+def test_only_midi_members_are_read(build, filename):
+    files = {'a.mid': b'A', 'dir/b.MIDI': b'BB', 'notes.txt': b'x', '.hidden.mid': b'x',
+             '__MACOSX/dir/._b.mid': b'x'}
+    members = list(iter_archive_members(io.BytesIO(build(files)), filename, 10, 1000))
+    assert members == [('a.mid', b'A'), ('dir/b.MIDI', b'BB')]
+
+
+@pytest.mark.parametrize('build, filename', [(zip_archive, 'songs.zip'), (tar_archive, 'songs.tgz')])
+@pytest.mark.parametrize('max_files, max_bytes', [(2, 1000), (10, 25)])
+def test_limits(build, filename, max_files, max_bytes):
+    archive = build({f'{i}.mid': b'x' * 10 for i in range(3)})
+    with pytest.raises(ArchiveLimitExceeded):
+        list(iter_archive_members(io.BytesIO(archive), filename, max_files, max_bytes))
+
+
+def test_results_stream_with_a_summary(make_midi):
+    members = iter([('good.mid', make_midi([60, 62, 64])), ('bad.mid', b'not a midi file'),
+                    ('two.mid', make_midi([60], [67, 69]))])
+
+    async def collect():
+        with ThreadPoolExecutor(2) as executor:
+            return [result async for result in bulk_import_results(members, executor)]
+
+    results = asyncio.run(collect())
+    summary = results.pop()
+    by_file = {result['file']: result for result in results}
+    assert sorted(result['index'] for result in results) == [0, 1, 2]
+    assert by_file['good.mid']['success'] and by_file['good.mid']['tracks'][0]['noteCount'] == 3
+    assert len(by_file['two.mid']['tracks']) == 2
+    assert not by_file['bad.mid']['success'] and 'error' in by_file['bad.mid']
+    assert summary['done'] and summary['success']
+    assert (summary['filesImported'], summary['filesFailed']) == (2, 1)
+
+
+def test_read_error_ends_with_an_error_summary(make_midi):
+    def members():
+        yield 'good.mid', make_midi([60])
+        raise ArchiveLimitExceeded('Archive has more than 1 MIDI files')
+
+    async def collect():
+        with ThreadPoolExecutor(1) as executor:
+            return [result async for result in bulk_import_results(members(), executor)]
+
+    results = asyncio.run(collect())
+    assert results[0]['success']
+    assert results[-1]['done'] and not results[-1]['success']
+    assert 'more than 1' in results[-1]['error']
@@ -0,0 +1,35 @@
+import random
+
+from corpus import MelodyCorpus
+
+
+def random_melody(rng, length=16):
+    return [rng.randrange(48, 84) for _ in range(length)]
+
+
+def test_small_corpus_exact_match():
+    rng = random.Random(1)
+    melody = [60, 62, 64, 65, 67, 65, 64, 62, 60, 67, 72, 71]
+    corpus = MelodyCorpus()
+    for i in range(7):
+        corpus.add(random_melody(rng), 'test', f'other-{i}')
+    # The same melody three times, once transposed: 3 of 10 melodies share all its n-grams
+    for i, shift in enumerate((0, 0, 5)):
+        corpus.add([p + shift for p in melody], 'test', f'match-{i}')
+    assert len(corpus) == 10
+
+    results = corpus.query(melody, top_k=3)
+    assert {r['name'] for r in results} == {'match-0', 'match-1', 'match-2'}
+    assert all(r['score'] > 0.9 for r in results)
+
+
+def test_common_ngrams_used_when_nothing_else_matches():
+    rng = random.Random(2)
+    corpus = MelodyCorpus(min_df_corpus=1)
+    shared = [60, 62, 64, 65, 67]
+    for i in range(10):
+        corpus.add(shared + [p + 24 for p in random_melody(rng, 8)], 'test', f'melody-{i}')
+
+    # Every n-gram of the query is in all 10 melodies, above the df cutoff
+    results = corpus.query(shared, top_k=10)
+    assert len(results) == 10
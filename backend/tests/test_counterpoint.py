@@ -0,0 +1,110 @@
+import itertools
+import random
+import time
+
+import pytest
+
+from counterpoint import (COUNTERPOINT_HIGH, COUNTERPOINT_LOW, BeamCounterpointSolver, counterpoint_candidates,
+                          generate_counterpoint_batch, generate_counterpoint_notes, greedy_counterpoint_pitches,
+                          score_counterpoint)
+from scale_utils import SCALE_REGISTRY
+
+MELODY = [60, 62, 64, 65, 67, 65, 64, 62, 60, 67, 72, 71, 69, 67, 65, 64]
+
+
+def legacy_counterpoint(melody, scale_pitches):
+    """The per-request path the snap tables replaced (pitch-class list rebuilt for every note)"""
+    out = []
+    for i, midi in enumerate(melody):
+        direction = -1 if i == 0 or midi - melody[i - 1] > 0 else 1
+        for interval in (4, 9, 7, 12):
+            candidate = midi + interval * direction
+            if 48 <= candidate <= 84:
+                note_class, octave = candidate % 12, candidate // 12
+                degrees = sorted({p % 12 for p in scale_pitches})
+                result = octave * 12 + min(degrees, key=lambda d: abs(d - note_class))
+                if abs(result - candidate) > 6:
+                    result += 12 if result < candidate else -12
+                out.append(result)
+                break
+    return out
+
+
+def random_melody(seed, length=200, low=55, high=80):
+    rng = random.Random(seed)
+    return [rng.randint(low, high) for _ in range(length)]
+
+
+@pytest.mark.parametrize('scale_type', SCALE_REGISTRY.names())
+def test_greedy_matches_the_old_snapping(scale_type):
+    table = SCALE_REGISTRY.get(scale_type, 'D')
+    scale_pitches = [62 + interval for interval in table.intervals]
+    melody = random_melody(len(scale_type))
+    assert greedy_counterpoint_pitches(melody, table) == legacy_counterpoint(melody, scale_pitches)
+
+
+def test_counterpoint_notes_alternate():
+    table = SCALE_REGISTRY.get('major', 'C')
+    notes = [{'midi': midi, 'time': i * 0.5, 'duration': 0.5, 'velocity': 0.8} for i, midi in enumerate(MELODY)]
+    result = generate_counterpoint_notes(notes, table)
+    assert [n['id'] for n in result[:4]] == ['orig-0', 'cp-0', 'orig-1', 'cp-1']
+    assert [n['time'] for n in result[:4]] == [0.0, 0.5, 1.0, 1.5]
+    assert all(table.contains(n['midi']) for n in result[1::2])
+    assert result[1]['velocity'] == pytest.approx(0.8 * 0.7)
+    assert generate_counterpoint_batch([notes, notes[:4]], table) == [result, result[:8]]
+
+
+@pytest.mark.parametrize('below', [True, False])
+def test_wide_beam_finds_the_optimum(below):
+    # Costs only depend on the previous note pair, so a beam that keeps every
+    # last pitch is exhaustive
+    table = SCALE_REGISTRY.get('major', 'C')
+    melody = [67, 69, 71, 72, 71]
+    candidates = [counterpoint_candidates(table, pitch, below, 4) for pitch in melody]
+    best = min(score_counterpoint(melody, line, below)['cost'] for line in itertools.product(*candidates))
+    pitches, stats = BeamCounterpointSolver(table, beam_width=64, time_budget=10, below=below).solve(melody)
+    assert stats['cost'] == best
+    assert stats['budgetExhaustedAt'] is None
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_beam_beats_greedy(seed):
+    table = SCALE_REGISTRY.get('minor', 'A')
+    melody = random_melody(seed, 64, 60, 79)
+    pitches, stats = BeamCounterpointSolver(table, beam_width=8, time_budget=10).solve(melody)
+    greedy = score_counterpoint(melody, greedy_counterpoint_pitches(melody, table))
+    assert len(pitches) == len(melody)
+    assert stats['violations'] == 0
+    assert stats['cost'] <= greedy['cost']
+    assert all(table.contains(p) and COUNTERPOINT_LOW <= p <= COUNTERPOINT_HIGH for p in pitches)
+    assert all(cp <= melody_pitch + 4 for cp, melody_pitch in zip(pitches, melody))  # Stays below, crossing <= 4
+
+
+def request(main_module, **kwargs):
+    notes = [{'midi': midi, 'time': i * 0.5, 'duration': 0.5, 'velocity': 0.8} for i, midi in enumerate(MELODY)]
+    return main_module.CounterpointRequest(notes=notes, key='C', scale_type='major', solver='beam', **kwargs)
+
+
+def test_solver_limits_are_clamped(main_module):
+    table = SCALE_REGISTRY.get('major', 'C')
+    solver = main_module.counterpoint_solver(request(main_module, beam_width=10_000, time_budget_ms=1e9), table)
+    assert solver.beam_width == main_module.COUNTERPOINT_MAX_BEAM_WIDTH
+    assert solver.time_budget == main_module.COUNTERPOINT_MAX_TIME_BUDGET_MS / 1000
+
+
+@pytest.mark.parametrize('limits', [{'beam_width': 0}, {'beam_width': -3}, {'time_budget_ms': 0},
+                                    {'time_budget_ms': -1}])
+def test_non_positive_limits_are_rejected(client, main_module, limits):
+    response = client.post('/generate_counterpoint', json=request(main_module, **limits).dict())
+    assert 'error' in response.json()
+
+
+def test_budget_is_checked_every_note():
+    solver = BeamCounterpointSolver(SCALE_REGISTRY.get('major', 'C'), beam_width=64, time_budget=0.005)
+    melody = MELODY * 500
+    started = time.perf_counter()
+    pitches, stats = solver.solve(melody)
+    assert len(pitches) == len(melody)
+    assert stats['budgetExhaustedAt'] is not None
+    # The beam part stops within a note of the deadline; the greedy rest is fast
+    assert time.perf_counter() - started < 1.0
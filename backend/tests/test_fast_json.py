@@ -0,0 +1,29 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+import fast_json
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def encoder(request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(fast_json, 'orjson', None)
+    elif fast_json.orjson is None:
+        pytest.skip('orjson is not installed')
+    return request.param
+
+
+def test_non_finite_floats_are_null(encoder):
+    content = {'a': math.nan, 'b': [1.5, math.inf, -math.inf], 'c': np.float64('nan'),
+               'd': np.array([1.0, np.nan]), 'e': (2.0, math.nan)}
+    assert json.loads(fast_json.dumps(content)) == {'a': None, 'b': [1.5, None, None], 'c': None,
+                                                     'd': [1.0, None], 'e': [2.0, None]}
+
+
+def test_finite_output_is_unchanged(encoder):
+    content = {'notes': [{'midi': 60, 'time': 0.5, 'velocity': np.float32(0.25)}], 'ids': np.arange(3)}
+    assert json.loads(fast_json.dumps(content, pretty=True)) == {
+        'notes': [{'midi': 60, 'time': 0.5, 'velocity': 0.25}], 'ids': [0, 1, 2]}
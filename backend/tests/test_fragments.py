@@ -0,0 +1,59 @@
+import random
+from collections import Counter
+
+import pytest
+
+from fragments import FragmentView, fragment_count, sample_fragment_bounds, sample_fragments
+from transformations import MusicTransformer
+
+
+def all_fragments(n, min_length, max_length):
+    """Every (start, length), ordered by length then start (the list sampling indexes into)"""
+    return [(start, length) for length in range(min_length, min(max_length, n) + 1)
+            for start in range(n - length + 1)]
+
+
+@pytest.mark.parametrize('n, min_length, max_length', [(10, 2, 4), (3, 2, 4), (1, 2, 4), (50, 1, 16)])
+def test_fragment_count(n, min_length, max_length):
+    assert fragment_count(n, min_length, max_length) == len(all_fragments(n, min_length, max_length))
+
+
+def test_draws_match_random_choice_over_every_fragment():
+    fragments = all_fragments(40, 2, 6)
+    expected_rng, rng = random.Random(5), random.Random(5)
+    expected = [expected_rng.choice(fragments) for _ in range(500)]
+    assert list(sample_fragment_bounds(40, 500, 2, 6, rng)) == expected
+
+
+def test_draws_are_uniform():
+    fragments = all_fragments(10, 2, 4)
+    draws = 48_000
+    counts = Counter(sample_fragment_bounds(10, draws, 2, 4, random.Random(1)))
+    assert set(counts) == set(fragments)
+    expected = draws / len(fragments)
+    # Binomial standard deviation is ~44 here: allow 5 of them
+    assert all(abs(count - expected) < 5 * (expected * (1 - 1 / len(fragments))) ** 0.5
+               for count in counts.values())
+
+
+def test_no_fragments_when_too_short():
+    assert list(sample_fragments([{'midi': 60}], 4, 2, 4)) == []
+
+
+def test_fragment_view():
+    notes = [{'midi': 60 + i} for i in range(10)]
+    view = FragmentView(notes, 3, 4)
+    assert list(view) == notes[3:7]
+    assert view[0] is notes[3] and view[-1] is notes[6]
+    assert view[1:3] == notes[4:6]
+    with pytest.raises(IndexError):
+        view[4]
+
+
+def test_develop_fragment_recombines_samples():
+    notes = [{'midi': 60 + i, 'time': i * 0.5, 'duration': 0.5, 'velocity': 0.8} for i in range(16)]
+    random.seed(3)
+    developed = MusicTransformer('major', 'C').develop(notes, 'fragment', 5, 2, 3)
+    assert 10 <= len(developed) <= 15
+    assert all(a['time'] <= b['time'] for a, b in zip(developed, developed[1:]))
+    assert {n['midi'] for n in developed} <= {n['midi'] for n in notes}
@@ -0,0 +1,87 @@
+import base64
+import io
+import json
+import zipfile
+
+import pytest
+
+from gesture_sweep import combination_count, expand_sweep, iter_combinations, render_sweep, sweep_values
+
+BASE = {'layerId': 0, 'midiNote': 60, 'durationPercent': 50, 'totalDuration': 4, 'numNotes': 8,
+        'pattern': 'even', 'curve': None, 'pulses': None, 'steps': None, 'rotation': 0, 'volatility': None,
+        'seed': 1, 'velocityEnvelope': 'flat', 'velocityStart': 80, 'velocityEnd': None}
+
+
+@pytest.mark.parametrize('spec, values', [
+    ([3, 1], [3, 1]),
+    ({'start': 1, 'stop': 5, 'step': 2}, [1, 3, 5]),
+    ({'start': 0.1, 'stop': 0.3, 'step': 0.1}, [0.1, 0.2, 0.3]),  # Float noise dropped, stop included
+    ({'start': 10, 'stop': 0, 'step': -5}, [10, 5, 0]),
+    ({'start': 0, 'stop': 1, 'num': 3}, [0, 0.5, 1]),
+    ({'start': 2, 'stop': 9, 'num': 1}, [2])
+])
+def test_sweep_values(spec, values):
+    assert sweep_values(spec) == values
+
+
+@pytest.mark.parametrize('spec', [[], 5, {'start': 1}, {'start': 0, 'stop': 5, 'step': -1},
+                                  {'start': 0, 'stop': 5, 'num': 0}])
+def test_invalid_sweeps(spec):
+    with pytest.raises(ValueError):
+        sweep_values(spec)
+
+
+def test_layout_fields_vary_slowest():
+    fields, values = expand_sweep({'durationPercent': [25, 75], 'velocityEnvelope': ['flat', 'swell'],
+                                   'numNotes': [4, 8, 16]})
+    assert fields == ['numNotes', 'durationPercent', 'velocityEnvelope']
+    assert combination_count(values) == 12
+    combinations = list(iter_combinations(fields, values))
+    assert [c['numNotes'] for c in combinations] == [4] * 4 + [8] * 4 + [16] * 4
+    assert combinations[1] == {'numNotes': 4, 'durationPercent': 25, 'velocityEnvelope': 'swell'}
+
+
+def test_reused_layouts_render_like_fresh_ones():
+    fields, values = expand_sweep({'pattern': ['even', 'random-walk', 'euclidean'], 'durationPercent': [10, 90],
+                                   'velocityEnvelope': ['flat', 'random-walk']})
+    configs = [{**BASE, **params} for params in iter_combinations(fields, values)]
+    swept = [midi for _, _, midi in render_sweep(iter(configs))]
+    fresh = [next(render_sweep(iter([config])))[2] for config in configs]
+    assert swept == fresh
+    assert len(set(fresh)) == len(fresh)
+
+
+def sweep_request(**overrides):
+    return {'base': BASE, 'sweep': {'numNotes': [2, 4], 'durationPercent': {'start': 25, 'stop': 75, 'step': 50}},
+            **overrides}
+
+
+def test_ndjson_endpoint(client):
+    response = client.post('/gesture/sweep', json=sweep_request())
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {'done': True, 'count': 4}
+    assert [line['params'] for line in lines[:-1]] == [
+        {'numNotes': 2, 'durationPercent': 25}, {'numNotes': 2, 'durationPercent': 75},
+        {'numNotes': 4, 'durationPercent': 25}, {'numNotes': 4, 'durationPercent': 75}]
+    assert [line['noteCount'] for line in lines[:-1]] == [2, 2, 4, 4]
+    assert all(base64.b64decode(line['midi']).startswith(b'MThd') for line in lines[:-1])
+
+
+def test_zip_endpoint(client):
+    response = client.post('/gesture/sweep', json=sweep_request(format='zip'))
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        index = json.loads(archive.read('index.json'))
+        assert [entry['file'] for entry in index['combinations']] == [f'gesture-0000{i}.mid' for i in range(4)]
+        assert all(archive.read(entry['file']).startswith(b'MThd') for entry in index['combinations'])
+
+
+@pytest.mark.parametrize('overrides, error', [
+    ({'sweep': {'layerId': [1, 2]}}, 'Unknown sweep fields'),
+    ({'sweep': {'tempo': [1, 2]}}, 'Unknown sweep fields'),
+    ({'format': 'wav'}, 'Unknown format'),
+    ({'sweep': {'numNotes': {'start': 1, 'stop': 100}, 'durationPercent': {'start': 1, 'stop': 100}}},
+     'Too many combinations'),
+    ({'sweep': {'numNotes': [4, 0]}}, 'Combination')
+])
+def test_endpoint_rejects_invalid_sweeps(client, overrides, error):
+    assert error in client.post('/gesture/sweep', json=sweep_request(**overrides)).json()['error']
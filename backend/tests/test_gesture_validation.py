@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture
+def layer(main_module):
+    def make(**kwargs):
+        return main_module.MultiLayerGestureLayerConfig(layerId=1, midiNote=60, durationPercent=50,
+                                                        totalDuration=4, numNotes=8, **kwargs)
+    return make
+
+
+def test_velocity_end_zero_is_rejected(main_module, layer):
+    assert main_module.gesture_layer_error(layer(velocityEnd=0)) is not None
+    assert main_module.gesture_layer_error(layer(velocityEnd=128)) is not None
+
+
+def test_velocity_end_is_optional(main_module, layer):
+    assert main_module.gesture_layer_error(layer()) is None
+    assert main_module.gesture_layer_error(layer(velocityEnd=1)) is None
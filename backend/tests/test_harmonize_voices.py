@@ -0,0 +1,74 @@
+import io
+import random
+
+import mido
+import pytest
+
+from scale_utils import SCALE_REGISTRY
+from transformations import CHORD_SHAPES, MusicTransformer
+
+
+def legacy_harmonize(transformer, notes, interval):
+    """The per-note loop harmonize() used before the vectorized voices"""
+    harmonized = []
+    for note_data in notes:
+        pitch = note_data['midi'] + transformer.find_diatonic_interval(note_data['midi'], interval)
+        while pitch > 96:
+            pitch -= 12
+        while pitch < 36:
+            pitch += 12
+        harmonized.append({**note_data, 'midi': pitch, 'velocity': note_data.get('velocity', 0.7) * 0.85})
+    return harmonized
+
+
+def melody(count=40, seed=3):
+    rng = random.Random(seed)
+    return [{'midi': rng.randint(20, 110), 'time': i * 0.25, 'duration': 0.25, 'velocity': 0.8}
+            for i in range(count)]
+
+
+@pytest.mark.parametrize('scale_type', SCALE_REGISTRY.names())
+@pytest.mark.parametrize('root_note', ['C', 'F#', 'A'])
+def test_voices_match_the_per_note_harmonizer(scale_type, root_note):
+    transformer = MusicTransformer(scale_type, root_note)
+    notes = melody()
+    intervals = [-9, -4, -1, 0, 2, 4, 7, 13]
+    voices = transformer.harmonize_voices(notes, intervals)
+    assert voices == [legacy_harmonize(transformer, notes, interval) for interval in intervals]
+    assert transformer.harmonize(notes, 2) == voices[intervals.index(2)]
+
+
+def test_empty_melody_and_chord_shapes():
+    transformer = MusicTransformer('major', 'C')
+    assert transformer.harmonize_voices([], [2, 4]) == [[], []]
+    assert MusicTransformer.chord_intervals('satb') == CHORD_SHAPES['satb']
+    with pytest.raises(ValueError):
+        MusicTransformer.chord_intervals('cluster')
+
+
+def request_body(**overrides):
+    return {'notes': melody(8), 'scale_type': 'major', 'root_note': 'C', **overrides}
+
+
+def test_endpoint_writes_one_track_per_voice(client):
+    response = client.post('/transform/harmonize-voices', json=request_body(chord='seventh'))
+    assert response.headers['content-type'] == 'audio/midi'
+    midi = mido.MidiFile(file=io.BytesIO(response.content))
+    names = [track.name for track in midi.tracks[1:]]
+    assert names == ['Melody', 'Harmony +2', 'Harmony +4', 'Harmony +6']
+    channels = [{m.channel for m in track if m.type == 'note_on'} for track in midi.tracks[1:]]
+    assert all(len(c) == 1 for c in channels) and len(set.union(*channels)) == 4 and 9 not in set.union(*channels)
+
+    expected = MusicTransformer('major', 'C').harmonize_voices(request_body()['notes'], [2, 4, 6])
+    for track, voice in zip(midi.tracks[2:], expected):
+        assert [m.note for m in track if m.type == 'note_on' and m.velocity > 0] == [n['midi'] for n in voice]
+
+
+def test_endpoint_json_and_errors(client):
+    data = client.post('/transform/harmonize-voices', json=request_body(intervals=[-2, 3], format='json')).json()
+    assert [voice['interval'] for voice in data['voices']] == [-2, 3]
+    assert [len(voice['notes']) for voice in data['voices']] == [8, 8]
+    assert 'Too many voices' in client.post('/transform/harmonize-voices',
+                                            json=request_body(intervals=list(range(1, 17)))).json()['error']
+    assert 'error' in client.post('/transform/harmonize-voices', json=request_body(chord='cluster')).json()
+    assert 'error' in client.post('/transform/harmonize-voices', json=request_body(format='wav')).json()
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from json_stream import iter_json_object
+
+DOCUMENT = {
+    'version': 1,
+    'name': 'café ♫',  # Multi-byte characters can be split across chunks
+    'melodies': [{'pattern': [60, 62.5, -1.5e-3], 'active': True}, 12345678901234567890, None, 'x'],
+    'meta': {'nested': [1, {'a': []}]}
+}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 100_000])
+def test_matches_json_loads(chunk_size):
+    data = json.dumps(DOCUMENT).encode()
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    members = list(iter_json_object(chunks, 'melodies'))
+    assert [value for key, value in members if key == 'melodies'] == DOCUMENT['melodies']
+    assert {key: value for key, value in members if key != 'melodies'} == {
+        key: value for key, value in DOCUMENT.items() if key != 'melodies'}
+
+
+def test_numbers_cut_by_chunk_boundaries():
+    assert list(iter_json_object([b'{"a": [12', b'34, 1.', b'5e+', b'2]}'], 'a')) == [('a', 1234), ('a', 150.0)]
+
+
+def test_stops_reading_when_stopped_early():
+    read = []
+
+    def chunks():
+        for chunk in (b'{"melodies": [1, ', b'2, ', b'3]}'):
+            read.append(chunk)
+            yield chunk
+
+    items = iter_json_object(chunks(), 'melodies')
+    assert next(items) == ('melodies', 1)
+    assert len(read) == 1
+
+
+def test_empty_object_and_array():
+    assert list(iter_json_object([b' {', b' } '], 'melodies')) == []
+    assert list(iter_json_object([b'\xef\xbb\xbf{"melodies": []}'], 'melodies')) == []
+
+
+@pytest.mark.parametrize('data', [b'[1, 2]', b'{"melodies": 3}', b'{"melodies": [1 2]}', b'{"a": 1 "b": 2}',
+                                  b'{"a": 1} extra', b'{"a": [1,', b'{1: 2}', b''])
+def test_malformed_input(data):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_object([data], 'melodies'))
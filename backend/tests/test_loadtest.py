@@ -0,0 +1,91 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+import loadtest  # noqa: E402
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like uvicorn
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path == '/sessions':
+            self.reply(200, {'session_id': 'abc'})
+        elif self.path == '/sessions/abc/edits':
+            self.reply(200, {'version': 2})
+        else:
+            self.reply(200, {'error': 'Unknown session'})
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_percentile_and_summary():
+    assert loadtest.percentile([], 50) == 0.0
+    assert loadtest.percentile([1, 2, 3, 4], 50) == 2
+    assert loadtest.percentile([1, 2, 3, 4], 99) == 4
+    summary = loadtest.summarize([(0.001, True), (0.003, False)], elapsed=2.0)
+    assert summary == {'requests': 2, 'errors': 1, 'errorRate': 0.5, 'rps': 1.0,
+                       'p50Ms': 1.0, 'p90Ms': 3.0, 'p99Ms': 3.0, 'maxMs': 3.0}
+
+
+@pytest.mark.parametrize('status, content_type, body, error', [
+    (200, 'application/json', b'{"ok": true}', None),
+    (200, 'application/json', b'{"error": "bad scale"}', 'bad scale'),
+    (200, 'application/json', b'{"error', 'Invalid JSON response'),
+    (200, 'audio/midi', b'{"error": "x"}', None),  # Only JSON bodies are inspected
+    (503, 'application/json', b'{}', 'HTTP 503')
+])
+def test_response_error(status, content_type, body, error):
+    assert loadtest.response_error(status, content_type, body) == error
+
+
+def test_production_scenario_loads():
+    scenario, entries = loadtest.load_scenario(loadtest.BACKEND_DIR / 'benchmarks/scenarios/production-mix.json')
+    assert len(entries) == len(scenario['requests'])
+    chain = next(e for e in entries if len(e.steps) > 1)
+    assert chain.steps[0].capture == {'session_id': 'session_id'}
+    # {"$sc_export": ...} placeholders are replaced by the export's layers
+    layers = json.loads(chain.steps[0].body)['layers']
+    assert layers and all('parsedMidi' in layer for layer in layers.values())
+
+
+def test_run_scenario_chains_steps(server):
+    entries = [
+        loadtest.Entry({'steps': [
+            {'path': '/sessions', 'json': {}, 'capture': {'id': 'session_id'}},
+            {'path': '/sessions/{id}/edits', 'route': 'POST /sessions/{id}/edits', 'json': {}}
+        ]}, {}),
+        loadtest.Entry({'path': '/missing', 'json': {}, 'weight': 1}, {})
+    ]
+    results = loadtest.run_scenario(server, entries, concurrency=2, duration=0.3, warmup=0, seed=1)
+    routes = results['routes']
+    assert routes['POST /sessions']['requests'] == routes['POST /sessions/{id}/edits']['requests'] > 0
+    assert routes['POST /sessions/{id}/edits']['errors'] == 0
+    assert routes['POST /missing']['errorRate'] == 1.0
+    assert routes['POST /missing']['topErrors'] == {'Unknown session': routes['POST /missing']['requests']}
+    assert results['total']['requests'] == sum(r['requests'] for r in routes.values())
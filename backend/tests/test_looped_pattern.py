@@ -0,0 +1,33 @@
+import io
+
+import mido
+
+from looped_pattern import LoopedPattern
+from transformations import MusicTransformer
+
+
+def decode_notes(midi_bytes):
+    mid = mido.MidiFile(file=io.BytesIO(midi_bytes))
+    return [msg for track in mid.tracks for msg in track if msg.type == 'note_on' and msg.velocity > 0]
+
+
+def test_sequence_above_midi_range_is_clipped():
+    notes = [{'midi': 120 + i, 'time': i * 0.5, 'duration': 0.5, 'velocity': 0.7} for i in range(6)]
+    pattern = MusicTransformer('major', 'C').sequence_pattern(notes)
+    # The sequence steps go up past 127
+    assert max(max(pitches) for pitches in pattern.pitch_cycle) > 127
+
+    played = decode_notes(pattern.to_midi())
+    assert played
+    assert all(0 <= msg.note <= 127 for msg in played)
+    assert max(msg.note for msg in played) == 127
+
+
+def test_velocities_above_one_are_clipped():
+    notes = [{'midi': 60, 'time': 0.0, 'duration': 0.5, 'velocity': 1.2},
+             {'midi': 62, 'time': 0.5, 'duration': 0.5, 'velocity': 0.0}]
+    for pattern in (LoopedPattern.from_notes(notes, repeats=4),  # Repeats encoded once and copied
+                    LoopedPattern.from_notes(notes, repeats=3, end=1.2)):  # Unrolled path
+        velocities = [msg.velocity for msg in decode_notes(pattern.to_midi())]
+        assert velocities and all(1 <= v <= 127 for v in velocities)
+        assert 127 in velocities
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from melody_analysis import StreamingMelodyAnalyzer, find_repeated_motifs, lcp_array, suffix_array
+from scale_utils import SCALE_REGISTRY
+from transformations import MusicTransformer
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_suffix_and_lcp_arrays_match_naive(seed):
+    rng = random.Random(seed)
+    values = [rng.randint(-3, 3) for _ in range(rng.randint(1, 80))]
+    expected = sorted(range(len(values)), key=lambda i: values[i:])
+    assert suffix_array(values) == expected
+
+    def common(a, b):
+        h = 0
+        while a + h < len(values) and b + h < len(values) and values[a + h] == values[b + h]:
+            h += 1
+        return h
+    assert lcp_array(values, expected) == [0] + [common(expected[i - 1], expected[i])
+                                                   for i in range(1, len(values))]
+
+
+def test_transposed_motif_is_found():
+    rng = random.Random(3)
+    motif = [2, 2, -4, 5, -1]  # Intervals
+    intervals = []
+    starts = []
+    for _ in range(3):
+        intervals += [rng.choice([7, -8, 9, -10, 11]) for _ in range(6)]
+        starts.append(len(intervals))
+        intervals += motif
+    motifs = find_repeated_motifs(intervals, min_length=3)
+    assert motifs[0]['intervals'] == motif
+    assert motifs[0]['length'] == len(motif) + 1
+    assert motifs[0]['occurrences'] == starts
+
+
+def test_motifs_are_real_maximal_and_non_overlapping():
+    rng = random.Random(7)
+    intervals = [rng.choice([-2, -1, 1, 2]) for _ in range(300)]
+    motifs = find_repeated_motifs(intervals, min_length=3, max_motifs=10)
+    assert motifs
+    for motif in motifs:
+        length = motif['length'] - 1
+        occurrences = motif['occurrences']
+        assert len(occurrences) >= 2
+        assert all(b - a >= length for a, b in zip(occurrences, occurrences[1:]))
+        for start in occurrences:
+            assert intervals[start:start + length] == motif['intervals']
+
+
+def test_no_motifs_without_repeats():
+    assert find_repeated_motifs(list(range(1, 40))) == []
+    assert find_repeated_motifs([1, 2]) == []
+
+
+def test_analyzer_single_pass_matches_the_transformer():
+    notes = [{'midi': midi, 'time': t, 'duration': 0.5}
+             for midi, t in zip([60, 62, 64, 62, 60, 67, 65, 64], [0, 0.5, 1, 1.5, 3, 3.5, 4, 6])]
+    analysis = StreamingMelodyAnalyzer(SCALE_REGISTRY.get('major', 'C')).add_many(notes).result()
+    assert analysis['intervals'] == [2, 2, -2, -2, 7, -2, -1]
+    assert analysis['contour'] == ['up', 'up', 'down', 'down', 'up', 'down', 'down']
+    assert analysis['scale_degrees'] == [1, 2, 3, 2, 1, 5, 4, 3]
+    assert analysis['phrases'] == MusicTransformer('major', 'C').detect_phrases(notes) == [[0, 1, 2, 3], [4, 5, 6],
+                                                                                             [7]]
+    assert analysis['range'] == {'lowest': 60, 'highest': 67, 'span': 7}
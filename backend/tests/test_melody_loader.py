@@ -0,0 +1,64 @@
+import io
+import json
+
+import mido
+import pytest
+
+from melody_loader import encode_layer_loops, iter_melody_file, layer_melodies, load_layer_loops, parse_melody, pick_melody
+
+
+def test_loop_count_repeats_the_pattern():
+    loop = parse_melody({'pattern': [60, 62, 64], 'loopCount': 3})
+    notes = loop.unroll()
+    assert len(loop) == 9
+    assert [n['midi'] for n in notes] == [60, 62, 64] * 3
+    assert [n['time'] for n in notes] == [i * 0.5 for i in range(9)]
+
+
+def test_velocities_ramp_and_clip():
+    notes = parse_melody({'pattern': [60, 62, 64, 65, 67], 'velocityFirst': 1.5, 'velocityLast': 0.0}).unroll()
+    assert [n['velocity'] for n in notes] == pytest.approx([1.0, 1.0, 0.75, 0.375, 0.1])
+
+
+@pytest.mark.parametrize('melody', [{}, {'pattern': [60, 128]}, {'pattern': [[60]]}, {'pattern': [60], 'loopCount': -1},
+                                    {'pattern': [60] * 10, 'loopCount': 200_000}])
+def test_invalid_melodies(melody):
+    with pytest.raises(ValueError):
+        parse_melody(melody)
+
+
+def test_any_number_of_layers():
+    melodies = [{'key': f'layer{i}', 'active': True, 'pattern': [60 + i]} for i in (12, 1, 3)]
+    melodies += [
+        {'key': 'layer2', 'active': False, 'pattern': [70]},  # Inactive
+        {'key': 'layer0', 'active': True, 'pattern': [70]},  # Layers start at 1
+        {'key': 'melody', 'active': True, 'pattern': [70]},
+        {'key': 'layer4', 'active': True, 'pattern': []},
+        {'key': 'layer3', 'active': True, 'pattern': [99]}  # Later entry wins
+    ]
+    assert {index: melody['pattern'] for index, melody in layer_melodies({'melodies': melodies}).items()} == {
+        0: [61], 2: [99], 11: [72]}
+    assert list(load_layer_loops({'melodies': melodies})) == [0, 2, 11]
+
+
+def test_layers_encode_to_midi():
+    melodies = [{'key': 'layer1', 'active': True, 'pattern': [60, 64], 'loopCount': 4},
+                {'key': 'layer2', 'active': True, 'pattern': [67]}]
+    encoded = encode_layer_loops(load_layer_loops({'melodies': melodies}))
+    for index, expected in ((0, 8), (1, 1)):
+        mid = mido.MidiFile(file=io.BytesIO(encoded[index]))
+        assert sum(msg.type == 'note_on' and msg.velocity > 0 for msg in mid) == expected
+
+
+def test_pick_melody_prefers_the_first_active_one():
+    melodies = [{'pattern': [60]}, {'pattern': [62], 'active': True}, {'pattern': [64], 'active': True}]
+    assert pick_melody(melodies).unroll()[0]['midi'] == 62
+    assert pick_melody(melodies[:1]).unroll()[0]['midi'] == 60
+
+
+def test_melody_file_is_read_incrementally():
+    data = json.dumps({'version': 1, 'melodies': [{'pattern': [60 + i]} for i in range(5)]}).encode()
+    chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+    assert [m['pattern'] for m in iter_melody_file(chunks)] == [[60 + i] for i in range(5)]
+    with pytest.raises(ValueError):
+        list(iter_melody_file([b'{"other": []}']))
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+
+from melody_watcher import MelodyFileWatcher
+
+
+def write_layers(path, patterns):
+    melodies = [{'key': f'layer{i + 1}', 'active': True, 'pattern': pattern} for i, pattern in enumerate(patterns)]
+    path.write_text(json.dumps({'melodies': melodies}))
+
+
+def test_initial_push_and_baseline(tmp_path):
+    path = tmp_path / 'layer-melodies.json'
+    write_layers(path, [[60, 62], [48]])
+    pushes = []
+
+    async def start(push_initial):
+        watcher = MelodyFileWatcher([path], lambda p, changed: pushes.append(sorted(changed)))
+        watcher.start(push_initial=push_initial)
+        await watcher.stop()
+        return watcher
+
+    asyncio.run(start(True))
+    assert pushes == [[0, 1]]
+    watcher = asyncio.run(start(False))
+    assert pushes == [[0, 1]]  # Read as the baseline only
+    assert watcher.status()['files'][0]['layers'] == ['layer1', 'layer2']
+
+
+def test_only_changed_layers_are_sent(tmp_path):
+    path = tmp_path / 'layer-melodies.json'
+    write_layers(path, [[60, 62], [48]])
+    pushes = []
+
+    async def edit():
+        watcher = MelodyFileWatcher([path], lambda p, changed: pushes.append(
+            {index: [n['midi'] for n in loop.notes] for index, loop in changed.items()}),
+            poll_interval=0.001, debounce=0.01)
+        watcher.start(push_initial=False)
+        write_layers(path, [[60, 62], [50, 52]])
+        os.utime(path, ns=(0, 1))  # A distinct mtime, even on coarse clocks
+        await asyncio.sleep(0.2)
+        # Same contents again: a touch is not an edit
+        write_layers(path, [[60, 62], [50, 52]])
+        os.utime(path, ns=(0, 2))
+        await asyncio.sleep(0.2)
+        await watcher.stop()
+        return watcher.status()
+
+    status = asyncio.run(edit())
+    assert pushes == [{1: [50, 52]}]
+    assert status['lastPush']['layers'] == ['layer2']
+    assert status['latency']['events'] == 1
+
+
+def test_failed_send_is_retried(tmp_path):
+    path = tmp_path / 'layer-melodies.json'
+    write_layers(path, [[60]])
+    attempts = []
+
+    def on_change(p, changed):
+        attempts.append(sorted(changed))
+        if len(attempts) == 1:
+            raise OSError("no route")
+
+    async def run():
+        watcher = MelodyFileWatcher([path], on_change)
+        watcher.start()
+        assert 'Send failed' in watcher.status()['files'][0]['error']
+        watcher._reload(watcher.files[0])  # The unsent layer is sent again
+        await watcher.stop()
+
+    asyncio.run(run())
+    assert attempts == [[0], [0]]
+
+
+def test_invalid_file_is_reported(tmp_path):
+    path = tmp_path / 'layer-melodies.json'
+    path.write_text('{"melodies": [')
+    pushes = []
+
+    async def run():
+        watcher = MelodyFileWatcher([path], lambda p, changed: pushes.append(changed))
+        watcher.start()
+        await watcher.stop()
+        return watcher.status()
+
+    status = asyncio.run(run())
+    assert not pushes and status['files'][0]['error']
+
+
+def test_watcher_endpoints(client, main_module):
+    write_layers(main_module.MELODY_WATCH_DIR / 'layer-melodies.json', [[60]])
+    started = client.post('/watcher/start', json={'paths': ['layer-melodies.json'], 'push_initial': False}).json()
+    assert started['success'] and started['files'][0]['layers'] == ['layer1']
+    assert client.get('/watcher/status').json()['running']
+    assert not client.post('/watcher/stop').json()['running']
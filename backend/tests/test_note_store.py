@@ -0,0 +1,29 @@
+import os
+
+from note_store import NoteStoreCache, pitches_to_records
+
+
+def build(pitches):
+    return lambda: ([({"name": "m"}, pitches_to_records(pitches))], {})
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = NoteStoreCache(tmp_path, max_files=2)
+    contents = [b'a', b'b', b'c']
+    for i, content in enumerate(contents[:2]):
+        cache.get_or_build(content, build([60 + i]))
+        os.utime(cache.path_for(content), (1000 + i, 1000 + i))
+    # Using 'a' again makes 'b' the least recently used
+    cache.get_or_build(b'a', build([60]))
+    cache.get_or_build(b'c', build([62]))
+    assert cache.path_for(b'a').exists()
+    assert not cache.path_for(b'b').exists()
+    assert cache.path_for(b'c').exists()
+
+
+def test_cache_ignores_other_files(tmp_path):
+    (tmp_path / 'corpus.gns').write_bytes(b'x' * 100)
+    cache = NoteStoreCache(tmp_path, max_bytes=1)
+    cache.get_or_build(b'a', build([60]))
+    assert (tmp_path / 'corpus.gns').exists()
+    assert cache.path_for(b'a').exists()  # The entry just built is kept even over the cap
@@ -0,0 +1,108 @@
+import asyncio
+import socket
+
+import pytest
+from pythonosc.osc_bundle import OscBundle
+from pythonosc.osc_message import OscMessage
+
+from osc_scheduler import (NOTE_OFF_ADDRESS, NOTE_ON_ADDRESS, OscNoteScheduler, TimingStats, build_timeline,
+                           percentile)
+
+
+@pytest.fixture
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.setblocking(False)
+    yield sock
+    sock.close()
+
+
+def received(sock):
+    """(address, params) of every message waiting on the socket, bundles flattened"""
+    messages = []
+    while True:
+        try:
+            data = sock.recv(65536)
+        except BlockingIOError:
+            return messages
+        if OscBundle.dgram_is_bundle(data):
+            messages += [(m.address, m.params) for m in OscBundle(data) if isinstance(m, OscMessage)]
+        else:
+            message = OscMessage(data)
+            messages.append((message.address, message.params))
+
+
+def test_timeline_orders_note_offs_first():
+    events, length = build_timeline({
+        'layer1': [{'midi': 60, 'time': 0, 'duration': 0.5, 'velocity': 100},
+                   {'midi': 62, 'time': 0.5, 'duration': 0.5}],
+        'layer2': [{'midi': 48, 'time': -1, 'duration': 0.25, 'velocity': 0.5}]
+    })
+    assert length == 1.0
+    assert [(t, address, args[:2]) for t, _, address, args in events] == [
+        (0.0, NOTE_ON_ADDRESS, ['layer1', 60]),
+        (0.0, NOTE_ON_ADDRESS, ['layer2', 48]),  # Negative times start at 0
+        (0.25, NOTE_OFF_ADDRESS, ['layer2', 48]),
+        (0.5, NOTE_OFF_ADDRESS, ['layer1', 60]),  # Before the note-on at the same time
+        (0.5, NOTE_ON_ADDRESS, ['layer1', 62]),
+        (1.0, NOTE_OFF_ADDRESS, ['layer1', 62])
+    ]
+    assert events[0][3][2] == pytest.approx(100 / 127)  # MIDI velocities are scaled to 0-1
+    assert events[4][3][2] == 0.7
+
+
+def test_timing_stats():
+    stats = TimingStats(late_threshold=0.005)
+    for error in (0.001, 0.002, 0.010, 0.003):
+        stats.record(error)
+    snapshot = stats.snapshot()
+    assert (snapshot['events'], snapshot['lateEvents'], snapshot['maxMs']) == (4, 1, 10.0)
+    assert snapshot['p50Ms'] == 2.0
+    assert percentile([], 99) == 0.0
+
+
+@pytest.mark.parametrize('bundles', [False, True])
+def test_plays_every_event_once(receiver, bundles):
+    layers = {'a': [{'midi': 60 + i, 'time': i * 0.01, 'duration': 0.01} for i in range(5)]}
+
+    async def play():
+        scheduler = OscNoteScheduler(*receiver.getsockname(), lookahead=0.01, bundles=bundles, loop=False)
+        scheduler.start(layers)
+        await asyncio.wait_for(scheduler._task, 2)
+        return scheduler.status()
+
+    status = asyncio.run(play())
+    messages = received(receiver)
+    assert [(address, params[1]) for address, params in messages if address == NOTE_ON_ADDRESS] == [
+        (NOTE_ON_ADDRESS, 60 + i) for i in range(5)]
+    assert sum(address == NOTE_OFF_ADDRESS for address, _ in messages) == 5
+    assert status['cycles'] == 1 and not status['running']
+    assert status['timing']['events'] == 10
+
+
+def test_stop_releases_sounding_notes(receiver):
+    async def play():
+        scheduler = OscNoteScheduler(*receiver.getsockname(), lookahead=0.005)
+        scheduler.start({'a': [{'midi': 64, 'time': 0, 'duration': 10}]})
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(play())
+    assert received(receiver) == [(NOTE_ON_ADDRESS, ['a', 64, pytest.approx(0.7)]), (NOTE_OFF_ADDRESS, ['a', 64])]
+    assert not scheduler.running
+
+
+def test_update_takes_over_at_the_loop_boundary(receiver):
+    async def play():
+        scheduler = OscNoteScheduler(*receiver.getsockname(), lookahead=0.005)
+        scheduler.start({'a': [{'midi': 60, 'time': 0, 'duration': 0.05}]})
+        await asyncio.sleep(0.02)
+        scheduler.update({'a': [{'midi': 72, 'time': 0, 'duration': 0.05}]})
+        await asyncio.sleep(0.15)
+        await scheduler.stop()
+
+    asyncio.run(play())
+    pitches = [params[1] for address, params in received(receiver) if address == NOTE_ON_ADDRESS]
+    assert pitches[0] == 60 and set(pitches[1:]) == {72}
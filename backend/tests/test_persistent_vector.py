@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from persistent_vector import PersistentVector, count_nodes
+
+
+def test_updates_match_a_list():
+    rng = random.Random(7)
+    vector, reference = PersistentVector(), []
+    versions = []
+    for _ in range(200):
+        changes = {rng.randrange(len(reference) + 50): rng.random() for _ in range(rng.randint(1, 20))}
+        vector = vector.update(changes)
+        for index, value in changes.items():
+            reference.extend([None] * (index + 1 - len(reference)))
+            reference[index] = value
+        versions.append((vector, list(reference)))
+    # Every older version is unchanged
+    for old, expected in versions:
+        assert list(old) == expected and len(old) == len(expected)
+        assert [old[i] for i in range(len(expected))] == expected
+
+
+def test_grows_across_levels():
+    vector = PersistentVector.from_iterable(range(5000))
+    assert len(vector) == 5000 and vector.shift == 10
+    assert vector.get(4999) == 4999
+    sparse = PersistentVector().set(40_000, 'x')
+    assert len(sparse) == 40_001 and sparse[39_999] is None and sparse[40_000] == 'x'
+    with pytest.raises(IndexError):
+        vector.get(5000)
+    with pytest.raises(IndexError):
+        vector.update({-1: 0})
+
+
+def test_versions_share_untouched_nodes():
+    base = PersistentVector.from_iterable(range(32 * 32 * 4))
+    edited = base.set(5, 'edited')
+    # Only the path to index 5 (root, inner node, leaf) is new
+    assert count_nodes([base, edited]) == count_nodes([base]) + 3
+    assert base.update({}) is base
+
+
+def test_diff_matches_a_naive_comparison():
+    rng = random.Random(11)
+    base = PersistentVector.from_iterable(rng.random() for _ in range(3000))
+    other = base.update({rng.randrange(6000): rng.random() for _ in range(40)})
+    other = other.update({rng.randrange(3000): None for _ in range(10)})
+    a, b = list(base), list(other)
+    a += [None] * (len(b) - len(a))
+    expected = [(i, x, y) for i, (x, y) in enumerate(zip(a, b)) if x != y]
+    assert list(base.diff(other)) == expected
+    assert list(other.diff(base)) == [(i, y, x) for i, x, y in expected]
+    assert list(base.diff(base)) == []
+    # A shallow vector against a deeper one
+    assert list(PersistentVector.from_iterable([1]).diff(PersistentVector.from_iterable([1]).set(2000, 2))) == [
+        (2000, None, 2)]
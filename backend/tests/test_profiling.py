@@ -0,0 +1,82 @@
+import pstats
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import ProfileSession, ProfileStore, profile_mode, profiled_route_class
+
+
+def busy_sync_work():
+    deadline = time.perf_counter() + 0.02
+    while time.perf_counter() < deadline:
+        pass
+    return {'ok': True}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(tmp_path / 'profiles', max_profiles=3)
+
+
+@pytest.fixture
+def profiled_client(store):
+    app = FastAPI()
+    app.router.route_class = profiled_route_class(store)
+
+    @app.get('/sync')
+    def sync_endpoint():
+        return busy_sync_work()
+
+    @app.get('/async')
+    async def async_endpoint():
+        return {'ok': True}
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize('value, mode', [(None, None), ('0', None), ('off', None), ('1', 'cprofile'),
+                                         ('cprofile', 'cprofile'), ('Sample', 'sample')])
+def test_profile_mode(value, mode):
+    assert profile_mode(value) == mode
+
+
+def test_unflagged_requests_are_not_profiled(profiled_client, store):
+    response = profiled_client.get('/sync')
+    assert response.json() == {'ok': True} and 'X-Profile-Id' not in response.headers
+    assert store.list() == []
+
+
+def test_sync_endpoint_is_profiled_in_the_threadpool(profiled_client, store):
+    response = profiled_client.get('/sync', headers={'X-Profile': '1', 'X-Request-Id': 'req-1'})
+    assert response.json() == {'ok': True}
+    [metadata] = store.list()
+    assert metadata['name'] == response.headers['X-Profile-Id']
+    assert (metadata['route'], metadata['requestId'], metadata['status'], metadata['format']) == (
+        '/sync', 'req-1', 200, 'pstats')
+    functions = {name for _, _, name in pstats.Stats(str(store.file(metadata['name']))).stats}
+    assert 'busy_sync_work' in functions
+
+
+def test_sampled_profiles_are_collapsed_stacks(profiled_client, store):
+    response = profiled_client.get('/sync?profile=sample')
+    path = store.file(response.headers['X-Profile-Id'])
+    assert path.suffix == '.folded'
+    assert 'busy_sync_work' in path.read_text()
+    assert store.list()[0]['samples'] > 0
+
+
+def test_old_profiles_are_pruned(profiled_client, store):
+    for _ in range(5):
+        profiled_client.get('/async', headers={'X-Profile': '1'})
+        time.sleep(0.01)  # Distinct mtimes
+    assert len(store.list()) == 3
+    assert len(list(store.directory.iterdir())) == 6  # Profile plus sidecar each
+    assert store.file('../../etc/passwd') is None
+
+
+def test_session_runs_calls_under_the_profiler():
+    session = ProfileSession('cprofile')
+    assert session.run(sum, [1, 2, 3]) == 6
+    assert len(session.profilers) == 1
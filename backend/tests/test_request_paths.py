@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize('directory', ['..', '../..', '/etc', 'sub/../../x'])
+def test_corpus_ingest_stays_in_corpus_dir(client, directory):
+    assert 'Path must be inside' in client.post('/corpus/ingest', json={'directory': directory}).json()['error']
+
+
+def test_corpus_ingest_inside_corpus_dir(client, main_module):
+    subdir = main_module.CORPUS_DIR / 'sub'
+    subdir.mkdir(exist_ok=True)
+    (subdir / 'm.json').write_text(json.dumps({'melodies': [
+        {'name': 'm', 'notes': [{'midi': 60 + i, 'time': i * 0.5, 'duration': 0.5} for i in range(8)]}
+    ]}))
+    result = client.post('/corpus/ingest', json={'directory': 'sub'}).json()
+    assert 'error' not in result
+    assert result['files'] == 1
+
+
+@pytest.mark.parametrize('path', ['../settings.db', '/etc/passwd'])
+def test_watcher_paths_stay_in_watch_dir(client, path):
+    assert 'Path must be inside' in client.post('/watcher/start', json={'paths': [path]}).json()['error']
+
+
+@pytest.mark.parametrize('path', ['../x.gns', '/tmp/x.gns'])
+def test_corpus_store_paths_stay_in_note_store_dir(client, path):
+    assert 'Path must be inside' in client.post('/corpus/save', json={'path': path}).json()['error']
@@ -0,0 +1,55 @@
+import io
+
+import mido
+import pytest
+
+
+def layer(pitches, **fields):
+    notes = [{'midi': p, 'time': i * 0.5, 'duration': 0.4, 'velocity': 0.8} for i, p in enumerate(pitches)]
+    return {'notes': notes, **fields}
+
+
+def read_midi(response):
+    assert response.headers['content-type'] == 'audio/midi'
+    assert int(response.headers['content-length']) == len(response.content)
+    return mido.MidiFile(file=io.BytesIO(response.content))
+
+
+def test_one_track_per_layer(client):
+    layers = [layer([60, 62, 64], name='Lead', program=73), layer([48, 43]),
+              layer([36], channel=9)] + [layer([70]) for _ in range(7)]
+    midi = read_midi(client.post('/save-midi/multi-layer', json={'layers': layers, 'bpm': 90}))
+    assert midi.type == 1 and len(midi.tracks) == 1 + len(layers)
+
+    tracks = midi.tracks[1:]
+    assert [t.name for t in tracks[:3]] == ['Lead', 'Layer 2', 'Layer 3']
+    assert [m.program for m in tracks[0] if m.type == 'program_change'] == [73]
+    assert not any(m.type == 'program_change' for m in tracks[1])
+    channels = [next(m.channel for m in t if m.type == 'note_on') for t in tracks]
+    # Default channels skip the drum channel; an explicit channel is kept
+    assert channels == [0, 1, 9, 3, 4, 5, 6, 7, 8, 10]
+    assert [[m.note for m in t if m.type == 'note_on' and m.velocity > 0] for t in tracks[:2]] == [[60, 62, 64], [48, 43]]
+
+
+def test_note_times_follow_the_tempo(client):
+    midi = read_midi(client.post('/save-midi/multi-layer', json={'layers': [layer([60, 62, 64])], 'bpm': 90}))
+    onsets, offsets, now = [], [], 0.0
+    for message in midi:  # Playback order, times in seconds
+        now += message.time
+        if message.type == 'note_on' and message.velocity > 0:
+            onsets.append(now)
+        elif message.type in ('note_off', 'note_on'):
+            offsets.append(now)
+    tick = 60 / 90 / midi.ticks_per_beat
+    assert onsets == pytest.approx([0.0, 0.5, 1.0], abs=tick)
+    assert offsets == pytest.approx([0.4, 0.9, 1.4], abs=tick)
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'layers': []}, 'No layers'),
+    ({'layers': [layer([60])], 'bpm': 0}, 'bpm must be positive'),
+    ({'layers': [layer([60], channel=16)]}, 'channel must be 0-15'),
+    ({'layers': [layer([60], program=128)]}, 'program must be 0-127')
+])
+def test_invalid_requests(client, body, error):
+    assert error in client.post('/save-midi/multi-layer', json=body).json()['error']
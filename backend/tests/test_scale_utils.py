@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from scale_utils import SCALE_REGISTRY, ScaleRegistry, generate_scale_notes
+from transformations import MusicTransformer
+
+
+def test_tables_match_the_scale():
+    table = SCALE_REGISTRY.get('major', 'D')
+    assert table.pitch_names == ('D', 'E', 'F#', 'G', 'A', 'B', 'C#')
+    assert [table.note_at(62, i) for i in range(9)] == [62, 64, 66, 67, 69, 71, 73, 74, 76]
+
+
+def legacy_snap(midi_note, pitch_classes):
+    """The snap_to_scale the tables replaced: closest pitch class in the octave, then within a tritone"""
+    result = midi_note // 12 * 12 + min(sorted(pitch_classes), key=lambda pc: abs(pc - midi_note % 12))
+    if abs(result - midi_note) > 6:
+        result += 12 if result < midi_note else -12
+    return result
+
+
+@pytest.mark.parametrize('scale_type', SCALE_REGISTRY.names())
+def test_snap_matches_the_old_snap(scale_type):
+    for root in range(12):
+        table = SCALE_REGISTRY.get(scale_type, root)
+        for midi in range(48, 72):
+            snapped = table.snap(midi)
+            assert table.contains(snapped)
+            assert abs(snapped - midi) <= 6
+            assert snapped == legacy_snap(midi, table.pitch_classes)
+
+
+def test_transpose_steps_matches_the_transformer():
+    transformer = MusicTransformer('dorian', 'E')
+    table = SCALE_REGISTRY.get('dorian', 'E')
+    pitches = np.arange(50, 80)
+    for steps in (-8, -1, 1, 3, 9):
+        expected = [transformer.transpose_by_scale_degree(int(p), steps) for p in pitches]
+        assert table.transpose_steps(pitches, steps).tolist() == expected
+
+
+def test_unknown_scale_falls_back_to_the_default():
+    assert SCALE_REGISTRY.get('no-such-scale', 'C') is SCALE_REGISTRY.get('major', 'C')
+    assert SCALE_REGISTRY.intervals('no-such-scale') == SCALE_REGISTRY.intervals('major')
+
+
+def test_register():
+    registry = ScaleRegistry({'major': [0, 2, 4, 5, 7, 9, 11]})
+    registry.register('pentatonic', [12, 2, 4, 7, 9, 4])  # Normalized: mod 12, sorted, deduplicated
+    assert registry.intervals('pentatonic') == (0, 2, 4, 7, 9)
+    assert registry.get('pentatonic', 'A').pitch_names == ('A', 'B', 'C#', 'E', 'F#')
+    with pytest.raises(ValueError):
+        registry.register('rootless', [2, 4, 7])
+
+
+def test_generate_scale_notes_uses_custom_scales():
+    notes = generate_scale_notes('E', 4, 'phrygian dominant', 8)
+    assert [n['midi'] for n in notes] == [64, 65, 68, 69, 71, 72, 74, 76]
@@ -0,0 +1,105 @@
+import pytest
+
+from session_store import LayerSessionStore
+
+NOTES = [{'midi': 60 + i, 'time': i * 0.5, 'duration': 0.5} for i in range(4)]
+
+
+def test_seeded_layer_starts_at_version_one():
+    session = LayerSessionStore().create({'1': NOTES})
+    buffer = session.layer('1')
+    assert buffer.version == 1
+    assert list(buffer.history) == [1]
+    assert len(buffer.get_version(1).notes) == len(NOTES)
+    assert session.summary()['layers']['1'] == {'version': 1, 'noteCount': len(NOTES)}
+
+
+def test_first_edit_of_seeded_layer_is_version_two():
+    buffer = LayerSessionStore().create({'1': NOTES}).layer('1')
+    buffer.move([0], dmidi=2)
+    assert buffer.version == 2
+    assert buffer.diff(1, 2)['changed'][0]['after']['midi'] == 62
+
+
+def test_failed_batch_is_rolled_back():
+    buffer = LayerSessionStore().create({'1': NOTES}).layer('1')
+    before = buffer.sorted_notes()
+    try:
+        with buffer.batch():
+            buffer.move([0, 1], dt=1.0)
+            buffer.delete([2])
+            buffer.insert([{'midi': 72, 'time': 0, 'duration': 1}, {'time': 1}])  # Second note has no midi
+    except KeyError:
+        pass
+    assert buffer.version == 1
+    assert buffer.next_id == len(NOTES)
+    assert buffer.sorted_notes() == before
+    assert list(buffer.history) == [1]
+
+
+def test_batch_is_one_version():
+    buffer = LayerSessionStore().create({'1': NOTES}).layer('1')
+    with buffer.batch():
+        buffer.move([0], dt=0.25)
+        new_ids = buffer.insert([{'midi': 72, 'time': 3, 'duration': 1}])
+        buffer.delete(new_ids)
+    assert buffer.version == 2
+    assert buffer.get_version(2).note_count == len(NOTES)
+
+
+def test_no_op_edits_keep_the_version():
+    buffer = LayerSessionStore().create({'1': NOTES}).layer('1')
+    assert buffer.delete([99]) == 0
+    assert buffer.move([99], dt=1.0) == 0
+    assert buffer.insert([]) == []
+    assert buffer.transform_range(10, 20, lambda notes: notes) == []
+    assert buffer.version == 1
+    assert list(buffer.history) == [1]
+
+
+def test_empty_layer_starts_at_version_one():
+    session = LayerSessionStore().create()
+    assert session.layer('1', create=True).version == 1
+
+
+def test_diff_and_restore():
+    buffer = LayerSessionStore().create({'1': NOTES}).layer('1')
+    buffer.delete([0])
+    buffer.insert([{'midi': 72, 'time': 4, 'duration': 1}])
+    buffer.move([1], dt=0.25)
+    assert buffer.version == 4
+    changes = buffer.diff(1, 4)
+    assert [n['id'] for n in changes['removed']] == [0]
+    assert [(n['id'], n['midi']) for n in changes['added']] == [(4, 72)]
+    assert [(c['id'], c['before']['time'], c['after']['time']) for c in changes['changed']] == [(1, 0.5, 0.75)]
+
+    entry = buffer.restore(1)
+    assert (buffer.version, entry.restored_from, entry.op) == (5, 1, 'restore')
+    assert buffer.diff(1, 5) == {'added': [], 'removed': [], 'changed': []}
+    assert sorted(buffer.notes) == [0, 1, 2, 3]
+    # Edits after a restore keep using fresh IDs
+    assert buffer.insert([{'midi': 50, 'time': 0, 'duration': 1}]) == [5]
+
+
+def test_history_is_bounded():
+    store = LayerSessionStore(max_history_per_layer=3)
+    buffer = store.create({'1': NOTES}).layer('1')
+    for _ in range(5):
+        buffer.move([0], dmidi=1)
+    assert list(buffer.history) == [4, 5, 6]
+    with pytest.raises(KeyError):
+        buffer.restore(1)
+    assert buffer.get_version(4).notes[0]['midi'] == 63
+
+
+def test_history_endpoints(client):
+    layers = {'1': {'parsedMidi': {'tracks': [{'notes': [{**n, 'velocity': 0.7} for n in NOTES]}]}}}
+    session_id = client.post('/sessions', json={'layers': layers}).json()['session_id']
+    base = f'/sessions/{session_id}/layers/1'
+    client.post(f'{base}/edits', json={'edits': [{'op': 'move', 'ids': [2], 'dmidi': 5}]})
+    assert [v['version'] for v in client.get(f'{base}/versions').json()['versions']] == [1, 2]
+    diff = client.get(f'{base}/versions/2/diff').json()
+    assert diff['base'] == 1 and [c['after']['midi'] for c in diff['changed']] == [67]
+    assert client.post(f'{base}/versions/1/restore').json() == {'version': 3, 'restoredFrom': 1, 'noteCount': 4}
+    assert [n['midi'] for n in client.get(f'{base}/versions/3').json()['notes']] == [60, 61, 62, 63]
+    assert 'error' in client.get(f'{base}/versions/99').json()
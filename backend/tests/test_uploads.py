@@ -0,0 +1,90 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from uploads import (UploadLimitMiddleware, UploadRejected, check_file_start, iter_upload_chunks, read_upload,
+                     upload_error_response)
+
+
+@pytest.fixture
+def limited_client():
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, limits={'/midi': (100, 'midi'), '/raw': (100, None)})
+    app.add_exception_handler(UploadRejected, upload_error_response)
+
+    @app.post('/midi')
+    async def midi(file: UploadFile = File(...)):
+        return {'bytes': len(await file.read())}
+
+    @app.post('/raw')
+    async def raw(file: UploadFile = File(...)):
+        return {'bytes': len(await file.read())}
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize('kind, head, result', [
+    ('midi', b'MThd\x00\x00', True), ('midi', b'MTh', None), ('midi', b'RIFF', False),
+    ('json', b'\xef\xbb\xbf  {"a"', True), ('json', b' \n ', None), ('json', b'[1]', True), ('json', b'"a"', False),
+    (None, b'anything', True)
+])
+def test_check_file_start(kind, head, result):
+    assert check_file_start(kind, head) is result
+
+
+def test_middleware_rejects_large_bodies_by_content_length(limited_client):
+    response = limited_client.post('/raw', content=b'x' * 200_000,
+                                   headers={'Content-Type': 'multipart/form-data; boundary=x'})
+    assert response.status_code == 413
+    assert 'limit is 100 bytes' in response.json()['error']
+
+
+def test_middleware_cuts_off_chunked_bodies(limited_client):
+    body = iter([b'x' * 8192] * 4)  # No Content-Length: sent chunked
+    response = limited_client.post('/raw', content=body, headers={'Content-Type': 'multipart/form-data; boundary=x'})
+    assert response.status_code == 413
+
+
+def test_middleware_checks_the_file_start(limited_client):
+    response = limited_client.post('/midi', files={'file': ('a.mid', b'RIFF....')})
+    assert response.status_code == 415
+    assert limited_client.post('/midi', files={'file': ('a.mid', b'MThd' + b'\0' * 10)}).json() == {'bytes': 14}
+    assert limited_client.post('/raw', files={'file': ('a.bin', b'RIFF')}).json() == {'bytes': 4}
+
+
+def test_iter_upload_chunks_caps_and_checks():
+    assert b''.join(iter_upload_chunks(io.BytesIO(b' {"a": 1}'), 100, 'json', chunk_size=1)) == b' {"a": 1}'
+    with pytest.raises(UploadRejected) as rejected:
+        list(iter_upload_chunks(io.BytesIO(b'{' + b' ' * 100), 50, 'json', chunk_size=8))
+    assert rejected.value.status_code == 413
+    for content in (b'', b'   ', b'oops'):
+        with pytest.raises(UploadRejected) as rejected:
+            list(iter_upload_chunks(io.BytesIO(content), 100, 'json'))
+        assert rejected.value.status_code == 415
+
+
+def test_read_upload_caps_and_checks():
+    def upload(content):
+        return UploadFile(io.BytesIO(content), filename='upload')
+
+    assert asyncio.run(read_upload(upload(b'MThd123'), 100, 'midi')) == b'MThd123'
+    with pytest.raises(UploadRejected) as rejected:
+        asyncio.run(read_upload(upload(b'MThd' * 100), 100, 'midi'))
+    assert rejected.value.status_code == 413
+    with pytest.raises(UploadRejected) as rejected:
+        asyncio.run(read_upload(upload(b'MTh'), 100, 'midi'))  # Too short to be MIDI
+    assert rejected.value.status_code == 415
+
+
+def test_import_midi_rejects_non_midi(client):
+    response = client.post('/import-midi', files={'file': ('song.mid', b'{"not": "midi"}')})
+    assert response.status_code == 415
+    assert 'MThd' in response.json()['error']
+
+
+def test_melody_upload_rejects_non_json(client):
+    response = client.post('/load-json-melody', files={'file': ('melody.json', b'MThd')})
+    assert response.status_code == 415
@@ -0,0 +1,54 @@
+import threading
+
+from warmup import Warmup
+
+
+def test_steps_are_timed_and_errors_recorded():
+    calls = []
+
+    def failing():
+        raise RuntimeError("no soundfont")
+
+    warmup = Warmup([('ok', lambda: calls.append('ok')), ('raises', failing),
+                     ('error-dict', lambda: {'error': 'bad scale'}), ('after', lambda: calls.append('after'))])
+    assert not warmup.ready and not warmup.status()['running']
+    warmup.run()
+    status = warmup.status()
+    assert warmup.ready and calls == ['ok', 'after']  # A failed step doesn't stop the others
+    assert status['errors'] == {'raises': 'no soundfont', 'error-dict': 'bad scale'}
+    assert list(status['steps']) == ['ok', 'raises', 'error-dict', 'after']
+    assert status['durationMs'] is not None and status['finishedAt'] >= status['startedAt']
+
+
+def test_start_runs_once_in_the_background():
+    release = threading.Event()
+    runs = []
+    warmup = Warmup([('slow', lambda: runs.append(release.wait(5)))])
+    warmup.start()
+    warmup.start()
+    assert not warmup.ready and warmup.status()['running']
+    release.set()
+    assert warmup.wait(5) and runs == [True]
+
+
+def test_skip_marks_ready():
+    warmup = Warmup([('never', lambda: 1 / 0)])
+    warmup.skip()
+    assert warmup.ready and warmup.status()['durationMs'] == 0.0 and warmup.status()['steps'] == {}
+
+
+def test_every_warmup_step_succeeds(main_module):
+    warmup = Warmup(main_module.warmup.steps)
+    warmup.run()
+    assert warmup.errors == {}
+
+
+def test_health_and_readiness(client, main_module, monkeypatch):
+    # WARMUP_ON_STARTUP=0 in the tests: ready straight after startup
+    assert client.get('/readyz').status_code == 200
+    assert client.get('/healthz').json()['status'] == 'ok'
+
+    monkeypatch.setattr(main_module, 'warmup', Warmup([]))
+    response = client.get('/readyz')
+    assert response.status_code == 503 and response.json()['ready'] is False
+    assert client.get('/healthz').json() == {'status': 'ok', 'ready': False, 'warmupMs': None}
@@ -0,0 +1,30 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from worker_lock import WorkerLock
+
+HOLD_LOCK = """
+import sys
+from worker_lock import WorkerLock
+print(WorkerLock(sys.argv[1]).acquire(), flush=True)
+sys.stdin.read()
+"""
+
+
+def test_only_one_process_holds_the_lock(tmp_path):
+    path = tmp_path / 'worker.lock'
+    holder = subprocess.Popen([sys.executable, '-c', HOLD_LOCK, str(path)], stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE, text=True, cwd=Path(__file__).resolve().parent.parent)
+    try:
+        assert holder.stdout.readline().strip() == 'True'
+        lock = WorkerLock(path)
+        assert not lock.acquire()
+        assert lock.owner() == holder.pid
+    finally:
+        holder.stdin.close()
+        holder.wait()
+    # Released when the holder exits
+    assert lock.acquire()
+    assert lock.acquire()
+    assert lock.owner() is not None
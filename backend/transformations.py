@@ -1,60 +1,48 @@
-from music21 import stream, note, interval, analysis, pitch
-from typing import List, Dict, Optional
-from scale_utils import get_scale_intervals
+from typing import List, Dict, Iterable, Optional, Sequence, Union
+from scale_utils import SCALE_REGISTRY
+from melody_analysis import StreamingMelodyAnalyzer
+from fragments import sample_fragments
+from looped_pattern import LoopedPattern
+import numpy as np
 import random
 
+# Harmony range: voices are folded by octaves into C2..C7
+HARMONY_LOW = 36
+HARMONY_HIGH = 96
+
+# Chord shapes as scale steps from the melody note (2 = a third, 4 = a fifth);
+# negative steps put the voice below the melody
+CHORD_SHAPES = {
+    "third": [2],
+    "triad": [2, 4],
+    "seventh": [2, 4, 6],
+    "ninth": [2, 4, 6, 8],
+    "sixth": [2, 5],
+    "sus2": [1, 4],
+    "sus4": [3, 4],
+    "quartal": [3, 6],
+    "open": [4, 9],
+    "below": [-2, -4],
+    "satb": [-2, -4, -7],
+}
+
+def fold_into_range(pitches: np.ndarray, low: int = HARMONY_LOW, high: int = HARMONY_HIGH) -> np.ndarray:
+    """Move pitches by whole octaves until they are <= high, then >= low"""
+    pitches = np.asarray(pitches, dtype=np.int64)
+    pitches = np.where(pitches > high, pitches - 12 * ((pitches - high + 11) // 12), pitches)
+    return np.where(pitches < low, pitches + 12 * ((low - pitches + 11) // 12), pitches)
+
 class MusicTransformer:
     def __init__(self, scale_type: str, root_note: str):
         self.scale_type = scale_type
         self.root_note = root_note
-        self.scale_intervals = get_scale_intervals(scale_type)
-        self.root_pitch = pitch.Pitch(root_note)
+        self.scale_table = SCALE_REGISTRY.get(scale_type, root_note)
+        self.scale_intervals = list(self.scale_table.intervals)
         
-    def analyze_melody(self, notes: List[Dict]) -> Dict:
-        """Analyze melody for intervals, contour, and patterns"""
-        if not notes:
-            return {
-                'intervals': [],
-                'contour': [],
-                'scale_degrees': [],
-                'phrases': []
-            }
-            
-        # Calculate intervals
-        intervals = []
-        for i in range(1, len(notes)):
-            intervals.append(notes[i]['midi'] - notes[i-1]['midi'])
-            
-        # Analyze contour (up/down/same)
-        contour = []
-        for interv in intervals:
-            if interv > 0:
-                contour.append('up')
-            elif interv < 0:
-                contour.append('down')
-            else:
-                contour.append('same')
-                
-        # Calculate scale degrees
-        scale_degrees = []
-        for note_data in notes:
-            degree = self.get_scale_degree(note_data['midi'])
-            scale_degrees.append(degree)
-            
-        # Detect phrases (simplified - based on time gaps)
-        phrases = self.detect_phrases(notes)
-        
-        return {
-            'intervals': intervals,
-            'contour': contour,
-            'scale_degrees': scale_degrees,
-            'phrases': phrases,
-            'range': {
-                'lowest': min(n['midi'] for n in notes),
-                'highest': max(n['midi'] for n in notes),
-                'span': max(n['midi'] for n in notes) - min(n['midi'] for n in notes)
-            }
-        }
+    def analyze_melody(self, notes: List[Dict], min_motif_length: int = 3) -> Dict:
+        """Analyze melody for intervals, contour, phrases and repeated motifs in one pass"""
+        analyzer = StreamingMelodyAnalyzer(self.scale_table, min_motif_length=min_motif_length)
+        return analyzer.add_many(notes).result()
         
     def counter_melody(self, notes: List[Dict], style: str = "contrary") -> List[Dict]:
         """Generate counter melody using contrary/parallel/oblique motion"""
@@ -120,25 +108,33 @@ class MusicTransformer:
         
     def harmonize(self, notes: List[Dict], interval_degree: int = 3) -> List[Dict]:
         """Create harmony line at specified diatonic interval"""
-        harmonized = []
+        return self.harmonize_voices(notes, [interval_degree])[0]
+        
+    def harmony_pitches(self, pitches: Sequence[int], intervals: Sequence[int]) -> np.ndarray:
+        """
+        Pitches of every harmony voice at once: one row per interval (in scale
+        steps), folded into the harmony range.
+        """
+        steps = np.asarray(intervals, dtype=np.int64).reshape(-1, 1)
+        return fold_into_range(self.scale_table.transpose_steps(np.asarray(pitches, dtype=np.int64), steps))
+        
+    def harmonize_voices(self, notes: List[Dict], intervals: Sequence[int]) -> List[List[Dict]]:
+        """Create one harmony line per diatonic interval, computed in one pass"""
+        if not notes:
+            return [[] for _ in intervals]
+        voices = self.harmony_pitches([n['midi'] for n in notes], intervals).tolist()
+        return [[{
+            **note_data,
+            'midi': pitch,
+            'velocity': note_data.get('velocity', 0.7) * 0.85
+        } for note_data, pitch in zip(notes, voice)] for voice in voices]
         
-        for note_data in notes:
-            # Find the diatonic interval in the scale
-            harmony_pitch = note_data['midi'] + self.find_diatonic_interval(note_data['midi'], interval_degree)
-            
-            # Keep in reasonable range
-            while harmony_pitch > 96:  # If too high
-                harmony_pitch -= 12
-            while harmony_pitch < 36:  # If too low
-                harmony_pitch += 12
-                
-            harmonized.append({
-                **note_data,
-                'midi': harmony_pitch,
-                'velocity': note_data.get('velocity', 0.7) * 0.85
-            })
-            
-        return harmonized
+    @staticmethod
+    def chord_intervals(chord: Optional[str]) -> List[int]:
+        """Scale steps of a named chord shape"""
+        if chord not in CHORD_SHAPES:
+            raise ValueError(f"Unknown chord shape: {chord} (expected one of {', '.join(CHORD_SHAPES)})")
+        return list(CHORD_SHAPES[chord])
         
     def transpose(self, notes: List[Dict], semitones: int) -> List[Dict]:
         """Transpose melody by semitones"""
@@ -262,34 +258,22 @@ class MusicTransformer:
                     
         return result
         
-    def develop(self, notes: List[Dict], method: str = "sequence") -> List[Dict]:
-        """Apply melodic development techniques"""
+    def develop(self, notes: List[Dict], method: str = "sequence", fragment_count: int = 4,
+                fragment_min_length: int = 2, fragment_max_length: int = 4) -> List[Dict]:
+        """
+        Apply melodic development techniques.
+
+        fragment_count and the fragment lengths only apply to method "fragment".
+        """
         if not notes:
             return []
             
         if method == "sequence":
-            # Repeat pattern at different scale degrees
-            developed = []
-            pattern_length = min(4, len(notes))
-            pattern = notes[:pattern_length]
-            
-            # Original
-            developed.extend(pattern)
-            
-            # Sequence up by scale steps
-            for degree_offset in [2, 4, -1]:  # up 2nd, up 4th, down 2nd
-                time_offset = len(developed) * 0.5
-                for note_data in pattern:
-                    new_pitch = self.transpose_by_scale_degree(note_data['midi'], degree_offset)
-                    developed.append({
-                        **note_data,
-                        'midi': new_pitch,
-                        'time': note_data['time'] + time_offset
-                    })
+            developed = self.sequence_pattern(notes).unroll()
                     
         elif method == "fragment":
-            # Break into fragments and recombine
-            fragments = self.extract_fragments(notes)
+            # Sample fragments (as views, not copies) and recombine
+            fragments = sample_fragments(notes, fragment_count, fragment_min_length, fragment_max_length)
             developed = self.recombine_fragments(fragments)
             
         elif method == "extend":
@@ -317,24 +301,62 @@ class MusicTransformer:
                     })
                     
         return developed
-        
+
+    def sequence_pattern(self, notes: List[Dict]) -> LoopedPattern:
+        """
+        develop("sequence") as a looped pattern: the first (up to) 4 notes,
+        then the same notes up a 2nd, up a 4th and down a 2nd, each repeat
+        starting 0.5s per pattern note after the previous one.
+        """
+        pattern = notes[:min(4, len(notes))]
+        return LoopedPattern.sequence(pattern, self.scale_table, [0, 2, 4, -1], period=len(pattern) * 0.5)
+
+    def apply(self, name: str, notes: Union[List[Dict], LoopedPattern],
+              params: Optional[Dict] = None) -> Union[List[Dict], LoopedPattern]:
+        """
+        Apply a transformation by its endpoint name, using the endpoint defaults.
+
+        Looped patterns stay looped for transpositions and augmentation/
+        diminution; other transformations unroll them first.
+        """
+        params = params or {}
+        if isinstance(notes, LoopedPattern):
+            if name == "transpose":
+                return notes.transpose(params.get('semitones') or 0)
+            if name == "transpose-diatonic":
+                return notes.transpose_diatonic(self.scale_table, params.get('semitones') or 0)
+            if name == "augment":
+                return notes.scale_time(params.get('factor') or 2.0)
+            if name == "diminish":
+                return notes.scale_time(params.get('factor') or 0.5)
+            notes = notes.unroll()
+        if name == "counter-melody":
+            return self.counter_melody(notes, style=params.get('style') or "contrary")
+        if name == "harmonize":
+            return self.harmonize(notes, interval_degree=params.get('interval') or 3)
+        if name == "transpose":
+            return self.transpose(notes, semitones=params.get('semitones') or 0)
+        if name == "transpose-diatonic":
+            return self.transpose_diatonic(notes, scale_steps=params.get('semitones') or 0)
+        if name == "invert":
+            return self.invert(notes, axis=params.get('axis') or "center")
+        if name == "augment":
+            return self.augment(notes, factor=params.get('factor') or 2.0)
+        if name == "diminish":
+            return self.diminish(notes, factor=params.get('factor') or 0.5)
+        if name == "ornament":
+            return self.ornament(notes, style=params.get('style') or "classical")
+        if name == "develop":
+            return self.develop(notes, method=params.get('method') or "sequence",
+                                fragment_count=params.get('fragment_count') or 4,
+                                fragment_min_length=params.get('fragment_min_length') or 2,
+                                fragment_max_length=params.get('fragment_max_length') or 4)
+        raise ValueError(f"Unknown transformation: {name}")
+
     # Helper methods
     def get_scale_degree(self, midi_note: int) -> int:
-        """Get scale degree of a MIDI note"""
-        note_class = midi_note % 12
-        root_class = self.root_pitch.pitchClass
-        
-        # Calculate interval from root
-        interval_from_root = (note_class - root_class) % 12
-        
-        # Find closest scale degree
-        for i, scale_interval in enumerate(self.scale_intervals):
-            if scale_interval == interval_from_root:
-                return i + 1
-                
-        # Not in scale, return closest
-        closest = min(self.scale_intervals, key=lambda x: abs(x - interval_from_root))
-        return self.scale_intervals.index(closest) + 1
+        """Get scale degree of a MIDI note (closest degree if not in scale)"""
+        return self.scale_table.degree_of_pc[midi_note % 12] + 1
         
     def find_diatonic_interval(self, midi_note: int, interval_steps: int) -> int:
         """Find diatonic interval (in scale steps, not semitones)"""
@@ -450,35 +472,24 @@ class MusicTransformer:
             }
         ]
         
-    def extract_fragments(self, notes: List[Dict], min_length: int = 2, max_length: int = 4) -> List[List[Dict]]:
-        """Extract melodic fragments"""
-        fragments = []
-        
-        for length in range(min_length, min(max_length + 1, len(notes) + 1)):
-            for i in range(len(notes) - length + 1):
-                fragments.append(notes[i:i + length])
-                
-        return fragments
-        
-    def recombine_fragments(self, fragments: List[List[Dict]]) -> List[Dict]:
-        """Recombine fragments in interesting ways"""
-        if not fragments:
-            return []
-            
-        # Select random fragments and concatenate
+    def recombine_fragments(self, fragments: Iterable[Sequence[Dict]]) -> List[Dict]:
+        """
+        Concatenate fragments in order, each starting 0.1s after the previous one ends.
+
+        Fragments may be lists or views; only the notes that end up in the
+        result are copied.
+        """
         result = []
         time_offset = 0
         
-        for _ in range(4):  # Create 4 fragment combinations
-            if fragments:
-                fragment = random.choice(fragments)
-                for note_data in fragment:
-                    result.append({
-                        **note_data,
-                        'time': note_data['time'] + time_offset
-                    })
-                if fragment:
-                    time_offset = result[-1]['time'] + result[-1]['duration'] + 0.1
+        for fragment in fragments:
+            for note_data in fragment:
+                result.append({
+                    **note_data,
+                    'time': note_data['time'] + time_offset
+                })
+            if result:
+                time_offset = result[-1]['time'] + result[-1]['duration'] + 0.1
                     
         return result
         
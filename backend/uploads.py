@@ -0,0 +1,174 @@
+"""
+Size-bounded upload handling.
+
+UploadLimitMiddleware enforces a per-route body size cap before the multipart
+parser spools anything: a too-large Content-Length is rejected straight away,
+and chunked bodies are cut off as soon as they pass the cap. For routes with
+a declared kind ('midi' or 'json'), it also checks the first bytes of the
+uploaded file as they arrive (MThd header, or a JSON object/array), so a
+wrong file is rejected without being received in full.
+
+Endpoints then read the spooled upload in chunks with read_upload() /
+iter_upload_chunks(), which apply the same checks.
+"""
+import re
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_LIMIT = 64 * 1024  # Multipart part headers must end within this many bytes
+MULTIPART_OVERHEAD = 16 * 1024  # Boundaries and part headers around the file
+
+MIDI_MAGIC = b'MThd'
+JSON_WHITESPACE = b' \t\r\n'
+UTF8_BOM = b'\xef\xbb\xbf'
+
+class UploadRejected(HTTPException):
+    """An upload refused before (or while) reading it: too large or wrong content"""
+
+def upload_error_response(request, exc: UploadRejected) -> JSONResponse:
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code)
+
+def too_large(max_bytes: int) -> UploadRejected:
+    return UploadRejected(413, f"Upload too large: the limit is {max_bytes} bytes")
+
+def check_file_start(kind: Optional[str], head: bytes) -> Optional[bool]:
+    """
+    Whether a file starting with `head` can be of this kind: True/False, or
+    None if more bytes are needed to tell.
+    """
+    if kind == 'midi':
+        if len(head) < len(MIDI_MAGIC):
+            return None if MIDI_MAGIC.startswith(head) else False
+        return head.startswith(MIDI_MAGIC)
+    if kind == 'json':
+        start = head[len(UTF8_BOM):] if head.startswith(UTF8_BOM) else head
+        start = start.lstrip(JSON_WHITESPACE)
+        if not start:
+            return None
+        return start[:1] in (b'{', b'[')
+    return True
+
+def wrong_kind(kind: str) -> UploadRejected:
+    if kind == 'midi':
+        return UploadRejected(415, "Invalid MIDI file: missing MThd header")
+    return UploadRejected(415, "Invalid JSON file: expected a JSON object")
+
+class _MultipartSniffer:
+    """Finds the first file part in a multipart body and checks its first bytes"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.head = b''
+        self.done = False
+
+    def feed(self, data: bytes) -> None:
+        if self.done:
+            return
+        self.head += data
+        match = re.search(rb'filename="[^"]*"[^\r\n]*\r\n(?:[^\r\n]+\r\n)*\r\n', self.head)
+        if match is None:
+            if len(self.head) > SNIFF_LIMIT:
+                self.done = True  # Unusual layout: leave it to the endpoint
+            return
+        result = check_file_start(self.kind, self.head[match.end():])
+        if result is None and len(self.head) <= SNIFF_LIMIT:
+            return
+        self.done = True
+        if result is False:
+            raise wrong_kind(self.kind)
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware capping request bodies of the given routes.
+
+    limits maps a path to (max file bytes, kind); kind is 'midi', 'json' or None.
+    """
+
+    def __init__(self, app, limits: Dict[str, Tuple[int, Optional[str]]]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get('path')) if scope['type'] == 'http' else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes, kind = limit
+        headers = dict(scope.get('headers') or [])
+        # Leave room for the multipart framing around the file
+        max_body = max_bytes + MULTIPART_OVERHEAD
+        content_length = headers.get(b'content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body:
+            await upload_error_response(None, too_large(max_bytes))(scope, receive, send)
+            return
+
+        sniffer = None
+        if kind is not None and headers.get(b'content-type', b'').startswith(b'multipart/form-data'):
+            sniffer = _MultipartSniffer(kind)
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                body = message.get('body', b'')
+                received += len(body)
+                if received > max_body:
+                    raise too_large(max_bytes)
+                if sniffer is not None:
+                    sniffer.feed(body)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+def iter_upload_chunks(f: BinaryIO, max_bytes: int, kind: Optional[str] = None,
+                       chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield an upload's bytes in chunks, checking the file start on the first
+    chunk(s) and raising UploadRejected once more than max_bytes were read.
+    """
+    total = 0
+    head = b''
+    checked = kind is None
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise too_large(max_bytes)
+        if not checked:
+            head += chunk
+            result = check_file_start(kind, head[:SNIFF_LIMIT])
+            if result is False or (result is None and len(head) > SNIFF_LIMIT):
+                raise wrong_kind(kind)
+            checked = result is True
+        yield chunk
+    if not checked:
+        # Ended before the start could be checked (e.g. empty or all whitespace)
+        raise wrong_kind(kind)
+
+async def read_upload(file: UploadFile, max_bytes: int, kind: Optional[str] = None) -> bytes:
+    """Read a whole upload, in chunks, within max_bytes and checking its kind"""
+    chunks = []
+    total = 0
+    head = b''
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise too_large(max_bytes)
+        if kind is not None and len(head) < SNIFF_LIMIT:
+            head += chunk
+            if check_file_start(kind, head[:SNIFF_LIMIT]) is False:
+                raise wrong_kind(kind)
+        chunks.append(chunk)
+    if kind is not None and check_file_start(kind, head[:SNIFF_LIMIT]) is not True:
+        raise wrong_kind(kind)
+    return b''.join(chunks)
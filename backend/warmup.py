@@ -0,0 +1,80 @@
+"""
+Startup warmup and readiness.
+
+The first request after a (re)start pays for first-use costs: music21's lazy
+initialization, NumPy kernels, the MIDI writers and empty caches. A Warmup
+runs a list of named steps (small representative calls into each of those
+paths) once, in a background thread, and records how long each took, so
+/healthz can answer right away while /readyz stays false until the worker is
+warm and a proxy can hold traffic until then.
+
+A step fails if it raises or returns an endpoint-style {"error": ...} dict.
+Failed steps are reported but don't keep the worker unready: every path still
+works, the first request to it is just slower.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+WarmupStep = Tuple[str, Callable[[], Any]]
+
+class Warmup:
+    def __init__(self, steps: Sequence[WarmupStep]):
+        self.steps = list(steps)
+        self.started: Optional[float] = None  # Wall-clock time
+        self.finished: Optional[float] = None
+        self.duration: Optional[float] = None  # Seconds
+        self.step_seconds: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def run(self) -> None:
+        """Run every step once, timing each"""
+        self.started = time.time()
+        started = time.perf_counter()
+        for name, step in self.steps:
+            step_started = time.perf_counter()
+            try:
+                result = step()
+                if isinstance(result, dict) and 'error' in result:
+                    self.errors[name] = str(result['error'])
+            except Exception as e:
+                self.errors[name] = str(e)
+            self.step_seconds[name] = time.perf_counter() - step_started
+        self.duration = time.perf_counter() - started
+        self.finished = time.time()
+        self._done.set()
+        if self.errors:
+            print(f"Warmup finished in {self.duration * 1000:.0f} ms with errors: {self.errors}")
+        else:
+            print(f"Warmup finished in {self.duration * 1000:.0f} ms")
+
+    def start(self) -> None:
+        """Run in a background thread (once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def skip(self) -> None:
+        """Mark ready without warming up (warmup disabled)"""
+        self.duration = 0.0
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "running": self.started is not None and not self.ready,
+            "startedAt": self.started,
+            "finishedAt": self.finished,
+            "durationMs": None if self.duration is None else round(self.duration * 1000, 1),
+            "steps": {name: round(seconds * 1000, 1) for name, seconds in self.step_seconds.items()},
+            "errors": self.errors
+        }
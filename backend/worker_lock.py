@@ -0,0 +1,88 @@
+"""
+Single-worker ownership of in-process state.
+
+Settings are shared between workers through SQLite (shared_state.py), but
+layer sessions, the melody corpus, the OSC scheduler and the melody watcher
+live in one process's memory: a session created (or a corpus ingested) by
+one `uvicorn --workers N` worker is unknown to the others, and every worker
+starting its own watcher or scheduler sends each OSC message N times.
+
+A WorkerLock is an exclusive flock on a file next to the settings database.
+The one process holding it owns that state; it is released by the OS when
+the process exits, so a restarted worker can take over. The
+SingleWorkerMiddleware answers requests for the stateful routes in every
+other process with 503 and an error saying to run a single worker, instead
+of letting them fail at random (or play twice).
+"""
+import os
+import re
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, and uvicorn workers there are rare
+    fcntl = None
+
+class WorkerLock:
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self.held = False
+
+    def acquire(self) -> bool:
+        """Take the lock if no other process holds it; True if this process holds it"""
+        if self.held and self._pid == os.getpid():
+            return True
+        if fcntl is None:
+            self.held, self._pid = True, os.getpid()
+            return True
+        if self._fd is None or self._pid != os.getpid():
+            # Never reuse a descriptor inherited across fork: the lock belongs to the parent
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+            self.held = False
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, str(os.getpid()).encode(), 0)
+        self.held = True
+        return True
+
+    def owner(self) -> Optional[int]:
+        """PID of the process holding the lock, as it recorded it"""
+        try:
+            return int(self.path.read_text().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+class SingleWorkerMiddleware:
+    """
+    ASGI middleware letting only the lock holder serve the given routes.
+
+    routes is a list of path regexes, matched from the start of the path.
+    """
+
+    def __init__(self, app, lock: WorkerLock, routes: Sequence[str]):
+        self.app = app
+        self.lock = lock
+        self.routes = [re.compile(pattern) for pattern in routes]
+
+    async def __call__(self, scope, receive, send):
+        if (scope['type'] == 'http' and scope.get('method') != 'OPTIONS'
+                and any(pattern.match(scope.get('path', '')) for pattern in self.routes)
+                and not self.lock.acquire()):
+            response = JSONResponse({"error": (
+                f"Layer sessions, the melody corpus, the OSC scheduler and the melody watcher are kept in one "
+                f"worker's memory (pid {self.lock.owner()}), and this request reached another worker. "
+                f"Run the server with a single worker (uvicorn --workers 1) to use them"
+            )}, status_code=503)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
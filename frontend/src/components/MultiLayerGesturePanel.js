@@ -29,8 +29,8 @@ const MultiLayerGesturePanel = ({
     return (
       config.midiNote >= 0 && config.midiNote <= 127 &&
       config.durationPercent >= 1 && config.durationPercent <= 100 &&
-      config.totalDuration >= 1 && config.totalDuration <= 10 &&
-      config.numNotes >= 1 && config.numNotes <= 100
+      config.totalDuration >= 1 && config.totalDuration <= 3600 &&
+      config.numNotes >= 1 && config.numNotes <= 100000
     );
   };
 
@@ -150,7 +150,7 @@ const MultiLayerGesturePanel = ({
                 <input
                   type="number"
                   min="1"
-                  max="10"
+                  max="3600"
                   step="0.5"
                   value={config.totalDuration}
                   onChange={(e) => updateLayerConfig(config.layerId, 'totalDuration', e.target.value)}
@@ -168,7 +168,7 @@ const MultiLayerGesturePanel = ({
                 <input
                   type="number"
                   min="1"
-                  max="100"
+                  max="100000"
                   value={config.numNotes}
                   onChange={(e) => updateLayerConfig(config.layerId, 'numNotes', e.target.value)}
                   style={{
@@ -193,7 +193,7 @@ const MultiLayerGesturePanel = ({
               marginBottom: '12px',
               textAlign: 'center'
             }}>
-              Please check parameter ranges: MIDI Note (0-127), Duration % of max (1-100), Total Duration (1-10s), Num Notes (1-100)
+              Please check parameter ranges: MIDI Note (0-127), Duration % of max (1-100), Total Duration (1-3600s), Num Notes (1-100000)
             </div>
           )}
 